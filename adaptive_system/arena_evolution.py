@@ -0,0 +1,766 @@
+#!/usr/bin/env python3
+"""
+Evolución acelerada de la Bot Battle Arena con backtests sobre datos históricos.
+
+En la arena en vivo cada generación tarda días: los guerreros operan en
+tiempo real y ``evaluate_arena`` los ordena por su ROI. Este módulo ejecuta
+el mismo ciclo (eliminar a los peores, cruzar y mutar a los mejores con
+``BotBattleArena._optimize_parameters``) puntuando a cada guerrero con un
+backtest vectorizado sobre velas históricas, de modo que pueden correrse
+cientos de generaciones en minutos y sembrar la arena con los ganadores.
+
+- Las señales reproducen la lógica de ``ScalpingStrategies`` tal como la
+  invoca ``TradingBot`` (multi_bot_manager): mismos indicadores, filtros de
+  volumen y de riesgo/recompensa, take profit y stop loss y tamaño de
+  posición, calculados sobre toda la serie con ``indicators.batch``.
+- La simulación sigue las reglas de ``TradingBot``: cierre por TP/SL al
+  precio de cierre de la vela, cierre y giro ante una señal contraria, cortos
+  sólo en futuros y comisión del 0.1% por lado.
+- Cada generación se evalúa en paralelo con ``ParallelGridRunner`` (pool
+  persistente: las velas se publican en memoria compartida una sola vez y
+  cada proceso conserva sus cachés entre generaciones).
+- Cachés: indicadores por timeframe y estrategia, y señales por los
+  parámetros que les afectan (en cada proceso); resultado completo por
+  guerrero (en el proceso principal), de modo que los supervivientes y los
+  hijos idénticos a otro ya evaluado no se vuelven a simular.
+
+La estrategia ``ml_adaptive`` depende de un modelo entrenado en vivo y no
+tiene versión vectorizada: sus guerreros se excluyen de la evolución offline.
+
+Uso típico:
+    from adaptive_system.bot_battle_arena import get_bot_battle_arena
+    arena = get_bot_battle_arena()
+    report = arena.evolve_offline(velas_1m, generations=300, n_jobs=4)
+"""
+
+import logging
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtesting.parallel import ParallelGridRunner
+from indicators import batch
+
+logger = logging.getLogger('BotBattleArena')
+
+OFFLINE_STRATEGIES = ("breakout_scalping", "momentum_scalping", "mean_reversion")
+
+# Comisión por lado de TradingBot (0.1%)
+COMMISSION_RATE = 0.001
+
+# Valores por defecto de ScalpingStrategies cuando el guerrero no los define
+STRATEGY_DEFAULTS = {
+    "max_position_size_pct": 2.0,
+    "take_profit_pct": 0.5,
+    "stop_loss_pct": 0.3,
+    "min_volume_threshold": 1.5,
+    "min_rr_ratio": 1.5
+}
+
+# Parámetros que afectan a las señales de cada estrategia (clave de la caché)
+SIGNAL_PARAMS = {
+    "breakout_scalping": ("take_profit_pct", "stop_loss_pct", "min_volume_threshold",
+                          "min_rr_ratio", "max_position_size_pct"),
+    "momentum_scalping": ("take_profit_pct", "stop_loss_pct", "min_rr_ratio",
+                          "max_position_size_pct"),
+    "mean_reversion": ("stop_loss_pct", "min_rr_ratio", "max_position_size_pct")
+}
+
+# Reglas de pandas para cada sufijo de timeframe
+_RESAMPLE_UNITS = {"m": "min", "h": "h", "d": "D", "w": "W"}
+
+# Cachés del proceso (se vacían si cambian los datos)
+_SIGNAL_CACHE_SIZE = 4096
+_worker_token: Optional[str] = None
+_frame_cache: Dict[str, Dict[str, np.ndarray]] = {}
+_indicator_cache: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+_signal_cache: "OrderedDict[Tuple, Dict[str, np.ndarray]]" = OrderedDict()
+
+
+def data_token(data: pd.DataFrame) -> str:
+    """
+    Identificador barato de un DataFrame de velas (tamaño, extremos y suma de cierres)
+
+    Args:
+        data: Velas OHLCV
+
+    Returns:
+        str: Token que cambia si cambian los datos
+    """
+    if data.empty:
+        return "empty"
+    return f"{len(data)}:{data.index[0]}:{data.index[-1]}:{float(data['close'].sum()):.10g}"
+
+
+def resample_ohlcv(data: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """
+    Agrega velas a un timeframe mayor (las velas vacías se descartan)
+
+    Args:
+        data: Velas OHLCV con DatetimeIndex
+        timeframe: Timeframe de destino ('1m', '5m', '15m', '1h', '4h', '1d'...)
+
+    Returns:
+        pd.DataFrame: Velas OHLCV del timeframe pedido
+    """
+    if not isinstance(data.index, pd.DatetimeIndex):
+        raise ValueError("Las velas deben estar indexadas por tiempo para cambiar de timeframe")
+    unit = _RESAMPLE_UNITS.get(timeframe[-1:].lower())
+    if unit is None or not timeframe[:-1].isdigit():
+        raise ValueError(f"Timeframe no soportado: {timeframe}")
+    rule = f"{int(timeframe[:-1])}{unit}"
+
+    # Si los datos ya están en ese timeframe no hace falta agregar
+    if len(data) > 1 and (data.index[1:] - data.index[:-1]).min() >= pd.Timedelta(rule):
+        return data
+    frame = data.resample(rule).agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum'
+    })
+    return frame.dropna(subset=['close'])
+
+
+def _frame_arrays(data: pd.DataFrame, timeframe: str) -> Dict[str, np.ndarray]:
+    """Columnas OHLCV del timeframe como arrays float64 (cacheadas)"""
+    if timeframe not in _frame_cache:
+        frame = resample_ohlcv(data, timeframe)
+        _frame_cache[timeframe] = {
+            col: frame[col].to_numpy(dtype=np.float64)
+            for col in ('open', 'high', 'low', 'close', 'volume')
+        }
+    return _frame_cache[timeframe]
+
+
+def _strategy_indicators(frame: Dict[str, np.ndarray], strategy_name: str) -> Dict[str, np.ndarray]:
+    """
+    Indicadores que no dependen de los parámetros del guerrero
+
+    Args:
+        frame: Columnas OHLCV
+        strategy_name: Estrategia
+
+    Returns:
+        Dict[str, np.ndarray]: Indicadores y condiciones base de la estrategia
+    """
+    close, high, low, volume = frame['close'], frame['high'], frame['low'], frame['volume']
+    avg_volume = batch.rolling_mean(volume, 10)
+    prev_close = batch.shift(close, 1)
+
+    if strategy_name == "breakout_scalping":
+        # Máximo/mínimo de las 10 velas anteriores. ScalpingStrategies incluye
+        # la vela actual en la ventana, con lo que el cierre nunca puede
+        # superar el máximo; aquí se usa la ventana anterior a la vela.
+        upper = batch.shift(batch.rolling_max(high, 10), 1)
+        lower = batch.shift(batch.rolling_min(low, 10), 1)
+        return {
+            'volume_ratio': volume / avg_volume,
+            'bullish': (close > upper) & (prev_close <= upper),
+            'bearish': (close < lower) & (prev_close >= lower),
+            'atr': batch.rolling_mean(high - low, 10) * 1.5
+        }
+
+    if strategy_name == "momentum_scalping":
+        fast = batch.ema(close, 5)
+        slow = batch.ema(close, 8)
+        prev_fast, prev_slow = batch.shift(fast, 1), batch.shift(slow, 1)
+        rsi = batch.rsi(close, 7)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            momentum = (close / batch.shift(close, 3) - 1) * 100
+        volume_confirmed = volume > avg_volume * 1.2
+        bullish = (fast > slow) & (prev_fast <= prev_slow) & (rsi > 50) & (momentum > 0.5) & volume_confirmed
+        bearish = (fast < slow) & (prev_fast >= prev_slow) & (rsi < 50) & (momentum < -0.5) & volume_confirmed
+        return {
+            'bullish': bullish,
+            'bearish': bearish,
+            'atr': batch.rolling_mean(_true_range(high, low, close), 14) * 1.5
+        }
+
+    if strategy_name == "mean_reversion":
+        middle, upper, lower = batch.bollinger_bands(close, 20, 2.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bandwidth = (upper - lower) / middle * 100
+        squeezing = bandwidth < batch.rolling_mean(bandwidth, 10) * 0.8
+        rsi = batch.rsi(close, 14)
+        return {
+            'bullish': (close <= lower) & (rsi < 30) & ~squeezing,
+            'bearish': (close >= upper) & (rsi > 70) & ~squeezing,
+            'target': middle,
+            'atr': batch.rolling_mean(_true_range(high, low, close), 14)
+        }
+
+    raise ValueError(f"Estrategia sin versión offline: {strategy_name}")
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True Range como lo calcula ScalpingStrategies (NaN en la primera vela)"""
+    prev_close = batch.shift(close, 1)
+    return np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def strategy_signals(frame: Dict[str, np.ndarray], indicators: Dict[str, np.ndarray],
+                     strategy_name: str, params: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Señales de entrada de una estrategia sobre toda la serie
+
+    Args:
+        frame: Columnas OHLCV
+        indicators: Resultado de _strategy_indicators para la estrategia
+        strategy_name: Estrategia
+        params: Parámetros del guerrero
+
+    Returns:
+        Dict[str, np.ndarray]: 'index' (velas con señal), 'direction' (1 compra,
+        -1 venta), 'take_profit', 'stop_loss' y 'size_pct' de cada señal
+    """
+    p = {**STRATEGY_DEFAULTS, **params}
+    close = frame['close']
+    tp_pct = p['take_profit_pct'] / 100
+    sl_pct = p['stop_loss_pct'] / 100
+    bullish, bearish = indicators['bullish'], indicators['bearish']
+    if strategy_name == "breakout_scalping":
+        volume_ok = indicators['volume_ratio'] > p['min_volume_threshold']
+        bullish, bearish = bullish & volume_ok, bearish & volume_ok
+
+    index = np.flatnonzero(bullish | bearish)
+    direction = np.where(bullish[index], 1, -1).astype(np.int8)
+    price = close[index]
+    atr = indicators['atr'][index]
+
+    if strategy_name == "mean_reversion":
+        take_profit = indicators['target'][index]
+        size_factor = 0.5
+    else:
+        take_profit = price * (1 + direction * tp_pct)
+        size_factor = 0.7 if strategy_name == "momentum_scalping" else 1.0
+    # Stop por ATR, limitado al stop porcentual (el más cercano al precio)
+    stop_loss = np.where(direction == 1,
+                         np.fmax(price * (1 - sl_pct), price - atr),
+                         np.fmin(price * (1 + sl_pct), price + atr))
+
+    risk = (price - stop_loss) * direction
+    reward = (take_profit - price) * direction
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rr_ratio = np.where(risk > 0, reward / risk, 0.0)
+    keep = rr_ratio >= p['min_rr_ratio']
+
+    return {
+        'index': index[keep],
+        'direction': direction[keep],
+        'take_profit': take_profit[keep],
+        'stop_loss': stop_loss[keep],
+        'size_pct': np.minimum(p['max_position_size_pct'], rr_ratio[keep] * size_factor)
+    }
+
+
+def _first_exit(close: np.ndarray, start: int, direction: int,
+                take_profit: float, stop_loss: float) -> int:
+    """
+    Primera vela desde ``start`` cuyo cierre alcanza el TP o el SL
+
+    Busca en bloques crecientes para no recorrer la serie entera en cada
+    operación.
+
+    Returns:
+        int: Índice de la vela, o -1 si no se alcanza
+    """
+    n = len(close)
+    chunk = 64
+    while start < n:
+        stop = min(start + chunk, n)
+        window = close[start:stop]
+        if direction == 1:
+            hit = (window >= take_profit) | (window <= stop_loss)
+        else:
+            hit = (window <= take_profit) | (window >= stop_loss)
+        if hit.any():
+            return start + int(hit.argmax())
+        start = stop
+        chunk *= 4
+    return -1
+
+
+def simulate_bracket_trades(close: np.ndarray, signals: Dict[str, np.ndarray],
+                            initial_balance: float = 100.0, leverage: int = 1,
+                            market_type: str = "spot",
+                            commission_rate: float = COMMISSION_RATE) -> Dict[str, Any]:
+    """
+    Simula las señales con la gestión de posiciones de TradingBot
+
+    En cada vela con señal: si hay posición contraria se cierra (y se abre la
+    nueva); si no hay posición se abre. Después se comprueban TP y SL con el
+    cierre de la vela. Sólo se recorren las velas con entrada o salida, así
+    que el coste depende del número de operaciones y no de la longitud de la
+    serie. La contabilidad es la de TradingBot, incluido el PnL multiplicado
+    por el apalancamiento en futuros. La posición abierta al final se cierra
+    con el último precio.
+
+    Args:
+        close: Precios de cierre
+        signals: Resultado de strategy_signals
+        initial_balance: Balance inicial
+        leverage: Apalancamiento
+        market_type: "spot" (sólo largos) o "futures"
+        commission_rate: Comisión por lado
+
+    Returns:
+        Dict[str, Any]: ROI, balance final y estadísticas de las operaciones
+    """
+    futures = market_type == "futures"
+    sig_index, sig_direction = signals['index'], signals['direction']
+    buys = np.flatnonzero(sig_direction == 1)
+    sells = np.flatnonzero(sig_direction == -1)
+    entries = np.arange(len(sig_index)) if futures else buys
+
+    balance = initial_balance
+    peak = initial_balance
+    max_drawdown = 0.0
+    pnls: List[float] = []
+    fees = 0.0
+    reasons = {'take_profit': 0, 'stop_loss': 0, 'signal_reversal': 0, 'end_of_data': 0}
+
+    # Señal con la que se abre la siguiente posición
+    k = entries[0] if len(entries) else None
+    while k is not None and balance > 0:
+        bar = int(sig_index[k])
+        direction = int(sig_direction[k])
+        price = close[bar]
+
+        # Apertura (mismo cálculo de cantidad, margen y comisión que TradingBot)
+        value = balance * signals['size_pct'][k] / 100.0
+        quantity = (value * leverage if futures else value) / price
+        cost = price * quantity
+        commission = cost * commission_rate
+        reserved = cost / leverage if futures else cost
+        if reserved + commission > balance:
+            quantity = (balance - commission) * (leverage if futures else 1) / price * 0.99
+            cost = price * quantity
+            commission = cost * commission_rate
+            reserved = cost / leverage if futures else cost
+        balance -= reserved + commission
+        fees += commission
+
+        # Salida: TP/SL o señal contraria, lo que ocurra antes (la señal se
+        # procesa antes que TP/SL dentro de la misma vela)
+        exit_bar = _first_exit(close, bar + 1, direction,
+                               signals['take_profit'][k], signals['stop_loss'][k])
+        opposite = sells if direction == 1 else buys
+        o = np.searchsorted(sig_index[opposite], bar, side='right')
+        reversal = int(opposite[o]) if o < len(opposite) else None
+        if reversal is not None and (exit_bar < 0 or sig_index[reversal] <= exit_bar):
+            exit_bar, reason = int(sig_index[reversal]), 'signal_reversal'
+        elif exit_bar >= 0:
+            reason = 'take_profit' if (close[exit_bar] - signals['take_profit'][k]) * direction >= 0 else 'stop_loss'
+        else:
+            exit_bar, reason = len(close) - 1, 'end_of_data'
+
+        exit_price = close[exit_bar]
+        exit_commission = exit_price * quantity * commission_rate
+        pnl = (exit_price - price) * quantity * direction
+        if futures:
+            pnl *= leverage
+            balance += reserved + pnl - exit_commission
+        else:
+            balance += exit_price * quantity - exit_commission
+        fees += exit_commission
+        pnls.append(pnl)
+        reasons[reason] += 1
+
+        peak = max(peak, balance)
+        if peak > 0:
+            max_drawdown = max(max_drawdown, (peak - balance) / peak * 100)
+
+        # Siguiente entrada: la señal contraria en futuros (giro) o la
+        # primera señal de entrada posterior al cierre
+        if reason == 'end_of_data':
+            k = None
+        elif reason == 'signal_reversal' and futures:
+            k = reversal
+        else:
+            e = np.searchsorted(sig_index[entries], exit_bar, side='right')
+            k = entries[e] if e < len(entries) else None
+
+    pnl_array = np.asarray(pnls)
+    profitable = int((pnl_array > 0).sum())
+    total_trades = len(pnls)
+    return {
+        'roi': float((balance / initial_balance - 1) * 100),
+        'final_balance': float(balance),
+        'total_trades': total_trades,
+        'profitable_trades': profitable,
+        'losing_trades': total_trades - profitable,
+        'win_rate': profitable / total_trades * 100 if total_trades else 0.0,
+        'total_profit': float(pnl_array[pnl_array > 0].sum()),
+        'total_loss': float(-pnl_array[pnl_array <= 0].sum()),
+        'total_fees': float(fees),
+        'max_drawdown': float(max_drawdown),
+        'exit_reasons': reasons
+    }
+
+
+def _reset_worker_caches(token: str):
+    """Vacía las cachés del proceso si los datos han cambiado"""
+    global _worker_token
+    if token != _worker_token:
+        _frame_cache.clear()
+        _indicator_cache.clear()
+        _signal_cache.clear()
+        _worker_token = token
+
+
+def evaluate_warrior(data: pd.DataFrame, warrior: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Backtest de un guerrero (función de evaluación de ParallelGridRunner)
+
+    Args:
+        data: Velas OHLCV del timeframe base
+        warrior: 'strategy_name', 'timeframe', 'leverage' y 'params'
+        context: 'token' de los datos, 'initial_balance' y 'market_type'
+
+    Returns:
+        Dict[str, Any]: Resultado de simulate_bracket_trades y 'signal_cache_hit'
+    """
+    _reset_worker_caches(context['token'])
+    strategy_name = warrior['strategy_name']
+    timeframe = warrior['timeframe']
+    params = warrior.get('params') or {}
+
+    frame = _frame_arrays(data, timeframe)
+    indicator_key = (timeframe, strategy_name)
+    if indicator_key not in _indicator_cache:
+        _indicator_cache[indicator_key] = _strategy_indicators(frame, strategy_name)
+
+    merged = {**STRATEGY_DEFAULTS, **params}
+    signal_key = (timeframe, strategy_name) + tuple(merged[name] for name in SIGNAL_PARAMS[strategy_name])
+    signals = _signal_cache.get(signal_key)
+    cache_hit = signals is not None
+    if cache_hit:
+        _signal_cache.move_to_end(signal_key)
+    else:
+        signals = strategy_signals(frame, _indicator_cache[indicator_key], strategy_name, params)
+        _signal_cache[signal_key] = signals
+        if len(_signal_cache) > _SIGNAL_CACHE_SIZE:
+            _signal_cache.popitem(last=False)
+
+    result = simulate_bracket_trades(frame['close'], signals,
+                                     initial_balance=context['initial_balance'],
+                                     leverage=warrior.get('leverage', 1),
+                                     market_type=context['market_type'])
+    result['bars'] = len(frame['close'])
+    result['signal_cache_hit'] = cache_hit
+    return result
+
+
+def warrior_key(warrior: Dict[str, Any]) -> Tuple:
+    """Clave hashable de un guerrero para la caché de resultados"""
+    params = warrior.get('params') or {}
+    return (warrior['strategy_name'], warrior['timeframe'], warrior.get('leverage', 1),
+            tuple(sorted((k, repr(v)) for k, v in params.items())))
+
+
+class OfflineArenaEvolution:
+    """
+    Ciclo de evolución de BotBattleArena con backtests históricos.
+
+    La población es una lista de dicts ('strategy_name', 'timeframe',
+    'leverage', 'params', 'generation', 'parent_ids'); la arena sólo se
+    modifica al sembrar los ganadores con ``seed_arena``. Los guerreros con
+    menos de ``min_trades`` operaciones se clasifican detrás de los demás y
+    nunca son ganadores (un ROI de 0 sin operar no es una estrategia).
+    """
+
+    def __init__(self, arena, data: pd.DataFrame,
+                 population_size: Optional[int] = None,
+                 initial_balance: float = 100.0,
+                 market_type: str = "spot",
+                 n_jobs: Optional[int] = None,
+                 seed: Optional[int] = None,
+                 min_trades: int = 1):
+        """
+        Args:
+            arena: BotBattleArena de la que se toman la población inicial, las
+                tasas de eliminación/optimización y el operador de cruce
+            data: Velas OHLCV con DatetimeIndex (se agregan a cada timeframe)
+            population_size: Tamaño de la población (None = max_battle_size de la arena)
+            initial_balance: Balance inicial de cada backtest
+            market_type: "spot" o "futures" (como TradingBot)
+            n_jobs: Procesos para evaluar cada generación (None = todos los núcleos)
+            seed: Semilla del generador aleatorio (evoluciones reproducibles)
+            min_trades: Operaciones mínimas en el backtest para competir por el primer puesto
+        """
+        missing = [col for col in ('open', 'high', 'low', 'close', 'volume') if col not in data.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas OHLCV: {missing}")
+        self.arena = arena
+        self.data = data[['open', 'high', 'low', 'close', 'volume']].astype(np.float64)
+        self.population_size = max(2, population_size or arena.max_battle_size)
+        self.context = {
+            'token': data_token(self.data),
+            'initial_balance': initial_balance,
+            'market_type': market_type
+        }
+        self.n_jobs = n_jobs
+        self.seed = seed
+        self.min_trades = min_trades
+        # Generador propio: no altera el estado global de random
+        self.rng = random.Random(seed)
+
+        self.population: List[Dict[str, Any]] = []
+        self.generation = 0
+        self.history: List[Dict[str, Any]] = []
+        self._results: Dict[Tuple, Dict[str, Any]] = {}
+        self._created = 0
+        self.stats = {
+            'evaluations': 0,
+            'result_cache_hits': 0,
+            'signal_cache_hits': 0,
+            'errors': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Población
+    # ------------------------------------------------------------------
+
+    def initial_population(self) -> List[Dict[str, Any]]:
+        """
+        Guerreros activos de la arena (o la arena estándar si no hay), mutados
+        hasta completar la población
+
+        Returns:
+            List[Dict[str, Any]]: Población inicial
+        """
+        population = []
+        skipped = set()
+        for warrior in self.arena.warriors.values():
+            if not warrior.active or warrior.defeated:
+                continue
+            if warrior.strategy_name not in OFFLINE_STRATEGIES:
+                skipped.add(warrior.strategy_name)
+                continue
+            population.append(self._genome(warrior.strategy_name, warrior.timeframe, warrior.leverage,
+                                           dict(warrior.params), warrior.generation, [warrior.warrior_id]))
+        if skipped:
+            logger.warning(f"Estrategias sin backtest offline, excluidas: {sorted(skipped)}")
+
+        if not population:
+            for strategy_name in OFFLINE_STRATEGIES:
+                for timeframe in ("1m", "5m", "15m", "1h"):
+                    population.append(self._genome(strategy_name, timeframe, 1,
+                                                   self.arena._get_default_params(strategy_name), 1, []))
+
+        # Completar con mutaciones de los existentes
+        base = list(population)
+        while len(population) < self.population_size:
+            parent = self.rng.choice(base)
+            population.append(self._genome(parent['strategy_name'], parent['timeframe'], parent['leverage'],
+                                           self.arena._optimize_parameters(parent['params'], rng=self.rng),
+                                           parent['generation'], [parent['id']]))
+        return population[:max(self.population_size, len(base))]
+
+    def _genome(self, strategy_name: str, timeframe: str, leverage: int, params: Dict[str, Any],
+                generation: int, parent_ids: List[str]) -> Dict[str, Any]:
+        self._created += 1
+        return {
+            'id': f"{strategy_name}_{timeframe}_gen{generation}_{self._created}",
+            'strategy_name': strategy_name,
+            'timeframe': timeframe,
+            'leverage': leverage,
+            'params': params,
+            'generation': generation,
+            'parent_ids': parent_ids
+        }
+
+    # ------------------------------------------------------------------
+    # Evaluación
+    # ------------------------------------------------------------------
+
+    def _evaluate(self, runner: ParallelGridRunner, population: List[Dict[str, Any]]):
+        """Asigna 'result' a cada guerrero, evaluando sólo los no cacheados"""
+        pending: Dict[Tuple, Dict[str, Any]] = {}
+        for warrior in population:
+            key = warrior_key(warrior)
+            if key in self._results:
+                self.stats['result_cache_hits'] += 1
+            elif key not in pending:
+                pending[key] = warrior
+
+        for warrior, result in runner.run(list(pending.values())):
+            if 'error' in result:
+                self.stats['errors'] += 1
+                result = {'roi': -100.0, 'total_trades': 0, 'error': result['error']}
+            self.stats['evaluations'] += 1
+            self.stats['signal_cache_hits'] += int(result.pop('signal_cache_hit', False))
+            self._results[warrior_key(warrior)] = result
+
+        for warrior in population:
+            warrior['result'] = self._results[warrior_key(warrior)]
+
+    def _next_generation(self, ranked: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Elimina a los peores y cría hijos de los mejores, con las mismas reglas
+        que BotBattleArena.evaluate_arena
+        """
+        arena = self.arena
+        num_to_eliminate = max(1, int(len(ranked) * arena.elimination_rate))
+        if len(ranked) - num_to_eliminate < arena.min_battle_size:
+            num_to_eliminate = max(0, len(ranked) - arena.min_battle_size)
+        survivors = ranked[:len(ranked) - num_to_eliminate]
+
+        num_parents = min(5, max(2, len(ranked) // 2))
+        parents = ranked[:num_parents]
+        generation = self.generation + 1
+
+        children = []
+        while len(survivors) + len(children) < self.population_size:
+            if len(parents) >= 2 and self.rng.random() < 0.7:
+                parent1, parent2 = self.rng.sample(parents, 2)
+                child = self._genome(parent1['strategy_name'], parent1['timeframe'],
+                                     max(parent1['leverage'], parent2['leverage']),
+                                     arena._optimize_parameters(parent1['params'], parent2['params'],
+                                                                rng=self.rng),
+                                     generation, [parent1['id'], parent2['id']])
+            else:
+                parent = self.rng.choice(parents)
+                child = self._genome(parent['strategy_name'], parent['timeframe'], parent['leverage'],
+                                     arena._optimize_parameters(parent['params'], rng=self.rng),
+                                     generation, [parent['id']])
+            children.append(child)
+        return survivors + children
+
+    def run(self, generations: int = 200, max_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Ejecuta la evolución
+
+        Args:
+            generations: Número de generaciones
+            max_seconds: Tiempo máximo (se termina la generación en curso)
+
+        Returns:
+            Dict[str, Any]: Generaciones, generaciones por minuto, evaluaciones,
+            aciertos de caché y mejor guerrero
+        """
+        if not self.population:
+            self.population = self.initial_population()
+
+        started = time.perf_counter()
+        completed = 0
+        with ParallelGridRunner(evaluate_warrior, self.data, context=self.context,
+                                n_jobs=self.n_jobs) as runner:
+            for _ in range(generations):
+                self._evaluate(runner, self.population)
+                ranked = sorted(self.population, key=self._rank_key, reverse=True)
+                rois = [w['result']['roi'] for w in ranked]
+                self.history.append({
+                    'generation': self.generation,
+                    'best_roi': rois[0],
+                    'average_roi': float(np.mean(rois)),
+                    'worst_roi': rois[-1],
+                    'best_strategy': ranked[0]['strategy_name'],
+                    'best_timeframe': ranked[0]['timeframe']
+                })
+                completed += 1
+                if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+                    self.population = ranked
+                    break
+                self.population = self._next_generation(ranked)
+                self.generation += 1
+
+            # Puntuar a los hijos de la última generación antes de elegir ganadores
+            self._evaluate(runner, self.population)
+
+        elapsed = time.perf_counter() - started
+        self.population.sort(key=self._rank_key, reverse=True)
+        report = {
+            'generations': completed,
+            'elapsed_seconds': round(elapsed, 3),
+            'generations_per_minute': round(completed / elapsed * 60, 1) if elapsed > 0 else 0.0,
+            'population_size': len(self.population),
+            'bars': len(self.data),
+            **self.stats,
+            'best': next(iter(self.best(1)), None)
+        }
+        logger.info(f"Evolución offline: {completed} generaciones en {elapsed:.1f}s "
+                     f"({report['generations_per_minute']} generaciones/min), "
+                     f"{self.stats['evaluations']} backtests, "
+                     f"{self.stats['result_cache_hits']} resultados reutilizados")
+        return report
+
+    def _rank_key(self, warrior: Dict[str, Any]) -> Tuple[bool, float]:
+        """Orden de la población: primero los que operan lo suficiente, luego por ROI"""
+        result = warrior['result']
+        return result.get('total_trades', 0) >= self.min_trades, result['roi']
+
+    def best(self, n: int = 5) -> List[Dict[str, Any]]:
+        """
+        Mejores guerreros de la población actual (sin repetir parámetros ni
+        incluir a los que no llegan a ``min_trades`` operaciones)
+
+        Args:
+            n: Número de guerreros
+
+        Returns:
+            List[Dict[str, Any]]: Guerreros ordenados por ROI con su resultado
+            (puede tener menos de ``n`` o estar vacía)
+        """
+        ranked = sorted((w for w in self.population
+                         if 'result' in w and w['result'].get('total_trades', 0) >= self.min_trades),
+                        key=lambda w: w['result']['roi'], reverse=True)
+        seen = set()
+        winners = []
+        for warrior in ranked:
+            key = warrior_key(warrior)
+            if key in seen:
+                continue
+            seen.add(key)
+            winners.append({k: v for k, v in warrior.items() if k != 'parent_ids'})
+            if len(winners) >= n:
+                break
+        return winners
+
+    def seed_arena(self, n: int = 5, activate: bool = True) -> List[str]:
+        """
+        Añade los mejores guerreros a la arena en vivo
+
+        Args:
+            n: Número de guerreros a añadir
+            activate: Activarlos para la batalla
+
+        Returns:
+            List[str]: IDs de los guerreros añadidos
+        """
+        added = []
+        stamp = int(time.time())
+        for i, winner in enumerate(self.best(n)):
+            warrior_id = (f"{winner['strategy_name']}_{winner['timeframe']}_"
+                          f"offline{winner['generation']}_{stamp}_{i}")
+            self.arena.add_warrior(strategy_name=winner['strategy_name'],
+                                   timeframe=winner['timeframe'],
+                                   leverage=winner['leverage'],
+                                   params=dict(winner['params']),
+                                   warrior_id=warrior_id)
+            warrior = self.arena.warriors[warrior_id]
+            warrior.generation = winner['generation']
+            self.arena.evolution_log.append({
+                "timestamp": datetime.now().isoformat(),
+                "generation": winner['generation'],
+                "new_warrior_id": warrior_id,
+                "parent_ids": [],
+                "strategy_name": winner['strategy_name'],
+                "timeframe": winner['timeframe'],
+                "params": winner['params'],
+                "source": "offline",
+                "offline_roi": winner['result']['roi'],
+                "offline_trades": winner['result']['total_trades']
+            })
+            if activate:
+                self.arena.activate_warrior(warrior_id)
+            added.append(warrior_id)
+        self.arena._save_arena()
+        return added
@@ -885,17 +885,21 @@ class BotBattleArena:
     
     def _optimize_parameters(self, 
                           params1: Dict[str, Any], 
-                          params2: Dict[str, Any] = None) -> Dict[str, Any]:
+                          params2: Dict[str, Any] = None,
+                          rng: Optional[random.Random] = None) -> Dict[str, Any]:
         """
         Optimiza parámetros a partir de uno o dos conjuntos de parámetros.
         
         Args:
             params1: Primer conjunto de parámetros
             params2: Segundo conjunto de parámetros (opcional)
+            rng: Generador aleatorio (None = módulo random)
             
         Returns:
             Dict[str, Any]: Parámetros optimizados
         """
+        rng = rng or random
+        
         # Si solo hay un conjunto de parámetros, mutarlo
         if params2 is None:
             new_params = params1.copy()
@@ -905,14 +909,14 @@ class BotBattleArena:
                 # Solo mutar valores numéricos
                 if isinstance(value, (int, float)):
                     # Decidir si mutar este parámetro
-                    if random.random() < self.optimization_rate:
+                    if rng.random() < self.optimization_rate:
                         if isinstance(value, int):
                             # Para enteros, cambiar en +/- 1-3 unidades
-                            mutation = random.randint(-3, 3)
+                            mutation = rng.randint(-3, 3)
                             new_params[key] = max(1, value + mutation)
                         else:
                             # Para flotantes, cambiar en +/- 5-20%
-                            mutation = random.uniform(-0.2, 0.2)
+                            mutation = rng.uniform(-0.2, 0.2)
                             new_params[key] = max(0.01, value * (1 + mutation))
             
             return new_params
@@ -923,7 +927,8 @@ class BotBattleArena:
         # Unir todas las claves
         all_keys = set(params1.keys()) | set(params2.keys())
         
-        for key in all_keys:
+        # En orden fijo para que una semilla dada produzca los mismos hijos
+        for key in sorted(all_keys):
             # Si la clave está en ambos, decidir cuál usar o combinar
             if key in params1 and key in params2:
                 val1 = params1[key]
@@ -932,7 +937,7 @@ class BotBattleArena:
                 # Si ambos son numéricos, posible combinación
                 if isinstance(val1, (int, float)) and isinstance(val2, (int, float)):
                     # Decide entre heredar de un padre, promediar o mutar
-                    r = random.random()
+                    r = rng.random()
                     
                     if r < 0.4:
                         # Heredar de padre 1
@@ -943,7 +948,7 @@ class BotBattleArena:
                     else:
                         # Promediar con posible mutación
                         avg = (val1 + val2) / 2
-                        mutation = random.uniform(-0.1, 0.1)
+                        mutation = rng.uniform(-0.1, 0.1)
                         
                         if isinstance(val1, int) and isinstance(val2, int):
                             new_params[key] = int(max(1, avg * (1 + mutation)))
@@ -951,13 +956,62 @@ class BotBattleArena:
                             new_params[key] = max(0.01, avg * (1 + mutation))
                 else:
                     # Para valores no numéricos, seleccionar aleatoriamente
-                    new_params[key] = random.choice([val1, val2])
+                    new_params[key] = rng.choice([val1, val2])
             else:
                 # Si la clave está solo en uno, usarla
                 new_params[key] = params1[key] if key in params1 else params2[key]
         
         return new_params
-    
+
+    def evolve_offline(self,
+                      data: pd.DataFrame,
+                      generations: int = 200,
+                      seed_winners: int = 5,
+                      population_size: int = None,
+                      market_type: str = "spot",
+                      n_jobs: int = None,
+                      max_seconds: float = None,
+                      seed: int = None,
+                      min_trades: int = 1) -> Dict[str, Any]:
+        """
+        Evolución acelerada con backtests sobre datos históricos.
+
+        Parte de los guerreros activos, ejecuta ``generations`` ciclos de
+        eliminación y cruce puntuando cada guerrero con un backtest (ver
+        adaptive_system.arena_evolution) y añade los mejores a la arena.
+
+        Args:
+            data: Velas OHLCV históricas con DatetimeIndex (timeframe base)
+            generations: Número de generaciones
+            seed_winners: Guerreros ganadores que se añaden y activan en la arena
+            population_size: Tamaño de la población (None = max_battle_size)
+            market_type: "spot" o "futures"
+            n_jobs: Procesos para evaluar cada generación (None = todos los núcleos)
+            max_seconds: Tiempo máximo de evolución
+            seed: Semilla para una evolución reproducible
+            min_trades: Operaciones mínimas en el backtest para ser ganador
+
+        Returns:
+            Dict[str, Any]: Informe de la evolución (incluye generaciones por
+            minuto) e IDs de los guerreros añadidos
+        """
+        from adaptive_system.arena_evolution import OfflineArenaEvolution
+
+        evolution = OfflineArenaEvolution(
+            self, data,
+            population_size=population_size,
+            market_type=market_type,
+            n_jobs=n_jobs,
+            seed=seed,
+            min_trades=min_trades
+        )
+        report = evolution.run(generations=generations, max_seconds=max_seconds)
+        report["history"] = evolution.history
+        report["seeded_warriors"] = evolution.seed_arena(seed_winners) if seed_winners else []
+
+        logger.info(f"Evolución offline completada: {len(report['seeded_warriors'])} guerreros añadidos a la arena")
+        return report
+
     def get_warrior_status(self, warrior_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene el estado de un guerrero.
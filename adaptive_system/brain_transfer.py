@@ -12,12 +12,19 @@ import sys
 import json
 import logging
 import shutil
+import sqlite3
+import tempfile
 import zipfile
+import zlib
 import pickle
 import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple, Union
 
+from adaptive_system.snapshot_store import (
+    SnapshotStore, SQLITE_SIDE_FILES, is_sqlite_file, sqlite_backup
+)
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +32,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger('BrainTransfer')
 
+# Bytes del inicio de cada archivo que se prueban antes de comprimirlo
+COMPRESS_SAMPLE_SIZE = 64 * 1024
+
+# Prefijo de los snapshots de scheduled_backup (los únicos que rota)
+SCHEDULED_BACKUP_PREFIX = "scheduled_backup_"
+
 class BrainTransfer:
     """
     Sistema para exportar e importar el cerebro (conocimiento) del bot.
@@ -38,7 +51,8 @@ class BrainTransfer:
                 base_dir: str = '.',
                 models_dir: str = 'models',
                 data_dir: str = 'data',
-                export_dir: str = 'brain_exports'):
+                export_dir: str = 'brain_exports',
+                snapshot_dir: str = None):
         """
         Inicializa el sistema de transferencia del cerebro.
         
@@ -47,11 +61,14 @@ class BrainTransfer:
             models_dir: Directorio donde se almacenan los modelos
             data_dir: Directorio donde se almacenan los datos de rendimiento
             export_dir: Directorio donde se guardarán las exportaciones
+            snapshot_dir: Directorio del almacén de snapshots (por defecto, export_dir/snapshots)
         """
         self.base_dir = Path(base_dir)
         self.models_dir = self.base_dir / models_dir
         self.data_dir = self.base_dir / data_dir
         self.export_dir = self.base_dir / export_dir
+        self.snapshot_dir = self.base_dir / snapshot_dir if snapshot_dir else self.export_dir / "snapshots"
+        self._snapshot_store = None
         
         # Archivos clave a incluir siempre en la exportación
         self.key_files = [
@@ -70,6 +87,46 @@ class BrainTransfer:
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.export_dir, exist_ok=True)
     
+    def _brain_files(self,
+                     include_models: bool = True,
+                     include_data: bool = True) -> List[Tuple[str, Path]]:
+        """
+        Archivos que forman el cerebro del bot.
+        
+        Args:
+            include_models: Si se deben incluir los modelos entrenados
+            include_data: Si se deben incluir los datos de rendimiento
+            
+        Returns:
+            List[Tuple[str, Path]]: Pares (ruta dentro de la exportación, archivo de origen)
+        """
+        files = []
+        for file in self.key_files:
+            source = self.base_dir / file
+            if os.path.isfile(source):
+                files.append((file, source))
+        
+        directories = []
+        if include_models:
+            directories.append(("models", self.models_dir))
+        if include_data:
+            directories.append(("data", self.data_dir))
+        
+        export_dir = os.path.abspath(self.export_dir)
+        for prefix, directory in directories:
+            for root, dirs, filenames in os.walk(directory):
+                # No incluir las propias exportaciones si cuelgan de este directorio
+                dirs[:] = sorted(d for d in dirs
+                                 if os.path.abspath(os.path.join(root, d)) != export_dir)
+                for file in sorted(filenames):
+                    # El contenido de -wal/-journal entra en la copia de la base de datos
+                    if file.endswith(SQLITE_SIDE_FILES):
+                        continue
+                    source = Path(root) / file
+                    rel_path = os.path.relpath(source, directory).replace(os.sep, '/')
+                    files.append((f"{prefix}/{rel_path}", source))
+        return files
+    
     def export_brain(self, 
                    name: str = None, 
                    include_models: bool = True,
@@ -77,6 +134,9 @@ class BrainTransfer:
         """
         Exporta todo el cerebro del bot a un archivo comprimido.
         
+        Los archivos se escriben directamente en el ZIP, sin copia temporal;
+        las bases de datos SQLite se copian con la API de backup en línea.
+        
         Args:
             name: Nombre personalizado para la exportación (opcional)
             include_models: Si se deben incluir los modelos entrenados
@@ -85,84 +145,217 @@ class BrainTransfer:
         Returns:
             str: Ruta al archivo de exportación creado
         """
-        # Generar nombre de archivo si no se especifica
+        export_path = self.export_dir / self._export_name(name, "bot_brain")
+        
+        try:
+            metadata = self._export_metadata(include_models, include_data)
+            
+            with zipfile.ZipFile(export_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for arcname, source in self._brain_files(include_models, include_data):
+                    try:
+                        if is_sqlite_file(source):
+                            self._write_sqlite(zipf, source, arcname)
+                        else:
+                            zipf.write(source, arcname, compress_type=self._compress_type(source))
+                    except (OSError, sqlite3.Error) as e:
+                        logger.error(f"Error al exportar {source}: {e}")
+                        continue
+                    metadata["files"].append({
+                        "path": arcname,
+                        "size": zipf.getinfo(arcname).file_size
+                    })
+                
+                zipf.writestr("export_metadata.json", json.dumps(metadata, indent=4))
+            
+            logger.info(f"Cerebro exportado exitosamente a: {export_path}")
+            return str(export_path)
+            
+        except Exception as e:
+            logger.error(f"Error al exportar cerebro: {e}")
+            # No dejar exportaciones a medias
+            if os.path.exists(export_path):
+                os.remove(export_path)
+            raise
+    
+    @staticmethod
+    def _export_name(name: Optional[str], prefix: str) -> str:
+        """Nombre del ZIP de exportación (con fecha si no se indica)"""
         if not name:
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            name = f"bot_brain_{timestamp}"
+            name = f"{prefix}_{timestamp}"
         
         # Asegurar que el nombre termina con .zip
         if not name.endswith('.zip'):
             name += '.zip'
+        return name
+    
+    @staticmethod
+    def _export_metadata(include_models: bool, include_data: bool) -> Dict[str, Any]:
+        """Metadatos de una exportación (la lista de archivos se completa al escribir)"""
+        return {
+            "export_date": datetime.datetime.now().isoformat(),
+            "bot_version": "1.0",  # Actualizar según versión del bot
+            "includes_models": include_models,
+            "includes_data": include_data,
+            "files": []
+        }
+    
+    @staticmethod
+    def _compress_type(source: Path) -> int:
+        """ZIP_STORED para archivos que apenas se comprimen (modelos ya comprimidos)"""
+        with open(source, 'rb') as f:
+            sample = f.read(COMPRESS_SAMPLE_SIZE)
+        if sample and len(zlib.compress(sample, 1)) >= len(sample) * 0.9:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+    
+    def _write_sqlite(self, zipf: zipfile.ZipFile, source: Path, arcname: str):
+        """Añade al ZIP una copia consistente de una base de datos SQLite"""
+        fd, backup_path = tempfile.mkstemp(dir=self.export_dir, suffix='.sqlite.tmp')
+        os.close(fd)
+        try:
+            sqlite_backup(str(source), backup_path)
+            zipf.write(backup_path, arcname)
+        finally:
+            os.remove(backup_path)
+    
+    # ------------------------------------------------------------------
+    # Snapshots incrementales
+    # ------------------------------------------------------------------
+    
+    @property
+    def snapshot_store(self) -> SnapshotStore:
+        """Almacén de snapshots (bloques compartidos entre respaldos)"""
+        if self._snapshot_store is None:
+            self._snapshot_store = SnapshotStore(str(self.snapshot_dir))
+        return self._snapshot_store
+    
+    def create_snapshot(self,
+                        name: str = None,
+                        include_models: bool = True,
+                        include_data: bool = True) -> Dict[str, Any]:
+        """
+        Crea un snapshot incremental del cerebro del bot.
+        
+        Sólo se leen los archivos modificados desde el snapshot anterior y sólo
+        se guardan los bloques nuevos, así que el respaldo tarda y ocupa en
+        proporción a lo que ha cambiado.
+        
+        Args:
+            name: ID del snapshot (por defecto, fecha y hora)
+            include_models: Si se deben incluir los modelos entrenados
+            include_data: Si se deben incluir los datos de rendimiento
             
-        export_path = self.export_dir / name
+        Returns:
+            Dict[str, Any]: ID, fecha, metadatos y estadísticas del snapshot
+        """
+        if name and (os.sep in name or '/' in name):
+            raise ValueError(f"Nombre de snapshot inválido: {name}")
         
-        try:
-            # Crear directorio temporal para organizar archivos
-            temp_dir = self.export_dir / "temp_export"
-            os.makedirs(temp_dir, exist_ok=True)
+        metadata = self._export_metadata(include_models, include_data)
+        del metadata["files"]
+        sources = [(arcname, str(source))
+                   for arcname, source in self._brain_files(include_models, include_data)]
+        manifest = self.snapshot_store.create(sources, snapshot_id=name, metadata=metadata)
+        return {k: v for k, v in manifest.items() if k != 'files'}
+    
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Lista los snapshots disponibles (el más reciente primero).
+        
+        Returns:
+            List[Dict[str, Any]]: ID, fecha, metadatos y estadísticas de cada snapshot
+        """
+        if not os.path.isdir(self.snapshot_dir):
+            return []
+        return self.snapshot_store.list_snapshots()
+    
+    def restore_snapshot(self,
+                         snapshot_id: str = None,
+                         paths: List[str] = None,
+                         override_existing: bool = True) -> Dict[str, Any]:
+        """
+        Restaura un snapshot completo o sólo algunos archivos.
+        
+        Args:
+            snapshot_id: ID del snapshot (None = el más reciente)
+            paths: Rutas a restaurar, p. ej. ['models/rf.pkl'] o ['data'] (None = todo)
+            override_existing: Si se deben sobrescribir archivos existentes
             
-            # Copiar archivos clave
-            for file in self.key_files:
-                source = self.base_dir / file
-                if os.path.exists(source):
-                    shutil.copy2(source, temp_dir)
+        Returns:
+            Dict[str, Any]: Información sobre la restauración
+        """
+        try:
+            if snapshot_id is None:
+                snapshots = self.list_snapshots()
+                if not snapshots:
+                    return {"success": False, "error": "No hay snapshots disponibles"}
+                snapshot_id = snapshots[0]['id']
             
-            # Copiar modelos
-            if include_models:
-                models_temp = temp_dir / "models"
-                if os.path.exists(self.models_dir):
-                    shutil.copytree(self.models_dir, models_temp, dirs_exist_ok=True)
-                    
-            # Copiar datos
-            if include_data:
-                data_temp = temp_dir / "data"
-                if os.path.exists(self.data_dir):
-                    shutil.copytree(self.data_dir, data_temp, dirs_exist_ok=True)
+            manifest = self.snapshot_store.load(snapshot_id)
+            files_imported = self.snapshot_store.restore(
+                snapshot_id, str(self.base_dir), paths=paths, overwrite=override_existing
+            )
             
-            # Crear archivo de metadatos
-            metadata = {
-                "export_date": datetime.datetime.now().isoformat(),
-                "bot_version": "1.0",  # Actualizar según versión del bot
-                "includes_models": include_models,
-                "includes_data": include_data,
-                "files": []
+            result = {
+                "success": True,
+                "import_date": datetime.datetime.now().isoformat(),
+                "original_export_date": manifest.get("created", "desconocido"),
+                "bot_version": manifest.get("metadata", {}).get("bot_version", "desconocido"),
+                "files_imported": files_imported,
+                "imported_from": snapshot_id
             }
+            logger.info(f"Snapshot {snapshot_id} restaurado ({len(files_imported)} archivos)")
+            return result
             
-            # Añadir lista de archivos incluidos en la exportación
-            for root, _, files in os.walk(temp_dir):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    rel_path = os.path.relpath(filepath, temp_dir)
-                    file_size = os.path.getsize(filepath)
-                    metadata["files"].append({
-                        "path": rel_path,
-                        "size": file_size
-                    })
-            
-            # Guardar metadatos
-            with open(temp_dir / "export_metadata.json", 'w') as f:
-                json.dump(metadata, f, indent=4)
+        except FileNotFoundError:
+            return {"success": False, "error": f"Snapshot no encontrado: {snapshot_id}"}
+        except Exception as e:
+            logger.error(f"Error al restaurar snapshot: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def export_snapshot(self, snapshot_id: str, name: str = None) -> str:
+        """
+        Exporta un snapshot a un ZIP compatible con ``import_brain``.
+        
+        Los archivos se escriben en el ZIP bloque a bloque desde el almacén.
+        
+        Args:
+            snapshot_id: ID del snapshot
+            name: Nombre del archivo ZIP (opcional)
             
-            # Crear archivo zip
+        Returns:
+            str: Ruta al archivo de exportación creado
+        """
+        manifest = self.snapshot_store.load(snapshot_id)
+        metadata = dict(manifest.get("metadata", {}))
+        metadata["export_date"] = manifest["created"]
+        export_path = self.export_dir / self._export_name(name or f"bot_brain_{snapshot_id}", "bot_brain")
+        
+        try:
             with zipfile.ZipFile(export_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        filepath = os.path.join(root, file)
-                        arcname = os.path.relpath(filepath, temp_dir)
-                        zipf.write(filepath, arcname)
-            
-            # Limpiar directorio temporal
-            shutil.rmtree(temp_dir)
-            
-            logger.info(f"Cerebro exportado exitosamente a: {export_path}")
-            return str(export_path)
-            
-        except Exception as e:
-            logger.error(f"Error al exportar cerebro: {e}")
-            # Limpiar si existe el directorio temporal
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
+                metadata["files"] = self.snapshot_store.write_zip(snapshot_id, zipf)
+                zipf.writestr("export_metadata.json", json.dumps(metadata, indent=4))
+        except Exception:
+            if os.path.exists(export_path):
+                os.remove(export_path)
             raise
+        
+        logger.info(f"Snapshot {snapshot_id} exportado a: {export_path}")
+        return str(export_path)
+    
+    def prune_snapshots(self, keep: int = 30, prefix: Optional[str] = None) -> Dict[str, int]:
+        """
+        Borra los snapshots más antiguos y los bloques que ya no se usan.
+        
+        Args:
+            keep: Número de snapshots a conservar
+            prefix: Si se indica, sólo se borran snapshots cuyo ID empieza por él
+            
+        Returns:
+            Dict[str, int]: Snapshots borrados, bloques y bytes liberados
+        """
+        return self.snapshot_store.prune(keep, prefix=prefix)
     
     def import_brain(self, 
                    file_path: str,
@@ -257,7 +450,7 @@ class BrainTransfer:
     
     def list_available_exports(self) -> List[Dict[str, Any]]:
         """
-        Lista todas las exportaciones disponibles.
+        Lista todas las exportaciones disponibles (ZIP y snapshots).
         
         Returns:
             List[Dict[str, Any]]: Lista de exportaciones con sus metadatos
@@ -291,6 +484,17 @@ class BrainTransfer:
                         "metadata": metadata
                     })
             
+            # Snapshots incrementales (se restauran por ID)
+            for snapshot in self.list_snapshots():
+                exports.append({
+                    "filename": snapshot["id"],
+                    "path": snapshot["id"],
+                    "size": snapshot.get("stats", {}).get("bytes", 0),
+                    "date": snapshot["created"],
+                    "metadata": snapshot.get("metadata", {}),
+                    "snapshot": True
+                })
+            
             # Ordenar por fecha de modificación (más reciente primero)
             exports.sort(key=lambda x: x["date"], reverse=True)
             
@@ -327,15 +531,31 @@ def restore_backup(file_path: str, override: bool = True) -> Dict[str, Any]:
     Función de conveniencia para restaurar un respaldo del cerebro del bot.
     
     Args:
-        file_path: Ruta al archivo de respaldo
+        file_path: Ruta al archivo de respaldo o ID de un snapshot
         override: Si se deben sobrescribir archivos existentes
         
     Returns:
         Dict[str, Any]: Información sobre la restauración
     """
     transfer = BrainTransfer()
+    if not os.path.exists(file_path) and any(s['id'] == file_path for s in transfer.list_snapshots()):
+        return transfer.restore_snapshot(file_path, override_existing=override)
     return transfer.import_brain(file_path, override)
 
+def restore_file(path: str, snapshot_id: str = None) -> Dict[str, Any]:
+    """
+    Función de conveniencia para recuperar un único archivo o modelo de un snapshot.
+    
+    Args:
+        path: Ruta del archivo o directorio, p. ej. 'models/rf.pkl'
+        snapshot_id: ID del snapshot (None = el más reciente)
+        
+    Returns:
+        Dict[str, Any]: Información sobre la restauración
+    """
+    transfer = BrainTransfer()
+    return transfer.restore_snapshot(snapshot_id, paths=[path])
+
 def list_backups() -> List[Dict[str, Any]]:
     """
     Función de conveniencia para listar todos los respaldos disponibles.
@@ -346,17 +566,25 @@ def list_backups() -> List[Dict[str, Any]]:
     transfer = BrainTransfer()
     return transfer.list_available_exports()
 
-def scheduled_backup() -> str:
+def scheduled_backup(keep: int = 30) -> str:
     """
     Función para ser utilizada en tareas programadas de respaldo.
-    Genera un nombre con la fecha actual y realiza el respaldo.
     
+    Crea un snapshot incremental con la fecha actual (sólo se guarda lo que
+    ha cambiado desde el anterior) y conserva los ``keep`` respaldos
+    programados más recientes; los snapshots manuales no se borran.
+    
+    Args:
+        keep: Número de snapshots a conservar
+        
     Returns:
-        str: Ruta al archivo de respaldo creado
+        str: ID del snapshot creado (se restaura con restore_backup)
     """
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    name = f"scheduled_backup_{timestamp}.zip"
-    return create_backup(name)
+    transfer = BrainTransfer()
+    snapshot = transfer.create_snapshot(f"{SCHEDULED_BACKUP_PREFIX}{timestamp}")
+    transfer.prune_snapshots(keep, prefix=SCHEDULED_BACKUP_PREFIX)
+    return snapshot["id"]
 
 def demo_brain_transfer():
     """Demostración del sistema de transferencia de cerebro."""
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Almacén de snapshots direccionado por contenido.
+
+Cada archivo de un snapshot se divide en bloques de tamaño fijo; cada bloque
+se guarda una sola vez con su hash SHA-256 como nombre (comprimido con zlib
+si compensa), y el snapshot es un manifiesto JSON con la lista de bloques de
+cada archivo. Los bloques que no cambian entre snapshots se comparten, así
+que un respaldo ocupa lo que ha cambiado desde el anterior.
+
+- Los archivos cuyo tamaño, mtime e inodo coinciden con el snapshot anterior
+  no se vuelven a leer: se reutiliza su lista de bloques.
+- Las bases de datos SQLite se copian con la API de backup en línea de
+  sqlite3 (copia consistente aunque el bot esté escribiendo) y se trocean
+  desde esa copia. Las páginas sin cambios producen los mismos bloques.
+- ``restore`` reconstruye todo el snapshot o sólo las rutas pedidas, y
+  ``write_zip`` lo vuelca a un ZIP sin copias intermedias.
+- Bloques y manifiestos se escriben en un temporal sincronizado a disco que
+  se renombra (y se sincroniza el directorio): tras un corte no quedan
+  archivos truncados con su nombre definitivo. Un bloque existente sólo se
+  reutiliza si su contenido es correcto.
+- ``create`` toma un bloqueo compartido sobre ``<root>/lock`` y ``gc`` uno
+  exclusivo, para que ``gc`` no borre bloques de un snapshot en curso.
+
+Estructura en disco:
+    <root>/chunks/ab/abcdef...   bloques
+    <root>/snapshots/<id>.json   manifiestos
+    <root>/lock                  bloqueo entre create y gc
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# Archivos auxiliares de SQLite (su contenido entra en la copia de backup)
+SQLITE_SIDE_FILES = ('-wal', '-shm', '-journal')
+
+# Marcas de cabecera de cada bloque guardado
+_RAW = b'r'
+_ZLIB = b'z'
+
+# Bytes que se comprimen para decidir si un bloque merece compresión
+_SAMPLE_SIZE = 64 * 1024
+
+# Bloqueo entre create y gc donde no hay fcntl (sólo dentro del proceso)
+_FALLBACK_LOCK = threading.RLock()
+
+
+def is_sqlite_file(path: str) -> bool:
+    """Indica si un archivo es una base de datos SQLite (por su cabecera)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def _fsync_dir(directory: str):
+    """Sincroniza un directorio (la entrada de un archivo renombrado)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # Sistemas sin fsync de directorios
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path: str, payload: bytes):
+    """
+    Escribe un archivo de forma atómica y durable (temporal sincronizado,
+    rename y sincronización del directorio)
+
+    Args:
+        path: Archivo destino
+        payload: Contenido completo
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+def sqlite_backup(source_path: str, target_path: str):
+    """
+    Copia consistente de una base de datos SQLite con la API de backup en línea
+
+    Args:
+        source_path: Base de datos de origen (puede estar en uso)
+        target_path: Archivo de destino
+    """
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+class SnapshotStore:
+    """
+    Snapshots de un conjunto de archivos con bloques compartidos.
+
+    Las rutas de un snapshot son nombres lógicos (p. ej. 'models/rf.pkl')
+    asociados a un archivo de origen; el almacén no depende de dónde estén.
+    """
+
+    def __init__(self, root: str, chunk_size: int = CHUNK_SIZE, compress_level: int = 1):
+        """
+        Args:
+            root: Directorio del almacén
+            chunk_size: Tamaño de bloque en bytes
+            compress_level: Nivel de zlib (0 = sin compresión)
+        """
+        self.root = root
+        self.chunk_size = chunk_size
+        self.compress_level = compress_level
+        self.chunks_dir = os.path.join(root, "chunks")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        os.makedirs(self.chunks_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Bloques
+    # ------------------------------------------------------------------
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+
+    def _put_chunk(self, data: bytes) -> Tuple[str, int]:
+        """
+        Guarda un bloque si no existe
+
+        Returns:
+            Tuple[str, int]: (hash del bloque, bytes escritos en disco; 0 si ya existía)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            if self._chunk_matches(path, data):
+                return digest, 0
+            logger.warning(f"Bloque {digest} dañado en disco: se vuelve a escribir")
+
+        payload = _RAW + data
+        # Probar con una muestra antes de comprimir el bloque entero: los
+        # modelos y archivos ya comprimidos apenas ganan y es lo más lento
+        sample = data[:_SAMPLE_SIZE]
+        if self.compress_level and len(zlib.compress(sample, 1)) < len(sample) * 0.9:
+            compressed = zlib.compress(data, self.compress_level)
+            if len(compressed) < len(data) * 0.9:
+                payload = _ZLIB + compressed
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_bytes(path, payload)
+        return digest, len(payload)
+
+    @staticmethod
+    def _chunk_matches(path: str, data: bytes) -> bool:
+        """Indica si el bloque guardado en ``path`` contiene exactamente ``data``"""
+        try:
+            with open(path, 'rb') as f:
+                payload = f.read()
+            if payload[:1] == _RAW:
+                return payload[1:] == data
+            return payload[:1] == _ZLIB and zlib.decompress(payload[1:]) == data
+        except (OSError, zlib.error):
+            return False
+
+    def read_chunk(self, digest: str) -> bytes:
+        """
+        Lee un bloque y comprueba su hash
+
+        Args:
+            digest: Hash SHA-256 del bloque
+
+        Returns:
+            bytes: Contenido del bloque
+        """
+        with open(self._chunk_path(digest), 'rb') as f:
+            payload = f.read()
+        data = zlib.decompress(payload[1:]) if payload[:1] == _ZLIB else payload[1:]
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Bloque corrupto: {digest}")
+        return data
+
+    def _store_file(self, path: str) -> Tuple[List[str], int, int, int]:
+        """
+        Trocea un archivo y guarda sus bloques nuevos
+
+        Returns:
+            Tuple: (hashes de los bloques, tamaño, bloques nuevos, bytes nuevos en disco)
+        """
+        chunks = []
+        size = 0
+        new_chunks = 0
+        new_bytes = 0
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(self.chunk_size), b""):
+                digest, written = self._put_chunk(data)
+                chunks.append(digest)
+                size += len(data)
+                if written:
+                    new_chunks += 1
+                    new_bytes += written
+        return chunks, size, new_chunks, new_bytes
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _lock(self, exclusive: bool):
+        """Bloqueo entre procesos: compartido para create, exclusivo para gc"""
+        if fcntl is None:
+            # Sin flock sólo se protege este proceso (create también se serializa)
+            with _FALLBACK_LOCK:
+                yield
+            return
+        with open(os.path.join(self.root, "lock"), 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """
+        Snapshots del almacén, del más reciente al más antiguo
+
+        Returns:
+            List[Dict[str, Any]]: Manifiestos sin la lista de archivos
+        """
+        snapshots = []
+        for file in os.listdir(self.snapshots_dir):
+            if not file.endswith('.json'):
+                continue
+            try:
+                manifest = self.load(file[:-len('.json')])
+            except (OSError, ValueError) as e:
+                logger.error(f"Manifiesto de snapshot ilegible {file}: {e}")
+                continue
+            snapshots.append({k: v for k, v in manifest.items() if k != 'files'})
+        snapshots.sort(key=lambda s: s['created'], reverse=True)
+        return snapshots
+
+    def load(self, snapshot_id: str) -> Dict[str, Any]:
+        """
+        Carga el manifiesto de un snapshot
+
+        Args:
+            snapshot_id: ID del snapshot
+
+        Returns:
+            Dict[str, Any]: Manifiesto
+        """
+        with open(self._manifest_path(snapshot_id), 'r') as f:
+            return json.load(f)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Manifiesto completo del snapshot más reciente, o None"""
+        snapshots = self.list_snapshots()
+        return self.load(snapshots[0]['id']) if snapshots else None
+
+    def create(self, sources: Iterable[Tuple[str, str]], snapshot_id: Optional[str] = None,
+               metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Crea un snapshot de los archivos dados
+
+        Args:
+            sources: Pares (ruta lógica, archivo de origen)
+            snapshot_id: ID del snapshot (por defecto, fecha y hora)
+            metadata: Datos adicionales a guardar en el manifiesto
+
+        Returns:
+            Dict[str, Any]: Manifiesto del snapshot creado (con 'stats')
+        """
+        # Mientras dure, gc no puede borrar los bloques aún sin manifiesto
+        with self._lock(exclusive=False):
+            return self._create(sources, snapshot_id, metadata)
+
+    def _create(self, sources: Iterable[Tuple[str, str]], snapshot_id: Optional[str],
+                metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        started_ns = time.time_ns()
+        snapshot_id = snapshot_id or datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        if os.path.exists(self._manifest_path(snapshot_id)):
+            raise ValueError(f"Ya existe un snapshot con ID {snapshot_id}")
+
+        previous = self.latest()
+        previous_files = previous['files'] if previous and previous.get('chunk_size') == self.chunk_size else {}
+        racy_limit = previous.get('started_ns', 0) if previous else 0
+
+        files = {}
+        stats = {'files': 0, 'bytes': 0, 'reused_files': 0, 'read_files': 0,
+                 'sqlite_backups': 0, 'new_chunks': 0, 'new_bytes': 0}
+        for logical_path, source_path in sources:
+            try:
+                file_stat = os.stat(source_path)
+            except OSError as e:
+                logger.error(f"Error al leer {source_path}: {e}")
+                continue
+
+            old = previous_files.get(logical_path)
+            sqlite = is_sqlite_file(source_path)
+            # Reutilizar la lista de bloques si el archivo no ha cambiado. Las
+            # bases de datos siempre se copian: con WAL, el archivo principal
+            # puede no cambiar aunque haya datos nuevos.
+            if (not sqlite and old is not None and
+                    old.get('size') == file_stat.st_size and
+                    old.get('mtime_ns') == file_stat.st_mtime_ns and
+                    old.get('inode') == file_stat.st_ino and
+                    file_stat.st_mtime_ns < racy_limit):
+                files[logical_path] = old
+                stats['reused_files'] += 1
+            else:
+                try:
+                    if sqlite:
+                        chunks, size, new_chunks, new_bytes = self._store_sqlite(source_path)
+                        stats['sqlite_backups'] += 1
+                    else:
+                        chunks, size, new_chunks, new_bytes = self._store_file(source_path)
+                except (OSError, sqlite3.Error) as e:
+                    logger.error(f"Error al guardar {source_path}: {e}")
+                    continue
+                files[logical_path] = {
+                    'size': size,
+                    'mtime_ns': file_stat.st_mtime_ns,
+                    'inode': file_stat.st_ino,
+                    'sqlite': sqlite,
+                    'chunks': chunks
+                }
+                stats['read_files'] += 1
+                stats['new_chunks'] += new_chunks
+                stats['new_bytes'] += new_bytes
+            stats['files'] += 1
+            stats['bytes'] += files[logical_path]['size']
+
+        manifest = {
+            'id': snapshot_id,
+            'created': datetime.now().isoformat(),
+            'started_ns': started_ns,
+            'chunk_size': self.chunk_size,
+            'metadata': metadata or {},
+            'stats': stats,
+            'files': files
+        }
+        # El manifiesto se escribe al final: un snapshot interrumpido no existe
+        atomic_write_bytes(self._manifest_path(snapshot_id), json.dumps(manifest).encode('utf-8'))
+
+        logger.info(f"Snapshot {snapshot_id}: {stats['files']} archivos ({stats['bytes']/1024/1024:.1f} MB), "
+                    f"{stats['reused_files']} sin cambios, {stats['new_chunks']} bloques nuevos "
+                    f"({stats['new_bytes']/1024/1024:.1f} MB)")
+        return manifest
+
+    def _store_sqlite(self, path: str) -> Tuple[List[str], int, int, int]:
+        """Copia consistente de una base de datos SQLite y guarda sus bloques"""
+        fd, backup_path = tempfile.mkstemp(dir=self.root, suffix='.sqlite.tmp')
+        os.close(fd)
+        try:
+            sqlite_backup(path, backup_path)
+            return self._store_file(backup_path)
+        finally:
+            os.remove(backup_path)
+
+    def iter_file(self, entry: Dict[str, Any]) -> Iterator[bytes]:
+        """Bloques de un archivo del snapshot, en orden"""
+        for digest in entry['chunks']:
+            yield self.read_chunk(digest)
+
+    def restore(self, snapshot_id: str, target_dir: str,
+                paths: Optional[Iterable[str]] = None, overwrite: bool = True) -> List[str]:
+        """
+        Restaura un snapshot (o parte) en un directorio
+
+        Args:
+            snapshot_id: ID del snapshot
+            target_dir: Directorio de destino (las rutas lógicas son relativas a él)
+            paths: Rutas lógicas a restaurar; un directorio ('models') incluye
+                todo su contenido (None = todo el snapshot)
+            overwrite: Sobrescribir archivos existentes
+
+        Returns:
+            List[str]: Rutas lógicas restauradas
+        """
+        files = self.load(snapshot_id)['files']
+        selected = self._select(files, paths)
+
+        restored = []
+        for logical_path in selected:
+            target = os.path.join(target_dir, logical_path)
+            if os.path.exists(target) and not overwrite:
+                continue
+            os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target) or '.', suffix='.restore.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for data in self.iter_file(files[logical_path]):
+                        f.write(data)
+                os.replace(temp_path, target)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            restored.append(logical_path)
+        return restored
+
+    @staticmethod
+    def _select(files: Dict[str, Any], paths: Optional[Iterable[str]]) -> List[str]:
+        """Rutas lógicas del snapshot que corresponden a ``paths``"""
+        if paths is None:
+            return list(files)
+        selected = []
+        for path in paths:
+            path = path.strip('/')
+            matches = [p for p in files if p == path or p.startswith(path + '/')]
+            if not matches:
+                raise KeyError(f"El snapshot no contiene {path}")
+            selected.extend(m for m in matches if m not in selected)
+        return selected
+
+    def write_zip(self, snapshot_id: str, zipf: zipfile.ZipFile,
+                  paths: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Vuelca un snapshot a un ZIP abierto, bloque a bloque
+
+        Args:
+            snapshot_id: ID del snapshot
+            zipf: ZIP abierto en escritura
+            paths: Rutas lógicas a incluir (None = todas)
+
+        Returns:
+            List[Dict[str, Any]]: 'path' y 'size' de cada archivo escrito
+        """
+        files = self.load(snapshot_id)['files']
+        written = []
+        for logical_path in self._select(files, paths):
+            with zipf.open(logical_path, 'w', force_zip64=True) as target:
+                for data in self.iter_file(files[logical_path]):
+                    target.write(data)
+            written.append({'path': logical_path, 'size': files[logical_path]['size']})
+        return written
+
+    def delete(self, snapshot_id: str):
+        """Elimina el manifiesto de un snapshot (los bloques se liberan con ``gc``)"""
+        os.remove(self._manifest_path(snapshot_id))
+
+    def gc(self) -> Dict[str, int]:
+        """
+        Borra los bloques que no usa ningún snapshot
+
+        Espera a que terminen los ``create`` en curso (bloqueo exclusivo).
+
+        Returns:
+            Dict[str, int]: Bloques y bytes liberados
+        """
+        with self._lock(exclusive=True):
+            return self._gc()
+
+    def _gc(self) -> Dict[str, int]:
+        referenced = set()
+        for snapshot in self.list_snapshots():
+            for entry in self.load(snapshot['id'])['files'].values():
+                referenced.update(entry['chunks'])
+
+        removed = 0
+        freed = 0
+        for prefix in os.listdir(self.chunks_dir):
+            prefix_dir = os.path.join(self.chunks_dir, prefix)
+            for digest in os.listdir(prefix_dir):
+                if digest in referenced:
+                    continue
+                path = os.path.join(prefix_dir, digest)
+                freed += os.path.getsize(path)
+                os.remove(path)
+                removed += 1
+        return {'removed_chunks': removed, 'freed_bytes': freed}
+
+    def prune(self, keep: int, prefix: Optional[str] = None) -> Dict[str, int]:
+        """
+        Conserva sólo los ``keep`` snapshots más recientes y libera sus bloques
+
+        Args:
+            keep: Snapshots a conservar
+            prefix: Si se indica, sólo se cuentan y borran los snapshots cuyo
+                ID empieza por él (el resto no se toca)
+
+        Returns:
+            Dict[str, int]: Snapshots borrados, bloques y bytes liberados
+        """
+        snapshots = [s for s in self.list_snapshots()
+                     if prefix is None or s['id'].startswith(prefix)]
+        for snapshot in snapshots[keep:]:
+            self.delete(snapshot['id'])
+        result = self.gc()
+        result['deleted_snapshots'] = max(len(snapshots) - keep, 0)
+        return result
@@ -12,6 +12,8 @@ from datetime import datetime
 from typing import Dict, List, Optional, Union, Any, Tuple
 from enum import Enum
 
+from core.state_store import DEFAULT_SAVE_INTERVAL, JsonStateStore
+
 logger = logging.getLogger("AdaptiveSystem")
 
 class MarketCondition(Enum):
@@ -226,17 +228,21 @@ class IndicatorPerformance:
 class AdaptiveWeightingSystem:
     """Sistema de ponderación adaptativa para indicadores técnicos"""
     
-    def __init__(self, data_file: str = "indicator_performance.json"):
+    def __init__(self, data_file: str = "indicator_performance.json",
+                 save_interval: float = DEFAULT_SAVE_INTERVAL):
         """
         Inicializa el sistema de ponderación
         
         Args:
             data_file: Archivo para guardar/cargar datos de rendimiento
+            save_interval: Segundos mínimos entre escrituras del archivo
         """
         self.data_file = data_file
         self.indicators = {}  # Dict[str, IndicatorPerformance]
         self.recalibration_count = 0
         self.last_recalibration = datetime.now()
+        self._store = JsonStateStore(data_file, self._state_dict, min_interval=save_interval,
+                                     indent=2, name='datos de rendimiento')
         
         # Inicializar o cargar datos
         if os.path.exists(data_file):
@@ -280,21 +286,22 @@ class AdaptiveWeightingSystem:
         self.indicators = {name: IndicatorPerformance(name) for name in default_indicators}
         logger.info("Indicadores inicializados con valores por defecto")
     
+    def _state_dict(self) -> Dict:
+        """Documento que se guarda en el archivo de datos"""
+        return {
+            "indicators": {name: indicator.to_dict() for name, indicator in self.indicators.items()},
+            "recalibration_count": self.recalibration_count,
+            "last_recalibration": self.last_recalibration.isoformat()
+        }
+    
     def _save_data(self):
-        """Guarda datos de rendimiento en archivo"""
-        try:
-            data = {
-                "indicators": {name: indicator.to_dict() for name, indicator in self.indicators.items()},
-                "recalibration_count": self.recalibration_count,
-                "last_recalibration": self.last_recalibration.isoformat()
-            }
-            
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            
+        """Marca los datos como modificados (se escriben agrupados y de forma atómica)"""
+        self._store.mark_dirty()
+    
+    def flush(self):
+        """Escribe ya los datos de rendimiento pendientes"""
+        if self._store.flush():
             logger.info(f"Datos de rendimiento guardados en {self.data_file}")
-        except Exception as e:
-            logger.error(f"Error al guardar datos de rendimiento: {e}")
     
     def update_indicator_performance(self, indicator_name: str, correct: bool, 
                                     profit: float, market_condition: MarketCondition,
@@ -316,11 +323,11 @@ class AdaptiveWeightingSystem:
         # Actualizar rendimiento
         self.indicators[indicator_name].update(correct, profit, market_condition, time_interval)
         
-        # Guardar después de cada actualización
-        self._save_data()
-        
         # Recalibrar pesos si es necesario
         self._recalibrate_weights()
+        
+        # Marcar para guardar (incluye el contador de recalibraciones)
+        self._save_data()
     
     def _recalibrate_weights(self):
         """Recalibra los pesos de los indicadores basándose en su rendimiento"""
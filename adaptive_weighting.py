@@ -14,6 +14,8 @@ import numpy as np
 from enum import Enum
 from typing import Dict, List, Any, Tuple, Optional
 
+from core.state_store import DEFAULT_SAVE_INTERVAL, JsonStateStore
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
@@ -252,16 +254,20 @@ class IndicatorPerformance:
 class AdaptiveWeightingSystem:
     """Sistema de ponderación adaptativa para indicadores técnicos"""
     
-    def __init__(self, data_file: str = "indicator_performance.json"):
+    def __init__(self, data_file: str = "indicator_performance.json",
+                 save_interval: float = DEFAULT_SAVE_INTERVAL):
         """
         Inicializa el sistema de ponderación
         
         Args:
             data_file: Archivo para guardar/cargar datos de rendimiento
+            save_interval: Segundos mínimos entre escrituras del archivo
         """
         self.data_file = data_file
         self.indicators = {}
         self.base_weights = {}
+        self._store = JsonStateStore(data_file, self._state_dict, min_interval=save_interval,
+                                     indent=4, name='datos de rendimiento')
         
         # Cargar datos si existen
         self._load_data()
@@ -312,31 +318,21 @@ class AdaptiveWeightingSystem:
         
         logger.info("Indicadores inicializados con pesos equiponderados")
     
+    def _state_dict(self) -> Dict:
+        """Documento que se guarda en el archivo de datos"""
+        return {
+            'indicators': {name: indicator.to_dict() for name, indicator in self.indicators.items()},
+            'base_weights': dict(self.base_weights)
+        }
+    
     def _save_data(self):
-        """Guarda datos de rendimiento en archivo"""
-        try:
-            # Preparar datos para guardar
-            indicators_data = {}
-            
-            for name, indicator in self.indicators.items():
-                indicators_data[name] = indicator.to_dict()
-            
-            data = {
-                'indicators': indicators_data,
-                'base_weights': self.base_weights
-            }
-            
-            # Crear directorio si no existe
-            os.makedirs(os.path.dirname(self.data_file) or '.', exist_ok=True)
-            
-            # Guardar datos
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=4)
-            
+        """Marca los datos como modificados (se escriben agrupados y de forma atómica)"""
+        self._store.mark_dirty()
+    
+    def flush(self):
+        """Escribe ya los datos de rendimiento pendientes"""
+        if self._store.flush():
             logger.info(f"Datos de rendimiento guardados en {self.data_file}")
-            
-        except Exception as e:
-            logger.error(f"Error al guardar datos: {e}")
     
     def update_indicator_performance(self, indicator_name: str, correct: bool, 
                                     profit: float, market_condition: MarketCondition,
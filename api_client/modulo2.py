@@ -13,6 +13,8 @@ from datetime import datetime
 # Implementación de filtros de sesión y cooldowns
 import datetime
 
+from data_management.order_book import OrderBookManager
+
 # Cargar las variables de entorno desde config.env con ruta completa
 # Nota: Este load_dotenv se hace aquí por si el módulo se ejecuta de forma independiente.
 # En main.py también se cargan.
@@ -69,6 +71,9 @@ class OKXWebSocketClient:
         self.base_url = "wss://ws.okx.com:8443/ws/v5/business"
         # Para canales privados (autenticados) como orders, balance, etc., se usaría:
         # self.base_url = "wss://ws.okx.com:8443/ws/v5/private"
+        # Libros L2 locales: se actualizan con los deltas de books-l2-tbt/books
+        # y piden una resuscripción si falla la secuencia o el checksum
+        self.order_books = OrderBookManager(on_resync=self.resubscribe)
 
 
     async def connect(self):
@@ -177,6 +182,20 @@ class OKXWebSocketClient:
             logging.error(f"Error al procesar respuesta de suscripción: {e}")
 
 
+    async def resubscribe(self, channel: str, inst_id: str):
+        """
+        Cancela y repite la suscripción a un canal para recibir un snapshot nuevo.
+        No espera la confirmación: la recibe el bucle de receive_messages.
+        """
+        if not self.is_connected:
+            logging.error("No se puede resuscribir: el WebSocket no está conectado.")
+            return
+        args = [{"channel": channel, "instId": inst_id}]
+        await self.ws.send(json.dumps({"op": "unsubscribe", "args": args}))
+        await self.ws.send(json.dumps({"op": "subscribe", "args": args}))
+        logging.info(f"Resuscripción enviada para {channel} - {inst_id}")
+
+
     async def receive_messages(self, message_processor):
         """
         Recibe mensajes del WebSocket y los pasa a un procesador.
@@ -241,19 +260,24 @@ class OKXWebSocketClient:
                     }
                     # logging.info(f"Mejor Bid: {processed_item['best_bid']}, Tamaño: {ticker_info.get('bidSz')} | Mejor Ask: {processed_item['best_ask']}, Tamaño: {ticker_info.get('askSz')}")
 
-                elif channel == "books-l2-tbt" and payload_data:
-                    book_info = payload_data[0]
-                    bids = book_info.get('bids', [])
-                    asks = book_info.get('asks', [])
-                    # Simplificamos para la cola
-                    processed_item = {
-                        "type": "books-l2-tbt",
-                        "instrument": inst_id,
-                        "timestamp": book_info.get('ts'),
-                        "best_bid": float(bids[0][0]) if bids else None,
-                        "best_ask": float(asks[0][0]) if asks else None,
-                        "data": payload_data # Opcional: mantener la data original completa
-                    }
+                elif channel.startswith("books") and payload_data:
+                    # Aplicar el snapshot/delta al libro local; los mensajes de un
+                    # libro inválido (pendiente de resuscripción) no van a la cola
+                    book = self.order_books.on_message(data)
+                    if book is not None:
+                        view = book.view()
+                        processed_item = {
+                            "type": channel,
+                            "instrument": inst_id,
+                            "timestamp": book.ts,
+                            "best_bid": view.best_bid,
+                            "best_ask": view.best_ask,
+                            "best_bid_size": view.best_bid_size,
+                            "best_ask_size": view.best_ask_size,
+                            "checksum": book.last_checksum,
+                            "book": view, # Vista inmutable del libro completo
+                            "data": payload_data # Opcional: mantener la data original completa
+                        }
 
                 elif channel.startswith('candle'):
                     inst_id = data["arg"].get('instId')
@@ -1,3 +1,7 @@
 import asyncio
 
-data_queue = asyncio.Queue()
\ No newline at end of file
+# Cola acotada: si el consumidor (y el guardado en DB) se retrasa, el cliente
+# WebSocket espera en put() en lugar de acumular mensajes sin límite.
+DATA_QUEUE_MAXSIZE = 10000
+
+data_queue = asyncio.Queue(maxsize=DATA_QUEUE_MAXSIZE)
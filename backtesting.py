@@ -18,6 +18,10 @@ import sys
 sys.path.append('.')
 from classic_strategies import TechnicalIndicators
 from modulo_intermediador import adaptar_binance_a_backtesting
+from backtesting.vectorized import simulate_signals
+from core.ledger import EquityLedger, TradeLedger
+from backtesting.parallel import (ParallelGridRunner, generate_param_combinations, params_key,
+                                  GridResultsFile)
 
 # Configurar logging
 logger = logging.getLogger("Backtesting")
@@ -71,8 +75,14 @@ class TradingSimulator:
             'volatility': 0.0
         }
         
-        # Historial de equity
-        self.equity_curve = []
+        # Historial de equity y operaciones en columnas, con métricas acumuladas
+        self.equity_ledger = EquityLedger(extra_columns={'balance': np.float64, 'price': np.float64})
+        self.trade_ledger = TradeLedger(initial_balance)
+    
+    @property
+    def equity_curve(self) -> List[Dict]:
+        """Historial de equity como lista de diccionarios (se construye desde equity_ledger)"""
+        return self.equity_ledger.to_records()
     
     def reset(self):
         """Reinicia el simulador para una nueva simulación"""
@@ -85,7 +95,8 @@ class TradingSimulator:
             'entry_time': None
         }
         self.trades = []
-        self.equity_curve = []
+        self.equity_ledger.reset()
+        self.trade_ledger.reset(self.initial_balance)
     
     def open_position(self, position_type: str, price: float, size: float, 
                      timestamp: pd.Timestamp, reason: str = ""):
@@ -178,6 +189,7 @@ class TradingSimulator:
         }
         
         self.trades.append(trade)
+        self.trade_ledger.record(net_pnl, timestamp=timestamp)
         
         # Actualizar equity
         self.equity = self.balance
@@ -219,86 +231,61 @@ class TradingSimulator:
         self.equity = equity
         
         # Registrar punto en equity curve
-        self.equity_curve.append({
-            'timestamp': timestamp,
-            'equity': equity,
-            'balance': self.balance,
-            'price': price
-        })
+        self.equity_ledger.append(timestamp, equity, balance=self.balance, price=price)
     
     def calculate_metrics(self):
         """Calcula métricas de rendimiento de la estrategia"""
-        if not self.trades:
+        ledger = self.trade_ledger
+        if ledger.trades == 0:
             logger.warning("No trades to calculate metrics")
             return
         
-        # Métricas básicas
-        self.metrics['total_trades'] = len(self.trades)
-        
-        # Operaciones ganadoras y perdedoras
-        winning_trades = [t for t in self.trades if t['net_pnl'] > 0]
-        losing_trades = [t for t in self.trades if t['net_pnl'] <= 0]
-        
-        self.metrics['winning_trades'] = len(winning_trades)
-        self.metrics['losing_trades'] = len(losing_trades)
+        # Métricas básicas (acumuladas en el registro de operaciones)
+        self.metrics['total_trades'] = ledger.trades
+        self.metrics['winning_trades'] = ledger.wins
+        self.metrics['losing_trades'] = ledger.losses
         
         # Tasa de ganancia
-        if self.metrics['total_trades'] > 0:
-            self.metrics['win_rate'] = self.metrics['winning_trades'] / self.metrics['total_trades']
+        self.metrics['win_rate'] = ledger.win_rate
         
         # Ganancias y pérdidas promedio
-        if winning_trades:
-            self.metrics['avg_profit'] = sum(t['net_pnl'] for t in winning_trades) / len(winning_trades)
+        if ledger.wins:
+            self.metrics['avg_profit'] = ledger.gross_profit / ledger.wins
         
-        if losing_trades:
-            self.metrics['avg_loss'] = abs(sum(t['net_pnl'] for t in losing_trades) / len(losing_trades))
+        if ledger.losses:
+            self.metrics['avg_loss'] = ledger.gross_loss / ledger.losses
         
         # Profit factor
         if self.metrics['avg_loss'] > 0:
             self.metrics['profit_factor'] = self.metrics['avg_profit'] / self.metrics['avg_loss']
         
-        # Máximo drawdown
-        if self.equity_curve:
-            # Convertir a DataFrame para facilitar cálculos
-            equity_df = pd.DataFrame([
-                {'timestamp': e['timestamp'], 'equity': e['equity']} 
-                for e in self.equity_curve
-            ])
-            
-            # Calcular drawdown
-            equity_df['peak'] = equity_df['equity'].cummax()
-            equity_df['drawdown'] = equity_df['equity'] - equity_df['peak']
-            equity_df['drawdown_pct'] = equity_df['drawdown'] / equity_df['peak']
-            
-            self.metrics['max_drawdown'] = abs(equity_df['drawdown'].min())
-            self.metrics['max_drawdown_pct'] = abs(equity_df['drawdown_pct'].min())
+        # Máximo drawdown (absoluto y relativo al pico)
+        equity = self.equity_ledger
+        if len(equity):
+            self.metrics['max_drawdown'] = equity.max_drawdown_abs
+            self.metrics['max_drawdown_pct'] = equity.max_drawdown
         
-        # Retornos diarios para Sharpe/Sortino
-        if len(self.equity_curve) > 1:
-            equity_values = [e['equity'] for e in self.equity_curve]
-            returns = pd.Series(equity_values).pct_change().dropna()
-            
+        # Retornos para Sharpe/Sortino
+        if len(equity) > 1:
             # Volatilidad
-            self.metrics['volatility'] = returns.std() * np.sqrt(252)  # Anualizada
+            self.metrics['volatility'] = equity.return_std(ddof=1) * np.sqrt(252)  # Anualizada
             
             # Sharpe Ratio (asumiendo retorno libre de riesgo 0)
-            avg_return = returns.mean()
-            if returns.std() > 0:
-                self.metrics['sharpe_ratio'] = (avg_return / returns.std()) * np.sqrt(252)
+            if equity.return_std(ddof=1) > 0:
+                self.metrics['sharpe_ratio'] = equity.sharpe_ratio(252, ddof=1)
             
             # Sortino Ratio (solo considera retornos negativos)
-            negative_returns = returns[returns < 0]
-            if len(negative_returns) > 0 and negative_returns.std() > 0:
-                self.metrics['sortino_ratio'] = (avg_return / negative_returns.std()) * np.sqrt(252)
+            if equity.downside_std() > 0:
+                self.metrics['sortino_ratio'] = equity.sortino_ratio(252)
         
         # CAGR (Compound Annual Growth Rate)
-        if len(self.equity_curve) > 1:
-            start_date = self.equity_curve[0]['timestamp']
-            end_date = self.equity_curve[-1]['timestamp']
+        if len(equity) > 1:
+            start_date = equity.timestamps[0]
+            end_date = equity.timestamps[-1]
             years = (end_date - start_date).days / 365.25
             
             if years > 0:
-                final_equity = self.equity_curve[-1]['equity']
+                final_equity = equity.last_equity
                 self.metrics['cagr'] = (final_equity / self.initial_balance) ** (1 / years) - 1
     
     def get_metrics_summary(self) -> Dict:
@@ -324,14 +311,14 @@ class TradingSimulator:
     
     def plot_equity_curve(self):
         """Grafica la curva de equity"""
-        if not self.equity_curve:
+        if not len(self.equity_ledger):
             logger.warning("No equity data to plot")
             return
         
         # Preparar datos
-        timestamps = [e['timestamp'] for e in self.equity_curve]
-        equity_values = [e['equity'] for e in self.equity_curve]
-        prices = [e['price'] for e in self.equity_curve]
+        timestamps = self.equity_ledger.timestamps.tolist()
+        equity_values = self.equity_ledger.equity
+        prices = self.equity_ledger.buffer['price']
         
         # Crear figura con dos subplots
         fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10), sharex=True)
@@ -487,12 +474,14 @@ class BacktestEngine:
             logger.error(f"Error loading data from CSV: {e}")
             return pd.DataFrame()
     
-    def run_backtest(self, strategy_fn: Callable) -> Dict:
+    def run_backtest(self, strategy_fn: Callable, vectorized: bool = False) -> Dict:
         """
         Ejecuta un backtest con la estrategia proporcionada
         
         Args:
             strategy_fn: Función de estrategia que recibe un DataFrame y retorna señales
+            vectorized: Simular con el núcleo vectorizado (backtesting.vectorized)
+                en lugar del bucle por vela
             
         Returns:
             Dict: Resultados del backtest
@@ -504,6 +493,9 @@ class BacktestEngine:
         # Reiniciar simulador
         self.simulator.reset()
         
+        if vectorized:
+            return self._run_vectorized_backtest(strategy_fn)
+        
         # Ejecutar estrategia
         try:
             signals = strategy_fn(self.data.copy())
@@ -575,6 +567,78 @@ class BacktestEngine:
         # Retornar resultados
         return self.simulator.get_metrics_summary()
     
+    def _run_vectorized_backtest(self, strategy_fn: Callable) -> Dict:
+        """
+        Versión vectorizada de run_backtest: mismas reglas de entrada/salida,
+        tamaño (1% del balance) y comisiones, sin recorrer las velas con iloc
+        
+        Args:
+            strategy_fn: Función de estrategia que recibe un DataFrame y retorna señales
+            
+        Returns:
+            Dict: Resultados del backtest
+        """
+        try:
+            signals = np.asarray(strategy_fn(self.data.copy()), dtype=np.float64)
+        except Exception as e:
+            logger.error(f"Error during backtest: {e}")
+            return {}
+        
+        # Sólo las señales exactamente 1 / -1 operan, como en el bucle original
+        n = min(len(signals), len(self.data))
+        signals = np.where(signals[:n] == 1, 1, np.where(signals[:n] == -1, -1, 0))
+        signals = np.concatenate((signals, np.zeros(len(self.data) - n, dtype=signals.dtype)))
+        
+        sim = simulate_signals(
+            self.data['close'].to_numpy(), signals,
+            initial_balance=self.simulator.initial_balance,
+            commission=self.simulator.commission,
+            accounting='units',
+            position_fraction=0.01
+        )
+        
+        index = self.data.index
+        for k in range(len(sim['entry_idx'])):
+            entry_time = index[sim['entry_idx'][k]]
+            exit_time = index[sim['exit_idx'][k]]
+            signal = 1 if sim['direction'][k] == 1 else -1
+            self.simulator.trades.append({
+                'type': 'long' if signal == 1 else 'short',
+                'entry_price': float(sim['entry_price'][k]),
+                'entry_time': entry_time,
+                'exit_price': float(sim['exit_price'][k]),
+                'exit_time': exit_time,
+                'size': float(sim['size'][k]),
+                'pnl': float(sim['pnl'][k]),
+                'net_pnl': float(sim['net_pnl'][k]),
+                'commission': float(sim['commission'][k]),
+                'duration': exit_time - entry_time,
+                'entry_reason': f"Signal: {signal}",
+                'exit_reason': "End of backtest" if sim['forced_exit'][k] else f"Exit signal: {-signal}"
+            })
+        
+        # Balance realizado por vela: cambia al abrir (comisión de entrada) y al cerrar
+        balance_steps = np.full(len(self.data), np.nan)
+        balance_steps[0] = self.simulator.initial_balance
+        balance_steps[sim['entry_idx']] = sim['entry_balance']
+        closed = ~sim['forced_exit']
+        balance_steps[sim['exit_idx'][closed]] = sim['balance'][closed]
+        filled = np.where(np.isnan(balance_steps), 0, np.arange(len(balance_steps)))
+        balance = balance_steps[np.maximum.accumulate(filled)][1:]
+        equity = sim['equity'][1:]
+        
+        self.simulator.trade_ledger.record_many(sim['net_pnl'], timestamps=index[sim['exit_idx']])
+        self.simulator.equity_ledger.extend(index[1:], equity, balance=balance.tolist(),
+                                            price=self.data['close'].to_numpy()[1:].tolist())
+        
+        self.simulator.balance = sim['final_balance']
+        self.simulator.equity = sim['final_balance']
+        
+        # Calcular métricas
+        self.simulator.calculate_metrics()
+        
+        return self.simulator.get_metrics_summary()
+    
     def run_backtest_with_indicator_weights(self) -> Dict:
         """
         Ejecuta un backtest con ponderación adaptativa de indicadores
@@ -882,13 +946,21 @@ class BacktestEngine:
             'trade_results': trade_results
         }
     
-    def optimize_strategy_parameters(self, strategy_class, param_grid: Dict) -> Dict:
+    def optimize_strategy_parameters(self, strategy_class, param_grid: Dict,
+                                     n_jobs: int = 1,
+                                     results_path: Optional[str] = None,
+                                     vectorized: bool = False) -> Dict:
         """
         Optimiza los parámetros de una estrategia mediante grid search
         
         Args:
             strategy_class: Clase de estrategia a optimizar
             param_grid: Diccionario con parámetros y valores a probar
+            n_jobs: Procesos en paralelo (1 = en serie, None = todos los núcleos)
+            results_path: Fichero de resultados ('.csv', '.json' o '.jsonl', ver
+                backtesting.parallel.GridResultsFile) que se escribe a medida que
+                termina cada combinación; si ya existe, se reanuda el grid
+            vectorized: Usar el simulador vectorizado en cada backtest
             
         Returns:
             Dict: Mejores parámetros y resultados
@@ -908,29 +980,44 @@ class BacktestEngine:
         all_results = []
         
         # Generar todas las combinaciones de parámetros
-        import itertools
-        
-        param_names = list(param_grid.keys())
-        param_values = list(param_grid.values())
-        
-        combinations = list(itertools.product(*param_values))
+        combinations = generate_param_combinations(param_grid)
         total_combinations = len(combinations)
         
         logger.info(f"Optimizing strategy with {total_combinations} parameter combinations")
         
-        for i, combination in enumerate(combinations):
-            params = dict(zip(param_names, combination))
-            
-            logger.info(f"Testing combination {i+1}/{total_combinations}: {params}")
-            
-            # Crear función de estrategia con los parámetros
-            def strategy_fn(df):
-                return getattr(strategy_class, 'moving_average_crossover')(
-                    df, **params
-                )
-            
-            # Ejecutar backtest
-            result = self.run_backtest(strategy_fn)
+        results_file = GridResultsFile(results_path, param_grid.keys()) if results_path else None
+        previous = results_file.load_completed() if results_file else {}
+        
+        def on_result(params, result):
+            if results_file and 'error' not in result:
+                results_file.append(params, result)
+        
+        runner = ParallelGridRunner(
+            _backtest_params_task,
+            self.data,
+            context={
+                'strategy_class': strategy_class,
+                'exchange_id': self.exchange_id,
+                'symbol': self.symbol,
+                'timeframe': self.timeframe,
+                'initial_balance': self.initial_balance,
+                'vectorized': vectorized
+            },
+            n_jobs=n_jobs
+        )
+        evaluated = runner.run(combinations, on_result=on_result, completed=previous)
+        evaluated = {params_key(params): result for params, result in evaluated}
+        
+        for params in combinations:
+            key = params_key(params)
+            if key in evaluated:
+                result = dict(evaluated[key])
+            elif key in previous:
+                result = dict(previous[key]['metrics'])
+            else:
+                continue
+            if 'error' in result or not result:
+                continue
             
             # Guardar resultado
             result['params'] = params.copy()
@@ -943,18 +1030,42 @@ class BacktestEngine:
                     'metrics': result.copy()
                 }
             
-            logger.info(f"Result: Return = {result.get('return_pct', 0):.2f}%, Sharpe = {result.get('sharpe_ratio', 0):.2f}")
+            logger.info(f"Result {params}: Return = {result.get('return_pct', 0):.2f}%, Sharpe = {result.get('sharpe_ratio', 0):.2f}")
         
-        return {
+        summary = {
             'best_result': best_result,
             'all_results': all_results
         }
+        if results_file:
+            results_file.write_summary(summary)
+        return summary
     
     def plot_results(self):
         """Grafica los resultados del backtest"""
         self.simulator.plot_equity_curve()
 
 
+def _backtest_params_task(data: pd.DataFrame, params: Dict, context: Dict) -> Dict:
+    """
+    Ejecuta un backtest de moving_average_crossover para una combinación de
+    parámetros (usado por ParallelGridRunner desde optimize_strategy_parameters)
+    """
+    engine = BacktestEngine(
+        exchange_id=context['exchange_id'],
+        symbol=context['symbol'],
+        timeframe=context['timeframe'],
+        initial_balance=context['initial_balance']
+    )
+    engine.data = data
+    
+    def strategy_fn(df):
+        return getattr(context['strategy_class'], 'moving_average_crossover')(
+            df, **params
+        )
+    
+    return engine.run_backtest(strategy_fn, vectorized=context['vectorized'])
+
+
 # Ejemplo de uso
 if __name__ == "__main__":
     # Usar el archivo grande para backtesting real
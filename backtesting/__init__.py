@@ -3,4 +3,6 @@
 Módulo para backtesting y optimización de estrategias de trading
 """
 
-from .engine import BacktestEngine, TradingSimulator
\ No newline at end of file
+from .engine import BacktestEngine, TradingSimulator
+from .streaming import (BarState, StreamingStrategy, LegacyStrategyAdapter,
+                        SignalSeriesStrategy)
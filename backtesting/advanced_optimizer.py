@@ -21,9 +21,12 @@ import matplotlib.pyplot as plt
 from tqdm import tqdm
 
 # Importaciones del proyecto
-from data_management.market_data import get_market_data, update_market_data
 from adaptive_system.weighting import MarketCondition, TimeInterval
 from strategies.machine_learning import MLStrategy, MLEnsembleStrategy
+from backtesting.vectorized import simulate_signals
+from backtesting.parallel import (ParallelGridRunner, generate_param_combinations, params_key,
+                                  GridResultsFile)
+from strategies.classic import PARAM_GRIDS
 
 logger = logging.getLogger("AdvancedOptimizer")
 
@@ -207,14 +210,13 @@ class StrategyRepository:
             
             # Añadir estrategias compuestas
             def rsi_macd_strategy(df):
-                rsi_signal = rsi_strategy(df)
-                macd_signal = macd_strategy(df)
+                rsi_signal = rsi_strategy(df).to_numpy()
+                macd_signal = macd_strategy(df).to_numpy()
                 # Combinar señales (señal solo si ambos concuerdan)
                 return pd.Series(
-                    [(1 if rsi_signal.iloc[i] > 0 and macd_signal.iloc[i] > 0 else
-                      -1 if rsi_signal.iloc[i] < 0 and macd_signal.iloc[i] < 0 else 0)
-                     for i in range(len(rsi_signal))],
-                    index=rsi_signal.index
+                    np.where((rsi_signal > 0) & (macd_signal > 0), 1,
+                             np.where((rsi_signal < 0) & (macd_signal < 0), -1, 0)),
+                    index=df.index
                 )
             
             strategies["RSI+MACD Combined"] = rsi_macd_strategy
@@ -258,7 +260,8 @@ class StrategyRepository:
 class BacktestResult:
     """Clase para almacenar resultados de backtesting"""
     
-    def __init__(self, strategy_name: str, params: Dict, data: pd.DataFrame, signals: pd.Series):
+    def __init__(self, strategy_name: str, params: Dict, data: pd.DataFrame, signals: pd.Series,
+                 vectorized: bool = False):
         """
         Inicializa el resultado de backtesting
         
@@ -267,6 +270,7 @@ class BacktestResult:
             params: Parámetros utilizados
             data: DataFrame con datos OHLCV
             signals: Series con señales (-1, 0, 1)
+            vectorized: Usar el núcleo vectorizado (backtesting.vectorized)
         """
         self.strategy_name = strategy_name
         self.params = params
@@ -276,7 +280,10 @@ class BacktestResult:
         self.metrics = {}
         
         # Ejecutar simulación
-        self._run_simulation()
+        if vectorized:
+            self._run_vectorized_simulation()
+        else:
+            self._run_simulation()
         # Calcular métricas
         self._calculate_metrics()
     
@@ -405,6 +412,54 @@ class BacktestResult:
         self.equity_curve = pd.Series(equity, index=self.data.index)
         self.final_balance = balance
     
+    def _run_vectorized_simulation(self, commission: float = 0.001, slippage: float = 0.001,
+                                   initial_balance: float = 10000.0):
+        """
+        Misma simulación que _run_simulation, calculada con el núcleo vectorizado.
+        Las señales NaN se tratan igual que en el bucle (abren corto sin posición).
+        
+        Args:
+            commission: Comisión por operación (0.001 = 0.1%)
+            slippage: Deslizamiento por operación (0.001 = 0.1%)
+            initial_balance: Balance inicial
+        """
+        if len(self.signals) < 2:
+            self._run_simulation(commission, slippage, initial_balance)
+            return
+        
+        close = self.data['close'].to_numpy()[:len(self.signals)]
+        sim = simulate_signals(
+            close, self.signals.to_numpy(),
+            initial_balance=initial_balance,
+            commission=commission,
+            slippage=slippage,
+            accounting='compound',
+            nan_policy='short'
+        )
+        
+        # Reconstruir el registro de operaciones (una entrada por trade, no por vela)
+        index = self.data.index
+        for k in range(len(sim['entry_idx'])):
+            position = "long" if sim['direction'][k] == 1 else "short"
+            self.trades.append({
+                "type": "entry",
+                "position": position,
+                "time": index[sim['entry_idx'][k]],
+                "price": float(sim['entry_price'][k]),
+                "balance": float(sim['entry_balance'][k])
+            })
+            self.trades.append({
+                "type": "exit",
+                "position": position,
+                "time": index[sim['exit_idx'][k]],
+                "price": float(sim['exit_price'][k]),
+                "pnl": float(sim['net_pnl'][k]),
+                "balance": float(sim['balance'][k])
+            })
+        
+        self.equity_curve = pd.Series(sim['equity'], index=index[:len(close)])
+        self.final_balance = sim['final_balance']
+    
     def _calculate_metrics(self):
         """Calcula métricas de rendimiento"""
         if not self.trades:
@@ -554,13 +609,15 @@ class BacktestResult:
 class MultiStrategyBacktester:
     """Clase para backtesting de múltiples estrategias"""
     
-    def __init__(self, data_manager=None):
+    def __init__(self, data_manager=None, vectorized: bool = False):
         """
         Inicializa el backtester multiestrategia
         
         Args:
             data_manager: Gestor de datos de mercado
+            vectorized: Simular con el núcleo vectorizado de backtesting.vectorized
         """
+        self.vectorized = vectorized
         self.strategy_repo = StrategyRepository()
         self.trend_detector = TrendDetector()
         self.results = {}
@@ -581,6 +638,7 @@ class MultiStrategyBacktester:
         logger.info(f"Running backtest for all strategies on {symbol} {interval} ({days} days)")
         
         # Obtener datos históricos
+        from data_management.market_data import update_market_data
         data = update_market_data(symbol, interval)
         
         # Limitar a los días solicitados
@@ -601,7 +659,7 @@ class MultiStrategyBacktester:
         for name, strategy_fn in tqdm(strategies.items(), desc="Running strategies"):
             try:
                 signals = strategy_fn(data)
-                result = BacktestResult(name, {}, data, signals)
+                result = BacktestResult(name, {}, data, signals, vectorized=self.vectorized)
                 results[name] = result
                 logger.info(f"Strategy {name}: Return={result.metrics['return_pct']:.2f}%, Win Rate={result.metrics['win_rate']:.2f}%")
             except Exception as e:
@@ -716,7 +774,8 @@ class MultiStrategyBacktester:
         return report
     
     def optimize_strategy(self, strategy_name: str, symbol: str, interval: str, 
-                         param_grid: Dict, days: int = 90) -> Dict:
+                         param_grid: Dict, days: int = 90, n_jobs: int = 1,
+                         results_path: Optional[str] = None) -> Dict:
         """
         Optimiza los parámetros de una estrategia
         
@@ -726,6 +785,10 @@ class MultiStrategyBacktester:
             interval: Intervalo de tiempo
             param_grid: Grid de parámetros a probar
             days: Días de histórico a utilizar
+            n_jobs: Procesos en paralelo (1 = en serie, None = todos los núcleos)
+            results_path: Fichero de resultados ('.csv', '.json' o '.jsonl', ver
+                backtesting.parallel.GridResultsFile) que se escribe a medida que
+                termina cada combinación; si ya existe, se reanuda el grid
             
         Returns:
             Dict: Resultados de optimización
@@ -739,6 +802,7 @@ class MultiStrategyBacktester:
             return {"error": f"Strategy {strategy_name} not found"}
         
         # Obtener datos históricos
+        from data_management.market_data import update_market_data
         data = update_market_data(symbol, interval)
         
         # Limitar a los días solicitados
@@ -747,35 +811,47 @@ class MultiStrategyBacktester:
             data = data[data.index >= start_date]
         
         # Generar todas las combinaciones de parámetros
-        import itertools
-        param_keys = list(param_grid.keys())
-        param_values = list(param_grid.values())
-        param_combinations = list(itertools.product(*param_values))
+        param_combinations = generate_param_combinations(param_grid)
         
         logger.info(f"Testing {len(param_combinations)} parameter combinations")
         
-        results = []
+        results_file = GridResultsFile(results_path, param_grid.keys()) if results_path else None
+        previous = results_file.load_completed() if results_file else {}
+        
+        runner = ParallelGridRunner(
+            _evaluate_strategy_params,
+            data,
+            context={"strategy_name": strategy_name, "vectorized": self.vectorized},
+            n_jobs=n_jobs
+        )
         
-        for params in tqdm(param_combinations, desc="Optimizing parameters"):
-            # Construir diccionario de parámetros
-            param_dict = {param_keys[i]: params[i] for i in range(len(param_keys))}
+        already_done = sum(params_key(p) in previous for p in param_combinations)
+        with tqdm(total=len(param_combinations), initial=already_done,
+                  desc="Optimizing parameters") as progress:
+            def on_result(params, metrics):
+                # Escribir cada resultado en cuanto está disponible
+                if results_file and "error" not in metrics:
+                    results_file.append(params, metrics)
+                progress.update(1)
             
-            try:
-                # Función anónima con parámetros específicos
-                strategy_with_params = lambda df: strategy_fn(df, **param_dict)
-                
-                # Ejecutar backtest
-                signals = strategy_with_params(data)
-                result = BacktestResult(strategy_name, param_dict, data, signals)
-                
-                # Guardar resultado
-                results.append({
-                    "params": param_dict,
-                    "metrics": result.metrics,
-                    "result": result
-                })
-            except Exception as e:
-                logger.error(f"Error testing parameters {param_dict}: {e}")
+            evaluated = runner.run(param_combinations, on_result=on_result, completed=previous)
+        evaluated = {params_key(params): metrics for params, metrics in evaluated}
+        
+        results = []
+        for param_dict in param_combinations:
+            key = params_key(param_dict)
+            if key in evaluated:
+                metrics = evaluated[key]
+            elif key in previous:
+                metrics = previous[key]["metrics"]
+            else:
+                continue
+            if "error" in metrics:
+                continue
+            results.append({
+                "params": param_dict,
+                "metrics": metrics
+            })
         
         # Ordenar por retorno
         sorted_results = sorted(
@@ -786,7 +862,7 @@ class MultiStrategyBacktester:
         
         best_result = sorted_results[0] if sorted_results else None
         
-        return {
+        summary = {
             "strategy": strategy_name,
             "symbol": symbol,
             "interval": interval,
@@ -803,6 +879,9 @@ class MultiStrategyBacktester:
                 for r in sorted_results[:10]  # Top 10
             ]
         }
+        if results_file:
+            results_file.write_summary(summary)
+        return summary
     
     def save_results(self, file_path: str = "data/backtest_results.json"):
         """
@@ -868,6 +947,26 @@ class MultiStrategyBacktester:
         except Exception as e:
             logger.error(f"Error loading backtest results: {e}")
 
+# Repositorio de estrategias de cada proceso del pool (ver _evaluate_strategy_params)
+_worker_strategy_repo: Optional[StrategyRepository] = None
+
+def _evaluate_strategy_params(data: pd.DataFrame, params: Dict, context: Dict) -> Dict:
+    """
+    Evalúa una combinación de parámetros de una estrategia del repositorio
+    (usado por ParallelGridRunner desde MultiStrategyBacktester.optimize_strategy)
+    
+    Las estrategias del repositorio son lambdas/closures que no se pueden
+    enviar a otro proceso, así que se resuelven por nombre en cada proceso.
+    """
+    global _worker_strategy_repo
+    if _worker_strategy_repo is None:
+        _worker_strategy_repo = StrategyRepository()
+    strategy_fn = _worker_strategy_repo.get_strategy(context["strategy_name"])
+    signals = strategy_fn(data, **params)
+    result = BacktestResult(context["strategy_name"], params, data, signals,
+                            vectorized=context["vectorized"])
+    return result.metrics
+
 class AutomatedLearningSystem:
     """Sistema de aprendizaje automatizado para bots de trading"""
     
@@ -901,6 +1000,7 @@ class AutomatedLearningSystem:
             Dict: Análisis de condiciones de mercado
         """
         # Obtener datos
+        from data_management.market_data import update_market_data
         data = update_market_data(symbol, interval)
         
         # Detectar tendencia
@@ -1063,6 +1163,7 @@ class AutomatedLearningSystem:
         logger.info(f"Starting simulation bot {bot_id} for {days_to_simulate} days")
         
         # Obtener datos
+        from data_management.market_data import update_market_data
         data = update_market_data(symbol, interval)
         
         # Limitar a los días solicitados
@@ -1322,32 +1423,7 @@ class AutomatedLearningSystem:
         Returns:
             Dict: Grid de parámetros
         """
-        param_grids = {
-            "SMA Crossover": {
-                "short_period": [5, 10, 15, 20],
-                "long_period": [30, 40, 50, 60]
-            },
-            "RSI Strategy": {
-                "period": [7, 14, 21],
-                "overbought": [65, 70, 75, 80],
-                "oversold": [20, 25, 30, 35]
-            },
-            "MACD Strategy": {
-                "fast_period": [8, 12, 16],
-                "slow_period": [21, 26, 30],
-                "signal_period": [7, 9, 12]
-            },
-            "Bollinger Bands": {
-                "period": [15, 20, 25],
-                "std_dev": [1.5, 2.0, 2.5]
-            },
-            "Mean Reversion": {
-                "lookback": [20, 30, 40],
-                "std_dev": [1.5, 2.0, 2.5, 3.0]
-            }
-        }
-        
-        return param_grids.get(strategy_name, {})
+        return PARAM_GRIDS.get(strategy_name, {})
     
     def _save_bot_config(self, bot_id: str, config: Dict):
         """
@@ -1448,6 +1524,7 @@ class AutomatedLearningSystem:
             Dict: Resultados del entrenamiento
         """
         # Obtener datos
+        from data_management.market_data import update_market_data
         data = update_market_data(symbol, interval)
         
         # Limitar a los días solicitados
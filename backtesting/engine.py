@@ -13,6 +13,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, Union, Callable
 import joblib
 from binance_data_processor import BinanceDataProcessor
+from core.ledger import EquityLedger, TradeLedger
+from .streaming import BarState, as_streaming_strategy
+from .parallel import (ParallelGridRunner, generate_param_combinations, params_key,
+                       GridResultsFile)
 
 # Configurar logging
 logging.basicConfig(
@@ -59,12 +63,20 @@ class TradingSimulator:
     def reset(self):
         """Reinicia el simulador para una nueva simulación"""
         self.balance = self.initial_balance
-        self.equity_history = []
         self.trades = []
         self.current_position = None
         self.positions_history = []
         self.peak_balance = self.initial_balance
         self.max_drawdown = 0.0
+        # Curva de equity y operaciones en columnas, con métricas acumuladas
+        self.equity_ledger = EquityLedger(initial_peak=self.initial_balance,
+                                          extra_columns={'balance': np.float64, 'has_position': bool})
+        self.trade_ledger = TradeLedger(self.initial_balance, extra_columns=('duration',))
+    
+    @property
+    def equity_history(self) -> List[Dict[str, Any]]:
+        """Historial de equity como lista de diccionarios (se construye desde equity_ledger)"""
+        return self.equity_ledger.to_records()
     
     def open_position(self, position_type: str, price: float, size: float, 
                      timestamp, reason: str = ""):
@@ -182,6 +194,7 @@ class TradingSimulator:
         # Añadir a historial
         self.trades.append(trade)
         self.positions_history.append(trade)
+        self.trade_ledger.record(pnl, timestamp=timestamp, duration=trade['duration'])
         
         # Actualizar balance
         self.balance += exit_value - commission_cost
@@ -234,21 +247,11 @@ class TradingSimulator:
             if self.current_position['type'] == 'long':
                 equity += self.current_position['contract_value']
         
-        # Registrar en historial
-        self.equity_history.append({
-            'timestamp': timestamp,
-            'equity': equity,
-            'balance': self.balance,
-            'has_position': self.current_position is not None
-        })
-        
-        # Actualizar máximo drawdown
-        if equity > self.peak_balance:
-            self.peak_balance = equity
-        else:
-            drawdown = (self.peak_balance - equity) / self.peak_balance
-            if drawdown > self.max_drawdown:
-                self.max_drawdown = drawdown
+        # Registrar en historial (actualiza pico y máximo drawdown)
+        self.equity_ledger.append(timestamp, equity, balance=self.balance,
+                                  has_position=self.current_position is not None)
+        self.peak_balance = self.equity_ledger.peak
+        self.max_drawdown = self.equity_ledger.max_drawdown
     
     def calculate_metrics(self) -> Dict[str, Any]:
         """
@@ -258,7 +261,8 @@ class TradingSimulator:
             Dict[str, Any]: Métricas calculadas
         """
         # Verificar que haya trades
-        if not self.trades:
+        ledger = self.trade_ledger
+        if ledger.trades == 0:
             return {
                 'total_trades': 0,
                 'net_profit': 0,
@@ -272,20 +276,15 @@ class TradingSimulator:
                 'avg_trade_duration': 0
             }
             
-        # Calcular métricas básicas
-        total_trades = len(self.trades)
-        winning_trades = [t for t in self.trades if t['pnl'] > 0]
-        losing_trades = [t for t in self.trades if t['pnl'] <= 0]
-        
-        win_count = len(winning_trades)
-        loss_count = len(losing_trades)
-        
-        # Evitar división por cero
-        win_rate = win_count / total_trades if total_trades > 0 else 0
+        # Métricas básicas (acumuladas en el registro de operaciones)
+        total_trades = ledger.trades
+        win_count = ledger.wins
+        loss_count = ledger.losses
+        win_rate = ledger.win_rate
         
         # Ganancias y pérdidas
-        total_profit = sum(t['pnl'] for t in winning_trades) if winning_trades else 0
-        total_loss = sum(t['pnl'] for t in losing_trades) if losing_trades else 0
+        total_profit = ledger.gross_profit
+        total_loss = -ledger.gross_loss
         
         avg_profit = total_profit / win_count if win_count > 0 else 0
         avg_loss = total_loss / loss_count if loss_count > 0 else 0
@@ -298,17 +297,11 @@ class TradingSimulator:
         net_profit_percent = (net_profit / self.initial_balance) * 100
         
         # Duración promedio de trades
-        avg_duration = sum(t['duration'] for t in self.trades) / total_trades if total_trades > 0 else 0
+        avg_duration = float(ledger.buffer['duration'].sum()) / total_trades
         
-        # Calcular Sharpe Ratio
-        if len(self.equity_history) > 1:
-            equity_values = [e['equity'] for e in self.equity_history]
-            returns = [equity_values[i] / equity_values[i-1] - 1 for i in range(1, len(equity_values))]
-            
-            annualized_factor = 365 * 24  # Asumiendo datos horarios
-            sharpe_ratio = (np.mean(returns) * annualized_factor) / (np.std(returns) * np.sqrt(annualized_factor)) if np.std(returns) > 0 else 0
-        else:
-            sharpe_ratio = 0
+        # Sharpe Ratio con los momentos acumulados de los retornos
+        annualized_factor = 365 * 24  # Asumiendo datos horarios
+        sharpe_ratio = self.equity_ledger.sharpe_ratio(annualized_factor) if len(self.equity_ledger) > 1 else 0
         
         return {
             'total_trades': total_trades,
@@ -324,7 +317,7 @@ class TradingSimulator:
             'profit_factor': profit_factor,
             'max_drawdown': self.max_drawdown,
             'final_balance': self.balance,
-            'final_equity': self.equity_history[-1]['equity'] if self.equity_history else self.balance,
+            'final_equity': self.equity_ledger.last_equity if len(self.equity_ledger) else self.balance,
             'sharpe_ratio': sharpe_ratio,
             'avg_trade_duration': avg_duration
         }
@@ -336,13 +329,13 @@ class TradingSimulator:
         Args:
             save_path: Ruta para guardar imagen, o None para mostrar
         """
-        if not self.equity_history:
+        if not len(self.equity_ledger):
             logger.warning("No hay datos para graficar")
             return
         
         # Preparar datos
-        timestamps = [entry['timestamp'] for entry in self.equity_history]
-        equity_values = [entry['equity'] for entry in self.equity_history]
+        timestamps = self.equity_ledger.timestamps.tolist()
+        equity_values = self.equity_ledger.equity
         
         # Crear figura
         plt.figure(figsize=(12, 6))
@@ -467,8 +460,8 @@ class TradingSimulator:
         if in_position:
             self.close_position(df_for_simulation.iloc[-1]['close'], df_for_simulation.index[-1], reason='ML_FINAL_EXIT')
         trades_df = pd.DataFrame(self.trades)
-        equity_curve = pd.Series([e['equity'] for e in self.equity_history],
-                                 index=[e['timestamp'] for e in self.equity_history])
+        equity_curve = pd.Series(self.equity_ledger.equity.copy(),
+                                 index=self.equity_ledger.timestamps.tolist())
         return trades_df, equity_curve
 
 class BacktestEngine:
@@ -613,13 +606,25 @@ class BacktestEngine:
         return data
     
     def run_backtest(self, strategy_func: Callable, 
-                   strategy_params: Dict = None) -> Dict[str, Any]:
+                   strategy_params: Dict = None,
+                   streaming: bool = False,
+                   copy_history: bool = False) -> Dict[str, Any]:
         """
         Ejecuta un backtest con una función de estrategia
         
         Args:
-            strategy_func: Función que implementa la estrategia
+            strategy_func: Función que implementa la estrategia, o una
+                StreamingStrategy (ver backtesting.streaming)
             strategy_params: Parámetros para la estrategia
+            streaming: Si es True, recorre los datos con un BarState incremental
+                en lugar de copiar el prefijo del DataFrame en cada vela
+            copy_history: En modo streaming, si las funciones de estrategia
+                clásicas reciben una copia del prefijo (como el bucle original).
+                Por defecto (False) reciben una vista sin copiar, sin el coste
+                O(N²); con copy-on-write (pandas >= 3) lo que la estrategia
+                modifique no altera los datos del backtest. Con pandas 2, usar
+                True si la estrategia modifica valores del DataFrame en el sitio.
+                Las StreamingStrategy y SignalSeriesStrategy nunca copian
             
         Returns:
             Dict[str, Any]: Resultados del backtest
@@ -634,9 +639,29 @@ class BacktestEngine:
         # Parámetros por defecto si no se proporcionan
         if strategy_params is None:
             strategy_params = {}
-            
-        # Variables para seguimiento de posición
-        in_position = False
+        
+        if streaming:
+            self._run_streaming(strategy_func, strategy_params, copy_history)
+        else:
+            self._run_legacy(strategy_func, strategy_params)
+        
+        # Calcular métricas
+        self.results = self.simulator.calculate_metrics()
+        
+        # Agregar metadatos
+        self.results.update({
+            'symbol': self.symbol,
+            'timeframe': self.timeframe,
+            'start_date': self.start_date,
+            'end_date': self.end_date,
+            'initial_balance': self.initial_balance,
+            'strategy_params': strategy_params
+        })
+        
+        return self.results
+    
+    def _run_legacy(self, strategy_func: Callable, strategy_params: Dict):
+        """Bucle original: pasa una copia del prefijo de datos en cada vela"""
         position_type = None
         
         # Recorrer datos
@@ -650,68 +675,100 @@ class BacktestEngine:
             # Ejecutar estrategia
             signal, reason = strategy_func(current_data, **strategy_params)
             
-            # Procesar señal
-            if signal == 1 and not in_position:  # Señal de compra
-                self.simulator.open_position(
-                    position_type='long',
-                    price=current_price,
-                    size=self.simulator.balance / current_price * 0.95,  # Usar 95% del balance
-                    timestamp=current_time,
-                    reason=reason or "Señal de compra"
-                )
-                in_position = True
-                position_type = 'long'
-                
-            elif signal == -1 and not in_position:  # Señal de venta en corto
-                self.simulator.open_position(
-                    position_type='short',
-                    price=current_price,
-                    size=self.simulator.balance / current_price * 0.95,  # Usar 95% del balance
-                    timestamp=current_time,
-                    reason=reason or "Señal de venta en corto"
-                )
-                in_position = True
-                position_type = 'short'
-                
-            elif signal == 0 and in_position:  # Señal de cierre
-                self.simulator.close_position(
-                    price=current_price,
-                    timestamp=current_time,
-                    reason=reason or "Señal de cierre"
-                )
-                in_position = False
-                position_type = None
-                
-            elif in_position and (
-                (position_type == 'long' and signal == -1) or 
-                (position_type == 'short' and signal == 1)
-            ):
-                # Señal contraria a la posición actual
-                self.simulator.close_position(
-                    price=current_price,
-                    timestamp=current_time,
-                    reason=reason or "Señal contraria"
-                )
-                
-                # Abrir nueva posición en dirección contraria
-                new_position_type = 'short' if position_type == 'long' else 'long'
-                self.simulator.open_position(
-                    position_type=new_position_type,
-                    price=current_price,
-                    size=self.simulator.balance / current_price * 0.95,
-                    timestamp=current_time,
-                    reason=reason or f"Cambio a posición {new_position_type}"
-                )
-                
-                in_position = True
-                position_type = new_position_type
+            position_type = self._apply_signal(signal, reason, position_type,
+                                               current_price, current_time)
+        
+        self._close_final_position(position_type, self.data.iloc[-1]['close'])
+    
+    def _run_streaming(self, strategy, strategy_params: Dict, copy_history: bool = False):
+        """
+        Bucle en modo streaming: los indicadores se precalculan una vez y la
+        estrategia recibe un BarState con vistas de solo lectura
+        """
+        streaming_strategy = as_streaming_strategy(strategy, strategy_params, copy=copy_history)
+        data = streaming_strategy.prepare(self.data)
+        state = BarState(data)
+        closes = data['close'].to_numpy()
+        index = data.index
+        position_type = None
+        
+        for i in range(1, len(data)):
+            state.i = i
+            signal, reason = streaming_strategy.on_bar(state)
+            position_type = self._apply_signal(signal, reason, position_type,
+                                               closes[i], index[i])
+        
+        self._close_final_position(position_type, closes[-1])
+    
+    def _apply_signal(self, signal, reason, position_type: Optional[str],
+                      current_price: float, current_time) -> Optional[str]:
+        """
+        Procesa la señal de una vela sobre el simulador y actualiza el equity
+        
+        Returns:
+            Optional[str]: Tipo de la posición abierta tras la vela, o None
+        """
+        in_position = position_type is not None
+        
+        if signal == 1 and not in_position:  # Señal de compra
+            self.simulator.open_position(
+                position_type='long',
+                price=current_price,
+                size=self.simulator.balance / current_price * 0.95,  # Usar 95% del balance
+                timestamp=current_time,
+                reason=reason or "Señal de compra"
+            )
+            position_type = 'long'
+            
+        elif signal == -1 and not in_position:  # Señal de venta en corto
+            self.simulator.open_position(
+                position_type='short',
+                price=current_price,
+                size=self.simulator.balance / current_price * 0.95,  # Usar 95% del balance
+                timestamp=current_time,
+                reason=reason or "Señal de venta en corto"
+            )
+            position_type = 'short'
             
-            # Actualizar equity
-            self.simulator.update_equity(current_price, current_time)
+        elif signal == 0 and in_position:  # Señal de cierre
+            self.simulator.close_position(
+                price=current_price,
+                timestamp=current_time,
+                reason=reason or "Señal de cierre"
+            )
+            position_type = None
+            
+        elif in_position and (
+            (position_type == 'long' and signal == -1) or 
+            (position_type == 'short' and signal == 1)
+        ):
+            # Señal contraria a la posición actual
+            self.simulator.close_position(
+                price=current_price,
+                timestamp=current_time,
+                reason=reason or "Señal contraria"
+            )
+            
+            # Abrir nueva posición en dirección contraria
+            new_position_type = 'short' if position_type == 'long' else 'long'
+            self.simulator.open_position(
+                position_type=new_position_type,
+                price=current_price,
+                size=self.simulator.balance / current_price * 0.95,
+                timestamp=current_time,
+                reason=reason or f"Cambio a posición {new_position_type}"
+            )
+            
+            position_type = new_position_type
         
-        # Cerrar posición al final si quedó abierta
-        if in_position:
-            last_price = self.data.iloc[-1]['close']
+        # Actualizar equity
+        self.simulator.update_equity(current_price, current_time)
+        
+        return position_type
+    
+    def _close_final_position(self, position_type: Optional[str], last_price: float):
+        """Cierra la posición al final si quedó abierta"""
+        if position_type is not None:
             last_time = self.data.index[-1]
             
             self.simulator.close_position(
@@ -719,32 +776,27 @@ class BacktestEngine:
                 timestamp=last_time,
                 reason="Fin del período de backtest"
             )
-        
-        # Calcular métricas
-        self.results = self.simulator.calculate_metrics()
-        
-        # Agregar metadatos
-        self.results.update({
-            'symbol': self.symbol,
-            'timeframe': self.timeframe,
-            'start_date': self.start_date,
-            'end_date': self.end_date,
-            'initial_balance': self.initial_balance,
-            'strategy_params': strategy_params
-        })
-        
-        return self.results
     
     def optimize_strategy(self, strategy_func: Callable, 
                         param_grid: Dict[str, List],
-                        metric: str = 'net_profit') -> Dict[str, Any]:
+                        metric: str = 'net_profit',
+                        n_jobs: int = 1,
+                        results_path: Optional[str] = None,
+                        streaming: bool = False,
+                        copy_history: bool = False) -> Dict[str, Any]:
         """
         Optimiza los parámetros de una estrategia mediante grid search
         
         Args:
-            strategy_func: Función de estrategia
+            strategy_func: Función de estrategia (a nivel de módulo si n_jobs != 1)
             param_grid: Diccionario de parámetros a probar
             metric: Métrica a optimizar
+            n_jobs: Procesos en paralelo (1 = en serie, None = todos los núcleos)
+            results_path: Fichero de resultados ('.csv', '.json' o '.jsonl', ver
+                backtesting.parallel.GridResultsFile) que se escribe a medida que
+                termina cada combinación; si ya existe, se reanuda el grid
+            streaming: Ejecutar cada backtest en modo streaming
+            copy_history: Ver run_backtest
             
         Returns:
             Dict[str, Any]: Mejores parámetros y resultados
@@ -765,12 +817,46 @@ class BacktestEngine:
         
         logger.info(f"Iniciando optimización con {total_combinations} combinaciones de parámetros")
         
-        # Probar cada combinación
-        for i, params in enumerate(param_combinations):
-            logger.info(f"Probando combinación {i+1}/{total_combinations}: {params}")
-            
-            # Ejecutar backtest con estos parámetros
-            result = self.run_backtest(strategy_func, params)
+        # Resultados de una ejecución anterior (reanudación)
+        results_file = GridResultsFile(results_path, param_grid.keys()) if results_path else None
+        previous = results_file.load_completed() if results_file else {}
+        
+        def on_result(params, result):
+            if results_file and 'error' not in result:
+                results_file.append(params, result)
+        
+        runner = ParallelGridRunner(
+            _run_backtest_task,
+            self.data,
+            context={
+                'strategy_func': strategy_func,
+                'streaming': streaming,
+                'copy_history': copy_history,
+                'engine_kwargs': {
+                    'exchange': self.exchange,
+                    'symbol': self.symbol,
+                    'timeframe': self.timeframe,
+                    'initial_balance': self.initial_balance,
+                    'leverage': self.leverage,
+                    'commission': self.commission
+                }
+            },
+            n_jobs=n_jobs
+        )
+        evaluated = runner.run(param_combinations, on_result=on_result, completed=previous)
+        evaluated = {params_key(params): (params, result) for params, result in evaluated}
+        
+        # Recorrer en el orden del grid para que el resultado sea determinista
+        for params in param_combinations:
+            key = params_key(params)
+            if key in evaluated:
+                params, result = evaluated[key]
+            elif key in previous:
+                result = previous[key]['metrics']
+            else:
+                continue
+            if 'error' in result:
+                continue
             
             # Guardar resultado
             all_results.append({
@@ -787,11 +873,14 @@ class BacktestEngine:
                 logger.info(f"Nuevo mejor resultado: {metric} = {best_metric_value}")
         
         # Devolver mejores parámetros y todos los resultados
-        return {
+        summary = {
             'best_params': best_params,
             'best_result': best_result,
             'all_results': all_results
         }
+        if results_file:
+            results_file.write_summary(summary)
+        return summary
     
     def _generate_param_combinations(self, param_grid: Dict[str, List]) -> List[Dict]:
         """
@@ -803,22 +892,7 @@ class BacktestEngine:
         Returns:
             List[Dict]: Lista de diccionarios con combinaciones de parámetros
         """
-        from itertools import product
-        
-        # Extraer nombres de parámetros y listas de valores
-        param_names = list(param_grid.keys())
-        param_values = list(param_grid.values())
-        
-        # Generar todas las combinaciones
-        combinations = list(product(*param_values))
-        
-        # Convertir a lista de diccionarios
-        result = []
-        for combo in combinations:
-            param_dict = {name: value for name, value in zip(param_names, combo)}
-            result.append(param_dict)
-            
-        return result
+        return generate_param_combinations(param_grid)
     
     def plot_results(self, save_path: Optional[str] = None):
         """
@@ -976,4 +1050,18 @@ class BacktestEngine:
                 plt.savefig(chart_path)
                 plt.close()
         
-        return df_comparison
\ No newline at end of file
+        return df_comparison
+
+
+def _run_backtest_task(data: pd.DataFrame, params: Dict, context: Dict) -> Dict[str, Any]:
+    """
+    Ejecuta un backtest para una combinación de parámetros (usado por
+    ParallelGridRunner desde BacktestEngine.optimize_strategy)
+    """
+    engine = BacktestEngine(**context['engine_kwargs'])
+    engine.data = data
+    engine.start_date = data.index.min()
+    engine.end_date = data.index.max()
+    return engine.run_backtest(context['strategy_func'], params,
+                               streaming=context['streaming'],
+                               copy_history=context.get('copy_history', False))
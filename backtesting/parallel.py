@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Ejecución paralela de grid search sobre datos históricos
+
+Los datos OHLCV se publican una sola vez en memoria compartida; cada proceso
+del pool reconstruye el DataFrame sin copiarlo al arrancar (en solo lectura,
+igual que en el camino en serie) y evalúa las combinaciones de parámetros que
+le toquen. Los resultados se entregan en el
+orden de las combinaciones (independientemente del orden en que terminen),
+lo que permite escribirlos en CSV/JSON a medida que llegan y reanudar un grid
+parcialmente completado.
+
+Usado como context manager, ParallelGridRunner mantiene el pool y la memoria
+compartida entre llamadas a ``run``, de modo que los procesos conservan el
+estado que cacheen entre lotes (p. ej. generaciones de un algoritmo genético).
+"""
+
+import csv
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('BacktestEngine')
+
+# Estado de cada proceso del pool (lo rellena _init_worker)
+_worker_data: Optional[pd.DataFrame] = None
+_worker_context: Any = None
+_worker_evaluate: Optional[Callable] = None
+_worker_shm: List[shared_memory.SharedMemory] = []
+
+
+def generate_param_combinations(param_grid: Dict[str, List]) -> List[Dict]:
+    """
+    Genera todas las combinaciones de un grid de parámetros, en orden estable
+
+    Args:
+        param_grid: Diccionario de parámetros con listas de valores
+
+    Returns:
+        List[Dict]: Lista de diccionarios con combinaciones de parámetros
+    """
+    names = list(param_grid.keys())
+    return [dict(zip(names, combo)) for combo in product(*param_grid.values())]
+
+
+def params_key(params: Dict, names: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Clave hashable para una combinación de parámetros.
+
+    Usa la representación en texto de cada valor para que coincida con lo
+    leído de un CSV ya escrito.
+    """
+    names = list(names) if names is not None else sorted(params)
+    return tuple(str(params[name]) for name in names)
+
+
+# Tipos de columna que se publican en memoria compartida (bool, enteros,
+# flotantes, complejos, fechas y duraciones de NumPy)
+_SHARED_KINDS = 'biufcmM'
+
+
+def _column_blocks(data: pd.DataFrame) -> Tuple[List[Tuple[np.dtype, List]], List]:
+    """
+    Agrupa las columnas por dtype de NumPy (un bloque por dtype)
+
+    Returns:
+        Tuple: ([(dtype, columnas)], columnas con otros tipos: object, texto,
+        categorías, extensiones de pandas...)
+    """
+    blocks: Dict[np.dtype, List] = {}
+    other = []
+    for column, dtype in data.dtypes.items():
+        if isinstance(dtype, np.dtype) and dtype.kind in _SHARED_KINDS:
+            blocks.setdefault(dtype, []).append(column)
+        else:
+            other.append(column)
+    return list(blocks.items()), other
+
+
+def _assemble_frame(spec: Dict, arrays: List[np.ndarray], index: pd.Index) -> pd.DataFrame:
+    """DataFrame de solo lectura con las columnas en su orden original y sin copiar los bloques"""
+    columns = {}
+    for block, values in zip(spec['blocks'], arrays):
+        values.flags.writeable = False
+        for j, column in enumerate(block['columns']):
+            columns[column] = values[:, j]
+    other = spec['other']
+    if other is not None:
+        for column in other.columns:
+            columns[column] = other[column]
+    data = pd.DataFrame({column: columns[column] for column in spec['columns']}, index=index, copy=False)
+    data.columns = pd.Index(spec['columns'], name=spec['columns_name'])
+    return data
+
+
+class SharedOHLCV:
+    """
+    Publica un DataFrame en memoria compartida.
+
+    Las columnas se agrupan en un bloque por dtype de NumPy (filas x
+    columnas), de modo que cada columna conserva su tipo, y el índice se
+    publica como int64 si es un DatetimeIndex (en su resolución). Las columnas
+    de otros tipos (texto, object, categorías...) y los demás índices se
+    envían tal cual a cada proceso. Los procesos ven los datos en solo
+    lectura; ``local_view`` da la misma vista al camino en serie.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        blocks, other = _column_blocks(data)
+        self.shape = data.shape
+        self._shms: List[shared_memory.SharedMemory] = []
+
+        block_specs = []
+        for dtype, columns in blocks:
+            values = data[columns].to_numpy(dtype=dtype)
+            shm = self._publish(values)
+            block_specs.append({'name': shm.name, 'dtype': dtype.str, 'columns': columns})
+
+        is_datetime = isinstance(data.index, pd.DatetimeIndex)
+        index_name = None
+        if is_datetime:
+            # asi8 está en la resolución del índice (pandas >= 2: s, ms, us o ns)
+            index_name = self._publish(data.index.asi8).name
+
+        self.spec = {
+            'rows': len(data),
+            'columns': list(data.columns),
+            'columns_name': data.columns.name,
+            'blocks': block_specs,
+            'other': data[other] if other else None,
+            'index_name': index_name,
+            'index': None if is_datetime else data.index,
+            'index_unit': data.index.unit if is_datetime else None,
+            'index_tz': str(data.index.tz) if is_datetime and data.index.tz is not None else None,
+            'index_label': data.index.name
+        }
+
+    def _publish(self, values: np.ndarray) -> shared_memory.SharedMemory:
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+        self._shms.append(shm)
+        return shm
+
+    @staticmethod
+    def _index(spec: Dict, index_values: Optional[np.ndarray]) -> pd.Index:
+        if index_values is None:
+            return spec['index']
+        index = pd.DatetimeIndex(index_values.astype(f"datetime64[{spec['index_unit']}]"),
+                                 name=spec['index_label'])
+        if spec['index_tz']:
+            index = index.tz_localize('UTC').tz_convert(spec['index_tz'])
+        return index
+
+    @staticmethod
+    def attach(spec: Dict) -> Tuple[pd.DataFrame, List[shared_memory.SharedMemory]]:
+        """
+        Reconstruye el DataFrame a partir de la memoria compartida, sin copiar
+
+        Returns:
+            Tuple: (DataFrame, handles de memoria compartida que hay que mantener vivos)
+        """
+        rows = spec['rows']
+        handles, arrays = [], []
+        for block in spec['blocks']:
+            shm = shared_memory.SharedMemory(name=block['name'])
+            handles.append(shm)
+            arrays.append(np.ndarray((rows, len(block['columns'])), dtype=np.dtype(block['dtype']),
+                                     buffer=shm.buf))
+        index_values = None
+        if spec['index_name'] is not None:
+            index_shm = shared_memory.SharedMemory(name=spec['index_name'])
+            handles.append(index_shm)
+            index_values = np.ndarray((rows,), dtype=np.int64, buffer=index_shm.buf)
+        return _assemble_frame(spec, arrays, SharedOHLCV._index(spec, index_values)), handles
+
+    @staticmethod
+    def local_view(data: pd.DataFrame) -> pd.DataFrame:
+        """
+        La misma vista que reciben los procesos del pool, sin memoria
+        compartida (para ``n_jobs == 1``): mismos dtypes y solo lectura
+        """
+        blocks, other = _column_blocks(data)
+        spec = {
+            'columns': list(data.columns),
+            'columns_name': data.columns.name,
+            'blocks': [{'columns': columns} for _, columns in blocks],
+            'other': data[other].copy() if other else None
+        }
+        arrays = [data[columns].to_numpy(dtype=dtype, copy=True) for dtype, columns in blocks]
+        return _assemble_frame(spec, arrays, data.index)
+
+    def close(self):
+        """Libera la memoria compartida (sólo desde el proceso que la creó)"""
+        for shm in self._shms:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shms = []
+
+
+def _init_worker(spec: Dict, evaluate: Callable, context: Any):
+    """Inicializa un proceso del pool: adjunta los datos compartidos una vez"""
+    global _worker_data, _worker_context, _worker_evaluate, _worker_shm
+    _worker_data, _worker_shm = SharedOHLCV.attach(spec)
+    _worker_evaluate = evaluate
+    _worker_context = context
+
+
+def _run_task(position: int, params: Dict) -> Tuple[int, Dict, Optional[str]]:
+    """Evalúa una combinación dentro de un proceso del pool"""
+    try:
+        return position, _worker_evaluate(_worker_data, params, _worker_context), None
+    except Exception as e:
+        return position, {}, f"{type(e).__name__}: {e}"
+
+
+class ParallelGridRunner:
+    """
+    Ejecuta ``evaluate(data, params, context) -> Dict`` para cada combinación
+    de parámetros en un pool de procesos.
+
+    ``evaluate`` y ``context`` deben poder serializarse con pickle (funciones
+    definidas a nivel de módulo, no lambdas ni closures).
+    """
+
+    def __init__(self, evaluate: Callable, data: pd.DataFrame, context: Any = None,
+                 n_jobs: Optional[int] = None):
+        """
+        Args:
+            evaluate: Función que evalúa una combinación de parámetros
+            data: Datos históricos OHLCV
+            context: Objeto adicional que recibe ``evaluate`` (estrategia, ajustes...)
+            n_jobs: Número de procesos (None = todos los núcleos, 1 = en serie)
+        """
+        self.evaluate = evaluate
+        self.data = data
+        self.context = context
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+
+        # Pool persistente (sólo dentro de ``with``)
+        self._shared: Optional[SharedOHLCV] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> 'ParallelGridRunner':
+        """Arranca un pool que se reutiliza en todas las llamadas a ``run``"""
+        if self.n_jobs > 1:
+            self._shared = SharedOHLCV(self.data)
+            self._pool = ProcessPoolExecutor(max_workers=self.n_jobs,
+                                             initializer=_init_worker,
+                                             initargs=(self._shared.spec, self.evaluate, self.context))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Detiene el pool persistente y libera la memoria compartida"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def run(self, combinations: List[Dict],
+            on_result: Optional[Callable[[Dict, Dict], None]] = None,
+            completed: Optional[Set[Tuple[str, ...]]] = None,
+            key_names: Optional[List[str]] = None) -> List[Tuple[Dict, Dict]]:
+        """
+        Evalúa las combinaciones y devuelve los resultados en su orden original
+
+        Args:
+            combinations: Combinaciones de parámetros
+            on_result: Callback ``(params, result)`` llamado en orden de
+                combinación a medida que hay resultados disponibles
+            completed: Claves (ver params_key) de combinaciones ya evaluadas
+                en una ejecución anterior, que se omiten
+            key_names: Nombres de parámetros usados para construir las claves
+
+        Returns:
+            List[Tuple[Dict, Dict]]: (params, resultado) de las combinaciones
+            evaluadas en esta ejecución. Una combinación que falla devuelve
+            ``{'error': ...}`` como resultado.
+        """
+        if completed:
+            pending = [p for p in combinations if params_key(p, key_names) not in completed]
+            skipped = len(combinations) - len(pending)
+            if skipped:
+                logger.info(f"Reanudando grid: {skipped} combinaciones ya evaluadas, {len(pending)} pendientes")
+        else:
+            pending = list(combinations)
+
+        total = len(pending)
+        ordered: List[Tuple[Dict, Dict]] = []
+        if total == 0:
+            return ordered
+
+        def emit(params: Dict, result: Dict, error: Optional[str]):
+            if error:
+                logger.error(f"Error evaluando {params}: {error}")
+                result = {'error': error}
+            ordered.append((params, result))
+            if on_result is not None:
+                on_result(params, result)
+
+        if self.n_jobs == 1:
+            # Misma vista (dtypes, solo lectura) que en los procesos del pool
+            data = SharedOHLCV.local_view(self.data)
+            for i, params in enumerate(pending):
+                try:
+                    emit(params, self.evaluate(data, params, self.context), None)
+                except Exception as e:
+                    emit(params, {}, f"{type(e).__name__}: {e}")
+                logger.info(f"Grid: {i + 1}/{total} combinaciones evaluadas")
+            return ordered
+
+        if self._pool is not None:
+            self._collect(self._pool, pending, emit)
+            return ordered
+
+        shared = SharedOHLCV(self.data)
+        try:
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, total),
+                                     initializer=_init_worker,
+                                     initargs=(shared.spec, self.evaluate, self.context)) as pool:
+                self._collect(pool, pending, emit)
+        finally:
+            shared.close()
+
+        return ordered
+
+    @staticmethod
+    def _collect(pool: ProcessPoolExecutor, pending: List[Dict], emit: Callable):
+        """Envía las combinaciones al pool y las emite en su orden original"""
+        total = len(pending)
+        buffer: Dict[int, Tuple[Dict, Optional[str]]] = {}
+        next_position = 0
+        futures = [pool.submit(_run_task, i, params) for i, params in enumerate(pending)]
+        for done, future in enumerate(as_completed(futures), start=1):
+            position, result, error = future.result()
+            buffer[position] = (result, error)
+            # Emitir en orden: sólo el prefijo contiguo ya terminado
+            while next_position in buffer:
+                result, error = buffer.pop(next_position)
+                emit(pending[next_position], result, error)
+                next_position += 1
+            logger.info(f"Grid: {done}/{total} combinaciones evaluadas")
+
+
+def load_completed_jsonl(path: str) -> Dict[Tuple[str, ...], Dict]:
+    """
+    Lee un fichero JSON lines de resultados (``{"params": ..., "metrics": ...}``
+    por línea) y devuelve los resultados por clave de combinación
+    """
+    completed: Dict[Tuple[str, ...], Dict] = {}
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Última línea truncada por una interrupción
+                continue
+            completed[params_key(entry['params'])] = entry
+    return completed
+
+
+def append_jsonl(path: str, entry: Dict):
+    """Añade un resultado a un fichero JSON lines y lo sincroniza a disco"""
+    with open(path, 'ab+') as f:
+        # Si la última línea quedó truncada, empezar en una línea nueva
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write((json.dumps(entry, default=str) + '\n').encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class GridResultsFile:
+    """
+    Fichero de resultados de un grid, escrito a medida que terminan las
+    combinaciones y usado para reanudar el grid.
+
+    El formato depende de la extensión de ``path``:
+    - '.csv': una fila por combinación con columnas de parámetros y métricas
+      (las métricas no escalares se omiten), como el CSV de
+      CerebroAdaptativo.optimizar_estrategia. Se reanuda leyendo el propio CSV.
+    - '.json': al terminar se escribe el resumen que devuelve el optimizador;
+      mientras tanto cada resultado va a un diario JSON lines junto a él
+      (mismo nombre con extensión '.jsonl'), del que se reanuda.
+    - '.jsonl': sólo el diario JSON lines.
+    """
+
+    def __init__(self, path: str, param_names: Iterable[str]):
+        """
+        Args:
+            path: Ruta del fichero de resultados
+            param_names: Nombres de los parámetros del grid (columnas del CSV)
+        """
+        self.path = path
+        self.param_names = list(param_names)
+        self.format = os.path.splitext(path)[1].lower().lstrip('.')
+        if self.format == 'csv':
+            self.journal_path = None
+        elif self.format == 'jsonl':
+            self.journal_path = path
+        else:
+            self.journal_path = os.path.splitext(path)[0] + '.jsonl'
+
+    def load_completed(self) -> Dict[Tuple[str, ...], Dict]:
+        """
+        Resultados ya escritos por una ejecución anterior
+
+        Returns:
+            Dict: ``{"params": ..., "metrics": ...}`` por clave de combinación (ver params_key)
+        """
+        if self.journal_path is not None:
+            return load_completed_jsonl(self.journal_path)
+
+        completed: Dict[Tuple[str, ...], Dict] = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                if any(row.get(name) is None for name in self.param_names):
+                    # Última fila truncada por una interrupción
+                    continue
+                params = {name: row[name] for name in self.param_names}
+                metrics = {k: _parse_csv_value(v) for k, v in row.items()
+                           if k not in params and k is not None}
+                completed[params_key(params)] = {'params': params, 'metrics': metrics}
+        return completed
+
+    def append(self, params: Dict, metrics: Dict):
+        """Escribe el resultado de una combinación y lo sincroniza a disco"""
+        if self.journal_path is not None:
+            append_jsonl(self.journal_path, {'params': params, 'metrics': metrics})
+            return
+
+        row = dict(params)
+        row.update({k: v for k, v in metrics.items() if _is_scalar(v)})
+        header = None
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'r', newline='') as f:
+                header = next(csv.reader(f), None)
+        with open(self.path, 'a', newline='') as f:
+            if not header:
+                header = self.param_names + [k for k in row if k not in self.param_names]
+                csv.writer(f).writerow(header)
+            csv.DictWriter(f, fieldnames=header, extrasaction='ignore').writerow(row)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def write_summary(self, summary: Dict):
+        """Escribe el resumen final del grid (sólo en formato '.json')"""
+        if self.format != 'json':
+            return
+        directory = os.path.dirname(self.path) or '.'
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
+        os.replace(temp_path, self.path)
+
+
+def _is_scalar(value: Any) -> bool:
+    return value is None or isinstance(value, (str, bool, int, float, np.number, pd.Timestamp))
+
+
+def _parse_csv_value(value: Optional[str]) -> Any:
+    """Convierte un valor leído de CSV en número cuando es posible"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Modo streaming para el motor de backtesting
+
+En lugar de copiar el prefijo completo del DataFrame en cada vela
+(``data.iloc[:i+1].copy()``, coste O(N²)), las estrategias reciben un
+estado incremental (BarState) con vistas de solo lectura sobre columnas
+precalculadas una única vez.
+"""
+
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('BacktestEngine')
+
+
+class BarState:
+    """
+    Estado de la vela actual durante un backtest en modo streaming.
+
+    Expone vistas sin copia (y de solo lectura) sobre las columnas numéricas
+    de los datos, además de un diccionario ``store`` donde la estrategia puede
+    guardar su propio estado incremental entre velas.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        """
+        Inicializa el estado a partir de los datos (ya con indicadores)
+
+        Args:
+            data: DataFrame completo del backtest
+        """
+        self.data = data
+        self.index = data.index
+        self.i = 0
+        self.store: Dict[str, Any] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+
+        for col in data.columns:
+            if pd.api.types.is_numeric_dtype(data[col]):
+                values = data[col].to_numpy()
+                view = values.view()
+                view.flags.writeable = False
+                self._columns[col] = view
+
+    def __len__(self) -> int:
+        return self.i + 1
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._columns
+
+    @property
+    def timestamp(self):
+        """Timestamp de la vela actual"""
+        return self.index[self.i]
+
+    @property
+    def close(self) -> float:
+        """Precio de cierre de la vela actual"""
+        return self._columns['close'][self.i]
+
+    def column(self, name: str) -> np.ndarray:
+        """Vista de solo lectura de una columna hasta la vela actual (incluida)"""
+        return self._columns[name][:self.i + 1]
+
+    def get(self, name: str, lag: int = 0, default: Any = np.nan) -> Any:
+        """
+        Valor de una columna en la vela actual o ``lag`` velas atrás
+
+        Args:
+            name: Nombre de la columna
+            lag: Número de velas hacia atrás (0 = vela actual)
+            default: Valor devuelto si no hay suficiente historial
+        """
+        pos = self.i - lag
+        if pos < 0:
+            return default
+        return self._columns[name][pos]
+
+    def window(self, name: str, length: int) -> np.ndarray:
+        """Vista de solo lectura con las últimas ``length`` velas de una columna"""
+        start = max(0, self.i + 1 - length)
+        return self._columns[name][start:self.i + 1]
+
+    @property
+    def history(self) -> pd.DataFrame:
+        """Prefijo de los datos hasta la vela actual, sin copiar"""
+        return self.data.iloc[:self.i + 1]
+
+
+class StreamingStrategy:
+    """
+    Clase base para estrategias del modo streaming.
+
+    ``prepare`` se ejecuta una vez antes del backtest para añadir columnas de
+    indicadores; ``on_bar`` se llama en cada vela y devuelve ``(signal, reason)``
+    con la misma convención que las funciones de estrategia clásicas.
+    """
+
+    def prepare(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Precalcula indicadores sobre todo el histórico (por defecto, nada)"""
+        return data
+
+    def on_bar(self, state: BarState) -> Tuple[int, Optional[str]]:
+        raise NotImplementedError
+
+
+class LegacyStrategyAdapter(StreamingStrategy):
+    """
+    Adaptador para funciones de estrategia con la firma clásica
+    ``strategy_func(df, **params) -> (signal, reason)``.
+
+    Por defecto pasa el prefijo sin copiar, sin el coste O(N²) de las copias
+    del bucle original. Con copy-on-write (pandas >= 3) las modificaciones que
+    haga la estrategia sobre el DataFrame recibido no alteran los datos; con
+    pandas 2, ``copy=True`` (``run_backtest(..., copy_history=True)``) pasa
+    una copia como el bucle original para las estrategias que lo modifican.
+    """
+
+    def __init__(self, strategy_func: Callable, params: Optional[Dict] = None,
+                 copy: bool = False):
+        self.strategy_func = strategy_func
+        self.params = params or {}
+        self.copy = copy
+
+    def on_bar(self, state: BarState) -> Tuple[int, Optional[str]]:
+        history = state.history
+        if self.copy:
+            history = history.copy()
+        return self.strategy_func(history, **self.params)
+
+
+class SignalSeriesStrategy(StreamingStrategy):
+    """
+    Estrategia streaming a partir de una función vectorizada de señales
+    (``fn(df, **params) -> pd.Series`` con valores -1, 0, 1).
+
+    La serie se calcula una sola vez sobre todo el histórico y cada vela sólo
+    lee su valor. Sólo es válido para funciones causales (el valor en la vela
+    i depende únicamente de velas <= i), como los cruces de medias o el RSI.
+
+    Los NaN (p. ej. el calentamiento de los indicadores) se mantienen: igual
+    que en el bucle por vela, una señal NaN no abre ni cierra posiciones.
+    """
+
+    def __init__(self, signal_func: Callable, params: Optional[Dict] = None,
+                 reason: Optional[str] = None):
+        self.signal_func = signal_func
+        self.params = params or {}
+        self.reason = reason
+        self._signals: Optional[np.ndarray] = None
+
+    def prepare(self, data: pd.DataFrame) -> pd.DataFrame:
+        signals = self.signal_func(data, **self.params)
+        self._signals = pd.Series(signals, index=data.index).to_numpy(dtype=float)
+        return data
+
+    def on_bar(self, state: BarState) -> Tuple[int, Optional[str]]:
+        return self._signals[state.i], self.reason
+
+
+def as_streaming_strategy(strategy: Any, params: Optional[Dict] = None,
+                          copy: bool = False) -> StreamingStrategy:
+    """
+    Convierte una estrategia en StreamingStrategy, envolviendo las funciones
+    clásicas con LegacyStrategyAdapter.
+    """
+    if isinstance(strategy, StreamingStrategy) or hasattr(strategy, 'on_bar'):
+        return strategy
+    return LegacyStrategyAdapter(strategy, params, copy=copy)
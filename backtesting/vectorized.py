@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Núcleo vectorizado de simulación señal -> trades/equity
+
+Sustituye los bucles por vela con ``iloc`` de los distintos simuladores por
+operaciones sobre arrays de NumPy. Las transiciones de posición sólo pueden
+ocurrir donde cambia la señal, así que el único bucle en Python recorre esos
+cambios (y luego los trades); el equity de cada tramo se calcula de forma
+vectorizada.
+
+Modos de contabilidad:
+- 'compound': toda la cuenta entra en cada operación y el P&L es el retorno
+  porcentual sobre el balance (BacktestResult de advanced_optimizer).
+- 'units': el tamaño se fija en unidades como fracción del balance y la
+  comisión se cobra sobre el valor de entrada y de salida (backtesting.py).
+
+Señales NaN (``nan_policy``):
+- 'zero': equivalen a 0 y no cambian nada (el bucle de BacktestEngine).
+- 'short': sin posición abren un corto y con posición la mantienen, como el
+  bucle de BacktestResult (``signal != 0`` es cierto para NaN y
+  ``1 if signal > 0 else -1`` da -1).
+"""
+
+import logging
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('BacktestEngine')
+
+ACCOUNTING_MODES = ('compound', 'units')
+NAN_POLICIES = ('zero', 'short')
+
+# Código interno de las velas con señal NaN en la política 'short'
+_NAN = 2
+
+
+def signal_transitions(signals: np.ndarray, start: int = 1,
+                       nan_policy: str = 'zero') -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calcula las entradas y salidas que produce una serie de señales
+
+    Reglas (las mismas que los bucles originales): sin posición, una señal
+    distinta de 0 abre en su dirección; con posición, una señal contraria
+    cierra y el sistema queda plano hasta la siguiente vela con señal. Las
+    señales 0 o en la misma dirección no cambian nada.
+
+    Args:
+        signals: Array de señales (se usa su signo)
+        start: Primera vela en la que se evalúan señales
+        nan_policy: Tratamiento de las señales NaN (ver docstring del módulo)
+
+    Returns:
+        Tuple: (entry_idx, exit_idx, direction). ``exit_idx`` vale -1 para una
+        posición que sigue abierta al final de los datos.
+    """
+    if nan_policy not in NAN_POLICIES:
+        raise ValueError(f"Política de NaN no soportada: {nan_policy}")
+    values = np.asarray(signals, dtype=np.float64)
+    sign = np.sign(np.nan_to_num(values)).astype(np.int8)
+    if nan_policy == 'short':
+        sign[np.isnan(values)] = _NAN
+    n = len(sign)
+    entries, exits, directions = [], [], []
+    if n <= start:
+        return (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=np.int8))
+
+    tail = sign[start:]
+    change_points = np.flatnonzero(tail[1:] != tail[:-1]) + start + 1
+    run_starts = np.concatenate(([start], change_points))
+    run_ends = np.append(run_starts[1:], n)
+
+    position = 0
+    for run_start, run_end, value in zip(run_starts.tolist(), run_ends.tolist(),
+                                         sign[run_starts].tolist()):
+        if value == _NAN:
+            # NaN: abre corto sin posición; con posición no cambia nada
+            if position != 0:
+                continue
+            value = -1
+        if value == 0 or value == position:
+            continue
+        if position == 0:
+            entries.append(run_start)
+            directions.append(value)
+            position = value
+        else:
+            # Señal contraria: cerrar; se reabre en la vela siguiente si la señal persiste
+            exits.append(run_start)
+            position = 0
+            if run_end - run_start >= 2:
+                entries.append(run_start + 1)
+                directions.append(value)
+                position = value
+
+    if len(exits) < len(entries):
+        exits.append(-1)
+
+    return (np.asarray(entries, dtype=np.int64), np.asarray(exits, dtype=np.int64),
+            np.asarray(directions, dtype=np.int8))
+
+
+def simulate_signals(close: np.ndarray, signals: np.ndarray,
+                     initial_balance: float = 10000.0,
+                     commission: float = 0.001,
+                     slippage: float = 0.0,
+                     accounting: str = 'compound',
+                     position_fraction: float = 1.0,
+                     start: int = 1,
+                     nan_policy: str = 'zero') -> Dict[str, Any]:
+    """
+    Simula long/short a partir de arrays de precios de cierre y señales
+
+    Args:
+        close: Array de precios de cierre
+        signals: Array de señales (-1, 0, 1) alineado con ``close``
+        initial_balance: Balance inicial
+        commission: Comisión por operación (0.001 = 0.1%)
+        slippage: Deslizamiento aplicado en contra en entrada y salida
+        accounting: 'compound' o 'units' (ver docstring del módulo)
+        position_fraction: Fracción del balance por operación (modo 'units')
+        start: Primera vela en la que se evalúan señales
+        nan_policy: Tratamiento de las señales NaN ('zero' o 'short')
+
+    Returns:
+        Dict[str, Any]: Arrays compactos de trades (``entry_idx``, ``exit_idx``,
+        ``direction``, ``entry_price``, ``exit_price``, ``size``, ``pnl``,
+        ``net_pnl``, ``commission``, ``entry_balance``, ``balance``), la curva
+        ``equity`` (una entrada por vela; las velas anteriores a ``start``
+        valen el balance inicial) y ``final_balance``. ``exit_idx`` es la última vela para la
+        posición cerrada a final de datos, marcada en ``forced_exit``.
+    """
+    if accounting not in ACCOUNTING_MODES:
+        raise ValueError(f"Modo de contabilidad no soportado: {accounting}")
+
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    entry_idx, exit_idx, direction = signal_transitions(signals, start, nan_policy)
+    n_trades = len(entry_idx)
+
+    forced_exit = exit_idx < 0
+    exit_idx = np.where(forced_exit, n - 1, exit_idx)
+
+    entry_price = np.empty(n_trades)
+    exit_price = np.empty(n_trades)
+    size = np.empty(n_trades)
+    pnl = np.empty(n_trades)
+    net_pnl = np.empty(n_trades)
+    entry_balance = np.empty(n_trades)
+    exit_commission = np.empty(n_trades)
+    balance_after = np.empty(n_trades)
+    equity = np.full(n, float(initial_balance))
+
+    balance = float(initial_balance)
+    flat_from = start
+
+    for k in range(n_trades):
+        e = int(entry_idx[k])
+        x = int(exit_idx[k])
+        d = int(direction[k])
+        # Las posiciones cerradas a final de datos siguen abiertas en el equity
+        open_end = n if forced_exit[k] else x
+
+        equity[flat_from:e] = balance
+
+        ep = float(close[e]) * (1 + d * slippage)
+        xp = float(close[x]) * (1 - d * slippage)
+        marks = close[e:open_end]
+
+        if accounting == 'compound':
+            stake = balance
+            entry_balance[k] = balance
+            if d == 1:
+                trade_pnl = (xp / ep - 1) * stake
+                open_pnl = (marks / ep - 1) * stake
+            else:
+                trade_pnl = (ep / xp - 1) * stake
+                open_pnl = (ep / marks - 1) * stake
+            trade_commission = stake * commission
+            open_pnl = open_pnl - stake * commission
+            trade_net = trade_pnl - trade_commission
+            equity[e:open_end] = stake + open_pnl
+            balance += trade_net
+            size[k] = stake / ep
+        else:
+            units = balance * position_fraction / ep
+            balance -= ep * units * commission
+            entry_balance[k] = balance
+            if d == 1:
+                trade_pnl = (xp - ep) * units
+                unrealized = (marks - ep) * units
+            else:
+                trade_pnl = (ep - xp) * units
+                unrealized = (ep - marks) * units
+            trade_commission = xp * units * commission
+            trade_net = trade_pnl - trade_commission
+            equity[e:open_end] = balance + (unrealized - marks * units * commission)
+            balance += trade_net
+            size[k] = units
+
+        entry_price[k] = ep
+        exit_price[k] = xp
+        pnl[k] = trade_pnl
+        net_pnl[k] = trade_net
+        exit_commission[k] = trade_commission
+        balance_after[k] = balance
+        flat_from = open_end
+
+    equity[flat_from:] = balance
+
+    return {
+        'entry_idx': entry_idx,
+        'exit_idx': exit_idx,
+        'direction': direction,
+        'forced_exit': forced_exit,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'size': size,
+        'pnl': pnl,
+        'net_pnl': net_pnl,
+        'commission': exit_commission,
+        'entry_balance': entry_balance,
+        'balance': balance_after,
+        'equity': equity,
+        'final_balance': balance
+    }
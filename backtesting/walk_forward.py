@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Optimización walk-forward sobre todo el histórico
+
+Divide el histórico en ventanas consecutivas de entrenamiento y prueba: en
+cada ventana de entrenamiento se elige la mejor combinación (estrategia,
+parámetros) de todo el StrategyRepository y se mide fuera de muestra en la
+ventana de prueba siguiente.
+
+Las ventanas se solapan mucho (cada vela aparece en varias), así que no se
+recalcula nada por ventana:
+
+1. Las señales de cada combinación se calculan una sola vez sobre el
+   histórico completo (los indicadores son causales: el valor en una vela no
+   depende de las siguientes, y además llegan ya "calentados" al inicio de
+   cada ventana). Se guardan en forma dispersa (sólo las velas con señal).
+2. Cada ventana recorta esas señales con ``searchsorted`` y las simula con el
+   núcleo vectorizado (backtesting.vectorized).
+
+Ambas fases se reparten entre procesos con ParallelGridRunner: primero las
+combinaciones y después las ventanas.
+"""
+
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .parallel import ParallelGridRunner, generate_param_combinations
+from .vectorized import simulate_signals
+
+logger = logging.getLogger('BacktestEngine')
+
+# Métricas por las que se puede elegir la combinación de cada ventana (mayor es mejor)
+SELECTION_METRICS = ('sharpe_ratio', 'return_pct', 'profit_factor', 'win_rate')
+
+# Estrategias resueltas en cada proceso (las del repositorio no se pueden serializar)
+_worker_strategies: Optional[Dict[str, Callable]] = None
+
+
+def load_strategies() -> Dict[str, Callable]:
+    """
+    Estrategias del StrategyRepository, por nombre
+
+    Si el optimizador avanzado no se puede importar (dependencias del
+    proyecto no disponibles) se usan las estrategias base de strategies.classic.
+
+    Returns:
+        Dict[str, Callable]: Funciones ``fn(df, **params) -> pd.Series``
+    """
+    try:
+        from .advanced_optimizer import StrategyRepository
+        strategies = StrategyRepository().get_all_strategies()
+    except Exception as e:
+        logger.warning(f"StrategyRepository no disponible ({type(e).__name__}: {e}); "
+                       f"se usan las estrategias de strategies.classic")
+        strategies = {}
+    if not strategies:
+        from strategies.classic import STRATEGIES
+        strategies = dict(STRATEGIES)
+    return strategies
+
+
+def _get_strategy(name: str) -> Callable:
+    global _worker_strategies
+    if _worker_strategies is None:
+        _worker_strategies = load_strategies()
+    return _worker_strategies[name]
+
+
+def generate_windows(n_bars: int, train_bars: int, test_bars: int,
+                     step_bars: Optional[int] = None, anchored: bool = False) -> List[Dict]:
+    """
+    Genera las ventanas de entrenamiento/prueba
+
+    Args:
+        n_bars: Velas del histórico
+        train_bars: Velas de cada ventana de entrenamiento
+        test_bars: Velas de cada ventana de prueba
+        step_bars: Avance entre ventanas (por defecto, test_bars: pruebas contiguas)
+        anchored: Si True, el entrenamiento empieza siempre en la vela 0 (ventana creciente)
+
+    Returns:
+        List[Dict]: Ventanas con ``window``, ``train_start``, ``train_end``
+        (= inicio de la prueba) y ``test_end``, como índices de vela
+    """
+    if train_bars < 2 or test_bars < 2:
+        raise ValueError("Las ventanas de entrenamiento y prueba necesitan al menos 2 velas")
+    step_bars = step_bars or test_bars
+    windows = []
+    train_end = train_bars
+    while train_end + test_bars <= n_bars:
+        windows.append({
+            'window': len(windows),
+            'train_start': 0 if anchored else train_end - train_bars,
+            'train_end': train_end,
+            'test_end': train_end + test_bars
+        })
+        train_end += step_bars
+    return windows
+
+
+def window_metrics(close: np.ndarray, signals: np.ndarray, commission: float = 0.001,
+                   slippage: float = 0.001, periods_per_year: int = 252) -> Dict[str, float]:
+    """
+    Simula una ventana y calcula sus métricas (mismas definiciones de
+    métricas que BacktestResult de advanced_optimizer)
+
+    Las señales NaN se tratan como 0 (``nan_policy='zero'``, sin posición),
+    no como la entrada en corto de BacktestResult: ``_sparse`` ya las
+    convierte en 0 al guardar las señales de cada combinación.
+
+    Args:
+        close: Precios de cierre de la ventana
+        signals: Señales de la ventana, alineadas con ``close`` (NaN = 0)
+        commission: Comisión por operación
+        slippage: Deslizamiento por operación
+        periods_per_year: Velas por año para anualizar el Sharpe
+
+    Returns:
+        Dict[str, float]: return_pct, sharpe_ratio, max_drawdown, total_trades,
+        win_rate, profit_factor y final_balance
+    """
+    sim = simulate_signals(close, signals, commission=commission, slippage=slippage,
+                           accounting='compound', nan_policy='zero')
+    net_pnl = sim['net_pnl']
+    total_trades = len(net_pnl)
+    if total_trades == 0:
+        return {'return_pct': 0.0, 'sharpe_ratio': 0.0, 'max_drawdown': 0.0, 'total_trades': 0,
+                'win_rate': 0.0, 'profit_factor': 0.0, 'final_balance': float(sim['final_balance'])}
+
+    equity = sim['equity']
+    total_profit = float(net_pnl[net_pnl > 0].sum())
+    total_loss = float(-net_pnl[net_pnl <= 0].sum())
+    peak = np.maximum.accumulate(equity)
+    returns = np.diff(equity) / equity[:-1]
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    return {
+        'return_pct': float((equity[-1] / equity[0] - 1) * 100),
+        'sharpe_ratio': float(returns.mean() / std * periods_per_year ** 0.5) if std > 0 else 0.0,
+        'max_drawdown': float(((peak - equity) / peak).max() * 100),
+        'total_trades': total_trades,
+        'win_rate': float((net_pnl > 0).mean() * 100),
+        'profit_factor': total_profit / total_loss if total_loss > 0 else float('inf'),
+        'final_balance': float(sim['final_balance'])
+    }
+
+
+def _sparse(signals: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Serie de señales -> (velas con señal, signo de la señal); NaN cuenta como 0"""
+    values = np.sign(np.nan_to_num(np.asarray(signals, dtype=np.float64)))
+    idx = np.flatnonzero(values)
+    return idx, values[idx].astype(np.int8)
+
+
+def _window_signals(sparse: Tuple[np.ndarray, np.ndarray], start: int, end: int) -> np.ndarray:
+    """Señales densas de las velas [start, end) a partir de su forma dispersa"""
+    idx, values = sparse
+    lo, hi = np.searchsorted(idx, [start, end])
+    dense = np.zeros(end - start, dtype=np.int8)
+    dense[idx[lo:hi] - start] = values[lo:hi]
+    return dense
+
+
+def _compute_signals(data: pd.DataFrame, candidate: Dict, context: Dict) -> Dict:
+    """
+    Señales de una combinación sobre todo el histórico (se ejecuta en los
+    procesos de ParallelGridRunner)
+    """
+    strategy_fn = _get_strategy(candidate['strategy'])
+    idx, values = _sparse(strategy_fn(data, **candidate['params']))
+    return {'idx': idx, 'values': values}
+
+
+def _evaluate_window(data: pd.DataFrame, window: Dict, context: Dict) -> Dict:
+    """
+    Entrena y prueba una ventana (se ejecuta en los procesos de ParallelGridRunner)
+
+    Evalúa todas las combinaciones en el tramo de entrenamiento, elige la mejor
+    por ``context['metric']`` (desempate por retorno) y la mide en el tramo de prueba.
+    """
+    close = data['close'].to_numpy()
+    a, b, c = window['train_start'], window['train_end'], window['test_end']
+    metric = context['metric']
+    settings = context['settings']
+
+    best, best_score, best_train, best_signals = None, None, None, None
+    for candidate, sparse in zip(context['candidates'], context['signals']):
+        train = window_metrics(close[a:b], _window_signals(sparse, a, b), **settings)
+        if train['total_trades'] < context['min_trades']:
+            continue
+        score = (train[metric], train['return_pct'])
+        if best_score is None or score > best_score:
+            best, best_score, best_train, best_signals = candidate, score, train, sparse
+
+    row = {
+        'window': window['window'],
+        'train_start': str(data.index[a]),
+        'train_end': str(data.index[b - 1]),
+        'test_start': str(data.index[b]),
+        'test_end': str(data.index[c - 1]),
+        'strategy': best['strategy'] if best else None,
+        'params': json.dumps(best['params'], sort_keys=True) if best else None,
+        f'train_{metric}': best_train[metric] if best else None,
+        'train_return_pct': best_train['return_pct'] if best else None,
+        'train_trades': best_train['total_trades'] if best else 0
+    }
+    if best is None:
+        # Ninguna combinación operó lo suficiente: la ventana de prueba queda sin operar
+        test = window_metrics(close[b:c], np.zeros(c - b, dtype=np.int8), **settings)
+    else:
+        test = window_metrics(close[b:c], _window_signals(best_signals, b, c), **settings)
+    row.update({f'test_{key}': value for key, value in test.items()})
+    return row
+
+
+class WalkForwardOptimizer:
+    """
+    Optimización walk-forward de todas las estrategias del repositorio.
+
+    Las señales calculadas se conservan entre llamadas mientras no cambien los
+    datos, así que volver a ejecutar con otra configuración de ventanas (o
+    con ``select`` para reoptimizar) no vuelve a calcular indicadores.
+    """
+
+    def __init__(self, train_bars: int = 10000, test_bars: int = 2000,
+                 step_bars: Optional[int] = None, anchored: bool = False,
+                 strategies: Optional[List[str]] = None,
+                 param_grids: Optional[Dict[str, Dict[str, List]]] = None,
+                 metric: str = 'sharpe_ratio', min_trades: int = 1,
+                 commission: float = 0.001, slippage: float = 0.001,
+                 periods_per_year: int = 252, n_jobs: Optional[int] = None):
+        """
+        Args:
+            train_bars: Velas de cada ventana de entrenamiento
+            test_bars: Velas de cada ventana de prueba
+            step_bars: Avance entre ventanas (por defecto, test_bars)
+            anchored: Entrenamiento desde el inicio del histórico (ventana creciente)
+            strategies: Nombres de estrategias del repositorio (None = todas)
+            param_grids: Grid de parámetros por estrategia (por defecto,
+                strategies.classic.PARAM_GRIDS); sin grid, se usan sus parámetros por defecto
+            metric: Métrica de selección (ver SELECTION_METRICS)
+            min_trades: Operaciones mínimas en entrenamiento para elegir una combinación
+            commission: Comisión por operación (0.001 = 0.1%)
+            slippage: Deslizamiento por operación (0.001 = 0.1%)
+            periods_per_year: Velas por año para anualizar el Sharpe
+            n_jobs: Procesos en paralelo (1 = en serie, None = todos los núcleos)
+        """
+        if metric not in SELECTION_METRICS:
+            raise ValueError(f"Métrica de selección no soportada: {metric}")
+        if param_grids is None:
+            from strategies.classic import PARAM_GRIDS
+            param_grids = PARAM_GRIDS
+
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.step_bars = step_bars
+        self.anchored = anchored
+        self.strategy_names = strategies
+        self.param_grids = param_grids
+        self.metric = metric
+        self.min_trades = min_trades
+        self.settings = {'commission': commission, 'slippage': slippage,
+                         'periods_per_year': periods_per_year}
+        self.n_jobs = n_jobs
+
+        self.candidates: List[Dict] = []
+        self.signals: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.timings: Dict[str, float] = {}
+        self._data_key: Optional[Tuple] = None
+
+    def _build_candidates(self) -> List[Dict]:
+        names = self.strategy_names or list(load_strategies())
+        candidates = []
+        for name in names:
+            grid = self.param_grids.get(name)
+            combos = generate_param_combinations(grid) if grid else [{}]
+            candidates.extend({'strategy': name, 'params': params} for params in combos)
+        return candidates
+
+    @staticmethod
+    def _fingerprint(data: pd.DataFrame) -> Tuple:
+        close = data['close']
+        return (len(data), data.index[0], data.index[-1], float(close.iloc[-1]), float(close.sum()))
+
+    def precompute(self, data: pd.DataFrame) -> int:
+        """
+        Calcula las señales de todas las combinaciones sobre todo el histórico
+        (no hace nada si ya están calculadas para estos datos)
+
+        Args:
+            data: DataFrame OHLCV indexado por tiempo
+
+        Returns:
+            int: Número de combinaciones con señales disponibles
+        """
+        key = self._fingerprint(data)
+        if key == self._data_key:
+            return len(self.candidates)
+
+        started = time.perf_counter()
+        candidates = self._build_candidates()
+        logger.info(f"Walk-forward: calculando señales de {len(candidates)} combinaciones sobre {len(data)} velas")
+        runner = ParallelGridRunner(_compute_signals, data, n_jobs=self.n_jobs)
+
+        self.candidates, self.signals = [], []
+        for candidate, result in runner.run(candidates):
+            if 'error' in result:
+                continue
+            self.candidates.append(candidate)
+            self.signals.append((result['idx'], result['values']))
+
+        self._data_key = key
+        self.timings['precompute_seconds'] = time.perf_counter() - started
+        return len(self.candidates)
+
+    def _context(self) -> Dict:
+        return {'candidates': self.candidates, 'signals': self.signals, 'metric': self.metric,
+                'min_trades': self.min_trades, 'settings': self.settings}
+
+    def run(self, data: pd.DataFrame,
+            on_window: Optional[Callable[[Dict], None]] = None) -> pd.DataFrame:
+        """
+        Ejecuta el walk-forward completo
+
+        Args:
+            data: DataFrame OHLCV indexado por tiempo
+            on_window: Callback con la fila de cada ventana, en orden, a medida que terminan
+
+        Returns:
+            pd.DataFrame: Una fila por ventana con la combinación elegida, su
+            resultado en entrenamiento y sus métricas fuera de muestra (test_*)
+        """
+        windows = generate_windows(len(data), self.train_bars, self.test_bars,
+                                   self.step_bars, self.anchored)
+        if not windows:
+            logger.warning(f"Histórico demasiado corto ({len(data)} velas) para ventanas de "
+                           f"{self.train_bars}+{self.test_bars}")
+            return pd.DataFrame()
+
+        self.precompute(data)
+        started = time.perf_counter()
+        logger.info(f"Walk-forward: {len(windows)} ventanas, {len(self.candidates)} combinaciones por ventana")
+
+        runner = ParallelGridRunner(_evaluate_window, data[['close']], context=self._context(),
+                                    n_jobs=self.n_jobs)
+        rows = []
+
+        def collect(window, row):
+            if 'error' in row:
+                return
+            rows.append(row)
+            if on_window is not None:
+                on_window(row)
+
+        runner.run(windows, on_result=collect)
+        self.timings['windows_seconds'] = time.perf_counter() - started
+        return pd.DataFrame(rows)
+
+    def select(self, data: pd.DataFrame) -> Optional[Dict]:
+        """
+        Elige la mejor combinación con las últimas ``train_bars`` velas
+        (reoptimización con los datos más recientes)
+
+        Args:
+            data: DataFrame OHLCV indexado por tiempo
+
+        Returns:
+            Optional[Dict]: ``strategy``, ``params`` y métricas de entrenamiento,
+            o None si ninguna combinación llega a ``min_trades``
+        """
+        if len(data) < 2:
+            return None
+        self.precompute(data)
+        n = len(data)
+        start = max(0, n - self.train_bars)
+        close = data['close'].to_numpy()
+
+        best, best_score = None, None
+        for candidate, sparse in zip(self.candidates, self.signals):
+            metrics = window_metrics(close[start:n], _window_signals(sparse, start, n), **self.settings)
+            if metrics['total_trades'] < self.min_trades:
+                continue
+            score = (metrics[self.metric], metrics['return_pct'])
+            if best_score is None or score > best_score:
+                best_score = score
+                best = {'strategy': candidate['strategy'], 'params': dict(candidate['params']), **metrics}
+        return best
+
+    def summary(self, table: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Resume una tabla de walk-forward
+
+        Args:
+            table: Resultado de ``run``
+
+        Returns:
+            Dict: Ventanas, retorno fuera de muestra encadenado, Sharpe medio
+            fuera de muestra, % de ventanas positivas, estrategias elegidas y tiempos
+        """
+        if table.empty:
+            return {'windows': 0, **self.timings}
+        test_returns = table['test_return_pct'].to_numpy(dtype=np.float64)
+        return {
+            'windows': len(table),
+            'candidates': len(self.candidates),
+            'oos_return_pct': float((np.prod(1 + test_returns / 100) - 1) * 100),
+            'mean_oos_sharpe': float(table['test_sharpe_ratio'].mean()),
+            'positive_windows_pct': float((test_returns > 0).mean() * 100),
+            'strategies_selected': table['strategy'].value_counts().to_dict(),
+            **self.timings
+        }
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la evolución offline de la Bot Battle Arena.
+
+Crea una arena estándar en un fichero temporal y la hace evolucionar con
+backtests sobre un histórico (adaptive_system.arena_evolution). Informa de las
+generaciones por minuto, los backtests realizados y los resultados
+reutilizados de la caché.
+
+Ejemplo:
+    python benchmark_arena.py --data processed_data/SOLUSDT_full_concat.csv --generations 500 --jobs 4
+    python benchmark_arena.py --bars 100000 --market-type futures --history benchmarks/arena.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from adaptive_system.bot_battle_arena import BotBattleArena
+from backtesting.parallel import append_jsonl
+from benchmark_walk_forward import load_history
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark con los argumentos de la línea de comandos
+
+    Returns:
+        Dict[str, Any]: Tamaño del problema, ritmo de la evolución, cachés y mejor guerrero
+    """
+    started = time.perf_counter()
+    data = load_history(args.data, args.bars)
+    load_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arena = BotBattleArena(arena_file=os.path.join(tmp, "arena.json"),
+                               max_battle_size=args.population)
+        arena.create_standard_arena()
+        report = arena.evolve_offline(data, generations=args.generations, seed_winners=0,
+                                      market_type=args.market_type, n_jobs=args.jobs,
+                                      max_seconds=args.max_seconds, seed=args.seed)
+
+    best = report['best'] or {}
+    result = best.get('result', {})
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'data': args.data or 'synthetic',
+        'bars': len(data),
+        'market_type': args.market_type,
+        'jobs': args.jobs or os.cpu_count(),
+        'population': report['population_size'],
+        'load_s': round(load_s, 3),
+        'generations': report['generations'],
+        'elapsed_s': report['elapsed_seconds'],
+        'generations_per_minute': report['generations_per_minute'],
+        'backtests': report['evaluations'],
+        'result_cache_hits': report['result_cache_hits'],
+        'signal_cache_hits': report['signal_cache_hits'],
+        'errors': report['errors'],
+        'best_strategy': f"{best.get('strategy_name')} {best.get('timeframe')}",
+        'best_roi': round(result.get('roi', 0.0), 4),
+        'best_trades': result.get('total_trades', 0),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la evolución offline de la arena")
+    parser.add_argument('--data', default=None, help="CSV o dataset columnar de velas de 1m (por defecto, datos generados)")
+    parser.add_argument('--bars', type=int, default=0, help="Últimas N velas (0 = todas; generadas: 200000)")
+    parser.add_argument('--generations', type=int, default=300, help="Generaciones a ejecutar")
+    parser.add_argument('--population', type=int, default=20, help="Guerreros por generación")
+    parser.add_argument('--market-type', default='spot', choices=['spot', 'futures'], help="Tipo de mercado")
+    parser.add_argument('--jobs', type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument('--max-seconds', type=float, default=None, help="Tiempo máximo de evolución")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla de la evolución")
+    parser.add_argument('--output', default=None, help="Guardar resultados en JSON")
+    parser.add_argument('--history', default=None, help="Añadir resultados a un fichero JSON lines")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ('BotBattleArena', 'BacktestEngine'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = run_benchmark(args)
+    for key, value in results.items():
+        print(f"{key:>22}: {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.history:
+        os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+        append_jsonl(args.history, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Benchmark de MultiBotManager: N bots de paper trading contra un feed reproducido.
+
+Reproduce velas (de un CSV/dataset columnar o generadas) a través del
+MarketDataHub, con varias actualizaciones parciales por vela como llegarían
+por WebSocket, y mide cuánto trabajo hacen los bots y con qué coste:
+evaluaciones por segundo, latencia de reparto, retraso de los bots, hilos y
+memoria máxima del proceso.
+
+Modos:
+    async    Runtime asyncio (un event loop + pool de evaluación acotado)
+    threads  Un hilo por bot suscrito al mismo hub
+
+Ejemplo:
+    python benchmark_multi_bot.py --bots 100 --bars 300 --mode async
+    python benchmark_multi_bot.py --bots 100 --bars 300 --mode threads
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.market_data_hub import MarketDataHub
+from core.multi_bot_manager import MultiBotManager
+
+STRATEGIES = ["breakout_scalping", "momentum_scalping", "mean_reversion"]
+
+
+def load_replay_data(data_path: Optional[str], bars: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Velas a reproducir: las últimas ``bars`` de ``data_path`` o un paseo aleatorio
+
+    Returns:
+        pd.DataFrame: Columnas timestamp (ms), open, high, low, close, volume
+    """
+    if data_path:
+        from data_management.columnar_store import read_market_data
+
+        df = read_market_data(data_path, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df = df.tail(bars).reset_index(drop=True)
+        timestamps = pd.to_datetime(df['timestamp'])
+        df['timestamp'] = timestamps.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        return df
+
+    rng = np.random.default_rng(seed)
+    close = 150.0 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, bars)) * close
+    return pd.DataFrame({
+        'timestamp': 1_700_000_000_000 + np.arange(bars, dtype=np.int64) * 60_000,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(50, 150, bars)
+    })
+
+
+def _partial_updates(row, updates_per_bar: int) -> List[List[Any]]:
+    """Velas OKX con la evolución de una vela: la última va confirmada"""
+    candles = []
+    for k in range(1, updates_per_bar + 1):
+        frac = k / updates_per_bar
+        close = row.open + (row.close - row.open) * frac
+        candles.append([int(row.timestamp), row.open, max(row.open, close, row.high * frac + row.open * (1 - frac)),
+                        min(row.open, close, row.low * frac + row.open * (1 - frac)), close,
+                        row.volume * frac, 0, 0, '1' if k == updates_per_bar else '0'])
+    return candles
+
+
+def create_bots(hub: MarketDataHub, n_bots: int, symbols: List[str], timeframe: str) -> MultiBotManager:
+    """Crea ``n_bots`` bots repartidos entre símbolos y estrategias"""
+    manager = MultiBotManager(None, hub=hub)
+    for i in range(n_bots):
+        strategy = STRATEGIES[i % len(STRATEGIES)]
+        manager.create_bot(
+            bot_id=f"bench_{i}",
+            strategy_name=strategy,
+            symbol=symbols[i % len(symbols)],
+            timeframe=timeframe,
+            params=manager._get_default_params(strategy)
+        )
+    return manager
+
+
+class _PeakThreads:
+    """Muestrea el número de hilos vivos durante la prueba"""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+
+    def sample(self):
+        self.peak = max(self.peak, threading.active_count())
+
+
+def _all_caught_up(hub: MarketDataHub) -> bool:
+    return all(m['lag_versions'] == 0 for m in hub.get_metrics()['subscribers'].values())
+
+
+async def _run_async(hub, manager, replay, symbols, timeframe, args, threads):
+    runtime = manager.create_async_runtime(max_workers=args.workers)
+    await runtime.start()
+    try:
+        interval = 1.0 / args.rate if args.rate > 0 else 0
+        for row in replay.itertuples(index=False):
+            for candle in _partial_updates(row, args.updates_per_bar):
+                for symbol in symbols:
+                    hub.on_candles(symbol, timeframe, [candle], received_ms=time.time() * 1000)
+                threads.sample()
+                await asyncio.sleep(interval)
+        deadline = time.perf_counter() + args.drain_timeout
+        while not _all_caught_up(hub) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        return runtime.get_metrics()
+    finally:
+        await runtime.stop()
+
+
+def _run_threads(hub, manager, replay, symbols, timeframe, args, threads):
+    manager.start_all_bots()
+    try:
+        interval = 1.0 / args.rate if args.rate > 0 else 0
+        for row in replay.itertuples(index=False):
+            for candle in _partial_updates(row, args.updates_per_bar):
+                for symbol in symbols:
+                    hub.on_candles(symbol, timeframe, [candle], received_ms=time.time() * 1000)
+                threads.sample()
+                time.sleep(interval)
+        deadline = time.perf_counter() + args.drain_timeout
+        while not _all_caught_up(hub) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        metrics = hub.get_metrics()
+        subscribers = list(metrics['subscribers'].values())
+        return {
+            'bots': len(manager.bots),
+            'running_bots': sum(1 for bot in manager.bots.values() if bot.running),
+            'evaluations': sum(m['deliveries'] for m in subscribers),
+            'errors': sum(1 for bot in manager.bots.values() if bot.error),
+            'skipped_updates': sum(m['skipped_updates'] for m in subscribers),
+            'max_skipped_updates': max((m['skipped_updates'] for m in subscribers), default=0),
+            'max_fanout_ms': metrics['max_fanout_ms'],
+            'avg_fanout_ms': (sum(m['fanout_avg_ms'] for m in subscribers) / len(subscribers))
+            if subscribers else 0.0,
+            'max_lag_versions': metrics['max_lag_versions']
+        }
+    finally:
+        manager.stop_all_bots()
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark con los argumentos de la línea de comandos
+
+    Returns:
+        Dict[str, Any]: Resultados (tiempos, evaluaciones, latencias, memoria)
+    """
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+    data = load_replay_data(args.data, args.warmup + args.bars)
+    warmup, replay = data.iloc[:args.warmup], data.iloc[args.warmup:]
+
+    hub = MarketDataHub(capacity=args.capacity)
+    manager = create_bots(hub, args.bots, symbols, args.timeframe)
+    for symbol in symbols:
+        hub.get_feed(symbol, args.timeframe).seed(
+            warmup.assign(timestamp=pd.to_datetime(warmup['timestamp'], unit='ms')))
+
+    threads = _PeakThreads()
+    start = time.perf_counter()
+    if args.mode == 'async':
+        metrics = asyncio.run(_run_async(hub, manager, replay, symbols, args.timeframe, args, threads))
+    else:
+        metrics = _run_threads(hub, manager, replay, symbols, args.timeframe, args, threads)
+    elapsed = time.perf_counter() - start
+
+    updates = len(replay) * args.updates_per_bar * len(symbols)
+    trades = sum(len(bot.trades) for bot in manager.bots.values())
+    return {
+        'mode': args.mode,
+        'bots': args.bots,
+        'symbols': len(symbols),
+        'bars': len(replay),
+        'feed_updates': updates,
+        'elapsed_s': round(elapsed, 3),
+        'evaluations_per_s': round(metrics['evaluations'] / elapsed, 1) if elapsed else 0.0,
+        'trades': trades,
+        'peak_threads': threads.peak,
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        **metrics
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de N bots contra un feed reproducido")
+    parser.add_argument('--bots', type=int, default=100, help="Número de bots")
+    parser.add_argument('--mode', choices=['async', 'threads'], default='async')
+    parser.add_argument('--workers', type=int, default=4, help="Pool de evaluación (modo async)")
+    parser.add_argument('--symbols', default='SOL-USDT', help="Símbolos separados por comas")
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--bars', type=int, default=200, help="Velas a reproducir")
+    parser.add_argument('--warmup', type=int, default=100, help="Velas de histórico inicial")
+    parser.add_argument('--updates-per-bar', type=int, default=5, help="Actualizaciones por vela")
+    parser.add_argument('--rate', type=float, default=200.0,
+                        help="Actualizaciones por segundo del feed (0 = sin pausa)")
+    parser.add_argument('--capacity', type=int, default=500, help="Velas por feed en el hub")
+    parser.add_argument('--drain-timeout', type=float, default=30.0,
+                        help="Segundos máximos para que los bots alcancen al feed al final")
+    parser.add_argument('--data', default=None, help="CSV o dataset columnar a reproducir")
+    parser.add_argument('--output', default=None, help="Guardar resultados en JSON")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ('MultiBotManager', 'MarketDataHub', 'AsyncBotRuntime'):
+        logging.getLogger(name).setLevel(logging.ERROR)
+
+    results = run_benchmark(args)
+    for key, value in results.items():
+        print(f"{key:>22}: {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
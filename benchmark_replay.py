@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark del camino en vivo (cola -> SignalEngine -> TradeExecutor) con datos grabados.
+
+Reproduce mensajes de ``market_data.db`` (tablas de HistoricalDataSaver), de
+un dataset del almacén columnar o, si no se indica ninguno, tickers generados
+con semilla fija, a través de ``api_client.modulocola.data_queue`` y mide
+rendimiento y latencias de extremo a extremo sin conexión al exchange. El
+resultado es reproducible: ``signals_digest`` y el balance final son iguales
+en cada ejecución con los mismos datos.
+
+Ejemplo:
+    python benchmark_replay.py --db data/market_data.db --instrument SOL-USDT
+    python benchmark_replay.py --store market_store --symbol SOLUSDT --interval 1m --speed 600
+    python benchmark_replay.py --messages 50000 --save-db /tmp/replay.db
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+from backtesting.parallel import append_jsonl
+from core.market_replay import (RecordedMessage, ReplayHarness, book_item, load_messages_from_db,
+                                load_messages_from_store, ticker_item)
+
+
+def synthetic_messages(n: int, instrument: str, seed: int = 42, interval_ms: int = 100) -> Iterator[RecordedMessage]:
+    """
+    Tickers y libro de órdenes generados (paseo aleatorio), alternados
+
+    Args:
+        n: Número de mensajes
+        instrument: Instrumento
+        seed: Semilla
+        interval_ms: Milisegundos entre mensajes
+
+    Returns:
+        Iterator[RecordedMessage]: (timestamp_ms, elemento de cola)
+    """
+    rng = np.random.default_rng(seed)
+    prices = np.round(150.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, n))), 2)
+    sizes = np.round(rng.uniform(1, 50, (n, 2)), 3)
+    ts0 = 1_700_000_000_000
+    for i in range(n):
+        ts = ts0 + i * interval_ms
+        price = float(prices[i])
+        if i % 2 == 0:
+            yield ts, ticker_item(instrument, ts, price, price - 0.01, price + 0.01)
+        else:
+            yield ts, book_item(instrument, ts, price - 0.01, float(sizes[i, 0]), price + 0.01, float(sizes[i, 1]))
+
+
+def load_messages(args) -> List[RecordedMessage]:
+    """Mensajes a reproducir según los argumentos (cargados en memoria antes de medir)"""
+    if args.db:
+        messages = load_messages_from_db(args.db, instrument=args.instrument)
+    elif args.store:
+        messages = load_messages_from_store(args.store, args.symbol, args.interval, instrument=args.instrument)
+    else:
+        messages = synthetic_messages(args.messages, args.instrument)
+    loaded = []
+    for message in messages:
+        loaded.append(message)
+        if args.messages and len(loaded) >= args.messages:
+            break
+    return loaded
+
+
+async def run_replay(args, messages: List[RecordedMessage]) -> Dict[str, Any]:
+    """Reproduce los mensajes con un HistoricalDataSaver opcional"""
+    queue = asyncio.Queue(maxsize=args.queue_size)
+    data_saver = None
+    if args.save_db:
+        from data_management.historical_data_saver_async import HistoricalDataSaver
+        data_saver = HistoricalDataSaver(db_path=args.save_db)
+        await data_saver.connect()
+    try:
+        harness = ReplayHarness(args.instrument, queue=queue, data_saver=data_saver)
+        results = await harness.run(messages, speed=args.speed)
+    finally:
+        if data_saver is not None:
+            await data_saver.disconnect()
+            results['db_rows_flushed'] = data_saver.metrics['rows_flushed']
+    return results
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark con los argumentos de la línea de comandos
+
+    Returns:
+        Dict[str, Any]: Origen de los datos, informe de ReplayHarness y memoria máxima
+    """
+    messages = load_messages(args)
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'source': args.db or (f"{args.store}/{args.symbol}/{args.interval}" if args.store else 'synthetic'),
+        'instrument': args.instrument,
+        'speed': args.speed or 'max',
+        'queue_size': args.queue_size
+    }
+    results.update(asyncio.run(run_replay(args, messages)))
+    results['max_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline en vivo con datos reproducidos")
+    parser.add_argument('--db', default=None, help="market_data.db grabada por HistoricalDataSaver")
+    parser.add_argument('--store', default=None, help="Directorio del almacén columnar")
+    parser.add_argument('--symbol', default='SOLUSDT', help="Símbolo del dataset columnar")
+    parser.add_argument('--interval', default='1m', help="Intervalo del dataset columnar")
+    parser.add_argument('--instrument', default='SOL-USDT', help="Instrumento del SignalEngine")
+    parser.add_argument('--messages', type=int, default=20000,
+                        help="Máximo de mensajes (datos generados: cantidad a generar; 0 = todos)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="Velocidad respecto al tiempo real (1 = real, 0 = máxima)")
+    parser.add_argument('--queue-size', type=int, default=10000, help="Tamaño máximo de la cola")
+    parser.add_argument('--save-db', default=None,
+                        help="Guardar también con HistoricalDataSaver en esta base de datos")
+    parser.add_argument('--output', default=None, help="Guardar resultados en JSON")
+    parser.add_argument('--history', default=None, help="Añadir resultados a un fichero JSON lines")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    for name in ('SignalEngine', 'TradeExecutor', 'SolanaScalper', 'MarketReplay'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = run_benchmark(args)
+    for key, value in results.items():
+        print(f"{key:>22}: {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.history:
+        os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+        append_jsonl(args.history, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark del escaneo y los paquetes de SyncManager (core.sync_manager).
+
+Mide sobre un árbol real (por defecto, el directorio actual) sin modificarlo:
+el manifiesto y los paquetes se escriben en un directorio temporal.
+
+- full_scan: hash de todos los archivos en un hilo, sin reutilizar nada
+- cold_scan / warm_scan: escaneo incremental sin manifiesto previo y repetido
+  sin cambios (sólo os.stat)
+- full_package / delta_package: paquete completo y paquete delta respecto al
+  completo
+
+Ejemplo:
+    python benchmark_sync.py --base-dir . --history benchmarks/sync.jsonl
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from backtesting.parallel import append_jsonl
+from core.sync_manager import SyncManager
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, round(time.perf_counter() - started, 3)
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark con los argumentos de la línea de comandos
+
+    Returns:
+        Dict[str, Any]: Tamaño del árbol, tiempos de escaneo y de paquetes, tamaños y memoria
+    """
+    base_dir = os.path.abspath(args.base_dir)
+    with tempfile.TemporaryDirectory() as tmp:
+        def manager(name: str, **kwargs) -> SyncManager:
+            return SyncManager(base_dir, manifest_file=os.path.join(tmp, f"{name}.json"),
+                               sync_dir=os.path.join(tmp, name), **kwargs)
+
+        full, full_scan_s = _timed(manager("full", incremental=False, hash_workers=1).scan_project)
+
+        incremental = manager("incremental", hash_workers=args.workers)
+        cold, cold_scan_s = _timed(incremental.scan_project)
+        warm, warm_scan_s = _timed(incremental.scan_project)
+
+        full_package, full_package_s = _timed(incremental.create_sync_package)
+        delta_package, delta_package_s = _timed(incremental.create_sync_package, baseline=full_package)
+
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'base_dir': base_dir,
+            'files': full['file_count'],
+            'total_mb': round(full['total_size'] / 1024 / 1024, 1),
+            'hash_workers': incremental.hash_workers,
+            'full_scan_s': full_scan_s,
+            'cold_scan_s': cold_scan_s,
+            'warm_scan_s': warm_scan_s,
+            'warm_hashed_files': warm['hashed_files'],
+            'full_package_s': full_package_s,
+            'full_package_mb': round(os.path.getsize(full_package) / 1024 / 1024, 2),
+            'delta_package_s': delta_package_s,
+            'delta_package_kb': round(os.path.getsize(delta_package) / 1024, 1),
+            'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del escaneo y los paquetes de SyncManager")
+    parser.add_argument('--base-dir', default='.', help="Árbol a escanear")
+    parser.add_argument('--workers', type=int, default=None, help="Hilos de hash (por defecto, hasta 4)")
+    parser.add_argument('--output', default=None, help="Guardar resultados en JSON")
+    parser.add_argument('--history', default=None, help="Añadir resultados a un fichero JSON lines")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('SyncManager').setLevel(logging.WARNING)
+
+    results = run_benchmark(args)
+    for key, value in results.items():
+        print(f"{key:>22}: {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.history:
+        os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+        append_jsonl(args.history, results)
+
+
+if __name__ == "__main__":
+    main()
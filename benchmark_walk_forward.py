@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Benchmark del walk-forward (backtesting.walk_forward) sobre un histórico completo.
+
+Mide las dos fases del optimizador: el cálculo de señales de todas las
+combinaciones sobre el histórico (una vez) y la evaluación de las ventanas de
+entrenamiento/prueba. Opcionalmente mide también unas pocas ventanas con el
+método ingenuo (recalcular indicadores y señales en cada ventana) y extrapola
+su coste al total, como referencia.
+
+Con --history cada ejecución se añade a un fichero JSON lines, para seguir la
+evolución del tiempo de ejecución entre versiones.
+
+Ejemplo:
+    python benchmark_walk_forward.py --data processed_data/SOLUSDT_full_concat.csv --jobs 8 \\
+        --history benchmarks/walk_forward.jsonl
+    python benchmark_walk_forward.py --bars 200000 --naive-windows 3
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtesting.parallel import append_jsonl
+from backtesting.walk_forward import (WalkForwardOptimizer, generate_windows, load_strategies,
+                                      window_metrics, _sparse)
+
+
+def load_history(data_path: Optional[str], bars: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Histórico a evaluar: ``data_path`` (CSV de Binance o dataset columnar) o un paseo aleatorio
+
+    Returns:
+        pd.DataFrame: OHLCV indexado por tiempo
+    """
+    if data_path:
+        from modulo_intermediador import adaptar_binance_a_backtesting
+
+        df = adaptar_binance_a_backtesting(data_path).set_index('timestamp')
+        return df.tail(bars) if bars else df
+
+    bars = bars or 200_000
+    rng = np.random.default_rng(seed)
+    close = 150.0 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, bars)) * close
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(50, 150, bars)
+    }, index=pd.date_range('2023-01-01', periods=bars, freq='min', name='timestamp'))
+
+
+def time_naive_windows(optimizer: WalkForwardOptimizer, data: pd.DataFrame, n_windows: int) -> float:
+    """
+    Segundos por ventana recalculando señales dentro de cada ventana (sin caché)
+
+    Args:
+        optimizer: Optimizador ya configurado (ventanas, combinaciones)
+        data: Histórico
+        n_windows: Ventanas a medir
+
+    Returns:
+        float: Segundos medios por ventana
+    """
+    strategies = load_strategies()
+    windows = generate_windows(len(data), optimizer.train_bars, optimizer.test_bars,
+                               optimizer.step_bars, optimizer.anchored)[:n_windows]
+    close = data['close'].to_numpy()
+    started = time.perf_counter()
+    for window in windows:
+        a, b, c = window['train_start'], window['train_end'], window['test_end']
+        for candidate in optimizer.candidates:
+            fn = strategies[candidate['strategy']]
+            idx, values = _sparse(fn(data.iloc[a:b], **candidate['params']))
+            dense = np.zeros(b - a, dtype=np.int8)
+            dense[idx] = values
+            window_metrics(close[a:b], dense, **optimizer.settings)
+    return (time.perf_counter() - started) / max(len(windows), 1)
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark con los argumentos de la línea de comandos
+
+    Returns:
+        Dict[str, Any]: Tamaño del problema, tiempos por fase, memoria y resumen del walk-forward
+    """
+    started = time.perf_counter()
+    data = load_history(args.data, args.bars)
+    load_s = time.perf_counter() - started
+
+    strategies = [s.strip() for s in args.strategies.split(',')] if args.strategies else None
+    optimizer = WalkForwardOptimizer(train_bars=args.train_bars, test_bars=args.test_bars,
+                                     step_bars=args.step_bars, anchored=args.anchored,
+                                     strategies=strategies, n_jobs=args.jobs)
+
+    started = time.perf_counter()
+    table = optimizer.run(data)
+    total_s = time.perf_counter() - started
+    summary = optimizer.summary(table)
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'data': args.data or 'synthetic',
+        'bars': len(data),
+        'train_bars': args.train_bars,
+        'test_bars': args.test_bars,
+        'jobs': args.jobs or os.cpu_count(),
+        'candidates': len(optimizer.candidates),
+        'windows': len(table),
+        'load_s': round(load_s, 3),
+        'precompute_s': round(optimizer.timings.get('precompute_seconds', 0.0), 3),
+        'windows_s': round(optimizer.timings.get('windows_seconds', 0.0), 3),
+        'total_s': round(total_s, 3),
+        'windows_per_s': round(len(table) / optimizer.timings['windows_seconds'], 2)
+        if optimizer.timings.get('windows_seconds') else 0.0,
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'oos_return_pct': round(summary.get('oos_return_pct', 0.0), 4),
+        'mean_oos_sharpe': round(summary.get('mean_oos_sharpe', 0.0), 4)
+    }
+
+    if args.naive_windows and len(table):
+        per_window = time_naive_windows(optimizer, data, args.naive_windows)
+        results['naive_s_per_window'] = round(per_window, 3)
+        results['naive_estimated_total_s'] = round(per_window * len(table), 1)
+
+    if args.table:
+        table.to_csv(args.table, index=False)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del walk-forward sobre un histórico completo")
+    parser.add_argument('--data', default=None, help="CSV o dataset columnar (por defecto, datos generados)")
+    parser.add_argument('--bars', type=int, default=0, help="Últimas N velas (0 = todas; generadas: 200000)")
+    parser.add_argument('--train-bars', type=int, default=10000, help="Velas de entrenamiento por ventana")
+    parser.add_argument('--test-bars', type=int, default=2000, help="Velas de prueba por ventana")
+    parser.add_argument('--step-bars', type=int, default=None, help="Avance entre ventanas")
+    parser.add_argument('--anchored', action='store_true', help="Entrenamiento desde el inicio del histórico")
+    parser.add_argument('--strategies', default=None, help="Estrategias separadas por comas (por defecto, todas)")
+    parser.add_argument('--jobs', type=int, default=None, help="Procesos (por defecto, todos los núcleos)")
+    parser.add_argument('--naive-windows', type=int, default=0,
+                        help="Ventanas a medir recalculando señales por ventana (referencia)")
+    parser.add_argument('--table', default=None, help="Guardar la tabla por ventana en CSV")
+    parser.add_argument('--output', default=None, help="Guardar resultados en JSON")
+    parser.add_argument('--history', default=None, help="Añadir resultados a un fichero JSON lines")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('BacktestEngine').setLevel(logging.WARNING)
+
+    results = run_benchmark(args)
+    for key, value in results.items():
+        print(f"{key:>24}: {value}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.history:
+        os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+        append_jsonl(args.history, results)
+
+
+if __name__ == "__main__":
+    main()
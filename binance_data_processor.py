@@ -12,6 +12,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 # import talib # ¡IMPORTANTE: HEMOS ELIMINADO LA IMPORTACIÓN DE TALIB!
 import logging
+from features.incremental import processor_feature_set
+from features.labeling import fixed_horizon_labels, triple_barrier_labels
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -25,6 +27,8 @@ class BinanceDataProcessor:
         self.data_folder = data_folder
         self.processed_folder = "processed_data"
         self.create_processed_folder()
+        # Estado incremental de indicadores para la ruta en vivo
+        self.live_engine = processor_feature_set()
         
     def create_processed_folder(self):
         """Crea carpeta para datos procesados"""
@@ -167,8 +171,14 @@ class BinanceDataProcessor:
     def calculate_future_profitability_target(self,
                                             df: pd.DataFrame,
                                             price_change_percent_threshold: float = 0.005,
-                                            horizon_candles: int = 5
+                                            horizon_candles: int = 5,
+                                            stop_loss_percent: Optional[float] = None
                                            ) -> pd.DataFrame:
+        """
+        Calcula la variable objetivo. Por defecto, retorno a horizonte fijo
+        (1 / -1 / 0 según supere el umbral); con ``stop_loss_percent``, triple
+        barrera: primer toque de TP (umbral) o SL dentro de ``horizon_candles``.
+        """
         if df.empty:
             print("--- DEBUG: DataFrame de entrada a calculate_future_profitability_target está vacío. ---")
             return df # O manejar según sea necesario
@@ -193,12 +203,14 @@ class BinanceDataProcessor:
         print(df['future_return'].value_counts(dropna=False).to_string())
 
         # Paso 3: Definir las condiciones y asignar el target
-        conditions = [
-            df['future_return'] > price_change_percent_threshold,         # Subida (target 1)
-            df['future_return'] < -price_change_percent_threshold         # Bajada (target -1)
-        ]
-        choices = [1, -1]
-        df['target'] = np.select(conditions, choices, default=0)
+        if stop_loss_percent is None:
+            # Subida (target 1) / bajada (target -1) más allá del umbral
+            df['target'] = fixed_horizon_labels(df['close'].to_numpy(), horizon_candles,
+                                                price_change_percent_threshold)
+        else:
+            df['target'] = triple_barrier_labels(df['close'].to_numpy(), df['high'].to_numpy(),
+                                                 df['low'].to_numpy(), price_change_percent_threshold,
+                                                 stop_loss_percent, horizon_candles)
         
         # Paso 4: Manejar NaNs en el target (por ejemplo, si future_return fue NaN)
         df['target'] = df['target'].where(df['future_return'].notna(), np.nan)
@@ -237,6 +249,13 @@ class BinanceDataProcessor:
 
         return df
 
+    def update_live_features(self, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Indicadores técnicos de velas nuevas continuando el estado de las anteriores.
+        Produce los mismos valores que process_data_chunk sobre el histórico completo.
+        """
+        return self.live_engine.update(new_rows)
+
     def process_data_chunk(self, chunk_df: pd.DataFrame) -> pd.DataFrame:
         """
         Procesa un chunk de datos de velas, añadiendo todos los indicadores técnicos y el TARGET.
@@ -263,12 +282,9 @@ class BinanceDataProcessor:
         # Cálculo de características temporales
         chunk_df = self.calculate_time_features(chunk_df)
         
-        # Cálculo de indicadores técnicos
-        chunk_df = self.calculate_sma(chunk_df, [5, 20, 50])
-        chunk_df = self.calculate_ema(chunk_df, [12, 26])
-        chunk_df = self.calculate_rsi(chunk_df, 14)
-        chunk_df = self.calculate_bollinger_bands(chunk_df, 20, 2.0)
-        chunk_df = self.calculate_macd(chunk_df, 12, 26, 9)
+        # Cálculo de indicadores técnicos (SMA 5/20/50, EMA 12/26, RSI 14, Bollinger 20, MACD)
+        # con el motor incremental, el mismo que usan el entrenamiento por chunks y la ruta en vivo
+        chunk_df = processor_feature_set().add_features(chunk_df)
         
         # --- NUEVA ADICIÓN CLAVE: Cálculo de la Variable Objetivo (Target) ---
         # Definimos que si el precio sube 0.5% en las próximas 5 velas, es una señal de "compra exitosa" (target = 1)
@@ -2,8 +2,11 @@ import pandas as pd
 import numpy as np
 from classic_strategies import ClassicStrategy, AdaptiveStrategy
 from modulo_intermediador import adaptar_binance_a_backtesting
-from backtesting import BacktestEngine
+from backtesting import BacktestEngine, SignalSeriesStrategy
+from backtesting.parallel import ParallelGridRunner, params_key
+from backtesting.walk_forward import WalkForwardOptimizer, load_strategies
 import csv
+import json
 import os
 import logging
 
@@ -44,6 +47,10 @@ class CerebroAdaptativo:
         self.estrategia_optima = None
         self.parametros_optimos = None
         self.resultados = None
+        # Función de la estrategia elegida por walk-forward (estrategias del repositorio)
+        self.funcion_optima = None
+        self.walk_forward_optimizer = None
+        self.velas_ultima_optimizacion = 0
         # La inicialización del df_historico_completo se hace en el main para optimización
         logging.info(f"Cerebro Adaptativo inicializado en modo: {self.modo}")
 
@@ -71,7 +78,12 @@ class CerebroAdaptativo:
         
         # Necesitamos la función de estrategia envuelta para el uso "en vivo"
         # Esto asume que ClassicStrategy.moving_average_crossover puede tomar un DataFrame
-        if self.estrategia_optima == 'moving_average_crossover':
+        if self.funcion_optima is not None:
+            # Estrategia del repositorio elegida por walk-forward
+            signals = self.funcion_optima(df_actual, **self.parametros_optimos)
+            signal = int(np.sign(np.nan_to_num(signals.iloc[-1]))) if not signals.empty else 0
+            reason = f"WF_{self.estrategia_optima}"
+        elif self.estrategia_optima == 'moving_average_crossover':
             # Asegúrate de que df_actual tenga suficientes datos para el cálculo de MA
             if len(df_actual) < max(self.parametros_optimos['fast_period'], self.parametros_optimos['slow_period']):
                 logging.warning(f"DataFrame demasiado corto ({len(df_actual)} filas) para calcular MA con periodos {self.parametros_optimos['fast_period']}, {self.parametros_optimos['slow_period']}.")
@@ -145,17 +157,117 @@ class CerebroAdaptativo:
         logging.info(f"[CEREBRO] Resultados guardados en {ruta_resultados}")
         return resultados
 
-    def reoptimizar_si_es_necesario(self):
+    def walk_forward(self, df_historico: pd.DataFrame, ruta_resultados: str = 'resultados_walk_forward.csv',
+                     train_bars: int = 10000, test_bars: int = 2000, step_bars: int = None,
+                     anclado: bool = False, metrica: str = 'sharpe_ratio', estrategias: list = None,
+                     n_jobs: int = None) -> pd.DataFrame:
         """
-        Lógica para reoptimizar si la rentabilidad baja o las condiciones de mercado cambian.
-        (Por ahora es un placeholder, pero es donde llamarías a optimizar_estrategia de nuevo).
+        Optimización walk-forward sobre todo el histórico con todas las
+        estrategias del repositorio (ver backtesting.walk_forward).
+
+        En cada ventana se reoptimizan estrategia y parámetros con las
+        train_bars velas anteriores y se mide el resultado fuera de muestra en
+        las test_bars siguientes. Cada ventana se escribe en el CSV en cuanto
+        termina. Al acabar se adopta la combinación elegida en la última ventana.
+
+        Returns:
+            pd.DataFrame: Una fila por ventana (parámetros elegidos y métricas test_*)
         """
-        logging.info("Reoptimización no implementada en esta versión.")
+        logging.info(f"[CEREBRO] Iniciando walk-forward: entrenamiento {train_bars} velas, prueba {test_bars} velas")
+
+        output_dir = os.path.dirname(ruta_resultados)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        datos = df_historico.set_index('timestamp') if 'timestamp' in df_historico.columns else df_historico
+        self.walk_forward_optimizer = WalkForwardOptimizer(
+            train_bars=train_bars, test_bars=test_bars, step_bars=step_bars, anchored=anclado,
+            strategies=estrategias, metric=metrica, n_jobs=n_jobs
+        )
+
+        with open(ruta_resultados, 'w', newline='') as csvfile:
+            writer = None
+
+            def registrar(fila):
+                nonlocal writer
+                if writer is None:
+                    writer = csv.DictWriter(csvfile, fieldnames=list(fila))
+                    writer.writeheader()
+                writer.writerow(fila)
+                csvfile.flush()
+                logging.info(f"[CEREBRO][WF] Ventana {fila['window']}: {fila['strategy']} {fila['params']} | "
+                             f"Retorno OOS={fila['test_return_pct']:.2f}% Sharpe OOS={fila['test_sharpe_ratio']:.2f}")
+
+            tabla = self.walk_forward_optimizer.run(datos, on_window=registrar)
+
+        resumen = self.walk_forward_optimizer.summary(tabla)
+        logging.info(f"[CEREBRO] Walk-forward finalizado: {resumen}")
+        logging.info(f"[CEREBRO] Resultados guardados en {ruta_resultados}")
 
-    def optimizar_estrategia(self, df_historico: pd.DataFrame, ruta_optimizacion: str = 'resultados_optimizacion.csv'):
+        if not tabla.empty and tabla['strategy'].iloc[-1] is not None:
+            self._adoptar_estrategia(tabla['strategy'].iloc[-1], json.loads(tabla['params'].iloc[-1]))
+            self.velas_ultima_optimizacion = len(datos)
+        return tabla
+
+    def _adoptar_estrategia(self, nombre: str, params: dict):
+        self.estrategia_optima = nombre
+        self.parametros_optimos = params
+        self.funcion_optima = load_strategies()[nombre]
+        logging.info(f"[CEREBRO] Estrategia adoptada: {nombre} con parámetros {params}")
+
+    def reoptimizar_si_es_necesario(self, df_historico: pd.DataFrame = None, rendimiento_reciente: float = None,
+                                    umbral_rendimiento: float = 0.0) -> bool:
+        """
+        Reoptimiza estrategia y parámetros con las velas más recientes si hace falta:
+        no hay estrategia elegida, el rendimiento reciente (en %) cae por debajo
+        del umbral, o han pasado test_bars velas desde la última optimización
+        (el mismo ritmo que el walk-forward).
+
+        Args:
+            df_historico: Histórico hasta la vela actual
+            rendimiento_reciente: Retorno (%) de la estrategia actual desde la última optimización
+            umbral_rendimiento: Retorno mínimo aceptable (%)
+
+        Returns:
+            bool: True si se ha reoptimizado
+        """
+        if df_historico is None or df_historico.empty:
+            logging.info("[CEREBRO] Reoptimización omitida: no hay histórico.")
+            return False
+
+        if self.walk_forward_optimizer is None:
+            self.walk_forward_optimizer = WalkForwardOptimizer()
+        optimizer = self.walk_forward_optimizer
+
+        datos = df_historico.set_index('timestamp') if 'timestamp' in df_historico.columns else df_historico
+        velas_nuevas = len(datos) - self.velas_ultima_optimizacion
+        if self.estrategia_optima is not None and velas_nuevas < optimizer.test_bars and (
+                rendimiento_reciente is None or rendimiento_reciente >= umbral_rendimiento):
+            return False
+
+        # Ventana de entrenamiento más otra igual de calentamiento para los indicadores
+        seleccion = optimizer.select(datos.iloc[-2 * optimizer.train_bars:])
+        if seleccion is None:
+            logging.warning("[CEREBRO] Reoptimización sin resultado: ninguna combinación operó en la ventana.")
+            return False
+
+        logging.info(f"[CEREBRO] Reoptimización: Retorno={seleccion['return_pct']:.2f}% | "
+                     f"Sharpe={seleccion['sharpe_ratio']:.2f} en las últimas {optimizer.train_bars} velas")
+        self._adoptar_estrategia(seleccion['strategy'], seleccion['params'])
+        self.velas_ultima_optimizacion = len(datos)
+        return True
+
+    def optimizar_estrategia(self, df_historico: pd.DataFrame, ruta_optimizacion: str = 'resultados_optimizacion.csv',
+                             n_jobs: int = 1, reanudar: bool = False):
         """
         Optimiza una estrategia probando diferentes combinaciones de parámetros.
         Guarda los resultados y reporta la mejor combinación.
+
+        Las combinaciones se evalúan en paralelo (n_jobs procesos, None = todos
+        los núcleos) con los datos compartidos entre procesos, y cada resultado
+        se escribe en el CSV en cuanto está disponible, en el orden del grid.
+        Con reanudar=True se conservan las filas ya escritas y sólo se evalúan
+        las combinaciones que faltan.
         """
         logging.info(f"[CEREBRO] Iniciando optimización de estrategia...")
 
@@ -171,93 +283,88 @@ class CerebroAdaptativo:
         best_params = {}
         best_return_pct = -np.inf # Inicializar con un valor muy bajo
         best_sharpe_ratio = -np.inf # Inicializar con un valor muy bajo
-        
-        with open(ruta_optimizacion, 'w', newline='') as csvfile:
+
+        # Índice temporal para el motor (una sola vez, no una copia por combinación)
+        datos = df_historico.set_index('timestamp') if 'timestamp' in df_historico.columns else df_historico
+
+        # --- Estrategias y parámetros a optimizar (Fase 1: Simplificado) ---
+        # Vamos a empezar con Moving Average Crossover, con rangos pequeños
+        logging.info("[CEREBRO] Probando estrategia: Moving Average Crossover")
+
+        # Puedes ajustar estos rangos para más o menos pruebas
+        # Para la fase simplificada, mantenlos pequeños
+        fast_periods = [5, 10, 15] # Prueba estos periodos para la MA rápida
+        slow_periods = [20, 30, 40] # Prueba estos periodos para la MA lenta
+
+        # La media rápida debe ser menor que la lenta
+        combinaciones = [
+            {'fast_period': fast_p, 'slow_period': slow_p}
+            for fast_p in fast_periods for slow_p in slow_periods if fast_p < slow_p
+        ]
+        logging.info(f"[CEREBRO][OPTIMIZACION] {len(combinaciones)} combinaciones a evaluar")
+
+        # Filas ya escritas en una ejecución anterior
+        filas_previas = []
+        if reanudar and os.path.exists(ruta_optimizacion):
+            with open(ruta_optimizacion, 'r', newline='') as csvfile:
+                filas_previas = list(csv.DictReader(csvfile))
+        completadas = {(fila['fast_period'], fila['slow_period']) for fila in filas_previas}
+
+        def actualizar_mejor(params, return_pct, sharpe_ratio):
+            nonlocal best_strategy_name, best_params, best_return_pct, best_sharpe_ratio
+            # Priorizamos Sharpe Ratio, luego Retorno
+            if sharpe_ratio > best_sharpe_ratio:
+                best_sharpe_ratio = sharpe_ratio
+                best_return_pct = return_pct
+                best_strategy_name = 'moving_average_crossover'
+                best_params = params
+            elif sharpe_ratio == best_sharpe_ratio and return_pct > best_return_pct:
+                best_return_pct = return_pct
+                best_strategy_name = 'moving_average_crossover'
+                best_params = params
+
+        for fila in filas_previas:
+            actualizar_mejor({'fast_period': int(fila['fast_period']), 'slow_period': int(fila['slow_period'])},
+                             float(fila['return_pct']), float(fila['sharpe_ratio']))
+
+        with open(ruta_optimizacion, 'a' if filas_previas else 'w', newline='') as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(encabezados) # Escribir encabezados
-            
-            # --- Estrategias y parámetros a optimizar (Fase 1: Simplificado) ---
-            # Vamos a empezar con Moving Average Crossover, con rangos pequeños
-            
-            logging.info("[CEREBRO] Probando estrategia: Moving Average Crossover")
-            
-            # Puedes ajustar estos rangos para más o menos pruebas
-            # Para la fase simplificada, mantenlos pequeños
-            fast_periods = [5, 10, 15] # Prueba estos periodos para la MA rápida
-            slow_periods = [20, 30, 40] # Prueba estos periodos para la MA lenta
-
-            total_combinations = 0
-            for fast_p in fast_periods:
-                for slow_p in slow_periods:
-                    if fast_p < slow_p:
-                        total_combinations += 1
-            
-            current_combination = 0
-
-            for fast_p in fast_periods:
-                for slow_p in slow_periods:
-                    
-                    if fast_p >= slow_p:
-                        # logging.info(f"Saltando combinación (fast={fast_p}, slow={slow_p}) donde fast >= slow.")
-                        continue # La media rápida debe ser menor que la lenta
-                    
-                    current_combination += 1
-                    logging.info(f"[CEREBRO][OPTIMIZACION] Probando MACD con fast={fast_p}, slow={slow_p} ({current_combination}/{total_combinations} completado)")
-
-                    # Definir la función de estrategia para el BacktestEngine
-                    # Esta función debe tomar un DataFrame y retornar (signal, reason)
-                    # Asegúrate de que df_block tiene suficientes datos para el cálculo de MA
-                    min_len_needed = max(fast_p, slow_p)
-                    if len(df_historico) < min_len_needed:
-                        logging.warning(f"DataFrame histórico demasiado corto ({len(df_historico)} filas) para calcular MA con periodos {fast_p}, {slow_p}. Saltando combinación.")
-                        # Si no hay suficientes datos para esta combinación de parámetros, se salta
-                        return_pct, sharpe_ratio, final_balance, total_trades, win_rate = 0.0, -np.inf, 0.0, 0, 0.0
-                        writer.writerow(['moving_average_crossover', fast_p, slow_p, return_pct, sharpe_ratio, final_balance, total_trades, win_rate])
-                        continue
-
-                    # La función ClassicStrategy.moving_average_crossover espera solo la serie 'close'
-                    def mac_strategy_fn(df_block_for_backtest):
-                        # Asegúrate de que tu ClassicStrategy.moving_average_crossover
-                        # pueda manejar el DataFrame directamente o solo la columna 'close'.
-                        # Asume que devuelve una Serie con -1, 0, 1
-                        # Enviamos solo la columna 'close' para el cálculo de indicadores.
-                        signal_series = ClassicStrategy.moving_average_crossover(df_block_for_backtest['close'], fast_p, slow_p)
-                        # El BacktestEngine espera un solo valor para la última vela del bloque.
-                        signal = signal_series.iloc[-1] if not signal_series.empty else 0
-                        return signal, None # Retornamos la señal y una razón vacía
-
-                    engine = BacktestEngine(df_historico.copy()) # Usamos una copia para no modificar el original
-                    
-                    try:
-                        result = engine.run_backtest(mac_strategy_fn)
-                    except Exception as e:
-                        logging.error(f"[CEREBRO] Error en backtest para MACD con fast={fast_p}, slow={slow_p}: {e}")
-                        # Si hay un error, registra un mal resultado para esta combinación
-                        result = {'net_profit_percent': -100.0, 'sharpe_ratio': -100.0, 'final_balance': 0.0, 'total_trades': 0, 'win_rate': 0.0}
-                    
-                    return_pct = result.get('net_profit_percent', 0.0) * 100
-                    sharpe_ratio = result.get('sharpe_ratio', -np.inf)
-                    final_balance = result.get('final_balance', 0.0)
-                    total_trades = result.get('total_trades', 0)
-                    win_rate = result.get('win_rate', 0.0)
-
-                    logging.info(f"  -> Resultado: Retorno={return_pct:.2f}%, Sharpe={sharpe_ratio:.2f}, Balance={final_balance:.2f}")
-
-                    # Guardar resultados en el CSV
-                    writer.writerow(['moving_average_crossover', fast_p, slow_p, return_pct, sharpe_ratio, final_balance, total_trades, win_rate])
-
-                    # Actualizar la mejor combinación si encontramos una mejor
-                    # Priorizamos Sharpe Ratio, luego Retorno
-                    if sharpe_ratio > best_sharpe_ratio:
-                        best_sharpe_ratio = sharpe_ratio
-                        best_return_pct = return_pct
-                        best_strategy_name = 'moving_average_crossover'
-                        best_params = {'fast_period': fast_p, 'slow_period': slow_p}
-                    elif sharpe_ratio == best_sharpe_ratio and return_pct > best_return_pct:
-                         best_return_pct = return_pct
-                         best_strategy_name = 'moving_average_crossover'
-                         best_params = {'fast_period': fast_p, 'slow_period': slow_p}
+            if not filas_previas:
+                writer.writerow(encabezados) # Escribir encabezados
+
+            def registrar(params, result):
+                fast_p, slow_p = params['fast_period'], params['slow_period']
+                if 'error' in result:
+                    # Si hay un error, registra un mal resultado para esta combinación
+                    result = {'net_profit_percent': -100.0, 'sharpe_ratio': -100.0, 'final_balance': 0.0, 'total_trades': 0, 'win_rate': 0.0}
+
+                return_pct = result.get('net_profit_percent', 0.0) * 100
+                sharpe_ratio = result.get('sharpe_ratio', -np.inf)
+                final_balance = result.get('final_balance', 0.0)
+                total_trades = result.get('total_trades', 0)
+                win_rate = result.get('win_rate', 0.0)
+
+                logging.info(f"  -> MACD fast={fast_p}, slow={slow_p}: Retorno={return_pct:.2f}%, Sharpe={sharpe_ratio:.2f}, Balance={final_balance:.2f}")
 
+                # Guardar resultados en el CSV a medida que llegan
+                writer.writerow(['moving_average_crossover', fast_p, slow_p, return_pct, sharpe_ratio, final_balance, total_trades, win_rate])
+                csvfile.flush()
+
+                actualizar_mejor(params, return_pct, sharpe_ratio)
+
+            # Si no hay suficientes datos para una combinación de parámetros, se salta
+            pendientes = []
+            for params in combinaciones:
+                if params_key(params, ['fast_period', 'slow_period']) in completadas:
+                    continue
+                if len(datos) < max(params['fast_period'], params['slow_period']):
+                    logging.warning(f"DataFrame histórico demasiado corto ({len(datos)} filas) para calcular MA con periodos {params['fast_period']}, {params['slow_period']}. Saltando combinación.")
+                    writer.writerow(['moving_average_crossover', params['fast_period'], params['slow_period'], 0.0, -np.inf, 0.0, 0, 0.0])
+                    continue
+                pendientes.append(params)
+
+            runner = ParallelGridRunner(_evaluar_cruce_medias, datos, n_jobs=n_jobs)
+            runner.run(pendientes, on_result=registrar)
 
         logging.info("[CEREBRO] Optimización de estrategia finalizada.")
         if best_strategy_name:
@@ -269,6 +376,18 @@ class CerebroAdaptativo:
             logging.warning("No se encontró una estrategia óptima (todos los backtests fallaron o no hubo resultados).")
 
 
+def _evaluar_cruce_medias(datos: pd.DataFrame, params: dict, context=None) -> dict:
+    """
+    Backtest de cruce de medias para una combinación de parámetros.
+    Se ejecuta en los procesos del ParallelGridRunner: la serie de señales se
+    calcula una vez sobre todo el histórico y el motor la recorre en modo streaming.
+    """
+    engine = BacktestEngine()
+    engine.data = datos
+    estrategia = SignalSeriesStrategy(ClassicStrategy.moving_average_crossover, params)
+    return engine.run_backtest(estrategia, streaming=True)
+
+
 # Modificación en el bloque principal para ejecutar la optimización simplificada
 if __name__ == "__main__":
     cerebro = CerebroAdaptativo("processed_data/SOLUSDT_full_concat.csv")
@@ -285,7 +404,7 @@ if __name__ == "__main__":
     if df_historico_simplificado.empty:
         logging.error("DataFrame histórico simplificado está vacío. Asegúrate de que 'SOLUSDT_full_concat.csv' exista y tenga datos.")
     else:
-        cerebro.optimizar_estrategia(df_historico_simplificado, 'resultados_optimizacion_simplificada.csv')
+        cerebro.optimizar_estrategia(df_historico_simplificado, 'resultados_optimizacion_simplificada.csv', n_jobs=None)
     
     logging.info("--- FASE 1 Completada. Revisa 'resultados_optimizacion_simplificada.csv' ---")
 
@@ -15,11 +15,31 @@ from sklearn.linear_model import LinearRegression
 import statsmodels.api as sm
 from statsmodels.tsa.stattools import coint, adfuller
 
+from indicators import batch as batch_indicators
+
 # Configurar logging
 logger = logging.getLogger("TradingStrategies")
 
 class TechnicalIndicators:
-    """Clase para cálculo de indicadores técnicos"""
+    """
+    Clase para cálculo de indicadores técnicos
+
+    Con ``backend = 'numpy'`` los cálculos se delegan en ``indicators.batch``
+    (arrays NumPy, sin Series intermedias); con ``'pandas'`` se usan las
+    fórmulas sobre Series. Para velas en vivo, ``indicators.streaming`` tiene
+    los mismos indicadores actualizables en O(1) por vela.
+    """
+
+    backend = 'numpy'
+
+    @staticmethod
+    def _fast() -> bool:
+        return TechnicalIndicators.backend == 'numpy'
+
+    @staticmethod
+    def _series(values: np.ndarray, like: pd.Series, name: Any = None) -> pd.Series:
+        """Envuelve un resultado de ``indicators.batch`` con el índice de ``like``"""
+        return pd.Series(values, index=getattr(like, 'index', None), name=name)
     
     @staticmethod
     def sma(data: pd.Series, period: int = 20) -> pd.Series:
@@ -33,6 +53,8 @@ class TechnicalIndicators:
         Returns:
             pd.Series: Media móvil calculada
         """
+        if TechnicalIndicators._fast():
+            return TechnicalIndicators._series(batch_indicators.sma(data, period), data, data.name)
         return data.rolling(window=period).mean()
     
     @staticmethod
@@ -47,6 +69,8 @@ class TechnicalIndicators:
         Returns:
             pd.Series: Media móvil exponencial calculada
         """
+        if TechnicalIndicators._fast():
+            return TechnicalIndicators._series(batch_indicators.ema(data, period), data, data.name)
         return data.ewm(span=period, adjust=False).mean()
     
     @staticmethod
@@ -61,6 +85,9 @@ class TechnicalIndicators:
         Returns:
             pd.Series: RSI calculado
         """
+        if TechnicalIndicators._fast():
+            return TechnicalIndicators._series(batch_indicators.rsi(data, period), data, data.name)
+
         delta = data.diff()
         
         # Separar ganancias y pérdidas
@@ -92,6 +119,10 @@ class TechnicalIndicators:
         Returns:
             Tuple[pd.Series, pd.Series, pd.Series]: MACD, señal, histograma
         """
+        if TechnicalIndicators._fast():
+            return tuple(TechnicalIndicators._series(values, data, data.name) for values in
+                         batch_indicators.macd(data, fast_period, slow_period, signal_period))
+
         # Calcular EMAs
         ema_fast = TechnicalIndicators.ema(data, fast_period)
         ema_slow = TechnicalIndicators.ema(data, slow_period)
@@ -119,6 +150,10 @@ class TechnicalIndicators:
         Returns:
             Tuple[pd.Series, pd.Series, pd.Series]: Media, banda superior, banda inferior
         """
+        if TechnicalIndicators._fast():
+            return tuple(TechnicalIndicators._series(values, data, data.name) for values in
+                         batch_indicators.bollinger_bands(data, period, num_std_dev))
+
         # Calcular media móvil
         middle_band = TechnicalIndicators.sma(data, period)
         
@@ -146,6 +181,9 @@ class TechnicalIndicators:
         Returns:
             pd.Series: ATR calculado
         """
+        if TechnicalIndicators._fast():
+            return TechnicalIndicators._series(batch_indicators.atr(high, low, close, period), close)
+
         # Calcular el True Range
         tr1 = high - low
         tr2 = abs(high - close.shift())
@@ -173,6 +211,10 @@ class TechnicalIndicators:
         Returns:
             Tuple[pd.Series, pd.Series, pd.Series]: ADX, +DI, -DI
         """
+        if TechnicalIndicators._fast():
+            return tuple(TechnicalIndicators._series(values, close) for values in
+                         batch_indicators.adx(high, low, close, period))
+
         # Calcular DM (Directional Movement)
         up_move = high - high.shift()
         down_move = low.shift() - low
@@ -213,6 +255,10 @@ class TechnicalIndicators:
         Returns:
             Tuple[pd.Series, pd.Series]: %K, %D
         """
+        if TechnicalIndicators._fast():
+            return tuple(TechnicalIndicators._series(values, close) for values in
+                         batch_indicators.stochastic(high, low, close, k_period, d_period))
+
         # Calcular %K
         lowest_low = low.rolling(window=k_period).min()
         highest_high = high.rolling(window=k_period).max()
@@ -244,6 +290,13 @@ class TechnicalIndicators:
         Returns:
             Dict[str, pd.Series]: Componentes de Ichimoku
         """
+        if TechnicalIndicators._fast():
+            components = batch_indicators.ichimoku(high, low, close, conversion_period, base_period,
+                                                   lagging_span2_period, displacement)
+            return {key: TechnicalIndicators._series(values, close,
+                                                     close.name if key == 'chikou_span' else None)
+                    for key, values in components.items()}
+
         # Tenkan-sen (Conversion Line)
         tenkan_sen = (high.rolling(window=conversion_period).max() + 
                      low.rolling(window=conversion_period).min()) / 2
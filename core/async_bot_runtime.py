@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Runtime asyncio para ejecutar muchos bots en un solo proceso.
+
+En lugar de un hilo del sistema por bot, cada BotInstance se ejecuta como una
+corrutina en un único event loop y se despierta cuando su feed del
+MarketDataHub publica una vela, un precio o un libro de órdenes nuevos. La
+evaluación de la estrategia (pandas, CPU) se delega en un pool de hilos
+acotado; el resto (señales, posiciones, métricas) se ejecuta en el loop.
+
+Si llegan varias actualizaciones mientras un bot está evaluando, al terminar
+sólo procesa la más reciente, así que la memoria y el trabajo pendiente están
+acotados por el número de bots y el tamaño del pool, no por el ritmo del feed.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.market_data_hub import LatencyStats, MarketDataHub, MarketFeed
+
+logger = logging.getLogger('AsyncBotRuntime')
+
+
+class AsyncBotRuntime:
+    """
+    Ejecuta instancias de BotInstance como corrutinas dirigidas por eventos.
+    """
+
+    def __init__(self, hub: MarketDataHub, max_workers: int = 4):
+        """
+        Args:
+            hub: Hub de datos de mercado que alimenta a los bots
+            max_workers: Evaluaciones de estrategia simultáneas (tamaño del pool)
+        """
+        self.hub = hub
+        self.max_workers = max_workers
+        self.bots: Dict[str, Any] = {}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._events: Dict[str, asyncio.Event] = {}
+        self._feed_events: Dict[Tuple[str, str], List[asyncio.Event]] = {}
+        self._listeners: Dict[Tuple[str, str], Any] = {}
+
+        self.stats = {
+            'evaluations': 0,
+            'signals': 0,
+            'errors': 0
+        }
+        self.bot_evaluations: Dict[str, int] = {}
+        self.evaluation_time = LatencyStats()
+        self.pool_wait = LatencyStats()
+
+    def add_bot(self, bot) -> bool:
+        """
+        Añade un bot al runtime (si ya está en marcha, lo arranca)
+
+        Args:
+            bot: BotInstance que no esté ejecutándose en su propio hilo
+
+        Returns:
+            bool: True si se añadió
+        """
+        if bot.bot_id in self.bots:
+            logger.warning(f"Bot {bot.bot_id} ya está en el runtime")
+            return False
+        if bot.thread is not None and bot.thread.is_alive():
+            logger.warning(f"Bot {bot.bot_id} se está ejecutando en un hilo; deténgalo antes")
+            return False
+        self.bots[bot.bot_id] = bot
+        if self._loop is not None:
+            self._start_bot(bot)
+        return True
+
+    async def remove_bot(self, bot_id: str) -> bool:
+        """Detiene y quita un bot del runtime"""
+        bot = self.bots.pop(bot_id, None)
+        if bot is None:
+            return False
+        task = self._tasks.pop(bot_id, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._detach_bot(bot)
+        return True
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Arranca todos los bots añadidos en el event loop actual"""
+        if self._loop is not None:
+            logger.warning("El runtime ya está en marcha")
+            return
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='bot-eval')
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+        for bot in self.bots.values():
+            self._start_bot(bot)
+        logger.info(f"Runtime asyncio iniciado con {len(self.bots)} bots y {self.max_workers} workers")
+
+    async def stop(self):
+        """Detiene todos los bots y libera el pool"""
+        if self._loop is None:
+            return
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+        for bot in self.bots.values():
+            self._detach_bot(bot)
+        for key, listener in self._listeners.items():
+            feed = self.hub.get_feed(*key, create=False)
+            if feed is not None:
+                feed.remove_listener(listener)
+        self._listeners.clear()
+        self._feed_events.clear()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._loop = None
+        logger.info("Runtime asyncio detenido")
+
+    async def run(self, duration: Optional[float] = None):
+        """
+        Arranca los bots y los mantiene en marcha
+
+        Args:
+            duration: Segundos de ejecución (None = hasta que se cancele)
+        """
+        await self.start()
+        try:
+            if duration is None:
+                await asyncio.Event().wait()
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            await self.stop()
+
+    # ------------------------------------------------------------------
+    # Bots
+    # ------------------------------------------------------------------
+
+    def _start_bot(self, bot):
+        subscription = self.hub.subscribe(bot.bot_id, bot.symbol, bot.timeframe)
+        feed = subscription.feed
+        key = (feed.symbol, feed.timeframe)
+        event = asyncio.Event()
+        self._events[bot.bot_id] = event
+        self._feed_events.setdefault(key, []).append(event)
+        if key not in self._listeners:
+            # Un único aviso al loop por publicación, que despierta a todos los bots del feed
+            loop = self._loop
+
+            def listener(_feed: MarketFeed, key=key):
+                loop.call_soon_threadsafe(self._dispatch, key)
+
+            self._listeners[key] = listener
+            feed.add_listener(listener)
+
+        bot.subscription = subscription
+        bot.running = True
+        bot.start_time = datetime.now()
+        bot.last_update_time = bot.start_time
+        bot.error = None
+        self.bot_evaluations.setdefault(bot.bot_id, 0)
+        self._tasks[bot.bot_id] = self._loop.create_task(self._run_bot(bot, subscription, event))
+
+    def _detach_bot(self, bot):
+        event = self._events.pop(bot.bot_id, None)
+        if bot.subscription is not None:
+            key = (bot.subscription.feed.symbol, bot.subscription.feed.timeframe)
+            if event is not None and event in self._feed_events.get(key, []):
+                self._feed_events[key].remove(event)
+        self.hub.unsubscribe(bot.bot_id)
+        bot.subscription = None
+        bot.running = False
+
+    def _dispatch(self, key: Tuple[str, str]):
+        for event in self._feed_events.get(key, ()):
+            event.set()
+
+    @staticmethod
+    def _evaluate(bot, snapshot: Dict[str, Any]):
+        """Prepara los datos y evalúa la estrategia (se ejecuta en el pool)"""
+        market_data = bot._market_data_from_snapshot(snapshot)
+        if market_data is None:
+            return None, None
+        return market_data, bot._execute_strategy(market_data)
+
+    async def _run_bot(self, bot, subscription, event: asyncio.Event):
+        """Corrutina de un bot: espera datos nuevos, evalúa y aplica la señal"""
+        loop = self._loop
+        try:
+            while True:
+                snapshot = subscription.poll()
+                if snapshot is None:
+                    event.clear()
+                    # Volver a mirar tras limpiar el evento para no perder un aviso
+                    snapshot = subscription.poll()
+                    if snapshot is None:
+                        await event.wait()
+                        continue
+
+                queued = time.perf_counter()
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    self.pool_wait.add((started - queued) * 1000)
+                    market_data, signal = await loop.run_in_executor(
+                        self._executor, self._evaluate, bot, snapshot)
+                    self.evaluation_time.add((time.perf_counter() - started) * 1000)
+
+                if market_data is None:
+                    continue
+                self.stats['evaluations'] += 1
+                self.bot_evaluations[bot.bot_id] += 1
+                if signal and signal.get("signal") in ("buy", "sell"):
+                    self.stats['signals'] += 1
+                bot._apply_market_data(market_data, signal)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats['errors'] += 1
+            bot.error = str(e)
+            bot.running = False
+            logger.error(f"Error en bot {bot.bot_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas del runtime
+
+        Returns:
+            Dict[str, Any]: bots activos, evaluaciones, tiempos de evaluación y
+            de espera del pool, versiones saltadas (total y máximo por bot), más
+            latencia de reparto y retraso del hub
+        """
+        hub_metrics = self.hub.get_metrics()
+        subscribers = [hub_metrics['subscribers'][bot_id] for bot_id in self.bots
+                       if bot_id in hub_metrics['subscribers']]
+        metrics = {
+            'bots': len(self.bots),
+            'running_bots': sum(1 for bot in self.bots.values() if bot.running),
+            'max_workers': self.max_workers,
+            **self.stats,
+            'skipped_updates': sum(m['skipped_updates'] for m in subscribers),
+            'max_skipped_updates': max((m['skipped_updates'] for m in subscribers), default=0),
+            'max_fanout_ms': max((m['fanout_max_ms'] for m in subscribers), default=0.0),
+            'avg_fanout_ms': (sum(m['fanout_avg_ms'] for m in subscribers) / len(subscribers))
+            if subscribers else 0.0,
+            'max_lag_versions': max((m['lag_versions'] for m in subscribers), default=0)
+        }
+        metrics.update(self.evaluation_time.as_dict('evaluation'))
+        metrics.update(self.pool_wait.as_dict('pool_wait'))
+        return metrics
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Registro columnar de operaciones y de equity.
+
+Los simuladores y los bots guardaban cada operación y cada punto de equity
+como un diccionario en una lista y recalculaban win rate, drawdown, Sharpe y
+rendimientos por período recorriendo esas listas en cada consulta. Aquí:
+
+- ``ColumnBuffer``: columnas NumPy preasignadas de sólo-añadir, que doblan su
+  capacidad al llenarse (coste amortizado O(1) por fila).
+- ``TradeLedger``: operaciones cerradas con acumuladores (PnL, ganancias,
+  pérdidas, comisiones, aciertos, drawdown de la curva de balance) que se
+  actualizan en O(1) por operación, y consultas por ventana de tiempo
+  (últimas 24h, 7d, 30d) con búsqueda binaria sobre la columna de tiempo.
+- ``EquityLedger``: curva de equity con pico, drawdown máximo y momentos de
+  los retornos (Welford) acumulados, más un Sharpe móvil en O(1) por vela.
+
+``summary()`` y ``to_frame()``/``to_records()`` son la única vía de exportación
+para informes y para el panel web.
+"""
+
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from indicators.streaming import RollingMean, RollingStd
+
+# Capacidad inicial de las columnas
+DEFAULT_CAPACITY = 256
+
+# Segundos por día, para las consultas por ventana
+SECONDS_PER_DAY = 86400.0
+
+
+def to_epoch(timestamp: Any) -> float:
+    """
+    Convierte un timestamp (datetime, pd.Timestamp, ISO, segundos o
+    milisegundos) a segundos desde epoch
+
+    Args:
+        timestamp: Marca de tiempo en cualquiera de esos formatos
+
+    Returns:
+        float: Segundos desde epoch (NaN si no se puede interpretar)
+    """
+    if timestamp is None:
+        return math.nan
+    if isinstance(timestamp, (int, float, np.integer, np.floating)):
+        value = float(timestamp)
+        # Milisegundos (convención de OKX/Binance)
+        return value / 1000.0 if value > 1e11 else value
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, np.datetime64):
+        return pd.Timestamp(timestamp).timestamp()
+    if isinstance(timestamp, str):
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+class ColumnBuffer:
+    """
+    Columnas NumPy de sólo-añadir con crecimiento amortizado.
+
+    ``buffer['pnl']`` devuelve una vista de las filas ocupadas (sin copia).
+    """
+
+    def __init__(self, dtypes: Dict[str, Any], capacity: int = DEFAULT_CAPACITY):
+        """
+        Inicializa las columnas vacías
+
+        Args:
+            dtypes: Nombre de columna -> dtype de NumPy (``object`` para valores arbitrarios)
+            capacity: Filas preasignadas
+        """
+        self.dtypes = dict(dtypes)
+        self.names = list(self.dtypes)
+        self._capacity = max(1, capacity)
+        self._size = 0
+        self._columns = {name: np.empty(self._capacity, dtype=dtype)
+                         for name, dtype in self.dtypes.items()}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name][:self._size]
+
+    def _reserve(self, rows: int) -> None:
+        if self._size + rows <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < self._size + rows:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append(self, row: Dict[str, Any]) -> int:
+        """
+        Añade una fila (las columnas ausentes quedan a NaN o None)
+
+        Args:
+            row: Columna -> valor
+
+        Returns:
+            int: Índice de la fila
+        """
+        self._reserve(1)
+        index = self._size
+        for name, column in self._columns.items():
+            value = row.get(name)
+            if value is None and column.dtype != object:
+                value = np.nan
+            column[index] = value
+        self._size += 1
+        return index
+
+    def extend(self, columns: Dict[str, Sequence]) -> None:
+        """
+        Añade varias filas a la vez
+
+        Args:
+            columns: Columna -> valores (todas de la misma longitud)
+        """
+        rows = len(next(iter(columns.values()))) if columns else 0
+        if rows == 0:
+            return
+        self._reserve(rows)
+        end = self._size + rows
+        for name, column in self._columns.items():
+            values = columns.get(name)
+            if values is None:
+                column[self._size:end] = None if column.dtype == object else np.nan
+            else:
+                column[self._size:end] = values
+        self._size = end
+
+    def clear(self) -> None:
+        """Vacía las columnas (conserva la capacidad)"""
+        self._size = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """Copia las filas ocupadas a un DataFrame"""
+        return pd.DataFrame({name: self[name].copy() for name in self.names})
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Filas ocupadas como lista de diccionarios (tipos nativos de Python)"""
+        columns = [self[name].tolist() for name in self.names]
+        return [dict(zip(self.names, values)) for values in zip(*columns)]
+
+
+class TradeLedger:
+    """
+    Registro de operaciones cerradas con métricas acumuladas.
+
+    Cada fila guarda el tiempo de cierre, el PnL y las comisiones de la
+    operación, más las columnas numéricas extra que pida el propietario. El
+    balance realizado es ``initial_balance + Σ(pnl - fees)``.
+    """
+
+    BASE_COLUMNS = {'timestamp': np.float64, 'pnl': np.float64, 'fees': np.float64}
+
+    def __init__(self, initial_balance: float = 0.0, extra_columns: Sequence[str] = (),
+                 capacity: int = DEFAULT_CAPACITY):
+        """
+        Inicializa el registro
+
+        Args:
+            initial_balance: Balance de partida de la curva de balance realizado
+            extra_columns: Columnas numéricas adicionales (se suman en las ventanas)
+            capacity: Filas preasignadas
+        """
+        dtypes = dict(self.BASE_COLUMNS)
+        dtypes.update({name: np.float64 for name in extra_columns})
+        self.extra_columns = list(extra_columns)
+        self.buffer = ColumnBuffer(dtypes, capacity)
+        self.initial_balance = initial_balance
+        self.reset()
+
+    def reset(self, initial_balance: Optional[float] = None) -> None:
+        """
+        Vacía el registro y los acumuladores
+
+        Args:
+            initial_balance: Nuevo balance de partida (None = el actual)
+        """
+        if initial_balance is not None:
+            self.initial_balance = initial_balance
+        self.buffer.clear()
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.total_pnl = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.total_fees = 0.0
+        self.balance = self.initial_balance
+        self.peak_balance = self.initial_balance
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+        self._last_timestamp = -math.inf
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def record(self, pnl: float, fees: float = 0.0, timestamp: Any = None, **extra: float) -> int:
+        """
+        Registra una operación cerrada y actualiza los acumuladores
+
+        Args:
+            pnl: PnL de la operación
+            fees: Comisiones de la operación
+            timestamp: Momento de cierre (datetime, ISO, segundos...; None = ahora)
+            **extra: Valores de las columnas adicionales
+
+        Returns:
+            int: Índice de la fila
+        """
+        ts = to_epoch(timestamp) if timestamp is not None else datetime.now().timestamp()
+        if ts < self._last_timestamp:
+            self._sorted = False
+        else:
+            self._last_timestamp = ts
+
+        self.trades += 1
+        self.total_pnl += pnl
+        self.total_fees += fees
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        else:
+            self.losses += 1
+            self.gross_loss += abs(pnl)
+
+        self.balance += pnl - fees
+        self.peak_balance = max(self.peak_balance, self.balance)
+        drawdown = self.peak_balance - self.balance
+        self.max_drawdown = max(self.max_drawdown, drawdown)
+        if self.peak_balance > 0:
+            self.max_drawdown_pct = max(self.max_drawdown_pct, drawdown / self.peak_balance * 100)
+
+        row = dict(extra)
+        row.update(timestamp=ts, pnl=pnl, fees=fees)
+        return self.buffer.append(row)
+
+    def record_many(self, pnl: Sequence[float], fees: Optional[Sequence[float]] = None,
+                    timestamps: Optional[Sequence[Any]] = None, **extra: Sequence[float]) -> None:
+        """
+        Registra varias operaciones de una vez (p. ej. un backtest vectorizado)
+
+        Args:
+            pnl: PnL de cada operación
+            fees: Comisiones de cada operación (None = 0)
+            timestamps: Momentos de cierre (None = ahora)
+            **extra: Columnas adicionales
+        """
+        pnl = np.asarray(pnl, dtype=np.float64)
+        if len(pnl) == 0:
+            return
+        fees = np.zeros(len(pnl)) if fees is None else np.asarray(fees, dtype=np.float64)
+        if timestamps is None:
+            ts = np.full(len(pnl), datetime.now().timestamp())
+        else:
+            ts = np.array([to_epoch(t) for t in timestamps], dtype=np.float64)
+
+        # Acumuladores en el mismo orden que record(), para dar los mismos números
+        for value, fee in zip(pnl.tolist(), fees.tolist()):
+            self.trades += 1
+            self.total_pnl += value
+            self.total_fees += fee
+            if value > 0:
+                self.wins += 1
+                self.gross_profit += value
+            else:
+                self.losses += 1
+                self.gross_loss += abs(value)
+        balances = self.balance + np.cumsum(pnl - fees)
+        peaks = np.maximum(np.maximum.accumulate(balances), self.peak_balance)
+        drawdowns = peaks - balances
+        self.max_drawdown = max(self.max_drawdown, float(drawdowns.max()))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = np.where(peaks > 0, drawdowns / peaks * 100, 0.0)
+        self.max_drawdown_pct = max(self.max_drawdown_pct, float(pct.max()))
+        self.balance = float(balances[-1])
+        self.peak_balance = float(peaks[-1])
+
+        if np.any(ts[1:] < ts[:-1]) or ts[0] < self._last_timestamp:
+            self._sorted = False
+        else:
+            self._last_timestamp = float(ts[-1])
+        columns = {name: np.asarray(values, dtype=np.float64) for name, values in extra.items()}
+        columns.update(timestamp=ts, pnl=pnl, fees=fees)
+        self.buffer.extend(columns)
+
+    @property
+    def win_rate(self) -> float:
+        """Fracción de operaciones con PnL positivo"""
+        return self.wins / self.trades if self.trades > 0 else 0.0
+
+    @property
+    def profit_factor(self) -> float:
+        """Ganancias brutas / pérdidas brutas (inf sin pérdidas)"""
+        return self.gross_profit / self.gross_loss if self.gross_loss > 0 else float('inf')
+
+    def _window_slice(self, since: float) -> slice:
+        times = self.buffer['timestamp']
+        if self._sorted:
+            return slice(int(np.searchsorted(times, since, side='left')), len(times))
+        return np.flatnonzero(times >= since)
+
+    def window(self, days: float = None, since: Any = None, now: Any = None) -> Dict[str, Any]:
+        """
+        Resumen de las operaciones cerradas en una ventana de tiempo
+
+        Args:
+            days: Días hacia atrás desde ``now``
+            since: Inicio de la ventana (alternativa a ``days``)
+            now: Fin de referencia (None = ahora)
+
+        Returns:
+            Dict: trades, wins, pnl, fees y la suma de cada columna extra
+        """
+        if since is None:
+            reference = to_epoch(now) if now is not None else datetime.now().timestamp()
+            start = reference - (days or 0) * SECONDS_PER_DAY
+        else:
+            start = to_epoch(since)
+        rows = self._window_slice(start)
+        pnl = self.buffer['pnl'][rows]
+        summary = {
+            'trades': int(len(pnl)),
+            'wins': int(np.count_nonzero(pnl > 0)),
+            'pnl': float(pnl.sum()),
+            'fees': float(self.buffer['fees'][rows].sum())
+        }
+        for name in self.extra_columns:
+            summary[name] = float(np.nansum(self.buffer[name][rows]))
+        return summary
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Métricas acumuladas del registro
+
+        Returns:
+            Dict: Operaciones, aciertos, PnL, comisiones, profit factor y drawdown
+        """
+        return {
+            'trades': self.trades,
+            'wins': self.wins,
+            'losses': self.losses,
+            'win_rate': self.win_rate,
+            'total_pnl': self.total_pnl,
+            'gross_profit': self.gross_profit,
+            'gross_loss': self.gross_loss,
+            'profit_factor': self.profit_factor,
+            'total_fees': self.total_fees,
+            'balance': self.balance,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_pct': self.max_drawdown_pct
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Operaciones como DataFrame (tiempo de cierre como datetime)"""
+        df = self.buffer.to_frame()
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+        return df
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Operaciones como lista de diccionarios"""
+        return self.buffer.to_records()
+
+
+class _Moments:
+    """Media y varianza acumuladas (Welford)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def std(self, ddof: int = 0) -> float:
+        if self.count - ddof <= 0:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.count - ddof))
+
+
+class EquityLedger:
+    """
+    Curva de equity con drawdown y estadísticas de retornos acumuladas.
+
+    Cada punto cuesta O(1): se actualizan el pico, el drawdown máximo
+    (absoluto y relativo), la media y varianza de los retornos (Welford), la
+    de los retornos negativos (Sortino) y un Sharpe móvil de ``rolling_window``
+    puntos.
+    """
+
+    def __init__(self, initial_peak: Optional[float] = None, extra_columns: Dict[str, Any] = None,
+                 rolling_window: int = 30, capacity: int = DEFAULT_CAPACITY):
+        """
+        Inicializa la curva
+
+        Args:
+            initial_peak: Pico de partida (p. ej. el balance inicial); None = el primer punto
+            extra_columns: Columnas adicionales (nombre -> dtype)
+            rolling_window: Puntos del Sharpe móvil
+            capacity: Filas preasignadas
+        """
+        dtypes = {'timestamp': object, 'equity': np.float64}
+        dtypes.update(extra_columns or {})
+        self.extra_columns = list(extra_columns or {})
+        self.buffer = ColumnBuffer(dtypes, capacity)
+        self.initial_peak = initial_peak
+        self.rolling_window = rolling_window
+        self.reset()
+
+    def reset(self, initial_peak: Optional[float] = None) -> None:
+        """
+        Vacía la curva y los acumuladores
+
+        Args:
+            initial_peak: Nuevo pico de partida (None = el actual)
+        """
+        if initial_peak is not None:
+            self.initial_peak = initial_peak
+        self.buffer.clear()
+        self.peak = self.initial_peak if self.initial_peak is not None else -math.inf
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.max_drawdown_abs = 0.0
+        self.last_equity = None
+        self._returns = _Moments()
+        self._downside = _Moments()
+        self._rolling_mean = RollingMean(self.rolling_window)
+        self._rolling_std = RollingStd(self.rolling_window)
+        self.rolling_sharpe = math.nan
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def append(self, timestamp: Any, equity: float, **extra: Any) -> float:
+        """
+        Añade un punto de equity
+
+        Args:
+            timestamp: Marca de tiempo (se guarda tal cual)
+            equity: Equity en ese momento
+            **extra: Valores de las columnas adicionales
+
+        Returns:
+            float: Drawdown actual respecto al pico (fracción)
+        """
+        if self.last_equity is not None:
+            ret = equity / self.last_equity - 1 if self.last_equity != 0 else math.nan
+            if ret == ret:
+                self._returns.add(ret)
+                if ret < 0:
+                    self._downside.add(ret)
+            mean = self._rolling_mean.update(ret)
+            std = self._rolling_std.update(ret)
+            self.rolling_sharpe = mean / std if std > 0 else math.nan
+        self.last_equity = equity
+
+        if equity > self.peak:
+            self.peak = equity
+            self.drawdown = 0.0
+        else:
+            self.max_drawdown_abs = max(self.max_drawdown_abs, self.peak - equity)
+            self.drawdown = (self.peak - equity) / self.peak if self.peak > 0 else 0.0
+            self.max_drawdown = max(self.max_drawdown, self.drawdown)
+
+        row = dict(extra)
+        row.update(timestamp=timestamp, equity=equity)
+        self.buffer.append(row)
+        return self.drawdown
+
+    def extend(self, timestamps: Sequence[Any], equity: Sequence[float], **extra: Sequence[Any]) -> None:
+        """
+        Añade varios puntos seguidos (mismo resultado que llamar a append con cada uno)
+
+        Args:
+            timestamps: Marcas de tiempo
+            equity: Valores de equity
+            **extra: Columnas adicionales
+        """
+        names = list(extra)
+        columns = [list(extra[name]) for name in names]
+        for i, (timestamp, value) in enumerate(zip(timestamps, np.asarray(equity, dtype=np.float64).tolist())):
+            self.append(timestamp, value, **{name: column[i] for name, column in zip(names, columns)})
+
+    @property
+    def equity(self) -> np.ndarray:
+        """Vista de la columna de equity"""
+        return self.buffer['equity']
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Vista de la columna de marcas de tiempo"""
+        return self.buffer['timestamp']
+
+    def returns(self) -> np.ndarray:
+        """Retornos simples entre puntos consecutivos"""
+        equity = self.equity
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return equity[1:] / equity[:-1] - 1
+
+    def mean_return(self) -> float:
+        """Media de los retornos"""
+        return self._returns.mean if self._returns.count else 0.0
+
+    def return_std(self, ddof: int = 0) -> float:
+        """
+        Desviación estándar de los retornos
+
+        Args:
+            ddof: Grados de libertad (0 como np.std, 1 como pandas)
+        """
+        return self._returns.std(ddof)
+
+    def downside_std(self, ddof: int = 1) -> float:
+        """Desviación estándar de los retornos negativos"""
+        return self._downside.std(ddof)
+
+    def sharpe_ratio(self, periods_per_year: float = 252, ddof: int = 0) -> float:
+        """
+        Sharpe anualizado (retorno libre de riesgo 0)
+
+        Args:
+            periods_per_year: Puntos de la curva por año
+            ddof: Grados de libertad de la desviación estándar
+        """
+        std = self.return_std(ddof)
+        if not std > 0:
+            return 0.0
+        return self.mean_return() / std * math.sqrt(periods_per_year)
+
+    def sortino_ratio(self, periods_per_year: float = 252) -> float:
+        """Sortino anualizado (desviación de los retornos negativos, ddof=1)"""
+        std = self.downside_std()
+        if not std > 0:
+            return 0.0
+        return self.mean_return() / std * math.sqrt(periods_per_year)
+
+    def summary(self, periods_per_year: float = 252) -> Dict[str, Any]:
+        """
+        Métricas acumuladas de la curva
+
+        Args:
+            periods_per_year: Puntos de la curva por año (para anualizar)
+
+        Returns:
+            Dict: Puntos, equity final, pico, drawdowns, Sharpe, Sortino y Sharpe móvil
+        """
+        return {
+            'points': len(self),
+            'final_equity': self.last_equity,
+            'peak_equity': self.peak if len(self) else None,
+            'max_drawdown': self.max_drawdown,
+            'max_drawdown_abs': self.max_drawdown_abs,
+            'sharpe_ratio': self.sharpe_ratio(periods_per_year),
+            'sortino_ratio': self.sortino_ratio(periods_per_year),
+            'rolling_sharpe': self.rolling_sharpe
+        }
+
+    def to_frame(self) -> pd.DataFrame:
+        """Curva como DataFrame"""
+        return self.buffer.to_frame()
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Curva como lista de diccionarios (formato de los antiguos historiales)"""
+        return self.buffer.to_records()
+
@@ -0,0 +1,614 @@
+#!/usr/bin/env python3
+"""
+Hub central de datos de mercado para los bots.
+
+En lugar de que cada bot descargue por REST las mismas velas y el mismo libro
+de órdenes en cada iteración, el hub mantiene un único feed por
+(símbolo, timeframe) alimentado por los clientes WebSocket
+(``websocket_client.py`` o la cola de ``api_client/modulo2.py``). Cada feed
+guarda las últimas velas en un buffer circular y calcula los indicadores una
+sola vez, de forma incremental, al llegar cada actualización. Los bots se
+suscriben al feed y se despiertan cuando hay datos nuevos.
+
+El hub registra la latencia de reparto (publicación -> bot despierto) y el
+retraso de cada suscriptor (versiones que se ha saltado o aún no ha leído).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_management.order_book import OrderBookManager, OrderBookView
+from features.incremental import IncrementalFeatureEngine, processor_feature_set
+
+logger = logging.getLogger('MarketDataHub')
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def normalize_interval(interval: str) -> str:
+    """
+    Normaliza un intervalo de OKX ('1H', '4H', '1D') al formato de los bots ('1h', '4h', '1d')
+
+    Los minutos ('1m') y meses ('1M') se dejan tal cual.
+    """
+    if interval and interval[-1] in ('H', 'D', 'W'):
+        return interval[:-1] + interval[-1].lower()
+    return interval
+
+
+class LatencyStats:
+    """Acumulador de latencias en milisegundos (última, media y máxima)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def add(self, value_ms: float):
+        self.count += 1
+        self.total += value_ms
+        self.last = value_ms
+        self.max = max(self.max, value_ms)
+
+    def as_dict(self, prefix: str) -> Dict[str, float]:
+        return {
+            f'{prefix}_last_ms': round(self.last, 3),
+            f'{prefix}_avg_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            f'{prefix}_max_ms': round(self.max, 3)
+        }
+
+
+class MarketFeed:
+    """
+    Feed de un (símbolo, timeframe): buffer circular de velas con indicadores.
+
+    Las velas cerradas se pasan una sola vez por el motor de indicadores
+    incrementales; la vela en curso se recalcula en cada actualización a
+    partir del estado de la última vela cerrada, sin avanzarlo.
+    """
+
+    def __init__(self, symbol: str, timeframe: str, capacity: int = 500,
+                 engine: Optional[IncrementalFeatureEngine] = None):
+        """
+        Args:
+            symbol: Par de trading (ej. "SOL-USDT")
+            timeframe: Marco temporal (ej. "1m")
+            capacity: Número de velas que se conservan
+            engine: Motor de indicadores (por defecto processor_feature_set())
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.capacity = capacity
+        self.engine = engine or processor_feature_set()
+        self.feature_columns = self.engine.outputs
+
+        # Buffer circular: la vela con número de orden ``seq`` ocupa ``seq % capacity``
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._ohlcv = np.full((capacity, len(OHLCV_COLUMNS)), np.nan)
+        self._features = np.full((capacity, len(self.feature_columns)), np.nan)
+        self._count = 0
+        self._last_closed = True
+
+        self.orderbook: Dict[str, Any] = {}
+        self.last_price: Optional[float] = None
+
+        # Versión: se incrementa con cada cambio publicado
+        self.version = 0
+        self._published_at = 0.0
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[['MarketFeed'], None]] = []
+        self._frame_cache: Tuple[int, Optional[pd.DataFrame]] = (-1, None)
+        self._candle_version = 0
+
+        self.stats = {
+            'candle_updates': 0,
+            'bars_closed': 0,
+            'stale_candles': 0,
+            'orderbook_updates': 0,
+            'price_updates': 0,
+            'frames_built': 0
+        }
+        self.ingest_latency = LatencyStats()
+        self.indicator_time = LatencyStats()
+
+    # ------------------------------------------------------------------
+    # Publicación (hilo del WebSocket)
+    # ------------------------------------------------------------------
+
+    def _compute(self, rows: np.ndarray) -> np.ndarray:
+        """Avanza el motor con las filas OHLCV dadas y devuelve sus features"""
+        data = {col: rows[:, i] for i, col in enumerate(OHLCV_COLUMNS)}
+        out = np.full((len(rows), len(self.feature_columns)), np.nan)
+        position = 0
+        for ind in self.engine.indicators:
+            values = ind.update({src: data[src] for src in ind.sources})
+            for col in ind.outputs:
+                out[:, position] = values[col]
+                position += 1
+        self.engine.rows_seen += len(rows)
+        return out
+
+    def _commit_last(self):
+        """Pasa la última vela (ya cerrada) por el motor y guarda sus features"""
+        slot = (self._count - 1) % self.capacity
+        self._features[slot] = self._compute(self._ohlcv[slot:slot + 1])[0]
+        self._last_closed = True
+        self.stats['bars_closed'] += 1
+
+    def _preview_last(self):
+        """Calcula las features de la vela en curso sin avanzar el estado del motor"""
+        slot = (self._count - 1) % self.capacity
+        state = self.engine.get_state()
+        self._features[slot] = self._compute(self._ohlcv[slot:slot + 1])[0]
+        self.engine.set_state(state)
+
+    def _publish(self, received_ms: Optional[float] = None):
+        """Marca un cambio y despierta a los suscriptores (con el lock tomado)"""
+        self.version += 1
+        self._published_at = time.perf_counter()
+        if received_ms:
+            self.ingest_latency.add(max(time.time() * 1000 - float(received_ms), 0.0))
+        self._condition.notify_all()
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error(f"Error en listener del feed {self.symbol} {self.timeframe}: {e}")
+
+    def add_listener(self, listener: Callable[['MarketFeed'], None]):
+        """
+        Registra una función que se llama (con el lock tomado, desde el hilo
+        que publica) tras cada cambio. Debe ser inmediata: p. ej. programar un
+        aviso en un event loop con ``loop.call_soon_threadsafe``.
+        """
+        with self._condition:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[['MarketFeed'], None]):
+        """Elimina una función registrada con add_listener"""
+        with self._condition:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def update_candle(self, timestamp: int, open_: float, high: float, low: float,
+                      close: float, volume: float, confirmed: bool = False,
+                      received_ms: Optional[float] = None) -> bool:
+        """
+        Aplica una actualización de vela
+
+        Una vela con el mismo timestamp que la última la sustituye; una con
+        timestamp posterior cierra la anterior y abre una nueva. Las
+        actualizaciones de velas ya cerradas se descartan.
+
+        Args:
+            timestamp: Apertura de la vela en milisegundos
+            open_, high, low, close, volume: Valores OHLCV
+            confirmed: La vela está cerrada (confirm == '1' en OKX)
+            received_ms: Momento de recepción (ms) para medir la latencia de entrada
+
+        Returns:
+            bool: True si la actualización se ha aplicado
+        """
+        row = (float(open_), float(high), float(low), float(close), float(volume))
+        timestamp = int(timestamp)
+        with self._condition:
+            start = time.perf_counter()
+            last_ts = self._timestamps[(self._count - 1) % self.capacity] if self._count else None
+
+            if last_ts is not None and (timestamp < last_ts or
+                                        (timestamp == last_ts and self._last_closed)):
+                self.stats['stale_candles'] += 1
+                return False
+
+            if last_ts is not None and timestamp > last_ts and not self._last_closed:
+                # Llega una vela nueva: la anterior queda cerrada tal como estaba
+                self._commit_last()
+
+            if timestamp != last_ts:
+                self._count += 1
+            slot = (self._count - 1) % self.capacity
+            self._timestamps[slot] = timestamp
+            self._ohlcv[slot] = row
+            self._last_closed = False
+
+            if confirmed:
+                self._commit_last()
+            else:
+                self._preview_last()
+
+            self.last_price = row[3]
+            self.stats['candle_updates'] += 1
+            self.indicator_time.add((time.perf_counter() - start) * 1000)
+            self._candle_version += 1
+            self._publish(received_ms)
+        return True
+
+    def update_orderbook(self, orderbook: Any, received_ms: Optional[float] = None):
+        """
+        Sustituye el libro de órdenes: un OrderBookView inmutable o un dict
+        ({'bids': [[precio, cantidad], ...], 'asks': ...})
+        """
+        with self._condition:
+            self.orderbook = orderbook
+            self.stats['orderbook_updates'] += 1
+            self._publish(received_ms)
+
+    def update_price(self, price: float, received_ms: Optional[float] = None):
+        """Actualiza el último precio negociado (ticker)"""
+        with self._condition:
+            self.last_price = float(price)
+            self.stats['price_updates'] += 1
+            self._publish(received_ms)
+
+    def seed(self, df: pd.DataFrame):
+        """
+        Carga un histórico inicial (p. ej. descargado una vez por REST)
+
+        Todas las velas se consideran cerradas salvo la última, que sigue
+        abierta hasta que llegue la siguiente por WebSocket.
+
+        Args:
+            df: DataFrame OHLCV con índice o columna 'timestamp'
+        """
+        if df is None or df.empty:
+            return
+        frame = df.reset_index() if 'timestamp' not in df.columns else df
+        timestamps = pd.to_datetime(frame['timestamp'])
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+        ms = timestamps.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        values = frame[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+        for i in range(len(frame)):
+            self.update_candle(ms[i], *values[i], confirmed=i < len(frame) - 1)
+
+    # ------------------------------------------------------------------
+    # Lectura (hilos de los bots)
+    # ------------------------------------------------------------------
+
+    def wait_for_update(self, last_version: int, timeout: Optional[float] = None) -> bool:
+        """Espera a que la versión del feed supere ``last_version``"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self.version > last_version, timeout)
+
+    def _build_frame(self) -> Optional[pd.DataFrame]:
+        """DataFrame de velas + indicadores, construido una vez por versión de velas"""
+        if self._frame_cache[0] == self._candle_version:
+            return self._frame_cache[1]
+        frame = None
+        if self._count:
+            first = max(self._count - self.capacity, 0)
+            slots = np.arange(first, self._count) % self.capacity
+            index = pd.DatetimeIndex(self._timestamps[slots].astype('datetime64[ms]'), name='timestamp')
+            frame = pd.DataFrame(np.hstack([self._ohlcv[slots], self._features[slots]]),
+                                 index=index, columns=OHLCV_COLUMNS + self.feature_columns)
+            self.stats['frames_built'] += 1
+        self._frame_cache = (self._candle_version, frame)
+        return frame
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Estado actual del feed con el formato de BotInstance._get_market_data
+
+        El DataFrame es compartido entre suscriptores: quien lo modifique debe
+        trabajar sobre una copia.
+
+        Returns:
+            Dict[str, Any]: dataframe, current_price, orderbook, timestamp,
+            version y bar_closed (la última vela está cerrada)
+        """
+        with self._condition:
+            return {
+                "dataframe": self._build_frame(),
+                "current_price": self.last_price,
+                "orderbook": self.orderbook,
+                "timestamp": datetime.now(),
+                "version": self.version,
+                "bar_closed": self._last_closed,
+                "published_at": self._published_at
+            }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del feed"""
+        with self._condition:
+            metrics = {
+                'symbol': self.symbol,
+                'timeframe': self.timeframe,
+                'version': self.version,
+                'bars': min(self._count, self.capacity),
+                **self.stats
+            }
+            metrics.update(self.ingest_latency.as_dict('ingest'))
+            metrics.update(self.indicator_time.as_dict('indicators'))
+            return metrics
+
+
+class FeedSubscription:
+    """
+    Suscripción de un bot a un feed.
+
+    ``wait`` bloquea hasta que el feed tenga una versión más reciente que la
+    última leída y devuelve el snapshot; si mientras tanto se publicaron
+    varias versiones, sólo se entrega la más reciente (las demás cuentan como
+    saltadas). La primera entrega es el snapshot vigente y no cuenta saltos:
+    el histórico cargado con ``seed`` no son actualizaciones perdidas.
+    """
+
+    def __init__(self, feed: MarketFeed, subscriber_id: str):
+        self.feed = feed
+        self.subscriber_id = subscriber_id
+        self.last_version = 0
+        self.deliveries = 0
+        self.skipped = 0
+        self.last_delivery: Optional[float] = None
+        self.fanout_latency = LatencyStats()
+        self.active = True
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Espera datos nuevos
+
+        Args:
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            Optional[Dict[str, Any]]: Snapshot del feed o None si no hubo
+            cambios dentro del timeout
+        """
+        if not self.feed.wait_for_update(self.last_version, timeout):
+            return None
+        return self._deliver()
+
+    def poll(self) -> Optional[Dict[str, Any]]:
+        """Devuelve el snapshot si hay una versión sin leer, sin esperar"""
+        if self.feed.version <= self.last_version:
+            return None
+        return self._deliver()
+
+    def _deliver(self) -> Dict[str, Any]:
+        snapshot = self.feed.snapshot()
+        now = time.perf_counter()
+        self.fanout_latency.add((now - snapshot['published_at']) * 1000)
+        if self.deliveries:
+            self.skipped += max(snapshot['version'] - self.last_version - 1, 0)
+        self.last_version = snapshot['version']
+        self.deliveries += 1
+        self.last_delivery = now
+        return snapshot
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Métricas del suscriptor: entregas, versiones saltadas y retraso actual"""
+        metrics = {
+            'subscriber_id': self.subscriber_id,
+            'symbol': self.feed.symbol,
+            'timeframe': self.feed.timeframe,
+            'deliveries': self.deliveries,
+            'skipped_updates': self.skipped,
+            'lag_versions': self.feed.version - self.last_version,
+            'seconds_since_delivery': round(time.perf_counter() - self.last_delivery, 3)
+            if self.last_delivery else None
+        }
+        metrics.update(self.fanout_latency.as_dict('fanout'))
+        return metrics
+
+
+class MarketDataHub:
+    """
+    Registro de feeds por (símbolo, timeframe) y punto de entrada de los
+    mensajes de los clientes WebSocket.
+    """
+
+    def __init__(self, capacity: int = 500,
+                 engine_factory: Callable[[], IncrementalFeatureEngine] = processor_feature_set,
+                 backfill: Optional[Callable[[str, str, int], Optional[pd.DataFrame]]] = None):
+        """
+        Args:
+            capacity: Velas por feed
+            engine_factory: Crea el motor de indicadores de cada feed
+            backfill: Función ``(symbol, timeframe, limit) -> DataFrame`` para
+                cargar el histórico inicial de un feed nuevo (una sola vez)
+        """
+        self.capacity = capacity
+        self.engine_factory = engine_factory
+        self.backfill = backfill
+        self.feeds: Dict[Tuple[str, str], MarketFeed] = {}
+        self.subscriptions: Dict[str, FeedSubscription] = {}
+        self._lock = threading.Lock()
+        # Libros L2 locales para los mensajes books* de websocket_client
+        self.order_books = OrderBookManager()
+        self.unrouted_messages = 0
+
+    def get_feed(self, symbol: str, timeframe: str, create: bool = True) -> Optional[MarketFeed]:
+        """
+        Devuelve el feed de (symbol, timeframe), creándolo si hace falta
+
+        Args:
+            symbol: Par de trading
+            timeframe: Marco temporal
+            create: Crear el feed si no existe
+
+        Returns:
+            Optional[MarketFeed]: Feed o None si no existe y ``create`` es False
+        """
+        key = (symbol, normalize_interval(timeframe))
+        with self._lock:
+            feed = self.feeds.get(key)
+            if feed is not None or not create:
+                return feed
+            feed = MarketFeed(key[0], key[1], self.capacity, self.engine_factory())
+            self.feeds[key] = feed
+
+        if self.backfill is not None:
+            try:
+                feed.seed(self.backfill(key[0], key[1], self.capacity))
+                logger.info(f"Feed {key[0]} {key[1]} inicializado con histórico")
+            except Exception as e:
+                logger.error(f"Error cargando histórico para {key[0]} {key[1]}: {e}")
+        return feed
+
+    def subscribe(self, subscriber_id: str, symbol: str, timeframe: str) -> FeedSubscription:
+        """Suscribe ``subscriber_id`` al feed (sustituye una suscripción previa con el mismo id)"""
+        subscription = FeedSubscription(self.get_feed(symbol, timeframe), subscriber_id)
+        with self._lock:
+            self.subscriptions[subscriber_id] = subscription
+        return subscription
+
+    def unsubscribe(self, subscriber_id: str):
+        """Elimina la suscripción de ``subscriber_id``"""
+        with self._lock:
+            subscription = self.subscriptions.pop(subscriber_id, None)
+        if subscription is not None:
+            subscription.active = False
+
+    def _feeds_for_symbol(self, symbol: str) -> List[MarketFeed]:
+        with self._lock:
+            return [feed for (sym, _), feed in self.feeds.items() if sym == symbol]
+
+    # ------------------------------------------------------------------
+    # Entrada de datos
+    # ------------------------------------------------------------------
+
+    def on_candles(self, symbol: str, interval: str, candles: List[List[Any]],
+                   received_ms: Optional[float] = None):
+        """
+        Aplica velas en formato OKX ``[ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]``
+
+        Las velas de un (símbolo, intervalo) sin feed se ignoran: el hub sólo
+        mantiene lo que algún bot ha pedido.
+        """
+        feed = self.get_feed(symbol, interval, create=False)
+        if feed is None:
+            self.unrouted_messages += 1
+            return
+        for candle in candles:
+            confirmed = len(candle) > 8 and str(candle[8]) == '1'
+            feed.update_candle(int(candle[0]), candle[1], candle[2], candle[3], candle[4], candle[5],
+                               confirmed=confirmed, received_ms=received_ms)
+
+    def on_orderbook(self, symbol: str, book: Any, received_ms: Optional[float] = None):
+        """
+        Publica un libro de órdenes en todos los feeds del símbolo
+
+        Args:
+            symbol: Par de trading
+            book: OrderBookView (se comparte tal cual) o dict con bids/asks
+            received_ms: Momento de recepción (ms)
+        """
+        if isinstance(book, OrderBookView):
+            orderbook = book
+        else:
+            orderbook = {'bids': book.get('bids', []), 'asks': book.get('asks', []), 'ts': book.get('ts')}
+        for feed in self._feeds_for_symbol(symbol):
+            feed.update_orderbook(orderbook, received_ms)
+
+    def on_price(self, symbol: str, price: float, received_ms: Optional[float] = None):
+        """Publica el último precio en todos los feeds del símbolo"""
+        for feed in self._feeds_for_symbol(symbol):
+            feed.update_price(price, received_ms)
+
+    def on_okx_message(self, message: Dict[str, Any]):
+        """
+        Procesa un mensaje OKX ya decodificado (``{'arg': {...}, 'data': [...]}``)
+
+        Se registra en websocket_client.OKXWebSocketClient con
+        ``add_message_listener`` (ver attach_websocket_client).
+        """
+        arg = message.get('arg', {})
+        channel = arg.get('channel', '')
+        symbol = arg.get('instId')
+        data = message.get('data') or []
+        if not symbol or not data:
+            return
+        received_ms = time.time() * 1000
+        if channel.startswith('candle'):
+            self.on_candles(symbol, channel.replace('candle', ''), data, received_ms)
+        elif channel.startswith('books'):
+            book = self.order_books.on_message(message)
+            if book is not None:
+                self.on_orderbook(symbol, book.view(), received_ms)
+        elif channel == 'tickers' and data[0].get('last'):
+            self.on_price(symbol, data[0]['last'], received_ms)
+
+    def on_queue_item(self, item: Dict[str, Any]):
+        """
+        Procesa un elemento de la cola de api_client/modulo2.py
+        (tipos 'candle', 'ticker' y 'books*')
+        """
+        item_type = item.get('type')
+        symbol = item.get('instrument')
+        if item_type == 'candle':
+            self.on_candles(symbol, item.get('interval', ''), item.get('data') or [],
+                            item.get('timestamp_received'))
+        elif item_type == 'ticker' and item.get('last_price') is not None:
+            self.on_price(symbol, item['last_price'])
+        elif item_type and item_type.startswith('books'):
+            if item.get('book') is not None:
+                self.on_orderbook(symbol, item['book'])
+            elif item.get('data'):
+                self.on_orderbook(symbol, item['data'][0])
+
+    def attach_websocket_client(self, client, subscribe: bool = True):
+        """
+        Conecta el hub a un websocket_client.OKXWebSocketClient
+
+        Args:
+            client: Cliente ya creado
+            subscribe: Suscribir velas, libro L2 incremental ('books') y ticker de los feeds
+                existentes (requiere el WebSocket público conectado)
+        """
+        client.add_message_listener(self.on_okx_message)
+        self.order_books.on_resync = client.resubscribe
+        if not subscribe:
+            return
+        with self._lock:
+            keys = list(self.feeds.keys())
+        symbols = sorted({symbol for symbol, _ in keys})
+        for symbol in symbols:
+            intervals = [timeframe for sym, timeframe in keys if sym == symbol]
+            client.subscribe_klines([symbol], intervals)
+        if symbols:
+            client.subscribe_orderbooks(symbols, depth="400")
+            client.subscribe_tickers(symbols)
+
+    async def consume_queue(self, queue: asyncio.Queue):
+        """Consume indefinidamente la cola de datos de api_client/modulo2.py"""
+        while True:
+            item = await queue.get()
+            try:
+                self.on_queue_item(item)
+            except Exception as e:
+                logger.error(f"Error procesando elemento de la cola en el hub: {e}")
+            finally:
+                queue.task_done()
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas de todos los feeds y suscriptores
+
+        Returns:
+            Dict[str, Any]: feeds (por 'SYMBOL timeframe'), subscribers (por
+            id), y los agregados max_fanout_ms y max_lag_versions
+        """
+        with self._lock:
+            feeds = list(self.feeds.values())
+            subscriptions = list(self.subscriptions.values())
+        subscriber_metrics = {s.subscriber_id: s.get_metrics() for s in subscriptions}
+        return {
+            'feeds': {f"{feed.symbol} {feed.timeframe}": feed.get_metrics() for feed in feeds},
+            'subscribers': subscriber_metrics,
+            'unrouted_messages': self.unrouted_messages,
+            'order_books': self.order_books.get_metrics(),
+            'max_fanout_ms': max((m['fanout_max_ms'] for m in subscriber_metrics.values()), default=0.0),
+            'max_lag_versions': max((m['lag_versions'] for m in subscriber_metrics.values()), default=0)
+        }
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Reproducción determinista de datos de mercado grabados sobre el pipeline en vivo.
+
+Lee tickers, libro de órdenes y velas grabados (tablas de
+``HistoricalDataSaver`` en ``market_data.db``, o klines del almacén columnar)
+y los pone en la cola de datos (``api_client.modulocola.data_queue``) con el
+mismo formato que ``OKXWebSocketClient.process_message``, a velocidad real,
+acelerada o tan rápido como sea posible. Así se puede ejercitar el camino
+cola -> SignalEngine -> TradeExecutor sin red.
+
+``ReplayHarness`` hace de consumidor (como ``ScalpingBot.run_data_consumer``)
+y mide la latencia de extremo a extremo: mensaje en la cola -> extraído,
+-> señal generada y -> orden simulada, además de la profundidad de la cola.
+"""
+
+import asyncio
+import hashlib
+import heapq
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('MarketReplay')
+
+# Mensaje grabado: (timestamp de llegada en ms, elemento de la cola)
+RecordedMessage = Tuple[int, Dict[str, Any]]
+
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '12h': 43_200_000, '1d': 86_400_000
+}
+
+
+def _fmt(value: Optional[float]) -> str:
+    """Número como lo envía OKX (cadena; vacía si no hay valor)"""
+    return '' if value is None else repr(float(value))
+
+
+def ticker_item(instrument: str, ts: int, last: float, bid: float, ask: float,
+                high_24h: Optional[float] = None, low_24h: Optional[float] = None,
+                vol_ccy_24h: Optional[float] = None, vol_24h: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Elemento de cola de un ticker, igual que el que genera process_message
+
+    Returns:
+        Dict[str, Any]: Elemento con 'type' = 'ticker' y el payload original de OKX en 'data'
+    """
+    fields = {
+        'instId': instrument,
+        'last': last,
+        'bidPx': bid,
+        'askPx': ask,
+        'high24h': high_24h,
+        'low24h': low_24h,
+        'volCcy24h': vol_ccy_24h,
+        'vol24h': vol_24h
+    }
+    # Los campos sin valor grabado se omiten (los consumidores usan .get con defecto)
+    payload = [dict({k: v if k == 'instId' else _fmt(v) for k, v in fields.items() if v is not None},
+                    ts=str(ts))]
+    return {
+        'type': 'ticker',
+        'instrument': instrument,
+        'timestamp': str(ts),
+        'last_price': float(last),
+        'best_bid': float(bid),
+        'best_ask': float(ask),
+        'data': payload
+    }
+
+
+def book_item(instrument: str, ts: int, best_bid: float, best_bid_size: float,
+              best_ask: float, best_ask_size: float, checksum: Optional[Any] = None,
+              channel: str = 'books-l2-tbt') -> Dict[str, Any]:
+    """
+    Elemento de cola del libro de órdenes (sólo nivel 1, que es lo que se graba)
+
+    Returns:
+        Dict[str, Any]: Elemento con las claves del libro local de process_message;
+        'book' es None porque no se graba el libro completo
+    """
+    payload = [{
+        'asks': [[_fmt(best_ask), _fmt(best_ask_size), '0', '1']],
+        'bids': [[_fmt(best_bid), _fmt(best_bid_size), '0', '1']],
+        'ts': str(ts),
+        'checksum': checksum
+    }]
+    return {
+        'type': channel,
+        'instrument': instrument,
+        'timestamp': int(ts),
+        'best_bid': best_bid,
+        'best_ask': best_ask,
+        'best_bid_size': best_bid_size,
+        'best_ask_size': best_ask_size,
+        'checksum': checksum,
+        'book': None,
+        'data': payload
+    }
+
+
+def candle_item(instrument: str, interval: str, ts: int, open_: float, high: float, low: float,
+                close: float, volume: float, volume_currency: float, received_ms: int,
+                confirmed: bool = True) -> Dict[str, Any]:
+    """
+    Elemento de cola de una vela ([ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm])
+
+    Returns:
+        Dict[str, Any]: Elemento con 'type' = 'candle'
+    """
+    candle = [str(ts), _fmt(open_), _fmt(high), _fmt(low), _fmt(close), _fmt(volume),
+              _fmt(volume_currency), _fmt(volume_currency), '1' if confirmed else '0']
+    return {
+        'type': 'candle',
+        'instrument': instrument,
+        'interval': interval,
+        'data': [candle],
+        'timestamp_received': int(received_ms)
+    }
+
+
+def load_messages_from_db(db_path: str, instrument: Optional[str] = None,
+                          start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                          channels: Iterable[str] = ('tickers', 'order_book', 'candlesticks'),
+                          book_channel: str = 'books-l2-tbt') -> Iterator[RecordedMessage]:
+    """
+    Mensajes grabados por HistoricalDataSaver, en orden de llegada
+
+    Las tres tablas se leen en streaming ordenadas por tiempo y se mezclan; a
+    igual timestamp el orden es ticker, libro, vela, y dentro de cada tabla el
+    de inserción, de modo que dos reproducciones del mismo fichero son
+    idénticas. Las velas se ordenan por ``timestamp_received``.
+
+    Args:
+        db_path: Ruta de la base de datos SQLite
+        instrument: Filtrar por instrumento (None = todos)
+        start_ms: Desde este timestamp (incluido)
+        end_ms: Hasta este timestamp (incluido)
+        channels: Tablas a reproducir
+        book_channel: Tipo con el que se publican los mensajes del libro
+
+    Returns:
+        Iterator[RecordedMessage]: (timestamp_ms, elemento de cola)
+    """
+    conn = sqlite3.connect(db_path)
+    existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+
+    def query(table: str, columns: str, time_column: str):
+        clauses, params = [], []
+        if instrument is not None:
+            clauses.append("instrument_id = ?")
+            params.append(instrument)
+        if start_ms is not None:
+            clauses.append(f"{time_column} >= ?")
+            params.append(int(start_ms))
+        if end_ms is not None:
+            clauses.append(f"{time_column} <= ?")
+            params.append(int(end_ms))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return conn.execute(f"SELECT {columns} FROM {table}{where} ORDER BY {time_column}, id", params)
+
+    streams = []
+    if 'tickers' in channels and 'tickers' in existing:
+        rows = query('tickers', "timestamp, instrument_id, last_price, bid_1, ask_1, high_24h, low_24h, "
+                                "vol_ccy_24h, vol_24h", 'timestamp')
+        streams.append((row[0], ticker_item(row[1], row[0], *row[2:])) for row in rows)
+    if 'order_book' in channels and 'order_book' in existing:
+        rows = query('order_book', "timestamp, instrument_id, best_bid, best_bid_size, best_ask, "
+                                   "best_ask_size, checksum", 'timestamp')
+        streams.append((row[0], book_item(row[1], row[0], *row[2:], channel=book_channel)) for row in rows)
+    if 'candlesticks' in channels and 'candlesticks' in existing:
+        rows = query('candlesticks', "timestamp_received, instrument_id, interval, timestamp, open_price, "
+                                     "high_price, low_price, close_price, volume, volume_currency",
+                     'timestamp_received')
+        streams.append((row[0], candle_item(row[1], row[2], row[3], *row[4:], received_ms=row[0]))
+                       for row in rows)
+
+    try:
+        yield from heapq.merge(*streams, key=lambda message: message[0])
+    finally:
+        conn.close()
+
+
+def load_messages_from_store(root: str, symbol: str, interval: str, instrument: Optional[str] = None,
+                             start: Optional[str] = None, end: Optional[str] = None,
+                             with_tickers: bool = True) -> Iterator[RecordedMessage]:
+    """
+    Klines del almacén columnar como velas confirmadas (y tickers derivados)
+
+    El almacén sólo guarda velas; con ``with_tickers`` cada vela cerrada se
+    acompaña de un ticker con su precio de cierre (bid = ask = cierre), para
+    que el SignalEngine, que trabaja con tickers, tenga datos que procesar.
+
+    Args:
+        root: Directorio del almacén columnar
+        symbol: Símbolo del dataset (p. ej. 'SOLUSDT')
+        interval: Intervalo del dataset (p. ej. '1m')
+        instrument: Instrumento con el que se publican (por defecto, el símbolo)
+        start: Inicio del rango (incluido)
+        end: Fin del rango (incluido)
+        with_tickers: Publicar también un ticker por vela
+
+    Returns:
+        Iterator[RecordedMessage]: (timestamp_ms, elemento de cola)
+    """
+    from data_management.columnar_store import ColumnarStore
+
+    instrument = instrument or symbol
+    dataset = ColumnarStore(root).dataset(symbol, interval)
+    df = dataset.read(columns=['open_time', 'open', 'high', 'low', 'close', 'volume', 'quote_asset_volume'],
+                      start=start, end=end)
+    if df.empty:
+        return
+
+    open_ms = df['open_time'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+    step = INTERVAL_MS.get(interval, 60_000)
+    quote_volume = (df['quote_asset_volume'] if 'quote_asset_volume' in df.columns
+                    else df['close'] * df['volume']).to_numpy(dtype=np.float64)
+    columns = [df[c].to_numpy(dtype=np.float64) for c in ('open', 'high', 'low', 'close', 'volume')]
+
+    for i in range(len(df)):
+        # La vela se confirma al cerrar, que es cuando la envía OKX con confirm=1
+        closed_ms = int(open_ms[i]) + step
+        o, h, l, c, v = (float(col[i]) for col in columns)
+        if with_tickers:
+            yield closed_ms, ticker_item(instrument, closed_ms, c, c, c)
+        yield closed_ms, candle_item(instrument, interval, int(open_ms[i]), o, h, l, c, v,
+                                     float(quote_volume[i]), received_ms=closed_ms)
+
+
+def _latency_summary(values: List[float], prefix: str) -> Dict[str, float]:
+    """Percentiles de una lista de latencias en ms"""
+    if not values:
+        return {f"{prefix}_count": 0}
+    arr = np.asarray(values)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        f"{prefix}_count": int(arr.size),
+        f"{prefix}_mean_ms": round(float(arr.mean()), 4),
+        f"{prefix}_p50_ms": round(float(p50), 4),
+        f"{prefix}_p95_ms": round(float(p95), 4),
+        f"{prefix}_p99_ms": round(float(p99), 4),
+        f"{prefix}_max_ms": round(float(arr.max()), 4)
+    }
+
+
+class MarketReplay:
+    """
+    Productor que publica mensajes grabados en una cola asyncio.
+
+    Con ``speed`` = 1 respeta los tiempos grabados, con ``speed`` > 1 los
+    comprime y con ``speed`` = None (o 0) publica sin esperas; en ese caso la
+    cola acotada marca el ritmo (put() espera cuando está llena).
+    """
+
+    def __init__(self, messages: Iterable[RecordedMessage], queue: Optional[asyncio.Queue] = None,
+                 speed: Optional[float] = None):
+        """
+        Args:
+            messages: Mensajes (timestamp_ms, elemento) en orden de llegada
+            queue: Cola destino (por defecto, api_client.modulocola.data_queue)
+            speed: Factor de velocidad respecto al tiempo real (None = máxima)
+        """
+        if queue is None:
+            from api_client.modulocola import data_queue
+            queue = data_queue
+        self.messages = messages
+        self.queue = queue
+        self.speed = speed or None
+        self.published = 0
+        self.max_depth = 0
+        self.total_depth = 0
+        self.max_schedule_lag_ms = 0.0
+        self.elapsed_s = 0.0
+
+    async def run(self) -> int:
+        """
+        Publica todos los mensajes
+
+        Returns:
+            int: Mensajes publicados
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        origin_ms = None
+        origin_loop = loop.time()
+
+        for ts, item in self.messages:
+            if self.speed is not None:
+                if origin_ms is None:
+                    origin_ms = ts
+                delay = origin_loop + (ts - origin_ms) / 1000.0 / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_schedule_lag_ms = max(self.max_schedule_lag_ms, -delay * 1000)
+
+            depth = self.queue.qsize()
+            self.total_depth += depth
+            if depth > self.max_depth:
+                self.max_depth = depth
+            # Marca de envío para medir la latencia de extremo a extremo
+            item['replay_sent_ns'] = time.perf_counter_ns()
+            await self.queue.put(item)
+            self.published += 1
+
+        self.elapsed_s = time.perf_counter() - started
+        return self.published
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Mensajes publicados, profundidad de la cola y retraso respecto al horario grabado"""
+        return {
+            'published': self.published,
+            'publish_elapsed_s': round(self.elapsed_s, 4),
+            'queue_depth_max': self.max_depth,
+            'queue_depth_mean': round(self.total_depth / self.published, 2) if self.published else 0.0,
+            'max_schedule_lag_ms': round(self.max_schedule_lag_ms, 3)
+        }
+
+
+class ReplayHarness:
+    """
+    Consumidor de la cola que alimenta SignalEngine y TradeExecutor y mide latencias.
+
+    Sigue el reparto de ``ScalpingBot.run_data_consumer``: los tickers van al
+    SignalEngine (como mensaje de OKX, que es lo que espera ``process_data``)
+    y, si se pasa un ``data_saver`` (HistoricalDataSaver), cada mensaje se
+    guarda igual que en el bot. Las señales se envían al TradeExecutor.
+    """
+
+    def __init__(self, instrument_id: str, queue: Optional[asyncio.Queue] = None,
+                 signal_engine=None, trade_executor=None, data_saver=None,
+                 buffer_size: int = 50):
+        """
+        Args:
+            instrument_id: Instrumento que procesa el SignalEngine (p. ej. 'SOL-USDT')
+            queue: Cola de datos (por defecto, api_client.modulocola.data_queue)
+            signal_engine: SignalEngine a usar (por defecto, uno nuevo conectado al ejecutor)
+            trade_executor: TradeExecutor a usar (por defecto, uno nuevo)
+            data_saver: HistoricalDataSaver opcional (ya conectado)
+            buffer_size: Tamaño del buffer del SignalEngine creado por defecto
+        """
+        from core.signal_engine import SignalEngine
+        from core.trade_executor import TradeExecutor
+
+        if queue is None:
+            from api_client.modulocola import data_queue
+            queue = data_queue
+        self.instrument_id = instrument_id
+        self.queue = queue
+        self.trade_executor = trade_executor or TradeExecutor()
+        self.signal_engine = signal_engine or SignalEngine(instrument_id, data_buffer_size=buffer_size)
+        # Las señales pasan por el harness para medir latencias antes de ejecutar la orden
+        self.signal_engine.on_signal_generated = self._on_signal
+        self.data_saver = data_saver
+
+        self._current_sent_ns = 0
+        self._current_ts = None
+        self._digest = hashlib.sha1()
+        self.counts: Dict[str, int] = {}
+        self.dequeue_latencies: List[float] = []
+        self.signal_latencies: List[float] = []
+        self.order_latencies: List[float] = []
+        self.signals = 0
+        self.orders = 0
+        self.errors = 0
+        self.replay: Optional[MarketReplay] = None
+        self.elapsed_s = 0.0
+
+    async def _on_signal(self, signal: str, instrument_id: str, price: float, data_context: Any):
+        """Callback del SignalEngine: mide la latencia y ejecuta la orden simulada"""
+        now = time.perf_counter_ns()
+        self.signals += 1
+        self.signal_latencies.append((now - self._current_sent_ns) / 1e6)
+        self._digest.update(f"{self._current_ts}|{signal}|{price!r};".encode())
+
+        trades_before = len(self.trade_executor.trade_history)
+        await self.trade_executor.execute_order(signal, instrument_id, price, data_context)
+        if len(self.trade_executor.trade_history) > trades_before:
+            self.orders += 1
+            self.order_latencies.append((time.perf_counter_ns() - self._current_sent_ns) / 1e6)
+
+    async def _handle(self, data: Dict[str, Any]):
+        """Reparte un elemento de la cola como lo hace el bot"""
+        kind = data.get('type')
+        if kind == 'ticker':
+            self._current_ts = data.get('timestamp')
+            await self.signal_engine.process_data({
+                'arg': {'channel': 'tickers', 'instId': data.get('instrument')},
+                'data': data.get('data')
+            })
+            if self.data_saver is not None:
+                await self.data_saver.save_ticker_data(data)
+        elif kind is not None and kind.startswith('books'):
+            if self.data_saver is not None:
+                await self.data_saver.save_order_book_data(data)
+        elif kind == 'candle':
+            if self.data_saver is not None:
+                await self.data_saver.save_candlestick_data(data)
+
+    async def consume(self):
+        """Consume la cola hasta que se cancela la tarea"""
+        while True:
+            data = await self.queue.get()
+            try:
+                sent_ns = data.get('replay_sent_ns')
+                if sent_ns is not None:
+                    self._current_sent_ns = sent_ns
+                    self.dequeue_latencies.append((time.perf_counter_ns() - sent_ns) / 1e6)
+                kind = data.get('type', 'unknown')
+                self.counts[kind] = self.counts.get(kind, 0) + 1
+                await self._handle(data)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error al procesar mensaje reproducido: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def run(self, messages: Iterable[RecordedMessage], speed: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Reproduce los mensajes y espera a que el consumidor los procese todos
+
+        Args:
+            messages: Mensajes (timestamp_ms, elemento) en orden de llegada
+            speed: Factor de velocidad respecto al tiempo real (None = máxima)
+
+        Returns:
+            Dict[str, Any]: Informe de la reproducción (ver ``report``)
+        """
+        self.replay = MarketReplay(messages, self.queue, speed)
+        consumer = asyncio.create_task(self.consume())
+        started = time.perf_counter()
+        try:
+            await self.replay.run()
+            await self.queue.join()
+        finally:
+            consumer.cancel()
+            try:
+                await consumer
+            except asyncio.CancelledError:
+                pass
+        self.elapsed_s = time.perf_counter() - started
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Informe de la reproducción
+
+        Returns:
+            Dict[str, Any]: Mensajes por tipo, ritmo, señales y órdenes, percentiles
+            de latencia (cola, señal y orden), profundidad de cola y estado del ejecutor
+        """
+        processed = sum(self.counts.values())
+        report = {
+            'messages': processed,
+            'messages_by_type': dict(sorted(self.counts.items())),
+            'elapsed_s': round(self.elapsed_s, 4),
+            'messages_per_s': round(processed / self.elapsed_s, 1) if self.elapsed_s else 0.0,
+            'signals': self.signals,
+            'orders': self.orders,
+            'errors': self.errors,
+            'signals_digest': self._digest.hexdigest()
+        }
+        if self.replay is not None:
+            report.update(self.replay.get_metrics())
+        report.update(_latency_summary(self.dequeue_latencies, 'queue'))
+        report.update(_latency_summary(self.signal_latencies, 'signal'))
+        report.update(_latency_summary(self.order_latencies, 'order'))
+        status = self.trade_executor.get_status()
+        report['final_balance'] = round(status['balance'], 6)
+        report['total_trades'] = status['total_trades']
+        return report
+
+
+async def replay_to_pipeline(messages: Iterable[RecordedMessage], instrument_id: str,
+                             speed: Optional[float] = None, queue: Optional[asyncio.Queue] = None,
+                             data_saver=None) -> Dict[str, Any]:
+    """
+    Reproduce mensajes grabados sobre un SignalEngine y TradeExecutor nuevos
+
+    Args:
+        messages: Mensajes (timestamp_ms, elemento) en orden de llegada
+        instrument_id: Instrumento del SignalEngine
+        speed: Factor de velocidad respecto al tiempo real (None = máxima)
+        queue: Cola de datos (por defecto, api_client.modulocola.data_queue)
+        data_saver: HistoricalDataSaver opcional (ya conectado)
+
+    Returns:
+        Dict[str, Any]: Informe de ReplayHarness.report
+    """
+    harness = ReplayHarness(instrument_id, queue=queue, data_saver=data_saver)
+    return await harness.run(messages, speed=speed)
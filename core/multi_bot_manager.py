@@ -10,15 +10,19 @@ con su propio capital inicial simulado.
 import os
 import sys
 import json
+import inspect
 import logging
 import threading
 import time
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any, Optional, Union, Tuple
 from concurrent.futures import ThreadPoolExecutor
 
+from core.ledger import TradeLedger
+from core.market_data_hub import MarketDataHub, FeedSubscription
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,7 +43,8 @@ class BotInstance:
                initial_balance: float = 100.0,
                leverage: int = 1,
                market_type: str = "spot",
-               params: Dict[str, Any] = None):
+               params: Dict[str, Any] = None,
+               hub: Optional[MarketDataHub] = None):
         """
         Inicializa una instancia de bot.
         
@@ -52,6 +57,9 @@ class BotInstance:
             leverage: Apalancamiento (solo para futuros)
             market_type: Tipo de mercado ("spot" o "futures")
             params: Parámetros específicos de la estrategia
+            hub: Hub de datos de mercado compartido. Con hub, el bot se
+                suscribe al feed de (symbol, timeframe) y se despierta con
+                cada actualización; sin hub, consulta por REST periódicamente.
         """
         self.bot_id = bot_id
         self.strategy_name = strategy_name
@@ -75,6 +83,11 @@ class BotInstance:
         # Historial de operaciones
         self.trades = []
         
+        # Operaciones cerradas en columnas y comisiones pagadas (entradas y salidas),
+        # acumuladas al registrar cada operación
+        self.ledger = TradeLedger(initial_balance, extra_columns=("entry_fees",))
+        self.fees_paid = 0.0
+        
         # Métricas de rendimiento
         self.metrics = {
             "win_rate": 0.0,
@@ -93,6 +106,11 @@ class BotInstance:
         # Thread para ejecución del bot
         self.thread = None
         self.stop_event = threading.Event()
+        
+        # Datos de mercado compartidos y objeto de estrategia (se crea una vez)
+        self.hub = hub
+        self.subscription: Optional[FeedSubscription] = None
+        self._strategy_impl = None
     
     def start(self):
         """Inicia la ejecución del bot en un hilo separado."""
@@ -105,6 +123,10 @@ class BotInstance:
         self.last_update_time = self.start_time
         self.error = None
         
+        # Suscribirse al feed compartido antes de arrancar el hilo
+        if self.hub is not None:
+            self.subscription = self.hub.subscribe(self.bot_id, self.symbol, self.timeframe)
+        
         # Iniciar hilo
         self.stop_event.clear()
         self.thread = threading.Thread(target=self._run)
@@ -124,6 +146,10 @@ class BotInstance:
         if self.thread:
             self.thread.join(timeout=5.0)
         
+        if self.hub is not None:
+            self.hub.unsubscribe(self.bot_id)
+            self.subscription = None
+        
         self.running = False
         logger.info(f"Bot {self.bot_id} detenido")
         return True
@@ -133,23 +159,22 @@ class BotInstance:
         try:
             while not self.stop_event.is_set():
                 # Obtener datos de mercado actualizados
-                market_data = self._get_market_data()
+                if self.subscription is not None:
+                    market_data = self._wait_market_data()
+                    if market_data is None:
+                        continue
+                else:
+                    market_data = self._get_market_data()
                 
                 # Ejecutar estrategia
                 signal = self._execute_strategy(market_data)
                 
-                # Procesar señal de trading
-                if signal:
-                    self._process_signal(signal, market_data)
-                
-                # Actualizar posiciones existentes
-                self._update_positions(market_data)
+                # Procesar señal, posiciones y métricas
+                self._apply_market_data(market_data, signal)
                 
-                # Calcular métricas
-                self._calculate_metrics()
-                
-                # Actualizar timestamp
-                self.last_update_time = datetime.now()
+                # Con hub, la siguiente iteración la marca el feed
+                if self.subscription is not None:
+                    continue
                 
                 # Simular velocidad real
                 if self.timeframe == "1m":
@@ -166,6 +191,65 @@ class BotInstance:
             self.running = False
             logger.error(f"Error en bot {self.bot_id}: {e}")
     
+    def _apply_market_data(self, market_data: Dict[str, Any], signal: Optional[Dict[str, Any]]):
+        """
+        Aplica el resultado de una evaluación de la estrategia.
+        
+        Args:
+            market_data: Datos de mercado con los que se evaluó la estrategia
+            signal: Señal de trading o None
+        """
+        # Procesar señal de trading
+        if signal:
+            self._process_signal(signal, market_data)
+        
+        # Actualizar posiciones existentes
+        self._update_positions(market_data)
+        
+        # Calcular métricas
+        self._calculate_metrics()
+        
+        # Actualizar timestamp
+        self.last_update_time = datetime.now()
+    
+    @staticmethod
+    def _market_data_from_snapshot(snapshot: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Convierte un snapshot del hub al formato de _get_market_data.
+        
+        Args:
+            snapshot: Snapshot de MarketFeed (o None)
+            
+        Returns:
+            Optional[Dict[str, Any]]: Datos de mercado, o None si el feed aún no
+            tiene precio
+        """
+        if snapshot is None or snapshot["current_price"] is None:
+            return None
+        
+        # Las estrategias añaden columnas al DataFrame: trabajar sobre una copia
+        df = snapshot["dataframe"]
+        return {
+            "dataframe": df.copy() if df is not None else None,
+            "current_price": snapshot["current_price"],
+            "orderbook": snapshot["orderbook"],
+            "timestamp": snapshot["timestamp"],
+            "bar_closed": snapshot["bar_closed"]
+        }
+    
+    def _wait_market_data(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        """
+        Espera la siguiente actualización del feed compartido.
+        
+        Args:
+            timeout: Segundos máximos de espera (para poder atender stop())
+            
+        Returns:
+            Optional[Dict[str, Any]]: Datos de mercado con el formato de
+            _get_market_data, o None si no hubo datos nuevos utilizables
+        """
+        return self._market_data_from_snapshot(self.subscription.wait(timeout))
+    
     def _get_market_data(self) -> Dict[str, Any]:
         """
         Obtiene datos de mercado para el símbolo y timeframe.
@@ -251,6 +335,28 @@ class BotInstance:
         # Valor por defecto
         return 100.0
     
+    def _get_strategy_impl(self):
+        """
+        Devuelve el objeto que implementa la estrategia, creándolo la primera vez.
+        
+        Returns:
+            ScalpingStrategies, IndicatorWeighting o None si la estrategia no lo necesita
+        """
+        if self._strategy_impl is None:
+            if self.strategy_name in ("breakout_scalping", "momentum_scalping", "mean_reversion"):
+                from scalping_strategies import ScalpingStrategies
+                
+                # Los parámetros del bot incluyen claves propias (trailing_stop_pct,
+                # rsi_period...): pasar sólo las que acepta el constructor
+                accepted = inspect.signature(ScalpingStrategies.__init__).parameters
+                self._strategy_impl = ScalpingStrategies(
+                    **{k: v for k, v in self.params.items() if k in accepted})
+            elif self.strategy_name == "ml_adaptive":
+                # Importar aquí para evitar dependencias circulares
+                from indicator_weighting import IndicatorWeighting
+                self._strategy_impl = IndicatorWeighting()
+        return self._strategy_impl
+    
     def _execute_strategy(self, market_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         Ejecuta la estrategia configurada.
@@ -268,38 +374,29 @@ class BotInstance:
         
         # Obtener la estrategia adecuada
         if self.strategy_name == "breakout_scalping":
-            from scalping_strategies import ScalpingStrategies
-            
-            # Crear instancia de estrategia con parámetros
-            scalper = ScalpingStrategies(**self.params)
+            # Instancia de estrategia con parámetros (reutilizada entre iteraciones)
+            scalper = self._get_strategy_impl()
             
             # Ejecutar estrategia
             return scalper.breakout_scalping_strategy(df, market_data.get("orderbook"))
             
         elif self.strategy_name == "momentum_scalping":
-            from scalping_strategies import ScalpingStrategies
-            
-            # Crear instancia de estrategia con parámetros
-            scalper = ScalpingStrategies(**self.params)
+            # Instancia de estrategia con parámetros (reutilizada entre iteraciones)
+            scalper = self._get_strategy_impl()
             
             # Ejecutar estrategia
             return scalper.momentum_scalping_strategy(df)
             
         elif self.strategy_name == "mean_reversion":
-            from scalping_strategies import ScalpingStrategies
-            
-            # Crear instancia de estrategia con parámetros
-            scalper = ScalpingStrategies(**self.params)
+            # Instancia de estrategia con parámetros (reutilizada entre iteraciones)
+            scalper = self._get_strategy_impl()
             
             # Ejecutar estrategia
             return scalper.mean_reversion_scalping(df)
             
         elif self.strategy_name == "ml_adaptive":
-            # Importar aquí para evitar dependencias circulares
-            from indicator_weighting import IndicatorWeighting
-            
-            # Crear instancia de ponderación adaptativa
-            weighting = IndicatorWeighting()
+            # Instancia de ponderación adaptativa (reutilizada entre iteraciones)
+            weighting = self._get_strategy_impl()
             
             # Obtener predicción
             prediction = weighting.get_prediction_summary(df)
@@ -430,7 +527,7 @@ class BotInstance:
         }
         
         # Registrar operación en el historial
-        self.trades.append({
+        self._record_trade({
             "id": f"T{len(self.trades) + 1}",
             "symbol": self.symbol,
             "side": "BUY",
@@ -497,7 +594,7 @@ class BotInstance:
         }
         
         # Registrar operación en el historial
-        self.trades.append({
+        self._record_trade({
             "id": f"T{len(self.trades) + 1}",
             "symbol": self.symbol,
             "side": "SELL",
@@ -596,7 +693,7 @@ class BotInstance:
             self.current_balance += (margin + pnl - commission)
         
         # Registrar operación en el historial
-        self.trades.append({
+        self._record_trade({
             "id": f"T{len(self.trades) + 1}",
             "symbol": self.symbol,
             "side": "SELL" if self.position["side"] == "long" else "BUY",
@@ -613,81 +710,69 @@ class BotInstance:
             "pnl_percent": pnl / entry_value * 100 if entry_value > 0 else 0,
             "duration_hours": duration_hours,
             "exit_reason": reason
-        })
+        }, entry_fees=self.position.get("entry_commission", 0))
         
         logger.info(f"Bot {self.bot_id}: Posición {self.position['side'].upper()} cerrada a ${price:.2f}, PnL: ${pnl:.2f}")
         
         # Limpiar posición actual
         self.position = None
     
-    def _calculate_metrics(self):
-        """Calcula métricas de rendimiento actualizadas."""
-        # Si no hay trades, no hay métricas que calcular
-        if not self.trades:
-            return
+    def _record_trade(self, trade: Dict[str, Any], entry_fees: float = 0.0):
+        """
+        Añade una operación al historial y actualiza los acumuladores.
         
-        # Filtrar sólo operaciones de salida (que tienen PnL)
-        exit_trades = [t for t in self.trades if t.get("trade_type") == "EXIT"]
+        Args:
+            trade: Operación (ENTRY o EXIT)
+            entry_fees: Comisión de entrada de la posición (sólo en EXIT)
+        """
+        self.trades.append(trade)
+        self.fees_paid += trade.get("commission", 0)
+        if trade.get("trade_type") == "EXIT":
+            self.ledger.record(trade.get("pnl", 0), fees=trade.get("commission", 0),
+                               timestamp=trade["timestamp"], entry_fees=entry_fees)
+    
+    def _calculate_metrics(self):
+        """Calcula métricas de rendimiento actualizadas (O(1), desde el registro de operaciones)."""
+        ledger = self.ledger
         
-        if not exit_trades:
+        # Sin operaciones cerradas no hay métricas que calcular
+        if ledger.trades == 0:
             return
         
-        # Calcular métricas básicas
-        total_trades = len(exit_trades)
-        profitable_trades = sum(1 for t in exit_trades if t.get("pnl", 0) > 0)
-        losing_trades = total_trades - profitable_trades
-        
-        win_rate = profitable_trades / total_trades if total_trades > 0 else 0
-        
-        # Calcular ganancias y pérdidas totales
-        total_profit = sum(t.get("pnl", 0) for t in exit_trades if t.get("pnl", 0) > 0)
-        total_loss = sum(abs(t.get("pnl", 0)) for t in exit_trades if t.get("pnl", 0) < 0)
-        
-        # Calcular profit factor
-        profit_factor = total_profit / total_loss if total_loss > 0 else float('inf')
-        
-        # Calcular ganancia/pérdida promedio por operación
-        avg_profit_per_trade = sum(t.get("pnl", 0) for t in exit_trades) / total_trades if total_trades > 0 else 0
-        
-        # Calcular comisiones totales
-        total_fees = sum(t.get("commission", 0) for t in self.trades)
-        
-        # Calcular ROI (Return On Investment)
-        roi = (self.current_balance / self.initial_balance - 1) * 100
-        
-        # Calcular drawdown
-        balances = [self.initial_balance]
-        current_balance = self.initial_balance
-        
-        for trade in exit_trades:
-            # Sumar el PnL y restar la comisión
-            pnl = trade.get("pnl", 0)
-            commission = trade.get("commission", 0)
-            current_balance += pnl - commission
-            balances.append(current_balance)
-        
-        # Calcular drawdown como la mayor caída desde un pico
-        peak = self.initial_balance
-        max_drawdown = 0
-        
-        for balance in balances:
-            peak = max(peak, balance)
-            drawdown = (peak - balance) / peak * 100
-            max_drawdown = max(max_drawdown, drawdown)
+        total_trades = ledger.trades
         
         # Actualizar diccionario de métricas
         self.metrics = {
-            "win_rate": win_rate * 100,  # En porcentaje
-            "profit_factor": profit_factor,
-            "avg_profit_per_trade": avg_profit_per_trade,
-            "max_drawdown": max_drawdown,
+            "win_rate": ledger.win_rate * 100,  # En porcentaje
+            "profit_factor": ledger.profit_factor,
+            "avg_profit_per_trade": ledger.total_pnl / total_trades,
+            # Mayor caída desde un pico del balance realizado (PnL - comisión de salida)
+            "max_drawdown": ledger.max_drawdown_pct,
             "total_trades": total_trades,
-            "profitable_trades": profitable_trades,
-            "losing_trades": losing_trades,
-            "total_profit": total_profit,
-            "total_loss": total_loss,
-            "total_fees": total_fees,
-            "roi": roi
+            "profitable_trades": ledger.wins,
+            "losing_trades": ledger.losses,
+            "total_profit": ledger.gross_profit,
+            "total_loss": ledger.gross_loss,
+            "total_fees": self.fees_paid,
+            "roi": (self.current_balance / self.initial_balance - 1) * 100
+        }
+    
+    def get_performance(self) -> Dict[str, Any]:
+        """
+        Obtiene las métricas del bot sin el resto del estado (para agregados e informes).
+        
+        Returns:
+            Dict[str, Any]: Balance, métricas globales y métricas de 1, 7 y 30 días
+        """
+        self._calculate_metrics()
+        return {
+            "running": self.running,
+            "initial_balance": self.initial_balance,
+            "current_balance": self.current_balance,
+            "metrics": self.metrics,
+            "daily_metrics": self._calculate_period_metrics(1),
+            "weekly_metrics": self._calculate_period_metrics(7),
+            "monthly_metrics": self._calculate_period_metrics(30)
         }
     
     def get_state(self) -> Dict[str, Any]:
@@ -697,16 +782,12 @@ class BotInstance:
         Returns:
             Dict[str, Any]: Estado completo del bot
         """
-        # Calcular métricas antes de retornar
-        self._calculate_metrics()
-        
-        # Ordenar trades más recientes primero
-        sorted_trades = sorted(self.trades, key=lambda t: t.get("timestamp", ""), reverse=True)
+        # Calcular métricas globales, diarias, semanales y mensuales
+        performance = self.get_performance()
         
-        # Calcular métricas diarias y mensuales
-        daily_metrics = self._calculate_period_metrics(1)
-        weekly_metrics = self._calculate_period_metrics(7)
-        monthly_metrics = self._calculate_period_metrics(30)
+        # Las operaciones se añaden en orden cronológico: las 10 más recientes
+        # son las últimas, de la más nueva a la más antigua
+        recent_trades = sorted(self.trades[-10:], key=lambda t: t.get("timestamp", ""), reverse=True)
         
         # Calcular comisión como porcentaje de la ganancia
         fee_to_profit_ratio = 0
@@ -729,10 +810,10 @@ class BotInstance:
             "last_update": self.last_update_time.isoformat() if self.last_update_time else None,
             "error": self.error,
             "metrics": self.metrics,
-            "daily_metrics": daily_metrics,
-            "weekly_metrics": weekly_metrics,
-            "monthly_metrics": monthly_metrics,
-            "recent_trades": sorted_trades[:10],  # Solo las 10 operaciones más recientes
+            "daily_metrics": performance["daily_metrics"],
+            "weekly_metrics": performance["weekly_metrics"],
+            "monthly_metrics": performance["monthly_metrics"],
+            "recent_trades": recent_trades,  # Solo las 10 operaciones más recientes
             "fee_impact": {
                 "fee_to_profit_ratio": fee_to_profit_ratio,
                 "avg_fee_per_trade": self.metrics["total_fees"] / self.metrics["total_trades"] if self.metrics["total_trades"] > 0 else 0
@@ -749,20 +830,14 @@ class BotInstance:
         Returns:
             Dict[str, Any]: Métricas del período
         """
-        # Calcular la fecha de inicio del período
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # Filtrar trades del período
-        period_exit_trades = [
-            t for t in self.trades 
-            if t.get("trade_type") == "EXIT" and 
-               datetime.fromisoformat(t.get("timestamp", datetime.now().isoformat())) >= start_date
-        ]
+        # Operaciones cerradas en el período (búsqueda binaria por tiempo de cierre)
+        period = self.ledger.window(days)
         
         # Si no hay trades en el período, retornar valores por defecto
-        if not period_exit_trades:
+        if period["trades"] == 0:
             return {
                 "total_trades": 0,
+                "profitable_trades": 0,
                 "win_rate": 0,
                 "profit": 0,
                 "profit_percent": 0,
@@ -771,25 +846,14 @@ class BotInstance:
             }
         
         # Calcular métricas del período
-        total_trades = len(period_exit_trades)
-        profitable_trades = sum(1 for t in period_exit_trades if t.get("pnl", 0) > 0)
-        
-        win_rate = profitable_trades / total_trades if total_trades > 0 else 0
-        
-        # Sumar PnL y comisiones
-        total_pnl = sum(t.get("pnl", 0) for t in period_exit_trades)
+        total_trades = period["trades"]
+        profitable_trades = period["wins"]
         
-        # Incluir también comisiones de entrada
-        entry_trade_ids = [t.get("position_id") for t in period_exit_trades]
-        period_entry_trades = [
-            t for t in self.trades 
-            if t.get("trade_type") == "ENTRY" and t.get("position_id") in entry_trade_ids
-        ]
+        win_rate = profitable_trades / total_trades
         
-        # Calcular comisiones totales
-        entry_fees = sum(t.get("commission", 0) for t in period_entry_trades)
-        exit_fees = sum(t.get("commission", 0) for t in period_exit_trades)
-        total_fees = entry_fees + exit_fees
+        # PnL y comisiones (de salida y de entrada de esas mismas posiciones)
+        total_pnl = period["pnl"]
+        total_fees = period["entry_fees"] + period["fees"]
         
         # Calcular ganancia neta
         net_profit = total_pnl - total_fees
@@ -804,6 +868,7 @@ class BotInstance:
         
         return {
             "total_trades": total_trades,
+            "profitable_trades": profitable_trades,
             "win_rate": win_rate * 100,  # En porcentaje
             "profit": net_profit,
             "profit_percent": period_roi,
@@ -816,15 +881,18 @@ class MultiBotManager:
     Gestor de múltiples instancias de bots de trading.
     """
     
-    def __init__(self, config_file: str = None):
+    def __init__(self, config_file: str = None, hub: Optional[MarketDataHub] = None):
         """
         Inicializa el gestor de bots.
         
         Args:
             config_file: Archivo de configuración (opcional)
+            hub: Hub de datos de mercado compartido por todos los bots
+                (opcional; sin hub cada bot consulta por REST)
         """
         self.bots: Dict[str, BotInstance] = {}
         self.config_file = config_file
+        self.hub = hub
         
         # Cargar configuración si existe
         if config_file and os.path.exists(config_file):
@@ -944,7 +1012,8 @@ class MultiBotManager:
             initial_balance=initial_balance,
             leverage=leverage,
             market_type=market_type,
-            params=params
+            params=params,
+            hub=self.hub
         )
         
         # Agregar al diccionario de bots
@@ -1109,8 +1178,8 @@ class MultiBotManager:
                 }
             }
         
-        # Obtener estado de todos los bots
-        all_status = self.get_all_bots_status()
+        # Métricas de todos los bots (sin construir su estado completo)
+        all_status = {bot_id: bot.get_performance() for bot_id, bot in self.bots.items()}
         
         # Calcular métricas combinadas
         total_bots = len(all_status)
@@ -1165,8 +1234,7 @@ class MultiBotManager:
         
         if daily_trades > 0:
             daily_profitable_trades = sum(
-                int(status.get("daily_metrics", {}).get("win_rate", 0) * status.get("daily_metrics", {}).get("total_trades", 0) / 100)
-                for status in all_status.values()
+                status.get("daily_metrics", {}).get("profitable_trades", 0) for status in all_status.values()
             )
             daily_win_rate = daily_profitable_trades / daily_trades * 100
         
@@ -1180,8 +1248,7 @@ class MultiBotManager:
         
         if monthly_trades > 0:
             monthly_profitable_trades = sum(
-                int(status.get("monthly_metrics", {}).get("win_rate", 0) * status.get("monthly_metrics", {}).get("total_trades", 0) / 100)
-                for status in all_status.values()
+                status.get("monthly_metrics", {}).get("profitable_trades", 0) for status in all_status.values()
             )
             monthly_win_rate = monthly_profitable_trades / monthly_trades * 100
         
@@ -1226,6 +1293,43 @@ class MultiBotManager:
             }
         }
     
+    def get_market_data_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas del hub de datos de mercado: feeds, latencia de reparto y
+        retraso de cada bot.
+        
+        Returns:
+            Dict[str, Any]: Métricas de MarketDataHub.get_metrics o {} sin hub
+        """
+        if self.hub is None:
+            return {}
+        return self.hub.get_metrics()
+    
+    def create_async_runtime(self, max_workers: int = 4,
+                             bot_ids: Optional[List[str]] = None):
+        """
+        Crea un runtime asyncio con los bots del gestor (alternativa a un hilo por bot).
+        
+        Args:
+            max_workers: Evaluaciones de estrategia simultáneas
+            bot_ids: Bots a incluir (por defecto todos)
+            
+        Returns:
+            AsyncBotRuntime: Runtime sin arrancar (ver AsyncBotRuntime.run),
+            o None si el gestor no tiene hub de datos
+        """
+        if self.hub is None:
+            logger.error("El runtime asyncio necesita un MarketDataHub")
+            return None
+        
+        from core.async_bot_runtime import AsyncBotRuntime
+        
+        runtime = AsyncBotRuntime(self.hub, max_workers=max_workers)
+        for bot_id in (bot_ids if bot_ids is not None else list(self.bots.keys())):
+            if bot_id in self.bots:
+                runtime.add_bot(self.bots[bot_id])
+        return runtime
+    
     def create_standard_bot_set(self, symbol: str = "SOL-USDT") -> Dict[str, str]:
         """
         Crea un conjunto estándar de bots para diferentes estrategias y timeframes.
@@ -1357,17 +1461,19 @@ class MultiBotManager:
             "max_position_size_pct": 50.0
         }
 
-def get_multi_bot_manager(config_file: str = "data/multi_bot_config.json") -> MultiBotManager:
+def get_multi_bot_manager(config_file: str = "data/multi_bot_config.json",
+                          hub: Optional[MarketDataHub] = None) -> MultiBotManager:
     """
     Función de conveniencia para obtener una instancia del gestor de bots.
     
     Args:
         config_file: Archivo de configuración
+        hub: Hub de datos de mercado compartido (opcional)
         
     Returns:
         MultiBotManager: Instancia del gestor de bots
     """
-    return MultiBotManager(config_file)
+    return MultiBotManager(config_file, hub=hub)
 
 def demo_multi_bot_manager():
     """Demostración del gestor de múltiples bots."""
@@ -17,10 +17,12 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Tuple, Optional, Union, Callable
 
 from risk_management.fee_calculator import FeeCalculator, calculate_trade_costs
-from data_management.market_data import get_market_data, update_market_data
 
 logger = logging.getLogger("ShortTrading")
 
+# Margen de mantenimiento usado para aproximar el precio de liquidación
+MAINTENANCE_MARGIN = 0.05  # 5% típico
+
 class ShortPosition:
     """Clase para representar una posición corta"""
     
@@ -85,19 +87,20 @@ class ShortPosition:
             return float('inf')
         
         # Margen de mantenimiento (varía por exchange)
-        maintenance_margin = 0.05  # 5% típico
+        maintenance_margin = MAINTENANCE_MARGIN
         
         # Aproximación: entry_price * (1 + 1/(leverage * (1 - maintenance_margin)))
         liquidation_price = self.entry_price * (1 + 1/(self.leverage * (1 - maintenance_margin)))
         
         return liquidation_price
     
-    def update_fees(self, current_price: float) -> float:
+    def update_fees(self, current_price: float, current_time: Optional[datetime] = None) -> float:
         """
         Actualiza el cálculo de comisiones de financiamiento
         
         Args:
             current_price: Precio actual del activo
+            current_time: Timestamp actual (default=ahora; en simulación, el de la vela)
             
         Returns:
             float: Nuevas comisiones de financiamiento acumuladas
@@ -106,7 +109,7 @@ class ShortPosition:
             return self.funding_fees
         
         # Calcular tiempo transcurrido en horas
-        now = datetime.now()
+        now = current_time if current_time is not None else datetime.now()
         hours_passed = (now - self.entry_time).total_seconds() / 3600
         
         # Calcular comisiones de financiamiento
@@ -117,20 +120,22 @@ class ShortPosition:
         
         return self.funding_fees
     
-    def calculate_pnl(self, current_price: float, include_fees: bool = True) -> Dict[str, float]:
+    def calculate_pnl(self, current_price: float, include_fees: bool = True,
+                      current_time: Optional[datetime] = None) -> Dict[str, float]:
         """
         Calcula el P&L actual o final de la posición
         
         Args:
             current_price: Precio actual o de salida
             include_fees: Si se deben incluir las comisiones en el cálculo
+            current_time: Timestamp actual para el financiamiento (default=ahora)
             
         Returns:
             Dict[str, float]: Información de P&L
         """
         # Actualizar comisiones si la posición está abierta
         if self.is_open:
-            self.update_fees(current_price)
+            self.update_fees(current_price, current_time)
         
         # Para posiciones cortas, el P&L es positivo cuando el precio baja
         price_diff = self.entry_price - current_price
@@ -259,6 +264,220 @@ class ShortPosition:
         
         return (False, "")
 
+def funding_fee_array(fee_calculator: FeeCalculator, trade_type: str, position_value: float,
+                      hours: np.ndarray, leverage: float = 1.0) -> np.ndarray:
+    """
+    Versión vectorizada de FeeCalculator.calculate_funding_fee para una posición
+    
+    Args:
+        fee_calculator: Calculadora con el calendario de financiamiento del exchange
+        trade_type: Tipo de mercado ("futures", "margin")
+        position_value: Valor de la posición a precio de entrada (USDT)
+        hours: Horas transcurridas desde la entrada (una por vela)
+        leverage: Apalancamiento
+        
+    Returns:
+        np.ndarray: Financiamiento acumulado en cada instante
+    """
+    hours = np.asarray(hours, dtype=np.float64)
+    
+    if trade_type == "futures":
+        # Se cobra por intervalo completo o empezado
+        schedule = fee_calculator.fee_structure["futures"]
+        intervals = np.ceil(hours / schedule["funding_interval_hours"])
+        return position_value * (schedule["avg_funding_rate"] * intervals)
+    
+    if trade_type == "margin":
+        # Interés por hora sobre el monto prestado
+        hourly_rate = fee_calculator.fee_structure["margin"]["hourly_interest"]
+        borrowed_amount = position_value * (leverage - 1) / leverage if leverage > 1 else 0
+        return borrowed_amount * hourly_rate * hours
+    
+    return np.zeros_like(hours)
+
+def _first_crossing(close: np.ndarray, start: int, stop: int, upper: float, lower: float) -> int:
+    """
+    Primera vela en [start, stop) con cierre >= upper o <= lower (``stop`` si no hay)
+    
+    Busca en bloques que se duplican, así el coste es proporcional a la
+    duración de la posición y no al total de velas.
+    """
+    chunk = 64
+    pos = start
+    while pos < stop:
+        end = min(pos + chunk, stop)
+        window = close[pos:end]
+        hits = np.flatnonzero((window >= upper) | (window <= lower))
+        if len(hits):
+            return pos + int(hits[0])
+        pos = end
+        chunk *= 2
+    return stop
+
+def simulate_short_positions(close: np.ndarray, signals: np.ndarray, times_ns: np.ndarray,
+                             fee_calculator: FeeCalculator, trade_type: str = "futures",
+                             initial_balance: float = 10000.0, leverage: float = 1.0,
+                             position_size_pct: float = 10.0, stop_loss_pct: Optional[float] = 5.0,
+                             take_profit_pct: Optional[float] = 10.0, start: int = 1) -> Dict[str, Any]:
+    """
+    Núcleo por arrays de ShortTradingSimulator.run_simulation
+    
+    Reproduce las mismas reglas y la misma contabilidad que el camino con
+    objetos ShortPosition: una posición corta como máximo, apertura con señal
+    < 0, cierre por stop loss, take profit o liquidación (en ese orden de
+    prioridad, comprobados antes de la señal de la vela), cierre con señal > 0
+    y cierre forzado en la última vela. El único bucle en Python recorre las
+    operaciones; para cada una se localiza la vela de salida buscando el
+    primer cruce de los niveles de SL/TP/liquidación hasta la siguiente señal
+    de cierre, y el financiamiento y el equity de la posición abierta se
+    calculan de golpe para todas sus velas.
+    
+    Args:
+        close: Precios de cierre
+        signals: Señales (-1, 0, 1) alineadas con ``close`` (NaN = 0)
+        times_ns: Timestamps de las velas en nanosegundos
+        fee_calculator: Calculadora de comisiones del exchange
+        trade_type: Tipo de mercado ("futures", "margin")
+        initial_balance: Balance inicial
+        leverage: Apalancamiento
+        position_size_pct: Tamaño de posición como % del balance
+        stop_loss_pct: Stop loss como % por encima de la entrada (None = sin SL)
+        take_profit_pct: Take profit como % por debajo de la entrada (None = sin TP)
+        start: Primera vela simulada
+        
+    Returns:
+        Dict[str, Any]: Arrays por operación (``entry_idx``, ``exit_idx``,
+        ``exit_reason``, ``size``, ``entry_price``, ``exit_price``,
+        ``entry_fee``, ``funding_fee``, ``exit_fee``, ``pnl_amount``,
+        ``net_pnl``, ``margin``, ``entry_balance``, ``balance``), la curva
+        ``equity`` (una entrada por vela) y ``final_balance``
+    """
+    close = np.asarray(close, dtype=np.float64)
+    signals = np.nan_to_num(np.asarray(signals, dtype=np.float64))
+    times_ns = np.asarray(times_ns, dtype=np.int64)
+    n = len(close)
+    
+    # Las comisiones de un tipo de mercado desconocido se cobran como spot (igual que FeeCalculator)
+    fee_type = trade_type if trade_type in fee_calculator.fee_structure else "spot"
+    taker = fee_calculator.fee_structure[fee_type]["taker"]
+    if leverage > 1:
+        liquidation_factor = 1 + 1/(leverage * (1 - MAINTENANCE_MARGIN))
+    else:
+        liquidation_factor = float('inf')
+    
+    short_bars = np.flatnonzero(signals < 0)
+    cover_bars = np.flatnonzero(signals > 0)
+    
+    trades = {key: [] for key in ('entry_idx', 'exit_idx', 'exit_reason', 'size', 'entry_price',
+                                  'exit_price', 'entry_fee', 'funding_fee', 'exit_fee', 'pnl_amount',
+                                  'net_pnl', 'margin', 'entry_balance', 'balance')}
+    equity = np.empty(n)
+    equity[:start] = initial_balance
+    balance = float(initial_balance)
+    flat_from = start
+    i = start
+    
+    while True:
+        s = int(np.searchsorted(short_bars, i))
+        if s == len(short_bars):
+            break
+        e = int(short_bars[s])
+        price = close[e]
+        size = balance * position_size_pct / 100 / price
+        position_value = size * price
+        margin = position_value / leverage if leverage > 1 else position_value
+        if margin > balance:
+            # Como en run_simulation, se descarta esta señal y se prueba con la siguiente
+            # (con un tamaño del 100% el redondeo depende del precio)
+            logger.warning(f"Balance insuficiente para abrir posición: {margin} > {balance}")
+            i = e + 1
+            continue
+        
+        equity[flat_from:e + 1] = balance
+        entry_fee = size * price * taker
+        balance -= margin
+        entry_balance = balance
+        
+        stop_loss = price * (1 + stop_loss_pct / 100) if stop_loss_pct is not None else None
+        take_profit = price * (1 - take_profit_pct / 100) if take_profit_pct is not None else None
+        liquidation_price = price * liquidation_factor
+        
+        # Salida: primer cruce de SL/TP/liquidación hasta la siguiente señal de cierre
+        c = int(np.searchsorted(cover_bars, e + 1))
+        cover = int(cover_bars[c]) if c < len(cover_bars) else n
+        last = min(cover, n - 1)
+        upper = min(stop_loss if stop_loss is not None else float('inf'), liquidation_price)
+        lower = take_profit if take_profit is not None else float('-inf')
+        k = _first_crossing(close, e + 1, last + 1, upper, lower)
+        
+        if k <= last:
+            x = k
+            if stop_loss is not None and close[x] >= stop_loss:
+                reason = "stop_loss"
+            elif take_profit is not None and close[x] <= take_profit:
+                reason = "take_profit"
+            else:
+                reason = "liquidation"
+            # Tras un cierre automático se puede abrir otra posición en la misma vela
+            i = x
+        elif cover < n:
+            x, reason = cover, "signal"
+            i = cover + 1
+        else:
+            x, reason = n - 1, "end_of_data"
+            i = n
+        
+        # Equity de las velas con la posición abierta (se registra antes de comprobar salidas)
+        marks = close[e + 1:x + 1]
+        hours = (times_ns[e + 1:x + 1] - times_ns[e]) / 1e9 / 3600
+        funding = funding_fee_array(fee_calculator, trade_type, position_value, hours, leverage)
+        unrealized = size * (price - marks) * leverage - (entry_fee + funding + size * marks * taker)
+        equity[e + 1:x + 1] = balance + margin + unrealized
+        
+        exit_price = close[x]
+        hours_held = (times_ns[x] - times_ns[e]) / 1e9 / 3600
+        funding_fee = float(funding_fee_array(fee_calculator, trade_type, position_value, hours_held, leverage))
+        exit_fee = size * exit_price * taker
+        pnl_amount = size * (price - exit_price) * leverage
+        net_pnl = pnl_amount - (entry_fee + funding_fee + exit_fee)
+        balance += margin
+        balance += net_pnl
+        flat_from = x + 1
+        
+        for key, value in (('entry_idx', e), ('exit_idx', x), ('exit_reason', reason), ('size', size),
+                           ('entry_price', price), ('exit_price', exit_price), ('entry_fee', entry_fee),
+                           ('funding_fee', funding_fee), ('exit_fee', exit_fee), ('pnl_amount', pnl_amount),
+                           ('net_pnl', net_pnl), ('margin', margin), ('entry_balance', entry_balance),
+                           ('balance', balance)):
+            trades[key].append(value)
+    
+    equity[flat_from:] = balance
+    
+    result = {}
+    for key, values in trades.items():
+        if key.endswith('_idx'):
+            result[key] = np.asarray(values, dtype=np.int64)
+        elif key == 'exit_reason':
+            result[key] = np.asarray(values, dtype=object)
+        else:
+            result[key] = np.asarray(values, dtype=np.float64)
+    result['equity'] = equity
+    result['final_balance'] = balance
+    return result
+
+def _equity_statistics(equity: np.ndarray) -> Tuple[float, float]:
+    """Máximo drawdown (%) y Sharpe anualizado de una curva de equity (como run_simulation)"""
+    if not len(equity):
+        return float('nan'), float('nan')
+    max_drawdown = float(np.min((equity / np.maximum.accumulate(equity) - 1) * 100))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = equity[1:] / equity[:-1] - 1
+        returns = returns[~np.isnan(returns)]
+        if len(returns) < 2:
+            return max_drawdown, float('nan')
+        sharpe_ratio = float(returns.mean() / returns.std(ddof=1) * (252 ** 0.5))
+    return max_drawdown, sharpe_ratio
+
 class ShortTradingSimulator:
     """Clase para simular operaciones en corto con cálculo de comisiones"""
     
@@ -285,7 +504,8 @@ class ShortTradingSimulator:
         logger.info(f"Simulador de trading en corto inicializado para {symbol} en {exchange} ({trade_type})")
     
     def open_short(self, price: float, size: float, leverage: float = 1.0,
-                 stop_loss_pct: Optional[float] = None, take_profit_pct: Optional[float] = None) -> Dict[str, Any]:
+                 stop_loss_pct: Optional[float] = None, take_profit_pct: Optional[float] = None,
+                 entry_time: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Abre una posición corta
         
@@ -295,6 +515,7 @@ class ShortTradingSimulator:
             leverage: Apalancamiento
             stop_loss_pct: Stop loss como porcentaje por encima del precio de entrada
             take_profit_pct: Take profit como porcentaje por debajo del precio de entrada
+            entry_time: Timestamp de entrada (default=ahora)
             
         Returns:
             Dict[str, Any]: Información de la posición abierta
@@ -317,7 +538,8 @@ class ShortTradingSimulator:
             trade_type=self.trade_type,
             exchange=self.exchange,
             stop_loss=stop_loss,
-            take_profit=take_profit
+            take_profit=take_profit,
+            entry_time=entry_time
         )
         
         # Calcular margen requerido
@@ -329,8 +551,9 @@ class ShortTradingSimulator:
             logger.warning(f"Balance insuficiente para abrir posición: {margin_required} > {self.current_balance}")
             return {"error": "Insufficient balance", "margin_required": margin_required}
         
-        # Restar comisión de entrada del balance
-        self.current_balance -= position.entry_fee
+        # Reservar el margen (se devuelve al cerrar); las comisiones se descuentan
+        # al cerrar, dentro del P&L neto
+        self.current_balance -= margin_required
         
         # Añadir a posiciones abiertas
         self.open_positions.append(position)
@@ -348,13 +571,14 @@ class ShortTradingSimulator:
             "liquidation_price": position.liquidation_price
         }
     
-    def close_short(self, position_id: int, price: float) -> Dict[str, Any]:
+    def close_short(self, position_id: int, price: float, exit_time: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Cierra una posición corta específica
         
         Args:
             position_id: ID de la posición (índice en la lista)
             price: Precio de salida
+            exit_time: Timestamp de salida (default=ahora)
             
         Returns:
             Dict[str, Any]: Resultado del cierre
@@ -369,7 +593,7 @@ class ShortTradingSimulator:
             return {"error": "Position already closed"}
         
         # Cerrar la posición
-        result = position.close_position(price)
+        result = position.close_position(price, exit_time)
         
         # Actualizar balance
         # - Devolver el margen
@@ -389,43 +613,41 @@ class ShortTradingSimulator:
         
         return result
     
-    def check_positions(self, current_price: float) -> List[Dict[str, Any]]:
+    def check_positions(self, current_price: float, current_time: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """
         Verifica todas las posiciones abiertas y cierra las que cumplan condiciones
         
         Args:
             current_price: Precio actual
+            current_time: Timestamp actual (default=ahora)
             
         Returns:
             List[Dict[str, Any]]: Resultados de las posiciones cerradas
         """
         closed_results = []
-        positions_to_remove = []
         
-        for i, position in enumerate(self.open_positions):
+        # close_short saca la posición de open_positions, así que se recorre una copia
+        for position in list(self.open_positions):
             # Comprobar condiciones de salida
-            should_close, reason = position.check_exit_conditions(current_price)
+            should_close, reason = position.check_exit_conditions(current_price, current_time)
             
             if should_close:
                 # Cerrar la posición
-                result = self.close_short(i, current_price)
+                result = self.close_short(self.open_positions.index(position), current_price, current_time)
                 result["close_reason"] = reason
                 closed_results.append(result)
-                positions_to_remove.append(i)
                 
                 logger.info(f"Posición cerrada automáticamente: {reason}")
         
-        # Actualizar lista de posiciones abiertas (eliminar las cerradas)
-        self.open_positions = [p for i, p in enumerate(self.open_positions) if i not in positions_to_remove]
-        
         return closed_results
     
-    def update_all_fees(self, current_price: float) -> float:
+    def update_all_fees(self, current_price: float, current_time: Optional[datetime] = None) -> float:
         """
         Actualiza las comisiones de financiamiento para todas las posiciones abiertas
         
         Args:
             current_price: Precio actual
+            current_time: Timestamp actual (default=ahora)
             
         Returns:
             float: Total de comisiones de financiamiento
@@ -433,7 +655,7 @@ class ShortTradingSimulator:
         total_funding_fees = 0.0
         
         for position in self.open_positions:
-            funding_fee = position.update_fees(current_price)
+            funding_fee = position.update_fees(current_price, current_time)
             total_funding_fees += funding_fee
         
         return total_funding_fees
@@ -484,18 +706,19 @@ class ShortTradingSimulator:
             "pnl_info": pnl_info
         }
     
-    def get_account_summary(self, current_price: float) -> Dict[str, Any]:
+    def get_account_summary(self, current_price: float, current_time: Optional[datetime] = None) -> Dict[str, Any]:
         """
         Obtiene un resumen de la cuenta y todas las posiciones
         
         Args:
             current_price: Precio actual
+            current_time: Timestamp actual para el financiamiento (default=ahora)
             
         Returns:
             Dict[str, Any]: Resumen de la cuenta
         """
         # Actualizar comisiones
-        self.update_all_fees(current_price)
+        self.update_all_fees(current_price, current_time)
         
         # Calcular equity (balance + P&L no realizado)
         unrealized_pnl = 0.0
@@ -503,12 +726,13 @@ class ShortTradingSimulator:
         margin_used = 0.0
         
         for position in self.open_positions:
-            pnl_info = position.calculate_pnl(current_price)
+            pnl_info = position.calculate_pnl(current_price, current_time=current_time)
             unrealized_pnl += pnl_info["net_pnl"]
             position_value += position.size * position.entry_price
             margin_used += pnl_info["margin_used"]
         
-        equity = self.current_balance + unrealized_pnl
+        # El margen reservado sigue siendo de la cuenta
+        equity = self.current_balance + margin_used + unrealized_pnl
         
         # Calcular métricas de rendimiento
         profit_from_closed = sum(p.calculate_pnl(p.exit_price)["net_pnl"] for p in self.closed_positions)
@@ -578,7 +802,7 @@ class ShortTradingSimulator:
             
             # Guardar equity actual
             if self.open_positions:
-                account = self.get_account_summary(current_price)
+                account = self.get_account_summary(current_price, current_time)
                 equity_curve.append(account["equity"])
             else:
                 equity_curve.append(self.current_balance)
@@ -586,9 +810,12 @@ class ShortTradingSimulator:
             # Verificar posiciones abiertas
             if self.open_positions:
                 # Comprobar condiciones de cierre
-                closed = self.check_positions(current_price)
+                closed = self.check_positions(current_price, current_time)
                 if closed:
                     position_open = False
+                    for result in closed:
+                        result["time"] = current_time.isoformat()
+                        result["type"] = "close_short"
                     trades_log.extend(closed)
             
             # Procesar señal para abrir nueva posición corta
@@ -603,7 +830,8 @@ class ShortTradingSimulator:
                     size=size,
                     leverage=leverage,
                     stop_loss_pct=stop_loss_pct,
-                    take_profit_pct=take_profit_pct
+                    take_profit_pct=take_profit_pct,
+                    entry_time=current_time
                 )
                 
                 if "error" not in result:
@@ -619,7 +847,7 @@ class ShortTradingSimulator:
             # Procesar señal para cerrar posición corta
             elif position_open and current_signal > 0:  # Señal de compra para cerrar corto
                 if self.open_positions:
-                    result = self.close_short(0, current_price)  # Cerrar la primera posición
+                    result = self.close_short(0, current_price, current_time)  # Cerrar la primera posición
                     position_open = False
                     result["time"] = current_time.isoformat()
                     result["type"] = "close_short"
@@ -628,7 +856,7 @@ class ShortTradingSimulator:
         # Cerrar posiciones abiertas al final de la simulación
         final_price = data['close'].iloc[-1]
         while self.open_positions:
-            result = self.close_short(0, final_price)
+            result = self.close_short(0, final_price, data.index[-1])
             result["time"] = data.index[-1].isoformat()
             result["type"] = "close_short_final"
             trades_log.append(result)
@@ -671,6 +899,164 @@ class ShortTradingSimulator:
             "trades_log": trades_log,
             "equity_curve": equity_curve
         }
+    
+    def _simulation_arrays(self, data: pd.DataFrame, signals: Union[pd.Series, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Cierres, señales (por posición) y timestamps en ns para el núcleo por arrays"""
+        close = data['close'].to_numpy(dtype=np.float64)
+        signal_values = np.asarray(signals, dtype=np.float64)[:len(close)]
+        times_ns = pd.DatetimeIndex(data.index).as_unit('ns').asi8
+        return close, signal_values, times_ns
+    
+    def _summarize_arrays(self, sim: Dict[str, Any], initial_balance: float) -> Dict[str, Any]:
+        """Estadísticas de run_simulation a partir del resultado de simulate_short_positions"""
+        final_balance = sim['final_balance']
+        max_drawdown, sharpe_ratio = _equity_statistics(sim['equity'][1:])
+        total_fees_per_trade = sim['entry_fee'] + sim['funding_fee'] + sim['exit_fee']
+        total_trades = len(sim['entry_idx'])
+        total_fees = float(total_fees_per_trade.sum())
+        return {
+            "initial_balance": initial_balance,
+            "final_balance": final_balance,
+            "total_return_pct": ((final_balance / initial_balance) - 1) * 100,
+            "max_drawdown_pct": max_drawdown,
+            "sharpe_ratio": sharpe_ratio,
+            "total_trades": total_trades,
+            "win_rate": (np.count_nonzero(sim['net_pnl'] > 0) / total_trades) * 100 if total_trades > 0 else 0,
+            "total_fees": total_fees,
+            "fee_impact_pct": (total_fees / initial_balance) * 100
+        }
+    
+    def run_vectorized_simulation(self, data: pd.DataFrame, strategy_fn: Callable,
+                                  initial_balance: float = 10000.0, leverage: float = 1.0,
+                                  position_size_pct: float = 10.0, stop_loss_pct: float = 5.0,
+                                  take_profit_pct: float = 10.0) -> Dict[str, Any]:
+        """
+        Misma simulación que run_simulation, calculada con simulate_short_positions
+        
+        No crea objetos ShortPosition ni recalcula el resumen de cuenta en cada
+        vela; el registro de operaciones y la curva de equity se reconstruyen
+        a partir de los arrays y coinciden con los de run_simulation. Requiere
+        un índice temporal en ``data``.
+        
+        Args:
+            data: DataFrame con datos históricos (OHLCV)
+            strategy_fn: Función de estrategia que retorna señales (-1, 0, 1)
+            initial_balance: Balance inicial
+            leverage: Apalancamiento
+            position_size_pct: Tamaño de posición como % del balance
+            stop_loss_pct: Stop loss como % por encima del precio de entrada (para shorts)
+            take_profit_pct: Take profit como % por debajo del precio de entrada (para shorts)
+            
+        Returns:
+            Dict[str, Any]: Resultados de la simulación (mismo formato que run_simulation)
+        """
+        close, signal_values, times_ns = self._simulation_arrays(data, strategy_fn(data))
+        sim = simulate_short_positions(
+            close, signal_values, times_ns, self.fee_calculator, self.trade_type,
+            initial_balance=initial_balance, leverage=leverage, position_size_pct=position_size_pct,
+            stop_loss_pct=stop_loss_pct, take_profit_pct=take_profit_pct
+        )
+        
+        # Estado final del simulador (sin posiciones abiertas, como tras run_simulation)
+        self.initial_balance = initial_balance
+        self.current_balance = sim['final_balance']
+        self.open_positions = []
+        self.closed_positions = []
+        
+        index = data.index
+        trades_log = []
+        for k in range(len(sim['entry_idx'])):
+            e, x = int(sim['entry_idx'][k]), int(sim['exit_idx'][k])
+            entry_price, exit_price, size = sim['entry_price'][k], sim['exit_price'][k], sim['size'][k]
+            entry_fee, funding_fee, exit_fee = sim['entry_fee'][k], sim['funding_fee'][k], sim['exit_fee'][k]
+            total_fees = entry_fee + funding_fee + exit_fee
+            notional_value = size * entry_price
+            margin = notional_value / leverage if leverage > 1 else notional_value
+            net_pnl = sim['net_pnl'][k]
+            price_diff = entry_price - exit_price
+            
+            trades_log.append({
+                "time": index[e].isoformat(),
+                "type": "open_short",
+                "price": entry_price,
+                "size": size,
+                "balance": sim['entry_balance'][k]
+            })
+            close_record = {
+                "symbol": self.symbol,
+                "position_type": "short",
+                "entry_price": entry_price,
+                "exit_price": exit_price,
+                "size": size,
+                "leverage": leverage,
+                "entry_time": index[e].isoformat(),
+                "exit_time": index[x].isoformat(),
+                "hours_held": (index[x] - index[e]).total_seconds() / 3600,
+                "entry_fee": entry_fee,
+                "funding_fees": funding_fee,
+                "exit_fee": exit_fee,
+                "total_fees": total_fees,
+                "pnl_info": {
+                    "price_diff": price_diff,
+                    "pnl_amount": sim['pnl_amount'][k],
+                    "pnl_pct": (price_diff / entry_price) * 100 * leverage,
+                    "total_fees": total_fees,
+                    "fee_impact_pct": (total_fees / notional_value) * 100,
+                    "net_pnl": net_pnl,
+                    "net_pnl_pct": (net_pnl / notional_value) * 100,
+                    "roi": (net_pnl / margin) * 100,
+                    "notional_value": notional_value,
+                    "margin_used": margin
+                },
+                "updated_balance": sim['balance'][k]
+            }
+            reason = sim['exit_reason'][k]
+            if reason not in ("signal", "end_of_data"):
+                close_record["close_reason"] = reason
+            close_record["time"] = index[x].isoformat()
+            close_record["type"] = "close_short_final" if reason == "end_of_data" else "close_short"
+            trades_log.append(close_record)
+        
+        results = self._summarize_arrays(sim, initial_balance)
+        results["trades_log"] = trades_log
+        results["equity_curve"] = sim['equity'][1:].tolist()
+        return results
+    
+    def sweep_parameters(self, data: pd.DataFrame, strategy_fn: Callable,
+                         param_grid: List[Dict[str, Any]],
+                         initial_balance: float = 10000.0) -> List[Dict[str, Any]]:
+        """
+        Evalúa muchas combinaciones de apalancamiento/SL/TP/tamaño en una sola llamada
+        
+        Las señales de la estrategia, los precios y los timestamps se preparan una
+        vez y cada combinación se simula con simulate_short_positions. Cada
+        combinación da las mismas estadísticas que run_simulation con esos
+        parámetros (sin trades_log ni equity_curve).
+        
+        Args:
+            data: DataFrame con datos históricos (OHLCV)
+            strategy_fn: Función de estrategia que retorna señales (-1, 0, 1)
+            param_grid: Combinaciones con claves 'leverage', 'stop_loss_pct',
+                'take_profit_pct' y/o 'position_size_pct' (las que falten toman
+                los valores por defecto de run_simulation)
+            initial_balance: Balance inicial
+            
+        Returns:
+            List[Dict[str, Any]]: Parámetros y estadísticas de cada combinación, en el mismo orden
+        """
+        defaults = {'leverage': 1.0, 'position_size_pct': 10.0, 'stop_loss_pct': 5.0, 'take_profit_pct': 10.0}
+        close, signal_values, times_ns = self._simulation_arrays(data, strategy_fn(data))
+        
+        results = []
+        for params in param_grid:
+            config = {**defaults, **params}
+            sim = simulate_short_positions(
+                close, signal_values, times_ns, self.fee_calculator, self.trade_type,
+                initial_balance=initial_balance, **config
+            )
+            results.append({"params": config, **self._summarize_arrays(sim, initial_balance)})
+        
+        return results
 
 def short_trading_example():
     """Ejemplo simple de trading en corto con cálculo de comisiones"""
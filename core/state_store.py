@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Persistencia de estado en JSON con escrituras diferidas y atómicas.
+
+Los componentes de aprendizaje adaptativo (pesos de indicadores, estadísticas
+de patrones, historial de posiciones, monitor de drawdown) guardaban su estado
+completo en disco en cada actualización. Este módulo centraliza esa
+persistencia:
+
+- ``JsonStateStore``: marca el estado como sucio y agrupa las escrituras. Se
+  escribe como mucho una vez cada ``min_interval`` segundos; los cambios que
+  llegan mientras tanto se escriben al vencer el intervalo (temporizador), al
+  llamar a ``flush``/``close`` o al salir del proceso.
+- ``AppendLog``: registro de sólo-añadir en JSON por líneas (.jsonl). Cada
+  entrada nueva es una línea; el archivo se compacta (se reescribe con las
+  últimas ``max_entries``) sólo cuando dobla ese tamaño.
+
+Todas las escrituras completas son atómicas: se escribe un archivo temporal en
+el mismo directorio, se sincroniza y se renombra sobre el destino, así que un
+corte a mitad de escritura nunca deja un JSON truncado.
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger('StateStore')
+
+# Intervalo mínimo por defecto entre dos escrituras del mismo archivo (segundos)
+DEFAULT_SAVE_INTERVAL = 5.0
+# Espera antes de reintentar una escritura fallida (segundos)
+_RETRY_DELAY = 1.0
+
+# Almacenes vivos, para volcarlos al salir del proceso
+_open_stores: 'weakref.WeakSet' = weakref.WeakSet()
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """
+    Escribe un archivo de texto de forma atómica (temporal + rename)
+
+    Args:
+        path: Archivo destino
+        text: Contenido completo
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = None) -> None:
+    """
+    Serializa ``data`` a JSON y lo escribe de forma atómica
+
+    Args:
+        path: Archivo destino
+        data: Objeto serializable
+        indent: Sangría del JSON (None = compacto)
+    """
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+def _copy_document(value: Any) -> Any:
+    """Copia los contenedores de un documento JSON (los escalares se comparten)"""
+    if isinstance(value, dict):
+        return {key: _copy_document(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy_document(item) for item in value]
+    return value
+
+
+def load_json(path: str, default: Any = None) -> Any:
+    """
+    Lee un archivo JSON
+
+    Args:
+        path: Archivo a leer
+        default: Valor si el archivo no existe
+
+    Returns:
+        Any: Contenido del archivo o ``default``
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class JsonStateStore:
+    """
+    Documento JSON con seguimiento de cambios y escrituras agrupadas.
+
+    El propietario aporta ``snapshot``, una función que construye el documento
+    a guardar. N cambios seguidos cuestan una única serialización: cuando la
+    escritura se aplaza, ``mark_dirty`` copia el documento en el hilo del
+    propietario y el temporizador sólo serializa y escribe esa copia (nunca
+    recorre los diccionarios vivos del propietario).
+    """
+
+    def __init__(self, path: str, snapshot: Callable[[], Any],
+                 min_interval: float = DEFAULT_SAVE_INTERVAL,
+                 indent: Optional[int] = None, name: str = None):
+        """
+        Inicializa el almacén
+
+        Args:
+            path: Archivo JSON destino
+            snapshot: Función que devuelve el documento a guardar
+            min_interval: Segundos mínimos entre escrituras (0 = escribir siempre)
+            indent: Sangría del JSON (None = compacto)
+            name: Nombre para los logs (por defecto, el archivo)
+        """
+        self.path = path
+        self.snapshot = snapshot
+        self.min_interval = min_interval
+        self.indent = indent
+        self.name = name or path
+
+        self.dirty = False
+        self.last_write = 0.0
+        self.writes = 0
+        self.changes = 0
+        self.errors = 0
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        # Copia del documento tomada en el último mark_dirty aplazado
+        self._pending_document: Any = None
+
+        _open_stores.add(self)
+
+    def mark_dirty(self) -> None:
+        """
+        Registra un cambio: escribe ya si ha pasado el intervalo mínimo desde
+        la última escritura; si no, copia el documento y programa su escritura
+        al vencer. Debe llamarse desde el hilo que modifica el estado.
+        """
+        with self._lock:
+            self.dirty = True
+            self.changes += 1
+            wait = self.last_write + self.min_interval - time.monotonic()
+            if wait <= 0:
+                self._cancel_timer()
+                if not self.flush() and self.dirty:
+                    self._schedule(_RETRY_DELAY)
+            else:
+                self._schedule(wait)
+
+    def _schedule(self, wait: float) -> None:
+        self._pending_document = _copy_document(self.snapshot())
+        if self._timer is None:
+            self._timer = threading.Timer(wait, self._timer_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timer_flush(self) -> None:
+        with self._lock:
+            self._timer = None
+            document = self._pending_document
+            if document is None or not self.dirty:
+                return
+            if not self._write(lambda: document) and self.dirty:
+                # Fallo de escritura: reintentar con la misma copia
+                self._timer = threading.Timer(_RETRY_DELAY, self._timer_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self) -> bool:
+        """
+        Escribe el documento si hay cambios pendientes (lo construye con
+        ``snapshot``: llamar desde el hilo que modifica el estado)
+
+        Returns:
+            bool: True si se escribió el archivo
+        """
+        with self._lock:
+            if not self.dirty:
+                return False
+            return self._write(self.snapshot)
+
+    def _write(self, build: Callable[[], Any]) -> bool:
+        with self._lock:
+            try:
+                text = json.dumps(build(), indent=self.indent)
+            except RuntimeError as e:
+                # Diccionario modificado por otro hilo durante la serialización
+                logger.debug(f"Estado de {self.name} en uso, escritura aplazada: {e}")
+                return False
+            except (TypeError, ValueError) as e:
+                # No serializable: reintentar no lo arreglaría
+                self.dirty = False
+                self.errors += 1
+                logger.error(f"Error al serializar {self.name}: {e}")
+                return False
+            self.dirty = False
+            try:
+                atomic_write_text(self.path, text)
+            except Exception as e:
+                self.dirty = True
+                self.errors += 1
+                logger.error(f"Error al guardar {self.name}: {e}")
+                return False
+            self._pending_document = None
+            self.last_write = time.monotonic()
+            self.writes += 1
+            logger.debug(f"Estado guardado en {self.path} ({self.changes} cambios, {self.writes} escrituras)")
+            return True
+
+    def close(self) -> None:
+        """Cancela la escritura programada y vuelca los cambios pendientes"""
+        with self._lock:
+            self._cancel_timer()
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene contadores del almacén
+
+        Returns:
+            Dict: Cambios registrados, escrituras, errores y si hay cambios pendientes
+        """
+        return {
+            'path': self.path,
+            'changes': self.changes,
+            'writes': self.writes,
+            'errors': self.errors,
+            'dirty': self.dirty
+        }
+
+
+class AppendLog:
+    """
+    Registro de sólo-añadir en JSON por líneas.
+
+    Las entradas se acumulan en memoria y se añaden al archivo en bloque (con
+    el mismo intervalo mínimo que ``JsonStateStore``). Se mantienen en memoria
+    las últimas ``max_entries`` para consultarlas sin leer el archivo.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000,
+                 min_interval: float = DEFAULT_SAVE_INTERVAL, name: str = None):
+        """
+        Inicializa el registro y carga sus últimas entradas
+
+        Args:
+            path: Archivo .jsonl
+            max_entries: Entradas a conservar (en memoria y tras compactar)
+            min_interval: Segundos mínimos entre escrituras (0 = escribir siempre)
+            name: Nombre para los logs (por defecto, el archivo)
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.min_interval = min_interval
+        self.name = name or path
+
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._pending: List[str] = []
+        self._file_lines = 0
+        self.last_write = 0.0
+        self.writes = 0
+        self.compactions = 0
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+        self._load()
+        _open_stores.add(self)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    self._file_lines += 1
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        self.entries.append(json.loads(line))
+                    except ValueError:
+                        # Última línea cortada por una caída: se descarta
+                        logger.warning(f"Línea inválida ignorada en {self.path}")
+        except Exception as e:
+            logger.error(f"Error al cargar {self.name}: {e}")
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """
+        Añade una entrada
+
+        Args:
+            entry: Diccionario serializable
+        """
+        self.extend([entry])
+
+    def extend(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """
+        Añade varias entradas
+
+        Args:
+            entries: Diccionarios serializables
+        """
+        with self._lock:
+            for entry in entries:
+                self.entries.append(entry)
+                self._pending.append(json.dumps(entry))
+            if len(self._pending) > 2 * self.max_entries:
+                # Las más antiguas ya no se conservarían tras compactar
+                del self._pending[:-self.max_entries]
+            wait = self.last_write + self.min_interval - time.monotonic()
+            if wait <= 0:
+                self._cancel_timer()
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self._timer_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timer_flush(self) -> None:
+        with self._lock:
+            self._timer = None
+            self.flush()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def flush(self) -> bool:
+        """
+        Añade al archivo las entradas pendientes (compactándolo si toca)
+
+        Returns:
+            bool: True si se escribió el archivo
+        """
+        with self._lock:
+            if not self._pending:
+                return False
+            try:
+                if self._file_lines + len(self._pending) > 2 * self.max_entries:
+                    self._compact()
+                else:
+                    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                    with open(self.path, 'a') as f:
+                        f.write('\n'.join(self._pending) + '\n')
+                    self._file_lines += len(self._pending)
+            except Exception as e:
+                logger.error(f"Error al guardar {self.name}: {e}")
+                return False
+            self._pending = []
+            self.last_write = time.monotonic()
+            self.writes += 1
+            return True
+
+    def _compact(self) -> None:
+        """Reescribe el archivo con las entradas en memoria (las últimas max_entries)"""
+        lines = [json.dumps(entry) for entry in self.entries]
+        atomic_write_text(self.path, ''.join(line + '\n' for line in lines))
+        self._file_lines = len(lines)
+        self.compactions += 1
+        logger.debug(f"{self.name} compactado a {len(lines)} entradas")
+
+    def close(self) -> None:
+        """Cancela la escritura programada y vuelca las entradas pendientes"""
+        with self._lock:
+            self._cancel_timer()
+            self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene contadores del registro
+
+        Returns:
+            Dict: Entradas en memoria, pendientes, escrituras y compactaciones
+        """
+        return {
+            'path': self.path,
+            'entries': len(self.entries),
+            'pending': len(self._pending),
+            'writes': self.writes,
+            'compactions': self.compactions
+        }
+
+
+@atexit.register
+def flush_all() -> None:
+    """Vuelca los cambios pendientes de todos los almacenes abiertos"""
+    for store in list(_open_stores):
+        try:
+            store.close()
+        except Exception as e:
+            logger.error(f"Error al volcar {store.name}: {e}")
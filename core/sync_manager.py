@@ -23,6 +23,7 @@ import zipfile
 import base64
 import traceback
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Any, Optional, Set, Tuple, Union
 
@@ -33,6 +34,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger('SyncManager')
 
+# Tamaño de lectura al calcular hashes
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Archivos grandes (bases de datos, modelos) con hash por bloques para paquetes delta
+DELTA_MIN_SIZE = 8 * 1024 * 1024
+DELTA_CHUNK_SIZE = 1024 * 1024
+
+# Prefijo de los bloques de un delta dentro del paquete
+DELTA_PREFIX = "__delta__/"
+
+# Extensiones que ya vienen comprimidas (se guardan sin volver a comprimir)
+STORED_EXTENSIONS = {
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.png', '.jpg', '.jpeg',
+    '.h5', '.keras', '.pt', '.pth', '.parquet', '.npz'
+}
+
 class SyncManager:
     """
     Gestor de sincronización entre instalaciones del bot.
@@ -44,7 +61,11 @@ class SyncManager:
     def __init__(self, 
                base_dir: str = ".", 
                manifest_file: str = "sync_manifest.json",
-               sync_dir: str = "sync_data"):
+               sync_dir: str = "sync_data",
+               incremental: bool = True,
+               hash_workers: int = None,
+               delta_min_size: int = DELTA_MIN_SIZE,
+               chunk_size: int = DELTA_CHUNK_SIZE):
         """
         Inicializa el gestor de sincronización.
         
@@ -52,10 +73,18 @@ class SyncManager:
             base_dir: Directorio base del bot
             manifest_file: Archivo de manifiesto para sincronización
             sync_dir: Directorio para archivos de sincronización
+            incremental: Reutilizar los hashes de archivos sin cambios (tamaño, mtime e inodo)
+            hash_workers: Hilos para calcular hashes (None = hasta 4 según núcleos)
+            delta_min_size: Tamaño a partir del cual un archivo se sincroniza por bloques
+            chunk_size: Tamaño de bloque para los deltas
         """
         self.base_dir = os.path.abspath(base_dir)
         self.manifest_file = os.path.join(self.base_dir, manifest_file)
         self.sync_dir = os.path.join(self.base_dir, sync_dir)
+        self.incremental = incremental
+        self.hash_workers = hash_workers or min(4, os.cpu_count() or 1)
+        self.delta_min_size = delta_min_size
+        self.chunk_size = chunk_size
         
         # Asegurar que exista el directorio de sincronización
         os.makedirs(self.sync_dir, exist_ok=True)
@@ -64,15 +93,17 @@ class SyncManager:
         self.manifest = self._load_or_create_manifest()
         
         # Lista de directorios y archivos a ignorar en la sincronización
+        # (las rutas se comparan relativas al directorio base)
         self.ignore_dirs = [
             '.git', '__pycache__', 'venv', 'env', '.env', 
-            'node_modules', '.vscode', '.idea', self.sync_dir
+            'node_modules', '.vscode', '.idea',
+            os.path.relpath(self.sync_dir, self.base_dir)
         ]
         
         self.ignore_files = [
             '.gitignore', '.DS_Store', 'Thumbs.db', '.env', 
             'config.local.json', 'local_settings.py', 'secrets.json',
-            'api_keys.json', 'credentials.json', self.manifest_file
+            'api_keys.json', 'credentials.json', os.path.basename(self.manifest_file)
         ]
         
         # Archivos de configuración que deben fusionarse, no sobreescribirse
@@ -144,17 +175,77 @@ class SyncManager:
             str: Hash SHA256 hexadecimal
         """
         hash_sha256 = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha256.update(chunk)
+        buffer = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buffer)
+        with open(file_path, 'rb', buffering=0) as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                hash_sha256.update(view[:n])
         return hash_sha256.hexdigest()
     
+    def _hash_file(self, file_path: str, size: int) -> Dict[str, Any]:
+        """
+        Calcula el hash de un archivo y, si es grande, el de cada bloque.
+        
+        Los hashes por bloque permiten enviar sólo los bloques modificados de
+        bases de datos y modelos (ver create_sync_package).
+        
+        Args:
+            file_path: Ruta al archivo
+            size: Tamaño del archivo según os.stat
+            
+        Returns:
+            Dict[str, Any]: 'hash' y, para archivos de al menos delta_min_size,
+            'chunk_size' y 'chunks' (hash de cada bloque)
+        """
+        if size < self.delta_min_size:
+            return {"hash": self._calculate_file_hash(file_path)}
+        
+        file_hash = hashlib.sha256()
+        chunks = []
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                file_hash.update(chunk)
+                chunks.append(hashlib.sha256(chunk).hexdigest())
+        return {"hash": file_hash.hexdigest(), "chunk_size": self.chunk_size, "chunks": chunks}
+    
+    def _hash_files(self, pending: List[Tuple[str, str, int]]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Calcula los hashes de varios archivos, en paralelo si hay varios hilos.
+        
+        hashlib libera el GIL con bloques grandes, así que los hilos leen y
+        calculan hashes de archivos distintos a la vez.
+        
+        Args:
+            pending: Lista de (ruta relativa, ruta completa, tamaño)
+            
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: Resultado de _hash_file por ruta
+            relativa (None si el archivo no pudo leerse)
+        """
+        def hash_one(item: Tuple[str, str, int]) -> Optional[Dict[str, Any]]:
+            rel_path, file_path, size = item
+            try:
+                return self._hash_file(file_path, size)
+            except Exception as e:
+                logger.error(f"Error al procesar archivo {file_path}: {e}")
+                return None
+        
+        if self.hash_workers > 1 and len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=self.hash_workers) as pool:
+                results = list(pool.map(hash_one, pending))
+        else:
+            results = [hash_one(item) for item in pending]
+        return {item[0]: result for item, result in zip(pending, results)}
+    
     def _should_ignore_path(self, path: str) -> bool:
         """
         Determina si una ruta debe ignorarse para sincronización.
         
         Args:
-            path: Ruta a verificar
+            path: Ruta a verificar (relativa al directorio base)
             
         Returns:
             bool: True si debe ignorarse, False en caso contrario
@@ -168,26 +259,53 @@ class SyncManager:
                 return True
         
         # Verificar si es un archivo ignorado
-        if os.path.isfile(path):
-            filename = os.path.basename(path)
-            if filename in self.ignore_files:
-                return True
+        return os.path.basename(norm_path) in self.ignore_files
+    
+    def _can_reuse_hash(self, previous: Optional[Dict[str, Any]], file_stat: os.stat_result,
+                        racy_limit: int) -> bool:
+        """
+        Indica si el hash del escaneo anterior sigue siendo válido.
         
-        return False
+        Requiere el mismo tamaño, mtime (ns) e inodo, y que el archivo se
+        modificara antes de que empezara el escaneo anterior: si cambió durante
+        ese escaneo, la misma mtime no garantiza el mismo contenido.
+        """
+        if not previous or "hash" not in previous:
+            return False
+        if (previous.get("size") != file_stat.st_size or
+                previous.get("mtime_ns") != file_stat.st_mtime_ns or
+                previous.get("inode") != file_stat.st_ino):
+            return False
+        if file_stat.st_mtime_ns >= racy_limit:
+            return False
+        # Los archivos grandes necesitan también los hashes por bloque
+        if file_stat.st_size >= self.delta_min_size:
+            return previous.get("chunk_size") == self.chunk_size and "chunks" in previous
+        return True
     
     def scan_project(self) -> Dict[str, Any]:
         """
         Escanea el proyecto para obtener información de archivos y directorios.
         
+        El escaneo es incremental: sólo se recalcula el hash de los archivos
+        nuevos o cuyo tamaño, fecha de modificación o inodo han cambiado desde
+        el último escaneo. El manifiesto sólo se reescribe si algo cambió.
+        
         Returns:
             Dict[str, Any]: Información del escaneo
         """
         start_time = time.time()
+        scan_started_ns = time.time_ns()
         file_count = 0
         dir_count = 0
         total_size = 0
         files_info = {}
         directories = []
+        pending = []
+        reused_hashes = 0
+        
+        previous_files = self.manifest.get("files", {}) if self.incremental else {}
+        racy_limit = self.manifest.get("scan_started_ns", 0)
         
         # Recorrer directorios y archivos
         for root, dirs, files in os.walk(self.base_dir):
@@ -216,20 +334,45 @@ class SyncManager:
                 # Obtener información del archivo
                 try:
                     file_stat = os.stat(file_path)
-                    file_size = file_stat.st_size
-                    file_hash = self._calculate_file_hash(file_path)
-                    
-                    # Guardar información del archivo
-                    files_info[rel_path] = {
-                        "size": file_size,
-                        "hash": file_hash,
-                        "last_modified": datetime.fromtimestamp(file_stat.st_mtime).isoformat()
-                    }
-                    
-                    file_count += 1
-                    total_size += file_size
                 except Exception as e:
                     logger.error(f"Error al procesar archivo {file_path}: {e}")
+                    continue
+                
+                info = {
+                    "size": file_stat.st_size,
+                    "last_modified": datetime.fromtimestamp(file_stat.st_mtime).isoformat(),
+                    "mtime_ns": file_stat.st_mtime_ns,
+                    "inode": file_stat.st_ino
+                }
+                previous = previous_files.get(rel_path)
+                if self._can_reuse_hash(previous, file_stat, racy_limit):
+                    info["hash"] = previous["hash"]
+                    if "chunks" in previous:
+                        info["chunk_size"] = previous["chunk_size"]
+                        info["chunks"] = previous["chunks"]
+                    reused_hashes += 1
+                else:
+                    pending.append((rel_path, file_path, file_stat.st_size))
+                files_info[rel_path] = info
+        
+        # Calcular los hashes pendientes
+        hashed_bytes = 0
+        for rel_path, result in self._hash_files(pending).items():
+            if result is None:
+                del files_info[rel_path]
+                continue
+            files_info[rel_path].update(result)
+            hashed_bytes += files_info[rel_path]["size"]
+        
+        for info in files_info.values():
+            file_count += 1
+            total_size += info["size"]
+        
+        old_files = self.manifest.get("files", {})
+        changed_files = sum(1 for rel_path, info in files_info.items()
+                            if old_files.get(rel_path, {}).get("hash") != info["hash"])
+        deleted_files = sum(1 for rel_path in old_files if rel_path not in files_info)
+        modified = bool(pending) or deleted_files > 0 or directories != self.manifest.get("directories")
         
         # Actualizar manifiesto
         self.manifest["files"] = files_info
@@ -239,25 +382,67 @@ class SyncManager:
         self.manifest["total_dirs"] = dir_count
         self.manifest["total_size"] = total_size
         
-        # Guardar manifiesto actualizado
-        self._save_manifest()
+        # Guardar manifiesto actualizado (sólo si hubo cambios)
+        if modified or "scan_started_ns" not in self.manifest:
+            self.manifest["scan_started_ns"] = scan_started_ns
+            self._save_manifest()
         
         scan_time = time.time() - start_time
-        logger.info(f"Escaneo completado: {file_count} archivos, {dir_count} directorios, {total_size/1024:.2f} KB en {scan_time:.2f}s")
+        logger.info(f"Escaneo completado: {file_count} archivos, {dir_count} directorios, {total_size/1024:.2f} KB en {scan_time:.2f}s "
+                    f"({len(pending)} hasheados, {reused_hashes} sin cambios)")
         
         return {
             "file_count": file_count,
             "dir_count": dir_count,
             "total_size": total_size,
-            "scan_time": scan_time
+            "scan_time": scan_time,
+            "hashed_files": len(pending),
+            "hashed_bytes": hashed_bytes,
+            "reused_hashes": reused_hashes,
+            "changed_files": changed_files,
+            "deleted_files": deleted_files
         }
     
-    def create_sync_package(self, output_file: str = None) -> str:
+    def _load_baseline(self, baseline: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Carga el manifiesto de referencia para un paquete delta.
+        
+        Args:
+            baseline: Manifiesto (dict), ruta a un manifiesto JSON o ruta a un
+                paquete de sincronización anterior (se usa su manifiesto)
+            
+        Returns:
+            Dict[str, Any]: Manifiesto de referencia
+        """
+        if isinstance(baseline, dict):
+            return baseline
+        if zipfile.is_zipfile(baseline):
+            with zipfile.ZipFile(baseline, 'r') as zipf:
+                return json.loads(zipf.read(os.path.basename(self.manifest_file)))
+        with open(baseline, 'r') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _compress_type(rel_path: str) -> int:
+        """Compresión para un archivo del paquete (los ya comprimidos se guardan tal cual)"""
+        extension = os.path.splitext(rel_path)[1].lower()
+        return zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    
+    def create_sync_package(self, output_file: str = None,
+                          baseline: Union[str, Dict[str, Any]] = None) -> str:
         """
         Crea un paquete de sincronización con los archivos del proyecto.
         
+        Sin ``baseline`` el paquete contiene todos los archivos. Con
+        ``baseline`` (el manifiesto de la instalación de destino o el último
+        paquete que se le envió) sólo contiene los archivos nuevos o
+        modificados respecto a ese manifiesto, la lista de archivos borrados y,
+        para archivos grandes con hashes por bloque en ambos manifiestos, sólo
+        los bloques que han cambiado.
+        
         Args:
             output_file: Ruta donde guardar el paquete (opcional)
+            baseline: Manifiesto de referencia para un paquete delta (opcional)
             
         Returns:
             str: Ruta al paquete de sincronización creado
@@ -265,16 +450,21 @@ class SyncManager:
         # Actualizar escaneo del proyecto
         self.scan_project()
         
+        baseline_manifest = self._load_baseline(baseline) if baseline is not None else None
+        baseline_files = baseline_manifest.get("files", {}) if baseline_manifest else None
+        
         # Generar nombre de archivo si no se proporciona
         if not output_file:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = os.path.join(self.sync_dir, f"sync_package_{timestamp}.zip")
+            prefix = "sync_delta" if baseline_files is not None else "sync_package"
+            output_file = os.path.join(self.sync_dir, f"{prefix}_{timestamp}.zip")
+        
+        included = []
+        deltas = {}
+        deleted = {}
         
         # Crear paquete ZIP
         with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Añadir manifiesto
-            zipf.write(self.manifest_file, os.path.basename(self.manifest_file))
-            
             # Añadir directorios (para preservar estructura)
             for dir_path in self.manifest["directories"]:
                 full_path = os.path.join(self.base_dir, dir_path)
@@ -285,15 +475,56 @@ class SyncManager:
             # Añadir archivos
             for rel_path, file_info in self.manifest["files"].items():
                 full_path = os.path.join(self.base_dir, rel_path)
-                if os.path.exists(full_path) and os.path.isfile(full_path):
-                    zipf.write(full_path, rel_path)
+                if not (os.path.exists(full_path) and os.path.isfile(full_path)):
+                    continue
+                
+                base_info = baseline_files.get(rel_path) if baseline_files is not None else None
+                if base_info is not None and base_info.get("hash") == file_info["hash"]:
+                    # Sin cambios respecto a la referencia
+                    continue
+                
+                if (base_info is not None and "chunks" in file_info and
+                        base_info.get("chunk_size") == file_info["chunk_size"] and base_info.get("chunks")):
+                    # Archivo grande: sólo los bloques que han cambiado
+                    base_chunks = base_info["chunks"]
+                    changed = [i for i, chunk_hash in enumerate(file_info["chunks"])
+                               if i >= len(base_chunks) or base_chunks[i] != chunk_hash]
+                    chunk_size = file_info["chunk_size"]
+                    with open(full_path, 'rb') as f:
+                        for i in changed:
+                            f.seek(i * chunk_size)
+                            zipf.writestr(f"{DELTA_PREFIX}{rel_path}/{i}", f.read(chunk_size),
+                                          compress_type=self._compress_type(rel_path))
+                    deltas[rel_path] = {"base_hash": base_info["hash"], "chunks": changed}
+                    continue
+                
+                zipf.write(full_path, rel_path, compress_type=self._compress_type(rel_path))
+                included.append(rel_path)
+            
+            if baseline_files is not None:
+                deleted = {rel_path: info.get("hash") for rel_path, info in baseline_files.items()
+                           if rel_path not in self.manifest["files"]}
+            
+            # Añadir manifiesto con la descripción del paquete
+            package_manifest = dict(self.manifest)
+            package_manifest["package"] = {
+                "type": "delta" if baseline_files is not None else "full",
+                "baseline": baseline_manifest.get("last_scan") if baseline_manifest else None,
+                "files": included,
+                "deltas": deltas,
+                "deleted": deleted
+            }
+            zipf.writestr(os.path.basename(self.manifest_file), json.dumps(package_manifest, indent=4))
         
         # Actualizar historial de sincronización
         sync_entry = {
             "timestamp": datetime.now().isoformat(),
             "type": "export",
             "package": os.path.basename(output_file),
-            "file_count": self.manifest["total_files"],
+            "package_type": package_manifest["package"]["type"],
+            "file_count": len(included) + len(deltas),
+            "delta_files": len(deltas),
+            "deleted_files": len(deleted),
             "size": os.path.getsize(output_file)
         }
         
@@ -301,13 +532,68 @@ class SyncManager:
         self.manifest["last_sync"] = sync_entry["timestamp"]
         self._save_manifest()
         
-        logger.info(f"Paquete de sincronización creado: {output_file} ({os.path.getsize(output_file)/1024:.2f} KB)")
+        logger.info(f"Paquete de sincronización creado: {output_file} ({os.path.getsize(output_file)/1024:.2f} KB, "
+                    f"{len(included)} archivos, {len(deltas)} deltas, {len(deleted)} borrados)")
         return output_file
     
+    def _replace_from_zip(self, zipf: zipfile.ZipFile, member: str, target_path: str):
+        """Escribe un archivo del paquete en su destino (vía archivo temporal)"""
+        os.makedirs(os.path.dirname(target_path) or ".", exist_ok=True)
+        temp_path = f"{target_path}.sync_tmp"
+        with zipf.open(member) as source, open(temp_path, 'wb') as target:
+            shutil.copyfileobj(source, target, HASH_BUFFER_SIZE)
+        os.replace(temp_path, target_path)
+    
+    def _apply_delta(self, zipf: zipfile.ZipFile, rel_path: str,
+                   file_info: Dict[str, Any], delta: Dict[str, Any]) -> bool:
+        """
+        Aplica los bloques modificados de un archivo grande.
+        
+        Args:
+            zipf: Paquete abierto
+            rel_path: Ruta relativa del archivo
+            file_info: Información del archivo en el manifiesto del paquete
+            delta: 'base_hash' y lista de bloques ('chunks') incluidos
+            
+        Returns:
+            bool: True si se actualizó, False si ya estaba al día
+        """
+        target_path = os.path.join(self.base_dir, rel_path)
+        if not os.path.exists(target_path):
+            raise FileNotFoundError(f"No existe el archivo base del delta: {rel_path}")
+        
+        current_hash = self._calculate_file_hash(target_path)
+        if current_hash == file_info["hash"]:
+            return False
+        if current_hash != delta["base_hash"]:
+            raise ValueError(f"{rel_path} no coincide con la versión de referencia del delta")
+        
+        # Parchear una copia y sustituir el original sólo si el resultado es correcto
+        temp_path = f"{target_path}.sync_tmp"
+        shutil.copyfile(target_path, temp_path)
+        try:
+            chunk_size = file_info["chunk_size"]
+            with open(temp_path, 'r+b') as f:
+                for i in delta["chunks"]:
+                    f.seek(i * chunk_size)
+                    f.write(zipf.read(f"{DELTA_PREFIX}{rel_path}/{i}"))
+                f.truncate(file_info["size"])
+            if self._calculate_file_hash(temp_path) != file_info["hash"]:
+                raise ValueError(f"El hash de {rel_path} tras aplicar el delta no coincide")
+            os.replace(temp_path, target_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return True
+    
     def apply_sync_package(self, package_path: str) -> Dict[str, Any]:
         """
         Aplica un paquete de sincronización al proyecto actual.
         
+        Los archivos se leen directamente del ZIP (sin extraerlo entero). Los
+        paquetes delta parchean los archivos grandes por bloques y borran los
+        archivos eliminados que no se hayan modificado localmente.
+        
         Args:
             package_path: Ruta al paquete de sincronización
             
@@ -317,87 +603,116 @@ class SyncManager:
         if not os.path.exists(package_path):
             raise FileNotFoundError(f"Paquete de sincronización no encontrado: {package_path}")
         
-        # Directorio temporal para extracción
+        # Directorio temporal para las configuraciones a fusionar
         temp_dir = os.path.join(self.sync_dir, "temp_extract")
         os.makedirs(temp_dir, exist_ok=True)
         
         try:
-            # Extraer paquete
             with zipfile.ZipFile(package_path, 'r') as zipf:
-                zipf.extractall(temp_dir)
-            
-            # Cargar manifiesto del paquete
-            package_manifest_path = os.path.join(temp_dir, os.path.basename(self.manifest_file))
-            if not os.path.exists(package_manifest_path):
-                raise ValueError("El paquete no contiene un manifiesto válido")
-            
-            with open(package_manifest_path, 'r') as f:
-                package_manifest = json.load(f)
-            
-            # Validar manifiesto
-            required_keys = ["version", "files", "directories"]
-            if not all(key in package_manifest for key in required_keys):
-                raise ValueError("El manifiesto del paquete es incompleto")
-            
-            # Resultados de la sincronización
-            results = {
-                "created_dirs": 0,
-                "created_files": 0,
-                "updated_files": 0,
-                "unchanged_files": 0,
-                "merged_configs": 0,
-                "errors": 0
-            }
-            
-            # Crear directorios primero
-            for dir_path in package_manifest["directories"]:
-                full_path = os.path.join(self.base_dir, dir_path)
-                if not os.path.exists(full_path):
-                    os.makedirs(full_path, exist_ok=True)
-                    results["created_dirs"] += 1
-            
-            # Procesar archivos
-            for rel_path, file_info in package_manifest["files"].items():
-                try:
-                    source_path = os.path.join(temp_dir, rel_path)
-                    target_path = os.path.join(self.base_dir, rel_path)
-                    
-                    # Verificar si el archivo existe
-                    file_exists = os.path.exists(target_path)
-                    
-                    # Determinar si es un archivo de configuración a fusionar
-                    is_config_to_merge = any(rel_path.endswith(config) for config in self.merge_configs)
-                    
-                    if is_config_to_merge and file_exists:
-                        # Fusionar archivos de configuración en lugar de sobrescribir
-                        self._merge_config_files(source_path, target_path)
-                        results["merged_configs"] += 1
-                        continue
-                    
-                    # Verificar si el archivo ha cambiado (si existe)
-                    if file_exists:
-                        current_hash = self._calculate_file_hash(target_path)
-                        if current_hash == file_info["hash"]:
-                            # El archivo no ha cambiado
+                # Cargar manifiesto del paquete
+                manifest_name = os.path.basename(self.manifest_file)
+                if manifest_name not in zipf.namelist():
+                    raise ValueError("El paquete no contiene un manifiesto válido")
+                package_manifest = json.loads(zipf.read(manifest_name))
+                
+                # Validar manifiesto
+                required_keys = ["version", "files", "directories"]
+                if not all(key in package_manifest for key in required_keys):
+                    raise ValueError("El manifiesto del paquete es incompleto")
+                
+                # Paquetes antiguos: todos los archivos incluidos
+                package = package_manifest.get("package") or {"type": "full"}
+                members = set(zipf.namelist())
+                deltas = package.get("deltas", {})
+                
+                # Resultados de la sincronización
+                results = {
+                    "created_dirs": 0,
+                    "created_files": 0,
+                    "updated_files": 0,
+                    "patched_files": 0,
+                    "unchanged_files": 0,
+                    "merged_configs": 0,
+                    "deleted_files": 0,
+                    "errors": 0
+                }
+                
+                # Crear directorios primero
+                for dir_path in package_manifest["directories"]:
+                    full_path = os.path.join(self.base_dir, dir_path)
+                    if not os.path.exists(full_path):
+                        os.makedirs(full_path, exist_ok=True)
+                        results["created_dirs"] += 1
+                
+                # Procesar archivos
+                for rel_path, file_info in package_manifest["files"].items():
+                    try:
+                        if rel_path in deltas:
+                            if self._apply_delta(zipf, rel_path, file_info, deltas[rel_path]):
+                                results["patched_files"] += 1
+                            else:
+                                results["unchanged_files"] += 1
+                            continue
+                        
+                        if rel_path not in members:
+                            # No incluido en un paquete delta: sin cambios
                             results["unchanged_files"] += 1
                             continue
                         
-                        # El archivo ha cambiado, actualizarlo
-                        shutil.copy2(source_path, target_path)
-                        results["updated_files"] += 1
-                    else:
-                        # El archivo no existe, crearlo
-                        # Asegurar que exista el directorio padre
-                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                        shutil.copy2(source_path, target_path)
-                        results["created_files"] += 1
+                        target_path = os.path.join(self.base_dir, rel_path)
+                        
+                        # Verificar si el archivo existe
+                        file_exists = os.path.exists(target_path)
+                        
+                        # Determinar si es un archivo de configuración a fusionar
+                        is_config_to_merge = any(rel_path.endswith(config) for config in self.merge_configs)
+                        
+                        if is_config_to_merge and file_exists:
+                            # Fusionar archivos de configuración en lugar de sobrescribir
+                            source_path = zipf.extract(rel_path, temp_dir)
+                            self._merge_config_files(source_path, target_path)
+                            results["merged_configs"] += 1
+                            continue
+                        
+                        # Verificar si el archivo ha cambiado (si existe)
+                        if file_exists:
+                            current_hash = self._calculate_file_hash(target_path)
+                            if current_hash == file_info["hash"]:
+                                # El archivo no ha cambiado
+                                results["unchanged_files"] += 1
+                                continue
+                            
+                            # El archivo ha cambiado, actualizarlo
+                            self._replace_from_zip(zipf, rel_path, target_path)
+                            results["updated_files"] += 1
+                        else:
+                            # El archivo no existe, crearlo
+                            self._replace_from_zip(zipf, rel_path, target_path)
+                            results["created_files"] += 1
+                    
+                    except Exception as e:
+                        logger.error(f"Error al procesar {rel_path}: {e}")
+                        results["errors"] += 1
                 
-                except Exception as e:
-                    logger.error(f"Error al procesar {rel_path}: {e}")
-                    results["errors"] += 1
+                # Borrar archivos eliminados en el origen (si no se modificaron aquí)
+                for rel_path, base_hash in package.get("deleted", {}).items():
+                    target_path = os.path.join(self.base_dir, rel_path)
+                    if not os.path.isfile(target_path):
+                        continue
+                    if self._calculate_file_hash(target_path) != base_hash:
+                        logger.warning(f"{rel_path} se modificó localmente, no se borra")
+                        continue
+                    os.remove(target_path)
+                    results["deleted_files"] += 1
             
-            # Actualizar manifiesto local con la información del paquete
-            self.manifest["files"].update(package_manifest["files"])
+            # Actualizar manifiesto local con la información del paquete (sin
+            # los datos de os.stat del origen, que no valen para estos archivos)
+            for rel_path, file_info in package_manifest["files"].items():
+                self.manifest["files"][rel_path] = {
+                    key: value for key, value in file_info.items() if key not in ("mtime_ns", "inode")
+                }
+            for rel_path in package.get("deleted", {}):
+                self.manifest["files"].pop(rel_path, None)
             
             # Añadir directorios que no existan ya
             for dir_path in package_manifest["directories"]:
@@ -409,6 +724,7 @@ class SyncManager:
                 "timestamp": datetime.now().isoformat(),
                 "type": "import",
                 "package": os.path.basename(package_path),
+                "package_type": package.get("type", "full"),
                 "results": results
             }
             
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Buffer circular columnar de velas con indicadores incrementales
+
+Sustituye a las listas de dicts que los bots recortan a las últimas N velas y
+convierten en un DataFrame nuevo en cada vela para recalcular RSI, MACD y
+medias sobre toda la ventana. Aquí cada columna OHLCV y cada feature es un
+array NumPy de capacidad fija; al añadir una vela sólo se avanza el estado de
+los indicadores (features.incremental) con esa vela, así que el coste por vela
+es O(1) aunque la ventana sea de miles de velas.
+
+Las velas que salen del buffer pueden volcarse al almacén columnar en disco
+(data_management.columnar_store) por lotes, y ``history`` las recupera si se
+necesita una ventana más larga que la capacidad.
+
+Uso típico:
+    from data_management.candle_buffer import CandleRingBuffer
+    from features.incremental import processor_feature_set
+    buffer = CandleRingBuffer(capacity=5000, engine=processor_feature_set())
+    buffer.append({'timestamp': 1700000000000, 'open': 1, 'high': 2, 'low': 0.5,
+                   'close': 1.5, 'volume': 10})
+    buffer.last()['rsi']
+"""
+
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+
+from features.incremental import IncrementalFeatureEngine
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class CandleRingBuffer:
+    """
+    Últimas ``capacity`` velas cerradas con sus features, en arrays de tamaño fijo.
+
+    La vela con número de orden ``seq`` ocupa la posición ``seq % capacity``.
+    Sólo se admiten velas posteriores a la última (las repetidas o atrasadas
+    se descartan), de modo que el estado de los indicadores avanza una vez por
+    vela.
+    """
+
+    def __init__(self, capacity: int = 5000, engine: Optional[IncrementalFeatureEngine] = None,
+                 spill_dataset=None, spill_batch: int = 1000):
+        """
+        Args:
+            capacity: Número de velas que se conservan en memoria
+            engine: Motor de indicadores incrementales (None = sólo OHLCV)
+            spill_dataset: ColumnarDataset donde se vuelcan las velas que salen del buffer
+            spill_batch: Velas por escritura en el almacén
+        """
+        if capacity < 1:
+            raise ValueError("La capacidad del buffer debe ser positiva")
+        self.capacity = capacity
+        self.engine = engine or IncrementalFeatureEngine([])
+        self.feature_columns = self.engine.outputs
+        self.spill_dataset = spill_dataset
+        self.spill_batch = max(1, min(spill_batch, capacity))
+
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._ohlcv = np.full((capacity, len(OHLCV_COLUMNS)), np.nan)
+        self._features = np.full((capacity, len(self.feature_columns)), np.nan)
+        self._column_index = {name: i for i, name in enumerate(OHLCV_COLUMNS)}
+        self._feature_index = {name: i for i, name in enumerate(self.feature_columns)}
+
+        # Velas añadidas en total y primera vela aún no volcada al almacén
+        self.count = 0
+        self._spilled = 0
+
+        self.stats = {
+            'candles': 0,
+            'stale_candles': 0,
+            'spilled_candles': 0,
+            'spill_writes': 0
+        }
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Timestamp (ms) de la última vela, o None si el buffer está vacío"""
+        return int(self._timestamps[(self.count - 1) % self.capacity]) if self.count else None
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def _compute(self, rows: np.ndarray) -> np.ndarray:
+        """Avanza el motor con las filas OHLCV dadas y devuelve sus features"""
+        out = np.full((len(rows), len(self.feature_columns)), np.nan)
+        if not self.feature_columns:
+            return out
+        data = {col: rows[:, i] for i, col in enumerate(OHLCV_COLUMNS)}
+        position = 0
+        for ind in self.engine.indicators:
+            values = ind.update({src: data[src] for src in ind.sources})
+            for col in ind.outputs:
+                out[:, position] = values[col]
+                position += 1
+        self.engine.rows_seen += len(rows)
+        return out
+
+    def _place(self, timestamps: np.ndarray, rows: np.ndarray, features: np.ndarray):
+        """Copia un bloque (como mucho ``capacity`` velas) al buffer"""
+        n = len(rows)
+        # Antes de sobrescribir, volcar las velas que van a salir
+        self._spill_until(self.count + n - self.capacity)
+        slots = (self.count + np.arange(n)) % self.capacity
+        self._timestamps[slots] = timestamps
+        self._ohlcv[slots] = rows
+        self._features[slots] = features
+        self.count += n
+        if self.spill_dataset is None:
+            self._spilled = max(self._spilled, self.count - self.capacity)
+
+    def append(self, candle: Mapping[str, Any]) -> bool:
+        """
+        Añade una vela cerrada y calcula sus features
+
+        Args:
+            candle: Vela con 'timestamp' (ms) y valores OHLCV
+
+        Returns:
+            bool: False si la vela no es posterior a la última y se ha descartado
+        """
+        timestamp = int(candle['timestamp'])
+        if self.count and timestamp <= self._timestamps[(self.count - 1) % self.capacity]:
+            self.stats['stale_candles'] += 1
+            return False
+        row = np.array([[float(candle[col]) for col in OHLCV_COLUMNS]])
+        self._place(np.array([timestamp], dtype=np.int64), row, self._compute(row))
+        self.stats['candles'] += 1
+        return True
+
+    def extend(self, df: pd.DataFrame) -> int:
+        """
+        Añade muchas velas a la vez (p. ej. un histórico de arranque)
+
+        Las features se calculan con una sola pasada vectorizada del motor; el
+        resultado es el mismo que añadirlas una a una.
+
+        Args:
+            df: Velas ordenadas con índice o columna 'timestamp' y columnas OHLCV
+
+        Returns:
+            int: Velas añadidas (se descartan las no posteriores a la última)
+        """
+        if df is None or df.empty:
+            return 0
+        frame = df.reset_index() if 'timestamp' not in df.columns else df
+        timestamps = frame['timestamp']
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            timestamps = timestamps.to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        else:
+            timestamps = pd.to_numeric(timestamps).to_numpy(dtype=np.int64)
+        rows = frame[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+
+        last = self.last_timestamp
+        keep = np.ones(len(rows), dtype=bool) if last is None else timestamps > last
+        # Orden estrictamente creciente, igual que append
+        keep &= np.concatenate([[True], timestamps[1:] > np.maximum.accumulate(timestamps)[:-1]])
+        self.stats['stale_candles'] += int((~keep).sum())
+        timestamps, rows = timestamps[keep], rows[keep]
+        if not len(rows):
+            return 0
+
+        features = self._compute(rows)
+        for start in range(0, len(rows), self.capacity):
+            end = start + self.capacity
+            self._place(timestamps[start:end], rows[start:end], features[start:end])
+        self.stats['candles'] += len(rows)
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # Volcado al almacén en disco
+    # ------------------------------------------------------------------
+
+    def _frame_for(self, first: int, end: int, features: bool = False) -> pd.DataFrame:
+        """DataFrame de las velas con número de orden en [first, end) (deben estar en el buffer)"""
+        slots = np.arange(first, end) % self.capacity
+        frame = pd.DataFrame(self._ohlcv[slots], columns=OHLCV_COLUMNS)
+        if features and self.feature_columns:
+            frame[self.feature_columns] = self._features[slots]
+        frame.insert(0, 'timestamp', pd.to_datetime(self._timestamps[slots], unit='ms'))
+        return frame
+
+    def _spill_until(self, target: int):
+        """Garantiza que las velas con número de orden < ``target`` están en el almacén"""
+        if self.spill_dataset is None or self._spilled >= target:
+            return
+        end = min(max(target, self._spilled + self.spill_batch), self.count)
+        self._write_spill(self._spilled, end)
+
+    def _write_spill(self, first: int, end: int):
+        frame = self._frame_for(first, end).rename(columns={'timestamp': 'open_time'})
+        try:
+            self.spill_dataset.write(frame, 'open_time', mode='append')
+            self.stats['spilled_candles'] += end - first
+            self.stats['spill_writes'] += 1
+        except Exception as e:
+            logger.error(f"Error al volcar {end - first} velas al almacén: {e}")
+        self._spilled = end
+
+    def flush(self) -> int:
+        """
+        Vuelca al almacén todas las velas aún no guardadas (p. ej. al apagar el bot)
+
+        Returns:
+            int: Velas escritas
+        """
+        if self.spill_dataset is None or self._spilled >= self.count:
+            return 0
+        first = self._spilled
+        self._write_spill(first, self.count)
+        return self.count - first
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def last(self) -> Dict[str, Any]:
+        """
+        Última vela con sus features
+
+        Returns:
+            Dict[str, Any]: 'timestamp', OHLCV y una clave por feature (vacío si no hay velas)
+        """
+        if not self.count:
+            return {}
+        slot = (self.count - 1) % self.capacity
+        values = {'timestamp': int(self._timestamps[slot])}
+        values.update(zip(OHLCV_COLUMNS, self._ohlcv[slot].tolist()))
+        values.update(zip(self.feature_columns, self._features[slot].tolist()))
+        return values
+
+    def column(self, name: str, n: Optional[int] = None) -> np.ndarray:
+        """
+        Últimos ``n`` valores de una columna en orden cronológico (copia)
+
+        Args:
+            name: 'timestamp', columna OHLCV o feature
+            n: Número de valores (None = todo el buffer)
+
+        Returns:
+            np.ndarray: Valores de la columna
+        """
+        n = len(self) if n is None else min(n, len(self))
+        slots = np.arange(self.count - n, self.count) % self.capacity
+        if name == 'timestamp':
+            return self._timestamps[slots]
+        if name in self._column_index:
+            return self._ohlcv[slots, self._column_index[name]]
+        if name in self._feature_index:
+            return self._features[slots, self._feature_index[name]]
+        raise KeyError(name)
+
+    def to_frame(self, n: Optional[int] = None) -> pd.DataFrame:
+        """
+        Últimas ``n`` velas del buffer con sus features, indexadas por tiempo
+
+        Args:
+            n: Número de velas (None = todo el buffer)
+
+        Returns:
+            pd.DataFrame: OHLCV y features
+        """
+        n = len(self) if n is None else min(n, len(self))
+        return self._frame_for(self.count - n, self.count, features=True).set_index('timestamp')
+
+    def history(self, n: int) -> pd.DataFrame:
+        """
+        Últimas ``n`` velas OHLCV, completando con el almacén si ``n`` supera el buffer
+
+        Args:
+            n: Número de velas
+
+        Returns:
+            pd.DataFrame: OHLCV indexado por tiempo (sin features)
+        """
+        in_memory = self.to_frame(n)[OHLCV_COLUMNS]
+        missing = n - len(in_memory)
+        if missing <= 0 or self.spill_dataset is None or not self.spill_dataset.exists():
+            return in_memory
+        first_ts = in_memory.index[0] if len(in_memory) else None
+        stored = self.spill_dataset.read(columns=['open_time'] + OHLCV_COLUMNS)
+        stored = stored.rename(columns={'open_time': 'timestamp'}).set_index('timestamp')
+        if first_ts is not None:
+            stored = stored[stored.index < first_ts]
+        return pd.concat([stored.tail(missing).astype(np.float64), in_memory])
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Velas en memoria, totales, descartadas y volcadas al almacén"""
+        return {
+            'capacity': self.capacity,
+            'bars': len(self),
+            'pending_spill': max(self.count - self._spilled, 0) if self.spill_dataset is not None else 0,
+            **self.stats
+        }
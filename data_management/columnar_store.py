@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Almacén columnar en disco para velas y datasets de features
+
+Sustituye los CSV de varios GB (``SOLUSDT_full_concat.csv``,
+``SOLUSDT_processed_big_dataset.csv``...) que se vuelven a parsear en cada
+ejecución. Cada dataset es un directorio particionado por mes::
+
+    <root>/<kind>/<symbol>/<interval>/date=2020-08/_meta.json
+                                                  /open.npy
+                                                  /close.npy
+                                                  ...
+
+Cada columna es un fichero ``.npy`` tipado (float32 para precios y features,
+int64 para enteros, datetime64[ns] para tiempos), así que las lecturas pueden
+hacerse con memory-mapping y proyectando sólo las columnas necesarias. El
+número de filas está en los metadatos de cada partición, sin recorrer datos.
+
+Uso típico:
+    from data_management.columnar_store import ColumnarStore, read_market_data
+    store = ColumnarStore('market_store')
+    store.write(df, 'SOLUSDT', '1m')
+    df = store.read('SOLUSDT', '1m', columns=['open_time', 'close'])
+
+    # Lector compatible con las rutas CSV existentes: si existe el dataset
+    # convertido ('<fichero>.cstore') se lee de ahí, si no del CSV.
+    df = read_market_data('processed_data/SOLUSDT_full_concat.csv')
+    for chunk in iter_market_data('processed_data/SOLUSDT_full_concat.csv', chunksize=100_000):
+        ...
+
+Conversión única del archivo CSV:
+    python -m data_management.columnar_store binance_data/SOLUSDT_raw_historical_data_*.csv \
+        --root market_store --symbol SOLUSDT --interval 1m
+"""
+
+import glob
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_SUFFIX = '.cstore'
+META_FILE = '_meta.json'
+PARTITION_PREFIX = 'date='
+TIME_COLUMNS = ('open_time', 'timestamp', 'close_time', 'time', 'date')
+
+
+def _is_time_column(name: str) -> bool:
+    return name in TIME_COLUMNS or name.endswith('_time')
+
+
+def _to_datetime(values: pd.Series) -> pd.Series:
+    """Convierte una columna de tiempo (texto o epoch) a datetime64[ns]"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        converted = values
+    elif pd.api.types.is_numeric_dtype(values):
+        # Epoch en s, ms (Binance), us o ns según la magnitud
+        sample = values.dropna()
+        magnitude = sample.abs().max() if len(sample) else 0
+        unit = 's' if magnitude < 1e11 else 'ms' if magnitude < 1e14 else 'us' if magnitude < 1e17 else 'ns'
+        converted = pd.to_datetime(values, unit=unit)
+    else:
+        converted = pd.to_datetime(values)
+    if getattr(converted.dt, 'tz', None) is not None:
+        converted = converted.dt.tz_convert('UTC').dt.tz_localize(None)
+    return converted.astype('datetime64[ns]')
+
+
+def _normalize_frame(df: pd.DataFrame, time_column: str, float_dtype: str) -> pd.DataFrame:
+    """Tipa las columnas para el almacén: tiempos, enteros, floats y texto"""
+    columns = {}
+    for name in df.columns:
+        series = df[name]
+        if name == time_column or (_is_time_column(name) and not pd.api.types.is_float_dtype(series)):
+            try:
+                columns[name] = _to_datetime(series)
+                continue
+            except (ValueError, TypeError):
+                if name == time_column:
+                    raise
+        if pd.api.types.is_bool_dtype(series):
+            columns[name] = series.astype(np.bool_)
+        elif pd.api.types.is_integer_dtype(series):
+            columns[name] = series.astype(np.int64)
+        elif pd.api.types.is_numeric_dtype(series):
+            columns[name] = series.astype(float_dtype)
+        else:
+            numeric = pd.to_numeric(series, errors='coerce')
+            if numeric.notna().sum() == series.notna().sum():
+                columns[name] = numeric.astype(float_dtype)
+            else:
+                columns[name] = series.astype(str)
+    return pd.DataFrame(columns, index=df.index)
+
+
+class ColumnarDataset:
+    """
+    Un dataset columnar (un símbolo/intervalo/tipo) particionado por mes
+    """
+
+    def __init__(self, path: str, time_column: Optional[str] = None):
+        """
+        Args:
+            path: Directorio del dataset
+            time_column: Columna temporal usada para particionar (por defecto
+                la guardada en los metadatos, o 'open_time'/'timestamp')
+        """
+        self.path = path
+        self._time_column = time_column
+
+    @property
+    def time_column(self) -> Optional[str]:
+        if self._time_column:
+            return self._time_column
+        partitions = self.partitions()
+        if partitions:
+            self._time_column = self._read_meta(partitions[0]).get('time_column')
+        return self._time_column
+
+    def exists(self) -> bool:
+        return bool(self.partitions())
+
+    def partitions(self) -> List[str]:
+        """Nombres de partición ('2020-08', ...) en orden cronológico"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(
+            name[len(PARTITION_PREFIX):] for name in os.listdir(self.path)
+            if name.startswith(PARTITION_PREFIX)
+            and os.path.exists(os.path.join(self.path, name, META_FILE))
+        )
+
+    def _partition_dir(self, partition: str) -> str:
+        return os.path.join(self.path, f"{PARTITION_PREFIX}{partition}")
+
+    def _read_meta(self, partition: str) -> Dict:
+        with open(os.path.join(self._partition_dir(partition), META_FILE), 'r') as f:
+            return json.load(f)
+
+    def columns(self) -> List[str]:
+        partitions = self.partitions()
+        return list(self._read_meta(partitions[-1])['columns']) if partitions else []
+
+    def num_rows(self) -> int:
+        """Número total de filas, leído de los metadatos"""
+        return sum(self._read_meta(p)['rows'] for p in self.partitions())
+
+    def write(self, df: pd.DataFrame, time_column: Optional[str] = None,
+              mode: str = 'append', float_dtype: str = 'float32') -> int:
+        """
+        Escribe un DataFrame en el dataset, una partición por mes
+
+        Con ``mode='append'`` las filas se combinan con las de las particiones
+        existentes (deduplicando por tiempo, prevalece la nueva); con
+        ``mode='overwrite'`` se borra el dataset antes de escribir.
+
+        Args:
+            df: Datos a escribir (la columna temporal puede ser el índice)
+            time_column: Columna temporal (por defecto 'open_time' o 'timestamp')
+            mode: 'append' u 'overwrite'
+            float_dtype: Tipo para columnas decimales
+
+        Returns:
+            int: Filas escritas
+        """
+        if mode not in ('append', 'overwrite'):
+            raise ValueError(f"Modo de escritura no soportado: {mode}")
+
+        if isinstance(df.index, pd.DatetimeIndex) or (df.index.name and df.index.name not in df.columns):
+            df = df.reset_index()
+        time_column = time_column or self._time_column or next(
+            (c for c in ('open_time', 'timestamp') if c in df.columns), None)
+        if time_column is None or time_column not in df.columns:
+            raise ValueError("Se necesita una columna temporal para particionar el dataset")
+        self._time_column = time_column
+
+        if mode == 'overwrite' and os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path, exist_ok=True)
+
+        frame = _normalize_frame(df, time_column, float_dtype)
+        frame = frame.dropna(subset=[time_column])
+        partition_keys = frame[time_column].dt.strftime('%Y-%m')
+
+        existing = set(self.partitions())
+        written = 0
+        for partition, part in frame.groupby(partition_keys, sort=True):
+            if partition in existing:
+                previous = self._read_partition(partition, None, mmap=False)
+                part = pd.concat([previous, part], ignore_index=True)
+            part = (part.drop_duplicates(subset=[time_column], keep='last')
+                        .sort_values(time_column, kind='stable')
+                        .reset_index(drop=True))
+            self._write_partition(partition, part, time_column)
+            written += len(part)
+        return written
+
+    def _write_partition(self, partition: str, part: pd.DataFrame, time_column: str):
+        """Escribe una partición en un directorio temporal y la sustituye de forma atómica"""
+        final_dir = self._partition_dir(partition)
+        tmp_dir = final_dir + '.tmp'
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+
+        dtypes = {}
+        for name in part.columns:
+            values = part[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), values, allow_pickle=False)
+            dtypes[name] = str(values.dtype)
+
+        meta = {
+            'rows': len(part),
+            'time_column': time_column,
+            'columns': dtypes,
+            'start': str(part[time_column].iloc[0]) if len(part) else None,
+            'end': str(part[time_column].iloc[-1]) if len(part) else None
+        }
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        old_dir = final_dir + '.old'
+        if os.path.isdir(final_dir):
+            os.replace(final_dir, old_dir)
+        os.replace(tmp_dir, final_dir)
+        if os.path.isdir(old_dir):
+            shutil.rmtree(old_dir)
+
+    def _read_partition(self, partition: str, columns: Optional[Iterable[str]],
+                        mmap: bool) -> pd.DataFrame:
+        meta = self._read_meta(partition)
+        names = [c for c in meta['columns'] if columns is None or c in columns]
+        directory = self._partition_dir(partition)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"),
+                          mmap_mode='r' if mmap else None, allow_pickle=False)
+            for name in names
+        }
+        return pd.DataFrame(arrays, copy=False)
+
+    def read_arrays(self, columns: Optional[Iterable[str]] = None,
+                    partitions: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Lee columnas como arrays de NumPy. Con una sola partición los arrays
+        son memory-maps de solo lectura (sin copia).
+        """
+        selected = list(partitions) if partitions is not None else self.partitions()
+        columns = list(columns) if columns is not None else None
+        per_partition = []
+        for partition in selected:
+            meta = self._read_meta(partition)
+            names = [c for c in meta['columns'] if columns is None or c in columns]
+            directory = self._partition_dir(partition)
+            per_partition.append({
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+                for name in names
+            })
+        if not per_partition:
+            return {}
+        if len(per_partition) == 1:
+            return per_partition[0]
+        return {name: np.concatenate([p[name] for p in per_partition]) for name in per_partition[0]}
+
+    def read(self, columns: Optional[Iterable[str]] = None,
+             start: Optional[Union[str, pd.Timestamp]] = None,
+             end: Optional[Union[str, pd.Timestamp]] = None,
+             mmap: bool = True) -> pd.DataFrame:
+        """
+        Lee el dataset (o un rango temporal) como DataFrame
+
+        Args:
+            columns: Columnas a leer (None = todas); las inexistentes se ignoran
+            start: Inicio del rango (incluido)
+            end: Fin del rango (incluido)
+            mmap: Leer los ficheros con memory-mapping
+
+        Returns:
+            pd.DataFrame: Datos con la columna temporal como columna normal
+        """
+        partitions = self.partitions()
+        if not partitions:
+            return pd.DataFrame()
+
+        time_column = self.time_column
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        if start is not None:
+            partitions = [p for p in partitions if p >= start.strftime('%Y-%m')]
+        if end is not None:
+            partitions = [p for p in partitions if p <= end.strftime('%Y-%m')]
+
+        columns = list(columns) if columns is not None else None
+        needed = columns
+        if columns is not None and (start is not None or end is not None) and time_column not in columns:
+            needed = columns + [time_column]
+
+        frames = [self._read_partition(p, needed, mmap) for p in partitions]
+        if not frames:
+            return pd.DataFrame(columns=columns or self.columns())
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+        if start is not None or end is not None:
+            mask = np.ones(len(df), dtype=bool)
+            if start is not None:
+                mask &= (df[time_column] >= start).to_numpy()
+            if end is not None:
+                mask &= (df[time_column] <= end).to_numpy()
+            df = df.loc[mask].reset_index(drop=True)
+        if columns is not None:
+            df = df[[c for c in columns if c in df.columns]]
+        return df
+
+
+class ColumnarStore:
+    """
+    Almacén de datasets columnares por símbolo, intervalo y tipo
+    ('klines' para velas raw, 'features' para datasets procesados)
+    """
+
+    def __init__(self, root: str = 'market_store'):
+        self.root = root
+
+    def dataset(self, symbol: str, interval: str, kind: str = 'klines') -> ColumnarDataset:
+        return ColumnarDataset(os.path.join(self.root, kind, symbol, interval))
+
+    def write(self, df: pd.DataFrame, symbol: str, interval: str, kind: str = 'klines',
+              time_column: Optional[str] = None, mode: str = 'append',
+              float_dtype: str = 'float32') -> int:
+        return self.dataset(symbol, interval, kind).write(df, time_column, mode, float_dtype)
+
+    def read(self, symbol: str, interval: str, kind: str = 'klines',
+             columns: Optional[Iterable[str]] = None, start=None, end=None,
+             mmap: bool = True) -> pd.DataFrame:
+        return self.dataset(symbol, interval, kind).read(columns, start, end, mmap)
+
+    def list_datasets(self) -> List[Dict[str, str]]:
+        """Datasets disponibles como dicts con kind, symbol e interval"""
+        datasets = []
+        for meta_path in glob.glob(os.path.join(self.root, '*', '*', '*', f"{PARTITION_PREFIX}*", META_FILE)):
+            interval_dir = os.path.dirname(os.path.dirname(meta_path))
+            kind_dir, symbol = os.path.split(os.path.dirname(interval_dir))
+            entry = {'kind': os.path.basename(kind_dir), 'symbol': symbol,
+                     'interval': os.path.basename(interval_dir)}
+            if entry not in datasets:
+                datasets.append(entry)
+        return datasets
+
+
+def dataset_path_for_csv(csv_path: str) -> str:
+    """Ruta del dataset columnar equivalente a un CSV ('x.csv' -> 'x.cstore')"""
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+
+def _resolve_dataset(source: str) -> Optional[ColumnarDataset]:
+    if os.path.isdir(source):
+        dataset = ColumnarDataset(source)
+        return dataset if dataset.exists() else None
+    if source.endswith('.csv'):
+        store_path = dataset_path_for_csv(source)
+        if os.path.isdir(store_path):
+            dataset = ColumnarDataset(store_path)
+            if dataset.exists():
+                if os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(store_path):
+                    logger.warning(f"El CSV '{source}' es más reciente que su dataset columnar; se usa el CSV.")
+                    return None
+                return dataset
+    return None
+
+
+def read_market_data(source: str, columns: Optional[Iterable[str]] = None,
+                     start=None, end=None) -> pd.DataFrame:
+    """
+    Lector compatible con ``pd.read_csv`` para los cargadores existentes
+
+    Si ``source`` es un dataset columnar, o un CSV con su dataset convertido
+    al lado, se lee del almacén (proyectando columnas y con memory-mapping);
+    si no, se lee el CSV.
+
+    Args:
+        source: Ruta a un CSV o a un directorio de dataset
+        columns: Columnas a leer (None = todas); las inexistentes se ignoran
+        start: Inicio del rango temporal (sólo datasets columnares)
+        end: Fin del rango temporal (sólo datasets columnares)
+
+    Returns:
+        pd.DataFrame: Datos leídos
+    """
+    dataset = _resolve_dataset(source)
+    if dataset is not None:
+        return dataset.read(columns=columns, start=start, end=end)
+
+    if columns is not None:
+        wanted = set(columns)
+        return pd.read_csv(source, usecols=lambda c: c in wanted)
+    return pd.read_csv(source)
+
+
+def iter_market_data(sources: Union[str, List[str]], columns: Optional[Iterable[str]] = None,
+                     chunksize: int = 500_000, nrows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """
+    Lector por bloques compatible con ``pd.read_csv(..., chunksize=...)``
+
+    Para cada fuente, si existe su dataset columnar se leen sus particiones
+    (proyectando columnas y con memory-mapping) sin pasar por el CSV; si no,
+    se lee el CSV por bloques. Con una lista de fuentes se encadenan en orden.
+
+    Args:
+        sources: Ruta (o lista de rutas) a CSV o directorios de dataset
+        columns: Columnas a leer (None = todas); las inexistentes se ignoran
+        chunksize: Filas máximas por bloque
+        nrows: Filas máximas en total (None = todas)
+
+    Yields:
+        pd.DataFrame: Bloques de datos en orden
+    """
+    remaining = nrows
+    for source in ([sources] if isinstance(sources, str) else sources):
+        dataset = _resolve_dataset(source)
+        if dataset is not None:
+            wanted = list(columns) if columns is not None else None
+            blocks = (part.iloc[start:start + chunksize].reset_index(drop=True)
+                      for part in (dataset._read_partition(p, wanted, mmap=True)
+                                   for p in dataset.partitions())
+                      for start in range(0, len(part), chunksize))
+        else:
+            wanted = set(columns) if columns is not None else None
+            blocks = pd.read_csv(source, chunksize=chunksize,
+                                 usecols=(lambda c: c in wanted) if wanted is not None else None)
+        for block in blocks:
+            if remaining is not None:
+                if remaining <= 0:
+                    return
+                block = block.iloc[:remaining]
+                remaining -= len(block)
+            yield block
+
+
+def count_rows(source: str) -> int:
+    """
+    Cuenta filas de datos sin parsear el fichero: metadatos para datasets
+    columnares, conteo de saltos de línea por bloques para CSV
+    """
+    dataset = _resolve_dataset(source)
+    if dataset is not None:
+        return dataset.num_rows()
+
+    lines = 0
+    last_byte = b'\n'
+    with open(source, 'rb') as f:
+        while True:
+            block = f.read(1 << 24)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last_byte = block[-1:]
+    if last_byte != b'\n':
+        lines += 1
+    return max(lines - 1, 0)  # sin la cabecera
+
+
+def convert_csv_to_store(csv_paths: Union[str, List[str]], dataset: Union[str, ColumnarDataset, None] = None,
+                         time_column: Optional[str] = None, chunksize: int = 500_000,
+                         float_dtype: str = 'float32') -> int:
+    """
+    Conversión única de uno o varios CSV a un dataset columnar
+
+    Args:
+        csv_paths: Ruta o lista de rutas CSV (se procesan en orden)
+        dataset: Dataset o directorio destino (por defecto '<csv>.cstore'
+            junto al primer CSV)
+        time_column: Columna temporal (por defecto 'open_time' o 'timestamp')
+        chunksize: Filas por bloque de lectura
+        float_dtype: Tipo para columnas decimales
+
+    Returns:
+        int: Filas escritas en el dataset
+    """
+    if isinstance(csv_paths, str):
+        csv_paths = [csv_paths]
+    csv_paths = sorted(csv_paths)
+    if dataset is None:
+        dataset = dataset_path_for_csv(csv_paths[0])
+    if isinstance(dataset, str):
+        dataset = ColumnarDataset(dataset, time_column)
+
+    for path in csv_paths:
+        logger.info(f"Convirtiendo '{path}' -> '{dataset.path}'...")
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            # Un CSV guardado con índice de tiempo trae la columna sin nombre
+            chunk = chunk.rename(columns={'Unnamed: 0': time_column or 'open_time'})
+            dataset.write(chunk, time_column=time_column, mode='append', float_dtype=float_dtype)
+
+    rows = dataset.num_rows()
+    logger.info(f"Dataset '{dataset.path}' con {rows} filas en {len(dataset.partitions())} particiones.")
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Convierte CSVs históricos al almacén columnar")
+    parser.add_argument('csv', nargs='+', help="Ficheros CSV (admite comodines)")
+    parser.add_argument('--root', help="Raíz del almacén (con --symbol/--interval)")
+    parser.add_argument('--symbol', help="Símbolo, p.ej. SOLUSDT")
+    parser.add_argument('--interval', default='1m', help="Intervalo de las velas")
+    parser.add_argument('--kind', default='klines', help="'klines' o 'features'")
+    parser.add_argument('--time-column', default=None, help="Columna temporal")
+    parser.add_argument('--float-dtype', default='float32', help="Tipo de las columnas decimales")
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in args.csv for p in glob.glob(pattern))
+    if not paths:
+        parser.error("No se encontraron ficheros CSV")
+
+    if args.root and args.symbol:
+        target = ColumnarStore(args.root).dataset(args.symbol, args.interval, args.kind)
+        convert_csv_to_store(paths, target, args.time_column, float_dtype=args.float_dtype)
+    else:
+        # Sin almacén: cada CSV se convierte a su '.cstore' (lo usa read_market_data)
+        for path in paths:
+            convert_csv_to_store(path, None, args.time_column, float_dtype=args.float_dtype)
@@ -1,15 +1,77 @@
 import aiosqlite
+import asyncio
 import logging
 import os
-from typing import Dict, Any
+import sqlite3
+import time
+from collections import deque
+from typing import Dict, Any, Callable, List, Optional, Tuple
 from dotenv import load_dotenv
 
 logger = logging.getLogger("SolanaScalper")
 
 load_dotenv()
 
+# Sentencias de inserción por tabla (se ejecutan con executemany al vaciar el buffer)
+INSERT_STATEMENTS = {
+    'tickers': """
+        INSERT OR IGNORE INTO tickers (
+            timestamp, instrument_id, last_price, ask_1, bid_1,
+            high_24h, low_24h, vol_ccy_24h, vol_24h
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+    'order_book': """
+        INSERT OR IGNORE INTO order_book (
+            timestamp, instrument_id, best_bid, best_bid_size,
+            best_ask, best_ask_size, checksum
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+    # Upsert: la versión final de una vela sustituye a cualquier snapshot previo
+    'candlesticks': """
+        INSERT INTO candlesticks (
+            timestamp, instrument_id, interval, open_price, high_price, low_price, close_price, volume, volume_currency, timestamp_received
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (timestamp, instrument_id, interval) DO UPDATE SET
+            open_price = excluded.open_price,
+            high_price = excluded.high_price,
+            low_price = excluded.low_price,
+            close_price = excluded.close_price,
+            volume = excluded.volume,
+            volume_currency = excluded.volume_currency,
+            timestamp_received = excluded.timestamp_received
+    """
+}
+
+# Errores propios de una fila (restricción, tipo o número de columnas): al
+# reintentar fila a fila, sólo esa fila se aparta; el resto se guarda
+ROW_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError,
+              sqlite3.DataError, OverflowError, TypeError, ValueError)
+
+CANDLE_FIELDS = ('timestamp', 'instrument', 'interval', 'open', 'high', 'low', 'close',
+                 'volume', 'volume_currency', 'timestamp_received')
+
+
 class HistoricalDataSaver:
-    def __init__(self, db_path=None):
+    """
+    Guarda tickers, order book y velas en SQLite con escritura diferida.
+
+    Los save_* sólo convierten el mensaje en una fila y la añaden a un buffer
+    por tabla; una tarea en segundo plano vuelca el buffer con executemany en
+    una única transacción cuando se alcanzan ``batch_size`` filas o pasan
+    ``flush_interval`` segundos. Si el backlog llega a ``max_backlog`` filas,
+    el save_* espera al vaciado (backpressure hacia el consumidor de la cola).
+    Si un lote falla, se reintenta fila a fila: las filas que siguen fallando
+    por sí mismas se apartan en ``rejected_rows`` y el resto se guarda.
+
+    Las velas en formación (OKX reenvía la misma vela muchas veces) se
+    mantienen en memoria por (instrumento, intervalo) y sólo se escribe una
+    fila cuando la vela se confirma, ya sea por el flag ``confirm`` de OKX o
+    por la llegada de la vela siguiente. Cada vela cerrada se notifica a los
+    callbacks registrados con ``register_bar_closed_callback``.
+    """
+
+    def __init__(self, db_path=None, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_backlog: int = 20000, max_rejected: int = 1000):
         if db_path is None:
             self.db_path = os.getenv("DATABASE_PATH", "data/market_data.db")
         else:
@@ -19,17 +81,81 @@ class HistoricalDataSaver:
             os.makedirs(db_dir, exist_ok=True)
         self.conn = None
 
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backlog = max(max_backlog, batch_size)
+
+        self._buffers: Dict[str, List[Tuple]] = {table: [] for table in INSERT_STATEMENTS}
+        self._backlog = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        # Últimas filas rechazadas por la DB: (tabla, fila, error)
+        self.rejected_rows: deque = deque(maxlen=max_rejected)
+
+        # Vela en formación por (instrumento, intervalo): {'bar': Dict, 'closed': bool}
+        self._current_bars: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._bar_closed_callbacks: List[Callable] = []
+
+        self.metrics = {
+            'rows_buffered': 0,
+            'rows_flushed': 0,
+            'rows_dropped': 0,
+            'rows_rejected': 0,
+            'flush_count': 0,
+            'flush_errors': 0,
+            'backpressure_waits': 0,
+            'last_flush_latency_ms': 0.0,
+            'max_flush_latency_ms': 0.0,
+            'total_flush_latency_ms': 0.0,
+            'last_flush_rows': 0,
+            'last_flush_time': None,
+            'candle_updates': 0,
+            'bars_closed': 0,
+            'stale_candles': 0
+        }
+
     async def connect(self):
         try:
             self.conn = await aiosqlite.connect(self.db_path)
+            # WAL: los lectores no bloquean al escritor y cada commit no reescribe la DB
+            await self.conn.execute("PRAGMA journal_mode=WAL")
+            await self.conn.execute("PRAGMA synchronous=NORMAL")
             await self._create_tables()
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_loop())
             logger.info(f"[HistoricalDataSaver]: Conectado a DB async '{self.db_path}' y tablas verificadas.")
         except Exception as e:
             logger.error(f"[HistoricalDataSaver ERROR]: Error al conectar a la base de datos: {e}")
             self.conn = None
 
     async def disconnect(self):
+        if self._flush_task is not None:
+            # No cancelar un volcado a medias: dejaría la transacción abierta
+            # y sus filas fuera del buffer
+            async with self._flush_lock:
+                self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
         if self.conn:
+            # Las velas aún en formación se guardan como parciales; el upsert
+            # las corregirá si la vela se confirma en una sesión posterior
+            for entry in self._current_bars.values():
+                if not entry['closed']:
+                    self._buffer_candle(entry['bar'])
+            # Vaciado final durable: synchronous=FULL y checkpoint del WAL antes de cerrar
+            try:
+                await self.conn.execute("PRAGMA synchronous=FULL")
+                await self.flush()
+                await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                logger.error(f"[HistoricalDataSaver ERROR]: Error en el vaciado final: {e}")
+            if self._backlog:
+                logger.error(f"[HistoricalDataSaver ERROR]: {self._backlog} filas sin guardar al desconectar.")
             await self.conn.close()
             self.conn = None
             logger.info(f"[HistoricalDataSaver]: Desconectado de la base de datos '{self.db_path}'.")
@@ -81,13 +207,167 @@ class HistoricalDataSaver:
         """)
         await self.conn.commit()
 
-    async def save_ticker_data(self, data: Dict[str, Any]):
+    async def _ensure_connection(self, kind: str) -> bool:
+        if self.conn:
+            return True
+        logger.warning(f"[HistoricalDataSaver]: Conexión a DB no activa al guardar {kind}. Intentando reconectar...")
+        await self.connect()
         if not self.conn:
-            logger.warning("[HistoricalDataSaver]: Conexión a DB no activa al guardar ticker. Intentando reconectar...")
-            await self.connect()
-            if not self.conn:
-                logger.error("[HistoricalDataSaver ERROR]: No se pudo reconectar a la DB para guardar ticker.")
-                return
+            logger.error(f"[HistoricalDataSaver ERROR]: No se pudo reconectar a la DB para guardar {kind}.")
+            return False
+        return True
+
+    async def _enqueue(self, table: str, row: Tuple):
+        """Añade una fila al buffer de su tabla y aplica backpressure si hace falta"""
+        self._buffers[table].append(row)
+        self._backlog += 1
+        self.metrics['rows_buffered'] += 1
+
+        if self._backlog >= self.max_backlog:
+            # El volcado en segundo plano no da abasto: el consumidor espera
+            self.metrics['backpressure_waits'] += 1
+            await self.flush()
+        elif self._backlog >= self.batch_size:
+            self._flush_requested.set()
+
+    def _buffer_candle(self, bar: Dict[str, Any]):
+        """Añade una vela al buffer sin pasar por la backpressure (uso interno)"""
+        self._buffers['candlesticks'].append(tuple(bar[field] for field in CANDLE_FIELDS))
+        self._backlog += 1
+        self.metrics['rows_buffered'] += 1
+
+    async def _flush_loop(self):
+        """Tarea en segundo plano: vacía el buffer por tamaño o por tiempo"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            if self._backlog:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"[HistoricalDataSaver ERROR]: Error en el volcado periódico: {e}")
+
+    async def flush(self) -> int:
+        """
+        Vuelca todas las filas pendientes en una sola transacción
+
+        Si el lote falla se reintenta fila a fila: las filas con errores
+        propios se apartan en ``rejected_rows`` y el resto se guarda. Sólo si
+        falla la DB (no una fila) se devuelve el lote al buffer.
+
+        Returns:
+            int: Número de filas escritas
+        """
+        async with self._flush_lock:
+            if not self.conn or not self._backlog:
+                return 0
+
+            batches = {table: rows for table, rows in self._buffers.items() if rows}
+            self._buffers = {table: [] for table in INSERT_STATEMENTS}
+            rows_count = self._backlog
+            self._backlog = 0
+
+            start = time.perf_counter()
+            try:
+                for table, rows in batches.items():
+                    await self.conn.executemany(INSERT_STATEMENTS[table], rows)
+                await self.conn.commit()
+            except Exception as e:
+                self.metrics['flush_errors'] += 1
+                logger.error(f"[HistoricalDataSaver ERROR]: Error al volcar {rows_count} filas: {e}")
+                await self._rollback()
+                try:
+                    rows_count -= await self._write_rows_individually(batches)
+                except Exception as retry_error:
+                    # Error de la DB (bloqueada, disco...), no de una fila concreta
+                    logger.error(f"[HistoricalDataSaver ERROR]: Error al reintentar fila a fila: {retry_error}")
+                    await self._rollback()
+                    # Devolver las filas al buffer (delante de las nuevas) para reintentar
+                    for table, rows in batches.items():
+                        self._buffers[table][:0] = rows
+                    self._backlog += rows_count
+                    if self._backlog > 2 * self.max_backlog:
+                        self._drop_oldest(self._backlog - 2 * self.max_backlog)
+                    return 0
+
+            latency_ms = (time.perf_counter() - start) * 1000
+            self.metrics['rows_flushed'] += rows_count
+            self.metrics['flush_count'] += 1
+            self.metrics['last_flush_rows'] = rows_count
+            self.metrics['last_flush_latency_ms'] = latency_ms
+            self.metrics['max_flush_latency_ms'] = max(self.metrics['max_flush_latency_ms'], latency_ms)
+            self.metrics['total_flush_latency_ms'] += latency_ms
+            self.metrics['last_flush_time'] = time.time()
+            logger.debug(f"[HistoricalDataSaver]: {rows_count} filas volcadas en {latency_ms:.1f} ms")
+            return rows_count
+
+    async def _rollback(self):
+        try:
+            await self.conn.rollback()
+        except Exception:
+            pass
+
+    async def _write_rows_individually(self, batches: Dict[str, List[Tuple]]) -> int:
+        """
+        Escribe un lote fallido fila a fila en una transacción
+
+        Una sentencia que falla no deshace las anteriores de la transacción,
+        así que las filas con errores propios (ROW_ERRORS) se apartan y el
+        resto se confirma con un único commit. Cualquier otro error se propaga.
+
+        Returns:
+            int: Número de filas rechazadas
+        """
+        rejected = 0
+        for table, rows in batches.items():
+            for row in rows:
+                try:
+                    await self.conn.execute(INSERT_STATEMENTS[table], row)
+                except ROW_ERRORS as e:
+                    rejected += 1
+                    self.rejected_rows.append((table, row, str(e)))
+                    logger.error(f"[HistoricalDataSaver ERROR]: Fila rechazada en {table}: {row} ({e})")
+        await self.conn.commit()
+        self.metrics['rows_rejected'] += rejected
+        return rejected
+
+    def _drop_oldest(self, count: int):
+        """Descarta las filas más antiguas si la DB lleva demasiado tiempo fallando"""
+        for table in self._buffers:
+            if count <= 0:
+                break
+            dropped = min(count, len(self._buffers[table]))
+            del self._buffers[table][:dropped]
+            self._backlog -= dropped
+            self.metrics['rows_dropped'] += dropped
+            count -= dropped
+        logger.error(f"[HistoricalDataSaver ERROR]: Buffer lleno, {self.metrics['rows_dropped']} filas descartadas en total.")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas del pipeline de escritura
+
+        Returns:
+            Dict[str, Any]: Contadores de filas (incluidas las rechazadas),
+            backlog actual por tabla y latencias de volcado (última, máxima y
+            media en ms)
+        """
+        metrics = dict(self.metrics)
+        metrics['backlog'] = self._backlog
+        metrics['backlog_by_table'] = {table: len(rows) for table, rows in self._buffers.items()}
+        metrics['open_bars'] = sum(1 for entry in self._current_bars.values() if not entry['closed'])
+        metrics['avg_flush_latency_ms'] = (
+            self.metrics['total_flush_latency_ms'] / self.metrics['flush_count']
+            if self.metrics['flush_count'] else 0.0
+        )
+        return metrics
+
+    async def save_ticker_data(self, data: Dict[str, Any]):
+        if not await self._ensure_connection("ticker"):
+            return
 
         try:
             ticker_info = data.get('data')[0] if isinstance(data.get('data'), list) else {}
@@ -101,58 +381,99 @@ class HistoricalDataSaver:
             vol_ccy_24h = float(ticker_info.get('volCcy24h', 0))
             vol_24h = float(ticker_info.get('vol24h', 0))
 
-            await self.conn.execute("""
-                INSERT OR IGNORE INTO tickers (
-                    timestamp, instrument_id, last_price, ask_1, bid_1,
-                    high_24h, low_24h, vol_ccy_24h, vol_24h
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (ts, inst_id, last, ask_1, bid_1, high_24h, low_24h, vol_ccy_24h, vol_24h))
-            await self.conn.commit()
-            logger.debug(f"[HistoricalDataSaver]: Ticker guardado para {inst_id} @ {last}")
+            await self._enqueue('tickers', (ts, inst_id, last, ask_1, bid_1, high_24h, low_24h, vol_ccy_24h, vol_24h))
+            logger.debug(f"[HistoricalDataSaver]: Ticker encolado para {inst_id} @ {last}")
         except Exception as e:
             logger.error(f"[HistoricalDataSaver ERROR]: Error al guardar ticker: {e}")
 
     async def save_order_book_data(self, data: Dict[str, Any]):
-        if not self.conn:
-            logger.warning("[HistoricalDataSaver]: Conexión a DB no activa al guardar order book. Intentando reconectar...")
-            await self.connect()
-            if not self.conn:
-                logger.error("[HistoricalDataSaver ERROR]: No se pudo reconectar a la DB para guardar order book.")
-                return
+        if not await self._ensure_connection("order book"):
+            return
 
         try:
-            arg = data.get('arg', {})
-            inst_id = arg.get('instId')
-            ob_data = data.get('data')[0] if isinstance(data.get('data'), list) else {}
-            ts = int(ob_data.get('ts'))
-
-            bids = ob_data.get('bids', [])
-            asks = ob_data.get('asks', [])
-
-            best_bid_px = float(bids[0][0]) if bids else None
-            best_bid_sz = float(bids[0][1]) if bids else None
-            best_ask_px = float(asks[0][0]) if asks else None
-            best_ask_sz = float(asks[0][1]) if asks else None
-            checksum = ob_data.get('checksum')
-
-            await self.conn.execute("""
-                INSERT OR IGNORE INTO order_book (
-                    timestamp, instrument_id, best_bid, best_bid_size,
-                    best_ask, best_ask_size, checksum
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (ts, inst_id, best_bid_px, best_bid_sz, best_ask_px, best_ask_sz, checksum))
-            await self.conn.commit()
-            logger.debug(f"[HistoricalDataSaver]: Order book guardado para {inst_id}")
+            if 'instrument' in data:
+                # Elemento de la cola de modulo2: nivel 1 del libro local ya actualizado
+                inst_id = data['instrument']
+                ts = int(data.get('timestamp'))
+                best_bid_px, best_bid_sz = data.get('best_bid'), data.get('best_bid_size')
+                best_ask_px, best_ask_sz = data.get('best_ask'), data.get('best_ask_size')
+                checksum = data.get('checksum')
+            else:
+                arg = data.get('arg', {})
+                inst_id = arg.get('instId')
+                ob_data = data.get('data')[0] if isinstance(data.get('data'), list) else {}
+                ts = int(ob_data.get('ts'))
+
+                bids = ob_data.get('bids', [])
+                asks = ob_data.get('asks', [])
+
+                best_bid_px = float(bids[0][0]) if bids else None
+                best_bid_sz = float(bids[0][1]) if bids else None
+                best_ask_px = float(asks[0][0]) if asks else None
+                best_ask_sz = float(asks[0][1]) if asks else None
+                checksum = ob_data.get('checksum')
+
+            await self._enqueue('order_book', (ts, inst_id, best_bid_px, best_bid_sz, best_ask_px, best_ask_sz, checksum))
+            logger.debug(f"[HistoricalDataSaver]: Order book encolado para {inst_id}")
         except Exception as e:
             logger.error(f"[HistoricalDataSaver ERROR]: Error al guardar order book: {e}")
 
-    async def save_candlestick_data(self, data: Dict[str, Any]):
-        if not self.conn:
-            logger.warning("[HistoricalDataSaver]: Conexión a DB no activa al guardar candlestick. Intentando reconectar...")
-            await self.connect()
-            if not self.conn:
-                logger.error("[HistoricalDataSaver ERROR]: No se pudo reconectar a la DB para guardar candlestick.")
+    def register_bar_closed_callback(self, callback: Callable[[Dict[str, Any]], Any]):
+        """
+        Registra un callback que recibe cada vela cerrada
+
+        Args:
+            callback: Función o corrutina ``callback(bar)``; ``bar`` es un dict
+                con las claves de CANDLE_FIELDS más ``confirmed_by``
+                ('confirm' o 'next_bar')
+        """
+        self._bar_closed_callbacks.append(callback)
+
+    def get_current_bar(self, inst_id: str, interval: str) -> Optional[Dict[str, Any]]:
+        """Último snapshot de la vela en formación (o recién cerrada) de un instrumento"""
+        entry = self._current_bars.get((inst_id, interval))
+        return dict(entry['bar']) if entry else None
+
+    async def _close_bar(self, bar: Dict[str, Any], confirmed_by: str):
+        """Escribe la versión final de una vela y notifica a los suscriptores"""
+        await self._enqueue('candlesticks', tuple(bar[field] for field in CANDLE_FIELDS))
+        self.metrics['bars_closed'] += 1
+
+        event = dict(bar, confirmed_by=confirmed_by)
+        for callback in self._bar_closed_callbacks:
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"[HistoricalDataSaver ERROR]: Error en callback de vela cerrada: {e}")
+
+    async def _update_candle(self, bar: Dict[str, Any], confirmed: bool):
+        """Actualiza la vela en formación y la cierra si corresponde"""
+        key = (bar['instrument'], bar['interval'])
+        entry = self._current_bars.get(key)
+
+        if entry is not None:
+            current_ts = entry['bar']['timestamp']
+            if bar['timestamp'] < current_ts:
+                # Snapshot retrasado de una vela ya superada
+                self.metrics['stale_candles'] += 1
                 return
+            if bar['timestamp'] == current_ts and entry['closed']:
+                # Reenvío de una vela ya confirmada
+                return
+            if bar['timestamp'] > current_ts and not entry['closed']:
+                # La vela nueva confirma la anterior con su último snapshot
+                await self._close_bar(entry['bar'], 'next_bar')
+
+        self._current_bars[key] = {'bar': bar, 'closed': confirmed}
+        self.metrics['candle_updates'] += 1
+        if confirmed:
+            await self._close_bar(bar, 'confirm')
+
+    async def save_candlestick_data(self, data: Dict[str, Any]):
+        if not await self._ensure_connection("candlestick"):
+            return
 
         try:
             inst_id = data.get('instrument')
@@ -164,28 +485,26 @@ class HistoricalDataSaver:
                 logger.warning(f"[HistoricalDataSaver]: Datos de vela vacíos para {inst_id}. Saltando guardado.")
                 return
 
-            candle_data = candle_data_list[0]
+            # OKX puede enviar varias velas en un mensaje; se procesan de la más antigua a la más reciente
+            for candle_data in sorted(candle_data_list, key=lambda c: int(c[0]) if c else 0):
+                if len(candle_data) < 7:
+                    logger.warning(f"[HistoricalDataSaver]: Datos de vela incompletos para {inst_id} ({interval}). Saltando guardado. Datos: {candle_data}")
+                    continue
 
-            if len(candle_data) < 7:
-                logger.warning(f"[HistoricalDataSaver]: Datos de vela incompletos para {inst_id} ({interval}). Saltando guardado. Datos: {candle_data}")
-                return
-
-            ts = int(candle_data[0])
-            open_price = float(candle_data[1])
-            high_price = float(candle_data[2])
-            low_price = float(candle_data[3])
-            close_price = float(candle_data[4])
-            volume = float(candle_data[5])
-            volume_currency = float(candle_data[6])
-
-            await self.conn.execute(
-                """
-                INSERT OR IGNORE INTO candlesticks (
-                    timestamp, instrument_id, interval, open_price, high_price, low_price, close_price, volume, volume_currency, timestamp_received
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (ts, inst_id, interval, open_price, high_price, low_price, close_price, volume, volume_currency, timestamp_received)
-            )
-            await self.conn.commit()
+                bar = {
+                    'timestamp': int(candle_data[0]),
+                    'instrument': inst_id,
+                    'interval': interval,
+                    'open': float(candle_data[1]),
+                    'high': float(candle_data[2]),
+                    'low': float(candle_data[3]),
+                    'close': float(candle_data[4]),
+                    'volume': float(candle_data[5]),
+                    'volume_currency': float(candle_data[6]),
+                    'timestamp_received': timestamp_received
+                }
+                # Formato OKX: [ts, o, h, l, c, vol, volCcy, volCcyQuote, confirm]
+                confirmed = len(candle_data) > 8 and str(candle_data[8]) == '1'
+                await self._update_candle(bar, confirmed)
         except Exception as e:
             logger.error(f"[HistoricalDataSaver ERROR]: Error al guardar datos de candlestick: {e}")
@@ -0,0 +1,510 @@
+#!/usr/bin/env python3
+"""
+Descargador asíncrono de velas históricas de Binance
+
+Sustituye a los bucles de una petición cada vez (``download_historical_data``,
+``BinanceDataDownloader.get_klines_historical``):
+
+- Peticiones concurrentes acotadas (semáforo) sobre rangos de tiempo y
+  símbolos, con una única sesión HTTP y conexiones reutilizadas.
+- Límite de peso con un token bucket que se sincroniza con la cabecera
+  ``X-MBX-USED-WEIGHT-1M`` y se detiene el tiempo de ``Retry-After`` ante un
+  429/418.
+- Antes de descargar se leen los tiempos ya guardados en el almacén columnar
+  y sólo se piden los huecos (incluido el tramo posterior a la última vela
+  guardada, así que una descarga interrumpida se reanuda donde quedó). Las
+  velas duplicadas se descartan y se cuentan.
+- Las velas se escriben directamente en el ColumnarStore por bloques.
+
+Para pruebas, ``base_url`` puede apuntar a un servidor HTTP local que imite
+``/api/v3/klines``.
+
+Uso:
+    python -m data_management.kline_downloader SOLUSDT --interval 1m \\
+        --start 2020-08-11 --root market_store --concurrency 8
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+import numpy as np
+import pandas as pd
+
+from data_management.columnar_store import ColumnarDataset, ColumnarStore
+
+logger = logging.getLogger(__name__)
+
+BINANCE_API_URL = "https://api.binance.com"
+KLINES_PATH = "/api/v3/klines"
+
+# Velas por petición (máximo de Binance) y peso de una petición de 1000 velas
+MAX_LIMIT = 1000
+KLINES_WEIGHT = 2
+# Peso por minuto permitido (por debajo del límite publicado en exchangeInfo)
+DEFAULT_WEIGHT_LIMIT = 1200
+WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '6h': 21_600_000,
+    '8h': 28_800_000, '12h': 43_200_000, '1d': 86_400_000, '3d': 259_200_000
+}
+
+KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
+]
+NUMERIC_COLUMNS = ['open', 'high', 'low', 'close', 'volume',
+                   'quote_asset_volume', 'number_of_trades',
+                   'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume']
+
+
+def to_ms(value: Union[str, int, float, pd.Timestamp, None]) -> Optional[int]:
+    """Fecha (texto, datetime o epoch en ms) -> epoch en ms"""
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer, float)):
+        return int(value)
+    return int(pd.Timestamp(value).value // 1_000_000)
+
+
+def find_gaps(open_times: np.ndarray, interval_ms: int, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+    """
+    Rangos de velas que faltan en ``[start_ms, end_ms)``
+
+    Args:
+        open_times: Tiempos de apertura ya guardados (ms, ordenados)
+        interval_ms: Duración de una vela
+        start_ms: Inicio del rango (se alinea a la vela siguiente)
+        end_ms: Fin del rango (excluido)
+
+    Returns:
+        List[Tuple[int, int]]: Rangos ``[inicio, fin)`` de tiempos de apertura sin datos
+    """
+    start_ms = -(-start_ms // interval_ms) * interval_ms
+    if start_ms >= end_ms:
+        return []
+    times = np.asarray(open_times, dtype=np.int64)
+    times = times[(times >= start_ms) & (times < end_ms)]
+    bounds = np.concatenate(([start_ms - interval_ms], times, [end_ms]))
+    holes = np.flatnonzero(np.diff(bounds) > interval_ms)
+    return [(int(bounds[i]) + interval_ms, int(bounds[i + 1])) for i in holes]
+
+
+def plan_requests(gaps: List[Tuple[int, int]], interval_ms: int,
+                  limit: int = MAX_LIMIT) -> List[Tuple[int, int]]:
+    """
+    Divide los huecos en peticiones de como mucho ``limit`` velas
+
+    Returns:
+        List[Tuple[int, int]]: (startTime, endTime) de cada petición, ambos incluidos
+    """
+    span = limit * interval_ms
+    return [(start, min(start + span, gap_end) - 1)
+            for gap_start, gap_end in gaps
+            for start in range(gap_start, gap_end, span)]
+
+
+def klines_to_frame(rows: List[List[Any]]) -> pd.DataFrame:
+    """
+    Respuestas de /api/v3/klines -> DataFrame con el mismo esquema que los CSV
+    históricos (open_time/close_time como fechas, sin la columna 'ignore')
+    """
+    df = pd.DataFrame(rows, columns=KLINE_COLUMNS).drop(columns=['ignore'])
+    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
+    df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
+    for col in NUMERIC_COLUMNS:
+        values = pd.to_numeric(df[col], errors='coerce')
+        df[col] = values if col == 'number_of_trades' else values.astype(np.float64)
+    return df
+
+
+class TokenBucket:
+    """
+    Limitador de peso por minuto para asyncio.
+
+    Se rellena de forma continua a ``capacity`` unidades por minuto. El peso
+    que informa el exchange sólo puede reducir los tokens disponibles (otras
+    conexiones desde la misma IP también consumen), y ``pause`` bloquea todas
+    las peticiones hasta que vence el ``Retry-After``.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        """
+        Args:
+            capacity: Peso máximo por periodo
+            period: Duración del periodo en segundos
+        """
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight: float = 1.0) -> None:
+        """
+        Espera hasta poder consumir ``weight``
+
+        Args:
+            weight: Peso de la petición
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Un lock por event loop (cada asyncio.run crea uno nuevo)
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if self.tokens >= weight:
+                        self.tokens -= weight
+                        return
+                    delay = (weight - self.tokens) / self.rate
+                self.waits += 1
+                self.wait_seconds += delay
+                await asyncio.sleep(delay)
+
+    def observe_used(self, used_weight: float) -> None:
+        """
+        Ajusta los tokens al peso usado que informa el exchange
+
+        Args:
+            used_weight: Valor de la cabecera X-MBX-USED-WEIGHT-1M
+        """
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, self.capacity - used_weight)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Bloquea las peticiones durante ``seconds`` (429/418 con Retry-After)
+
+        Args:
+            seconds: Segundos de pausa
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+
+
+class KlineDownloader:
+    """
+    Descarga velas de uno o varios símbolos al almacén columnar, pidiendo sólo
+    lo que falta.
+
+    Puede usarse como contexto asíncrono (``async with``) para compartir la
+    sesión HTTP entre varias descargas; si no, cada llamada abre la suya.
+    """
+
+    def __init__(self, store: Union[str, ColumnarStore] = 'market_store',
+                 base_url: str = BINANCE_API_URL, max_concurrency: int = 8,
+                 weight_limit: float = DEFAULT_WEIGHT_LIMIT, request_weight: float = KLINES_WEIGHT,
+                 limit: int = MAX_LIMIT, max_retries: int = 5, timeout: float = 30.0,
+                 flush_rows: int = 200_000):
+        """
+        Args:
+            store: Almacén columnar (o su directorio raíz)
+            base_url: URL base de la API (un servidor local en pruebas)
+            max_concurrency: Peticiones simultáneas como máximo (entre todos los símbolos)
+            weight_limit: Peso por minuto permitido
+            request_weight: Peso de cada petición de velas
+            limit: Velas por petición
+            max_retries: Reintentos por petición ante errores de red, 5xx o 429/418
+            timeout: Timeout total de cada petición (segundos)
+            flush_rows: Velas acumuladas antes de escribir en el almacén
+        """
+        self.store = ColumnarStore(store) if isinstance(store, str) else store
+        self.base_url = base_url.rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.request_weight = request_weight
+        self.limit = limit
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.flush_rows = flush_rows
+
+        self.bucket = TokenBucket(weight_limit)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.requests = 0
+        self.retries = 0
+        self.failed_requests = 0
+
+    async def __aenter__(self) -> 'KlineDownloader':
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Abre la sesión HTTP compartida (pool de max_concurrency conexiones)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self) -> None:
+        """Cierra la sesión HTTP"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> List[List[Any]]:
+        """
+        Una petición de velas con límite de peso y reintentos
+
+        Returns:
+            List[List[Any]]: Velas recibidas (vacío si la petición falla definitivamente)
+        """
+        params = {"symbol": symbol, "interval": interval, "startTime": start_ms,
+                  "endTime": end_ms, "limit": self.limit}
+        url = f"{self.base_url}{KLINES_PATH}"
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire(self.request_weight)
+            try:
+                async with self._semaphore:
+                    async with self._session.get(url, params=params) as resp:
+                        self.requests += 1
+                        used = resp.headers.get(WEIGHT_HEADER)
+                        if used is not None:
+                            self.bucket.observe_used(float(used))
+                        if resp.status in (429, 418):
+                            retry_after = float(resp.headers.get('Retry-After', 2 ** attempt))
+                            logger.warning(f"Límite de peso alcanzado ({resp.status}): pausa de {retry_after:.1f}s")
+                            self.bucket.pause(retry_after)
+                            self.retries += 1
+                            continue
+                        if resp.status >= 500:
+                            raise aiohttp.ClientResponseError(resp.request_info, resp.history,
+                                                              status=resp.status, message=resp.reason)
+                        if resp.status >= 400:
+                            # Error del cliente (símbolo o parámetros inválidos): reintentar no sirve
+                            logger.error(f"Error {resp.status} pidiendo velas de {symbol}: {await resp.text()}")
+                            break
+                        data = await resp.json()
+                if not isinstance(data, list):
+                    logger.error(f"Respuesta inesperada pidiendo velas de {symbol}: {data}")
+                    break
+                return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    break
+                delay = min(2 ** attempt, 30)
+                logger.warning(f"Error de red pidiendo velas de {symbol} ({e}); reintento en {delay}s")
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+        self.failed_requests += 1
+        logger.error(f"Sin datos para {symbol} {interval} entre {start_ms} y {end_ms}")
+        return []
+
+    async def _fetch_requests(self, symbol: str, interval: str,
+                              requests: List[Tuple[int, int]]) -> List[List[Any]]:
+        results = await asyncio.gather(*(self._fetch(symbol, interval, a, b) for a, b in requests))
+        return [row for rows in results for row in rows]
+
+    async def fetch_frame(self, symbol: str, interval: str, start, end) -> pd.DataFrame:
+        """
+        Descarga un rango completo sin escribirlo en el almacén
+
+        Args:
+            symbol: Par (ej. SOLUSDT)
+            interval: Intervalo de las velas
+            start: Inicio del rango (incluido)
+            end: Fin del rango (excluido)
+
+        Returns:
+            pd.DataFrame: Velas ordenadas y sin duplicados
+        """
+        interval_ms = INTERVAL_MS[interval]
+        requests = plan_requests(find_gaps(np.empty(0, dtype=np.int64), interval_ms, to_ms(start), to_ms(end)),
+                                 interval_ms, self.limit)
+        opened = self._session is None
+        await self.open()
+        try:
+            rows = await self._fetch_requests(symbol, interval, requests)
+        finally:
+            if opened:
+                await self.close()
+        if not rows:
+            return pd.DataFrame(columns=KLINE_COLUMNS[:-1])
+        df = klines_to_frame(rows)
+        return df.drop_duplicates(subset=['open_time']).sort_values('open_time').reset_index(drop=True)
+
+    @staticmethod
+    def _stored_open_times(dataset: ColumnarDataset) -> np.ndarray:
+        if not dataset.exists():
+            return np.empty(0, dtype=np.int64)
+        time_column = dataset.time_column or 'open_time'
+        values = dataset.read_arrays([time_column]).get(time_column)
+        if values is None:
+            return np.empty(0, dtype=np.int64)
+        return np.asarray(values).astype('datetime64[ms]').astype(np.int64)
+
+    async def download(self, symbol: str, interval: str = '1m', start=None, end=None,
+                       fill_gaps: bool = True) -> Dict[str, Any]:
+        """
+        Descarga al almacén las velas que faltan de un símbolo
+
+        Args:
+            symbol: Par (ej. SOLUSDT)
+            interval: Intervalo de las velas
+            start: Inicio del rango (por defecto, la primera vela guardada)
+            end: Fin del rango, excluido (por defecto, la última vela cerrada)
+            fill_gaps: Rellenar también huecos intermedios; si False, sólo se
+                reanuda a partir de la última vela guardada
+
+        Returns:
+            Dict[str, Any]: Huecos encontrados, peticiones, velas nuevas,
+            duplicados, velas que siguen faltando, tiempo y velas por segundo
+        """
+        interval_ms = INTERVAL_MS[interval]
+        dataset = self.store.dataset(symbol, interval)
+        started = time.perf_counter()
+
+        stored = np.unique(self._stored_open_times(dataset))
+        stored_duplicates = 0
+        if dataset.exists():
+            stored_duplicates = dataset.num_rows() - len(stored)
+
+        start_ms = to_ms(start)
+        if start_ms is None:
+            if not len(stored):
+                raise ValueError(f"No hay velas guardadas de {symbol} {interval}: indica la fecha de inicio")
+            start_ms = int(stored[0])
+        end_ms = to_ms(end)
+        if end_ms is None:
+            end_ms = int(time.time() * 1000) // interval_ms * interval_ms
+        if not fill_gaps and len(stored):
+            start_ms = max(start_ms, int(stored[-1]) + interval_ms)
+
+        gaps = find_gaps(stored, interval_ms, start_ms, end_ms)
+        missing = sum((b - a) // interval_ms for a, b in gaps)
+        requests = plan_requests(gaps, interval_ms, self.limit)
+        logger.info(f"{symbol} {interval}: {len(stored)} velas guardadas, {len(gaps)} huecos "
+                    f"({missing} velas), {len(requests)} peticiones")
+
+        opened = self._session is None
+        await self.open()
+        new_candles = duplicates = 0
+        try:
+            batch = max(1, self.flush_rows // self.limit)
+            for i in range(0, len(requests), batch):
+                rows = await self._fetch_requests(symbol, interval, requests[i:i + batch])
+                if not rows:
+                    continue
+                df = klines_to_frame(rows)
+                unique = df.drop_duplicates(subset=['open_time'])
+                duplicates += len(df) - len(unique)
+                new_candles += len(unique)
+                await asyncio.to_thread(dataset.write, unique, 'open_time', 'append')
+        finally:
+            if opened:
+                await self.close()
+
+        elapsed = time.perf_counter() - started
+        still_missing = 0
+        if requests:
+            remaining = find_gaps(np.unique(self._stored_open_times(dataset)), interval_ms, start_ms, end_ms)
+            still_missing = sum((b - a) // interval_ms for a, b in remaining)
+        stats = {
+            'symbol': symbol,
+            'interval': interval,
+            'gaps': len(gaps),
+            'missing_before': int(missing),
+            'requests': len(requests),
+            'candles': new_candles,
+            'duplicates_received': duplicates,
+            'duplicates_stored': int(stored_duplicates),
+            'missing_after': int(still_missing),
+            'elapsed_s': round(elapsed, 3),
+            'candles_per_s': round(new_candles / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        logger.info(f"{symbol} {interval}: {new_candles} velas nuevas en {elapsed:.1f}s "
+                    f"({stats['candles_per_s']} velas/s), faltan {still_missing}")
+        return stats
+
+    async def download_many(self, symbols: List[str], interval: str = '1m', start=None, end=None,
+                            fill_gaps: bool = True) -> Dict[str, Any]:
+        """
+        Descarga varios símbolos a la vez, compartiendo sesión, concurrencia y límite de peso
+
+        Returns:
+            Dict[str, Any]: Estadísticas por símbolo (``symbols``) y totales
+            (velas, peticiones, reintentos, esperas por peso, velas por segundo)
+        """
+        started = time.perf_counter()
+        opened = self._session is None
+        await self.open()
+        try:
+            results = await asyncio.gather(*(self.download(symbol, interval, start, end, fill_gaps)
+                                             for symbol in symbols), return_exceptions=True)
+        finally:
+            if opened:
+                await self.close()
+
+        per_symbol = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error descargando {symbol}: {result}")
+                per_symbol[symbol] = {'error': str(result)}
+            else:
+                per_symbol[symbol] = result
+        elapsed = time.perf_counter() - started
+        candles = sum(r.get('candles', 0) for r in per_symbol.values())
+        return {
+            'symbols': per_symbol,
+            'candles': candles,
+            'requests': self.requests,
+            'retries': self.retries,
+            'failed_requests': self.failed_requests,
+            'rate_limit_waits': self.bucket.waits,
+            'rate_limit_wait_s': round(self.bucket.wait_seconds, 3),
+            'elapsed_s': round(elapsed, 3),
+            'candles_per_s': round(candles / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+    def run(self, symbols: Union[str, List[str]], interval: str = '1m', start=None, end=None,
+            fill_gaps: bool = True) -> Dict[str, Any]:
+        """Versión síncrona de ``download_many``"""
+        if isinstance(symbols, str):
+            symbols = [symbols]
+        return asyncio.run(self.download_many(symbols, interval, start, end, fill_gaps))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description="Descarga velas históricas de Binance al almacén columnar")
+    parser.add_argument('symbols', nargs='+', help="Pares, p.ej. SOLUSDT BTCUSDT")
+    parser.add_argument('--interval', default='1m', choices=sorted(INTERVAL_MS, key=INTERVAL_MS.get))
+    parser.add_argument('--start', default=None, help="Fecha de inicio (por defecto, reanudar lo guardado)")
+    parser.add_argument('--end', default=None, help="Fecha de fin (por defecto, ahora)")
+    parser.add_argument('--root', default='market_store', help="Raíz del almacén columnar")
+    parser.add_argument('--base-url', default=BINANCE_API_URL)
+    parser.add_argument('--concurrency', type=int, default=8, help="Peticiones simultáneas")
+    parser.add_argument('--weight-limit', type=float, default=DEFAULT_WEIGHT_LIMIT, help="Peso por minuto")
+    parser.add_argument('--no-fill-gaps', action='store_true', help="Sólo reanudar tras la última vela guardada")
+    args = parser.parse_args()
+
+    downloader = KlineDownloader(args.root, base_url=args.base_url, max_concurrency=args.concurrency,
+                                 weight_limit=args.weight_limit)
+    stats = downloader.run(args.symbols, args.interval, args.start, args.end, not args.no_fill_gaps)
+    print(json.dumps(stats, indent=2))
@@ -233,35 +233,36 @@ def get_current_price(symbol: str) -> float:
     except Exception as public_error:
         logger.error(f"Error obteniendo precio con API pública: {public_error}")
         
-    # MÉTODO 3: Intentar con datos recientes (respaldo)
-    df = get_market_data(symbol, "1m", 1)
+    try:
+        # MÉTODO 3: Intentar con datos recientes (respaldo)
+        df = get_market_data(symbol, "1m", 1)
     
-    if df is not None and not df.empty:
-        price = df['close'].iloc[-1]
-        logger.info(f"Precio de {symbol} desde datos recientes: ${price}")
-        return price
+        if df is not None and not df.empty:
+            price = df['close'].iloc[-1]
+            logger.info(f"Precio de {symbol} desde datos recientes: ${price}")
+            return price
     
-    # MÉTODO 4: Valores por defecto actualizados si no hay datos (última opción)
-    default_prices = {
-        "SOL-USDT": 178.75,  # Actualizado
-        "BTC-USDT": 68000.0,
-        "ETH-USDT": 3500.0,
-        "AVAX-USDT": 35.0,
-        "BNB-USDT": 600.0,
-        "MATIC-USDT": 0.8,
-        "ADA-USDT": 0.45,
-        "DOT-USDT": 7.5,
-        "LINK-USDT": 18.0,
-        "XRP-USDT": 0.55
-    }
+        # MÉTODO 4: Valores por defecto actualizados si no hay datos (última opción)
+        default_prices = {
+            "SOL-USDT": 178.75,  # Actualizado
+            "BTC-USDT": 68000.0,
+            "ETH-USDT": 3500.0,
+            "AVAX-USDT": 35.0,
+            "BNB-USDT": 600.0,
+            "MATIC-USDT": 0.8,
+            "ADA-USDT": 0.45,
+            "DOT-USDT": 7.5,
+            "LINK-USDT": 18.0,
+            "XRP-USDT": 0.55
+        }
     
-    price = default_prices.get(symbol, 100.0)
-    logger.warning(f"Usando precio predeterminado para {symbol}: ${price}")
-    return price
+        price = default_prices.get(symbol, 100.0)
+        logger.warning(f"Usando precio predeterminado para {symbol}: ${price}")
+        return price
     
-except Exception as e:
-    logger.error(f"Error obteniendo precio actual: {e}")
-    return 178.75  # Valor de respaldo para SOL actualizado
+    except Exception as e:
+        logger.error(f"Error obteniendo precio actual: {e}")
+        return 178.75  # Valor de respaldo para SOL actualizado
 
 def generate_test_data(symbol: str, timeframe: str = "15m", limit: int = 100) -> pd.DataFrame:
     """
@@ -0,0 +1,487 @@
+"""
+Libro de órdenes L2 local a partir de los canales ``books`` de OKX
+
+OKX envía por ``books-l2-tbt`` / ``books`` un snapshot inicial y después sólo
+los niveles que cambian (tamaño '0' = nivel eliminado), con ``prevSeqId`` /
+``seqId`` para detectar huecos y un CRC32 de los 25 mejores niveles de cada
+lado. OrderBook aplica esos mensajes sobre listas de niveles ordenadas
+(inserción/borrado por bisección) y valida secuencia y checksum; si algo no
+cuadra el libro se marca inválido y OrderBookManager pide una resuscripción
+para recibir un snapshot nuevo.
+
+Las consultas se hacen sobre OrderBookView, una vista inmutable con arrays
+NumPy (precios, tamaños y acumulados) que se construye como mucho una vez por
+versión del libro: mejor bid/ask en O(1), y volumen dentro de un x%, paredes y
+slippage estimado con búsqueda binaria sobre los acumulados. Al ser inmutable,
+la vista se puede compartir con otros hilos (bots) mientras el libro sigue
+actualizándose.
+"""
+
+import asyncio
+import logging
+import time
+import zlib
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHECKSUM_LEVELS = 25
+
+
+class _BookSide:
+    """
+    Un lado del libro: niveles ordenados del mejor al peor precio.
+
+    ``_keys`` está en orden ascendente (precio para asks, -precio para bids)
+    para poder usar bisect; ``_raw`` guarda precio y tamaño tal como llegan
+    (necesarios para el checksum).
+    """
+
+    def __init__(self, descending: bool):
+        self.descending = descending
+        self._keys: List[float] = []
+        self._sizes: List[float] = []
+        self._raw: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self):
+        self._keys.clear()
+        self._sizes.clear()
+        self._raw.clear()
+
+    def apply(self, levels: List[List[str]]):
+        """Aplica niveles ``[precio, tamaño, ...]``; tamaño 0 elimina el nivel"""
+        keys, sizes, raw = self._keys, self._sizes, self._raw
+        sign = -1.0 if self.descending else 1.0
+        for level in levels:
+            price_str, size_str = str(level[0]), str(level[1])
+            key = sign * float(price_str)
+            size = float(size_str)
+            i = bisect_left(keys, key)
+            exists = i < len(keys) and keys[i] == key
+            if size == 0:
+                if exists:
+                    del keys[i], sizes[i], raw[i]
+            elif exists:
+                sizes[i] = size
+                raw[i] = (price_str, size_str)
+            else:
+                keys.insert(i, key)
+                sizes.insert(i, size)
+                raw.insert(i, (price_str, size_str))
+
+    def top_raw(self, n: int) -> List[Tuple[str, str]]:
+        return self._raw[:n]
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(precios, tamaños) del mejor al peor nivel"""
+        prices = np.array(self._keys, dtype=np.float64)
+        if self.descending:
+            prices = -prices
+        return prices, np.array(self._sizes, dtype=np.float64)
+
+
+class OrderBookView:
+    """
+    Vista inmutable de un libro en un instante, con arrays para consultas rápidas.
+
+    ``side`` es 'bids' o 'asks'; los precios de referencia por defecto son el
+    precio medio.
+    """
+
+    def __init__(self, inst_id: str, bid_prices: np.ndarray, bid_sizes: np.ndarray,
+                 ask_prices: np.ndarray, ask_sizes: np.ndarray,
+                 ts: Optional[int] = None, version: int = 0):
+        self.inst_id = inst_id
+        self.ts = ts
+        self.version = version
+        self._prices = {'bids': bid_prices, 'asks': ask_prices}
+        self._sizes = {'bids': bid_sizes, 'asks': ask_sizes}
+        self._cum = {side: np.cumsum(self._sizes[side]) for side in ('bids', 'asks')}
+        self._cum_notional = {side: np.cumsum(self._sizes[side] * self._prices[side])
+                              for side in ('bids', 'asks')}
+
+    # --- Nivel 1 ---
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        prices = self._prices['bids']
+        return float(prices[0]) if len(prices) else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        prices = self._prices['asks']
+        return float(prices[0]) if len(prices) else None
+
+    @property
+    def best_bid_size(self) -> Optional[float]:
+        sizes = self._sizes['bids']
+        return float(sizes[0]) if len(sizes) else None
+
+    @property
+    def best_ask_size(self) -> Optional[float]:
+        sizes = self._sizes['asks']
+        return float(sizes[0]) if len(sizes) else None
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    def num_levels(self, side: str) -> int:
+        return len(self._prices[side])
+
+    # --- Profundidad ---
+
+    def _levels_within(self, side: str, pct: float, reference: Optional[float]) -> int:
+        """Número de niveles de ``side`` a menos de ``pct``% de ``reference``"""
+        reference = self.mid_price if reference is None else reference
+        prices = self._prices[side]
+        if reference is None or not len(prices):
+            return 0
+        if side == 'bids':
+            # Precios descendentes: contar los >= límite inferior
+            return int(np.searchsorted(-prices, -reference * (1 - pct / 100), side='right'))
+        return int(np.searchsorted(prices, reference * (1 + pct / 100), side='right'))
+
+    def depth(self, side: str, pct: float, reference: Optional[float] = None) -> float:
+        """
+        Volumen acumulado de ``side`` a menos de ``pct``% del precio de referencia
+
+        Args:
+            side: 'bids' o 'asks'
+            pct: Distancia máxima en porcentaje
+            reference: Precio de referencia (por defecto el medio)
+
+        Returns:
+            float: Suma de tamaños
+        """
+        n = self._levels_within(side, pct, reference)
+        return float(self._cum[side][n - 1]) if n else 0.0
+
+    def levels(self, side: str, n: Optional[int] = None) -> List[List[float]]:
+        """Niveles ``[precio, tamaño]`` del mejor al peor (los ``n`` primeros)"""
+        prices, sizes = self._prices[side][:n], self._sizes[side][:n]
+        return np.column_stack([prices, sizes]).tolist()
+
+    def walls(self, side: str, pct: float = 2.0, reference: Optional[float] = None,
+              threshold: float = 0.15) -> List[Dict[str, float]]:
+        """
+        Niveles que concentran más de ``threshold`` del volumen dentro de ``pct``%
+
+        Returns:
+            List[Dict[str, float]]: price, size y pct_of_total de cada pared
+        """
+        n = self._levels_within(side, pct, reference)
+        if not n:
+            return []
+        total = self._cum[side][n - 1]
+        sizes = self._sizes[side][:n]
+        idx = np.nonzero(sizes / total > threshold)[0]
+        prices = self._prices[side]
+        return [{'price': float(prices[i]), 'size': float(sizes[i]),
+                 'pct_of_total': float(sizes[i] / total * 100)} for i in idx]
+
+    def estimate_slippage(self, side: str, size: float, max_levels: Optional[int] = None) -> float:
+        """
+        Slippage estimado (%) de una orden de mercado de ``size`` unidades
+
+        Misma convención que ScalpingStrategies._estimate_slippage: se
+        consumen niveles desde el mejor precio; si no hay volumen suficiente
+        se promedia sólo lo ejecutado.
+
+        Args:
+            side: 'buy' (consume asks) o 'sell' (consume bids)
+            size: Tamaño de la orden
+            max_levels: Limitar a los primeros niveles (None = todo el libro)
+
+        Returns:
+            float: Slippage en porcentaje (>= 0)
+        """
+        book_side = 'asks' if side == 'buy' else 'bids'
+        prices = self._prices[book_side]
+        n = len(prices) if max_levels is None else min(max_levels, len(prices))
+        if n == 0 or size <= 0:
+            return 0.0
+        cum, cum_notional = self._cum[book_side], self._cum_notional[book_side]
+        k = int(np.searchsorted(cum[:n], size, side='left'))
+        if k >= n:
+            filled, cost = cum[n - 1], cum_notional[n - 1]
+        else:
+            before = cum[k - 1] if k else 0.0
+            filled = size
+            cost = (cum_notional[k - 1] if k else 0.0) + (size - before) * prices[k]
+        if filled <= 0:
+            return 0.0
+        avg_price = cost / filled
+        base_price = prices[0]
+        if side == 'buy':
+            slippage = (avg_price - base_price) / base_price * 100
+        else:
+            slippage = (base_price - avg_price) / base_price * 100
+        return max(0.0, float(slippage))
+
+    def analyze(self, current_price: float, depth_pct: float = 2.0,
+                wall_threshold: float = 0.15, test_order_size: float = 10) -> Dict[str, Any]:
+        """
+        Análisis del libro con las mismas claves que ScalpingStrategies.analyze_orderbook
+
+        Args:
+            current_price: Precio actual del activo
+            depth_pct: Profundidad a analizar (% desde el precio actual)
+            wall_threshold: Fracción del volumen para considerar una pared
+            test_order_size: Tamaño de la orden simulada para el slippage
+
+        Returns:
+            Dict[str, Any]: Métricas de presión, paredes, slippage y liquidez
+        """
+        lower_bound = current_price * (1 - depth_pct / 100)
+        upper_bound = current_price * (1 + depth_pct / 100)
+        n_bids = self._levels_within('bids', depth_pct, current_price)
+        n_asks = self._levels_within('asks', depth_pct, current_price)
+        bid_volume = float(self._cum['bids'][n_bids - 1]) if n_bids else 0.0
+        ask_volume = float(self._cum['asks'][n_asks - 1]) if n_asks else 0.0
+
+        bid_walls = self.walls('bids', depth_pct, current_price, wall_threshold)
+        ask_walls = self.walls('asks', depth_pct, current_price, wall_threshold)
+        nearest_support = max([b['price'] for b in bid_walls], default=lower_bound)
+        nearest_resistance = min([a['price'] for a in ask_walls], default=upper_bound)
+        total = bid_volume + ask_volume
+
+        return {
+            'buy_sell_ratio': bid_volume / ask_volume if ask_volume > 0 else float('inf'),
+            'imbalance': (bid_volume - ask_volume) / total if total > 0 else 0,
+            'bid_volume': bid_volume,
+            'ask_volume': ask_volume,
+            'nearest_support': nearest_support,
+            'nearest_resistance': nearest_resistance,
+            'support_distance_pct': (current_price - nearest_support) / current_price * 100,
+            'resistance_distance_pct': (nearest_resistance - current_price) / current_price * 100,
+            'buy_slippage_pct': self.estimate_slippage('buy', test_order_size, n_asks),
+            'sell_slippage_pct': self.estimate_slippage('sell', test_order_size, n_bids),
+            'bid_walls': bid_walls,
+            'ask_walls': ask_walls,
+            'avg_liquidity': total / 2
+        }
+
+    def to_dict(self, depth: Optional[int] = None) -> Dict[str, Any]:
+        """Formato ``{'bids': [[precio, tamaño], ...], 'asks': [...], 'ts': ...}``"""
+        return {'bids': self.levels('bids', depth), 'asks': self.levels('asks', depth), 'ts': self.ts}
+
+
+class OrderBook:
+    """
+    Libro L2 de un instrumento mantenido con snapshots y actualizaciones de OKX.
+    """
+
+    def __init__(self, inst_id: str):
+        self.inst_id = inst_id
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.ts: Optional[int] = None
+        self.seq_id: Optional[int] = None
+        self.valid = False
+        self.version = 0
+        self.last_checksum: Optional[int] = None
+        self._view: Optional[OrderBookView] = None
+
+    @staticmethod
+    def _signed_crc32(text: str) -> int:
+        value = zlib.crc32(text.encode('utf-8'))
+        return value - (1 << 32) if value >= (1 << 31) else value
+
+    def checksum(self) -> int:
+        """
+        CRC32 de OKX: los 25 mejores niveles de cada lado intercalados
+        ``bid:tamaño:ask:tamaño:...`` (si un lado tiene menos, se omite), como
+        entero con signo de 32 bits
+        """
+        bids = self.bids.top_raw(CHECKSUM_LEVELS)
+        asks = self.asks.top_raw(CHECKSUM_LEVELS)
+        parts = []
+        for i in range(max(len(bids), len(asks))):
+            if i < len(bids):
+                parts.extend(bids[i])
+            if i < len(asks):
+                parts.extend(asks[i])
+        return self._signed_crc32(':'.join(parts))
+
+    def apply(self, data: Dict[str, Any], action: str = 'snapshot') -> bool:
+        """
+        Aplica un elemento ``data[i]`` de un mensaje books de OKX
+
+        Args:
+            data: Diccionario con bids, asks, ts y opcionalmente checksum,
+                prevSeqId y seqId
+            action: 'snapshot' o 'update'
+
+        Returns:
+            bool: False si hay hueco de secuencia o el checksum no coincide
+            (el libro queda inválido hasta el próximo snapshot)
+        """
+        seq_id = data.get('seqId')
+        if action == 'snapshot':
+            self.bids.clear()
+            self.asks.clear()
+            self.valid = True
+        else:
+            if not self.valid:
+                return False
+            prev_seq = data.get('prevSeqId')
+            if prev_seq is not None and self.seq_id is not None and int(prev_seq) != self.seq_id:
+                logger.warning(f"Hueco de secuencia en {self.inst_id}: prevSeqId={prev_seq}, "
+                               f"último seqId={self.seq_id}")
+                self.valid = False
+                return False
+
+        self.bids.apply(data.get('bids', []))
+        self.asks.apply(data.get('asks', []))
+        if data.get('ts') is not None:
+            self.ts = int(data['ts'])
+        if seq_id is not None:
+            self.seq_id = int(seq_id)
+        self.version += 1
+        self._view = None
+
+        expected = data.get('checksum')
+        if expected is not None:
+            self.last_checksum = int(expected)
+            if self.checksum() != self.last_checksum:
+                logger.warning(f"Checksum incorrecto en el libro de {self.inst_id}")
+                self.valid = False
+                return False
+        return True
+
+    def view(self) -> OrderBookView:
+        """Vista inmutable del estado actual (cacheada hasta el próximo cambio)"""
+        if self._view is None:
+            bid_prices, bid_sizes = self.bids.arrays()
+            ask_prices, ask_sizes = self.asks.arrays()
+            self._view = OrderBookView(self.inst_id, bid_prices, bid_sizes, ask_prices, ask_sizes,
+                                       ts=self.ts, version=self.version)
+        return self._view
+
+    # Accesos directos a la vista actual
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self.view().best_bid
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self.view().best_ask
+
+    def depth(self, side: str, pct: float, reference: Optional[float] = None) -> float:
+        return self.view().depth(side, pct, reference)
+
+    def estimate_slippage(self, side: str, size: float, max_levels: Optional[int] = None) -> float:
+        return self.view().estimate_slippage(side, size, max_levels)
+
+    def analyze(self, current_price: float, **kwargs) -> Dict[str, Any]:
+        return self.view().analyze(current_price, **kwargs)
+
+
+class OrderBookManager:
+    """
+    Libros por instrumento alimentados con mensajes ``books*`` de OKX.
+
+    Si un libro queda inválido (hueco de secuencia o checksum), se llama una
+    vez a ``on_resync(channel, inst_id)`` (función o corrutina) para pedir un
+    snapshot nuevo; las actualizaciones que lleguen mientras tanto se ignoran.
+    """
+
+    def __init__(self, on_resync: Optional[Callable[[str, str], Any]] = None):
+        self.books: Dict[str, OrderBook] = {}
+        self.on_resync = on_resync
+        self._resync_pending: Dict[str, bool] = {}
+        self.stats = {
+            'snapshots': 0,
+            'updates': 0,
+            'rejected': 0,
+            'resyncs': 0
+        }
+        self._apply_time_ms = 0.0
+
+    def get_book(self, inst_id: str) -> Optional[OrderBook]:
+        return self.books.get(inst_id)
+
+    def on_message(self, message: Dict[str, Any]) -> Optional[OrderBook]:
+        """
+        Aplica un mensaje books de OKX ya decodificado
+
+        Los canales sin 'action' (p. ej. books5) envían siempre el libro
+        completo y se tratan como snapshot.
+
+        Args:
+            message: ``{'arg': {'channel', 'instId'}, 'action'?, 'data': [...]}``
+
+        Returns:
+            Optional[OrderBook]: El libro actualizado, o None si el mensaje
+            se ha descartado
+        """
+        arg = message.get('arg', {})
+        inst_id = arg.get('instId')
+        channel = arg.get('channel', '')
+        data = message.get('data') or []
+        if not inst_id or not data:
+            return None
+
+        book = self.books.get(inst_id)
+        if book is None:
+            book = self.books[inst_id] = OrderBook(inst_id)
+        action = message.get('action', 'snapshot')
+
+        start = time.perf_counter()
+        ok = True
+        for item in data:
+            ok = book.apply(item, action) and ok
+        self._apply_time_ms += (time.perf_counter() - start) * 1000
+
+        if action == 'snapshot':
+            self.stats['snapshots'] += 1
+            self._resync_pending[inst_id] = False
+        else:
+            self.stats['updates'] += 1
+        if ok:
+            return book
+
+        self.stats['rejected'] += 1
+        self._request_resync(channel, inst_id)
+        return None
+
+    def _request_resync(self, channel: str, inst_id: str):
+        if self._resync_pending.get(inst_id):
+            return
+        self._resync_pending[inst_id] = True
+        self.stats['resyncs'] += 1
+        logger.warning(f"Libro de {inst_id} inválido: solicitando resuscripción a {channel}")
+        if self.on_resync is None:
+            return
+        try:
+            result = self.on_resync(channel, inst_id)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            logger.error(f"Error solicitando resuscripción de {inst_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Contadores de mensajes y estado de cada libro"""
+        messages = self.stats['snapshots'] + self.stats['updates']
+        return {
+            **self.stats,
+            'avg_apply_ms': round(self._apply_time_ms / messages, 4) if messages else 0.0,
+            'books': {inst_id: {'valid': book.valid, 'bids': len(book.bids), 'asks': len(book.asks),
+                                'seq_id': book.seq_id}
+                      for inst_id, book in self.books.items()}
+        }
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import logging
+from features.incremental import advanced_feature_set
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -8,6 +9,8 @@ logger = logging.getLogger(__name__)
 class AdvancedFeatureEngineer:
     def __init__(self):
         logger.info("Inicializando AdvancedFeatureEngineer.")
+        # Estado incremental para la ruta en vivo (mismos valores que add_all_features)
+        self.live_engine = advanced_feature_set()
 
     def add_all_features(self, df):
         if df.empty:
@@ -34,27 +37,22 @@ class AdvancedFeatureEngineer:
             logger.error("Columna 'close' no encontrada para indicadores técnicos.")
             return df
 
-        df['SMA_10'] = df['close'].rolling(window=10).mean()
-        df['SMA_30'] = df['close'].rolling(window=30).mean()
-        
-        df['RSI_14'] = self._calculate_rsi(df['close'], window=14)
-
-        df['EMA_12'] = df['close'].ewm(span=12, adjust=False).mean()
-        df['EMA_26'] = df['close'].ewm(span=26, adjust=False).mean()
-        df['MACD'] = df['EMA_12'] - df['EMA_26']
-        df['MACD_Signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-        df['MACD_Hist'] = df['MACD'] - df['MACD_Signal']
-
-        window_bb = 20
-        num_std_dev = 2
-        df['BB_SMA'] = df['close'].rolling(window=window_bb).mean()
-        df['BB_STD'] = df['close'].rolling(window=window_bb).std()
-        df['BB_UPPER'] = df['BB_SMA'] + (df['BB_STD'] * num_std_dev)
-        df['BB_LOWER'] = df['BB_SMA'] - (df['BB_STD'] * num_std_dev)
+        # Mismo motor incremental que la ruta en vivo (update_live_features)
+        df = advanced_feature_set().add_features(df)
 
         logger.info("Indicadores técnicos añadidos: SMA_10, SMA_30, RSI_14, MACD, MACD_Signal, MACD_Hist, BB_UPPER, BB_LOWER, BB_SMA, BB_STD.")
         return df
 
+    def update_live_features(self, new_rows):
+        """
+        Calcula los indicadores técnicos de velas nuevas continuando el estado
+        de las anteriores (coste proporcional a las filas nuevas).
+
+        Los valores son idénticos a los de add_technical_indicators sobre el
+        histórico completo.
+        """
+        return self.live_engine.update(new_rows)
+
     def add_time_based_features(self, df):
         if 'open_time' not in df.columns:
             logger.error("Columna 'open_time' no encontrada para características temporales.")
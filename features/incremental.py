@@ -0,0 +1,547 @@
+"""
+Motor incremental de features (SMA, EMA, RSI, Bandas de Bollinger, MACD)
+
+Cada indicador guarda su estado entre llamadas (último valor de cada EMA,
+las últimas ``window - 1`` velas para medias y desviaciones móviles, las
+medias de Wilder del RSI), así que añadir velas nuevas cuesta O(filas nuevas)
+y el resultado no depende de cómo se trocee el histórico: procesar todo de una
+vez, por chunks o vela a vela produce exactamente los mismos valores. El
+entrenamiento (por chunks) y la ruta en vivo (vela a vela) usan el mismo
+código y por tanto las mismas features.
+
+FeatureChunkCache guarda el resultado de cada indicador por chunk con una
+huella de (parámetros del indicador, contenido del chunk, estado de entrada),
+de modo que cambiar un indicador sólo recalcula sus columnas y añadir datos
+nuevos sólo calcula los chunks nuevos.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+logger = logging.getLogger(__name__)
+
+
+def _recurrence(x: np.ndarray, decay: float, gain: float, prev: float) -> np.ndarray:
+    """
+    Calcula ``y[t] = gain * x[t] + decay * y[t-1]`` partiendo de ``y[-1] = prev``
+
+    Las operaciones se hacen en el mismo orden con scipy o con el bucle, así que
+    el resultado no depende de dónde empiece el bloque.
+    """
+    if len(x) == 0:
+        return np.empty(0)
+    if lfilter is not None:
+        y, _ = lfilter([gain], [1.0, -decay], x, zi=[decay * prev])
+        return y
+    y = np.empty(len(x))
+    for i, value in enumerate(x):
+        prev = gain * value + decay * prev
+        y[i] = prev
+    return y
+
+
+class IncrementalIndicator:
+    """
+    Clase base de los indicadores incrementales.
+
+    ``update`` recibe las columnas de entrada de las velas nuevas y devuelve
+    las columnas calculadas para esas mismas velas, actualizando el estado.
+    """
+
+    version = 1
+    sources: List[str] = ['close']
+
+    def __init__(self, name: str, params: Dict[str, Any]):
+        self.name = name
+        self.params = params
+        self.reset()
+
+    @property
+    def outputs(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    def update(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        raise NotImplementedError
+
+    def get_state(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def set_state(self, state: Dict[str, Any]):
+        raise NotImplementedError
+
+    def fingerprint(self) -> str:
+        """Huella de la definición del indicador (clase, versión, parámetros, columnas)"""
+        definition = {
+            'class': type(self).__name__,
+            'version': self.version,
+            'params': self.params,
+            'sources': self.sources,
+            'outputs': self.outputs
+        }
+        return hashlib.sha1(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+
+class _WindowTail:
+    """Últimas ``window - 1`` observaciones para calcular ventanas móviles por bloques"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = np.empty(0)
+
+    def windows(self, x: np.ndarray):
+        """
+        Devuelve (ventanas, primera fila nueva con ventana completa) y avanza la cola
+        """
+        values = np.concatenate([self.values, x])
+        first_full = max(self.window - 1 - len(self.values), 0)
+        keep = self.window - 1
+        self.values = values[max(len(values) - keep, 0):].copy() if keep else np.empty(0)
+        if len(values) < self.window:
+            return None, first_full
+        return sliding_window_view(values, self.window), first_full
+
+
+def _rolling(tail: _WindowTail, x: np.ndarray, *reducers) -> List[np.ndarray]:
+    """Aplica cada ``reducer(ventanas)`` a las ventanas completas; NaN en las demás filas"""
+    outs = [np.full(len(x), np.nan) for _ in reducers]
+    windows, first_full = tail.windows(x)
+    if windows is not None and first_full < len(x):
+        # Las últimas ventanas terminan en cada fila nueva desde first_full
+        windows = windows[-(len(x) - first_full):]
+        for out, reducer in zip(outs, reducers):
+            out[first_full:] = reducer(windows)
+    return outs
+
+
+def _mean(windows: np.ndarray) -> np.ndarray:
+    return windows.mean(axis=1)
+
+
+def _std(windows: np.ndarray) -> np.ndarray:
+    return windows.std(axis=1, ddof=1)
+
+
+class SMA(IncrementalIndicator):
+    """Media móvil simple (equivalente a ``rolling(window).mean()``)"""
+
+    def __init__(self, window: int, column: Optional[str] = None, source: str = 'close'):
+        self.window = window
+        self.column = column or f'sma_{window}'
+        self.sources = [source]
+        super().__init__(self.column, {'window': window, 'source': source})
+
+    @property
+    def outputs(self) -> List[str]:
+        return [self.column]
+
+    def reset(self):
+        self._tail = _WindowTail(self.window)
+
+    def update(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        x = np.asarray(data[self.sources[0]], dtype=np.float64)
+        return {self.column: _rolling(self._tail, x, _mean)[0]}
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'tail': self._tail.values.copy()}
+
+    def set_state(self, state: Dict[str, Any]):
+        self._tail.values = np.asarray(state['tail'], dtype=np.float64).copy()
+
+
+class EMA(IncrementalIndicator):
+    """Media móvil exponencial (equivalente a ``ewm(span=span, adjust=False).mean()``)"""
+
+    def __init__(self, span: int, column: Optional[str] = None, source: str = 'close'):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.column = column or f'ema_{span}'
+        self.sources = [source]
+        super().__init__(self.column, {'span': span, 'source': source})
+
+    @property
+    def outputs(self) -> List[str]:
+        return [self.column]
+
+    def reset(self):
+        self._last: Optional[float] = None
+
+    def step(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return np.empty(0)
+        if self._last is None:
+            # La primera observación inicializa la EMA
+            y = np.concatenate([[x[0]], _recurrence(x[1:], 1.0 - self.alpha, self.alpha, x[0])])
+        else:
+            y = _recurrence(x, 1.0 - self.alpha, self.alpha, self._last)
+        self._last = float(y[-1])
+        return y
+
+    def update(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        return {self.column: self.step(data[self.sources[0]])}
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'last': self._last}
+
+    def set_state(self, state: Dict[str, Any]):
+        self._last = state['last']
+
+
+class RSI(IncrementalIndicator):
+    """
+    Relative Strength Index.
+
+    ``method='wilder'``: medias exponenciales de Wilder (``ewm(com=window-1,
+    min_periods=window)``, como AdvancedFeatureEngineer). ``method='sma'``:
+    medias simples de ganancias y pérdidas (como BinanceDataProcessor).
+    """
+
+    def __init__(self, window: int = 14, column: Optional[str] = None,
+                 method: str = 'wilder', source: str = 'close'):
+        if method not in ('wilder', 'sma'):
+            raise ValueError(f"Método de RSI no soportado: {method}")
+        self.window = window
+        self.method = method
+        self.column = column or 'rsi'
+        self.sources = [source]
+        super().__init__(self.column, {'window': window, 'method': method, 'source': source})
+
+    @property
+    def outputs(self) -> List[str]:
+        return [self.column]
+
+    def reset(self):
+        self._prev_close: Optional[float] = None
+        # Wilder: numeradores/denominador de la media ponderada y observaciones vistas
+        self._gain_num = 0.0
+        self._loss_num = 0.0
+        self._weight = 0.0
+        self._count = 0
+        # SMA: colas de ganancias y pérdidas
+        self._gain_tail = _WindowTail(self.window)
+        self._loss_tail = _WindowTail(self.window)
+
+    def update(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        close = np.asarray(data[self.sources[0]], dtype=np.float64)
+        if len(close) == 0:
+            return {self.column: np.empty(0)}
+        prev = np.nan if self._prev_close is None else self._prev_close
+        delta = np.diff(close, prepend=prev)
+        self._prev_close = float(close[-1])
+        # Igual que delta.where(delta > 0, 0): la primera diferencia (NaN) cuenta como 0
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+
+        if self.method == 'sma':
+            avg_gain = _rolling(self._gain_tail, gain, _mean)[0]
+            avg_loss = _rolling(self._loss_tail, loss, _mean)[0]
+        else:
+            decay = 1.0 - 1.0 / self.window
+            gain_num = _recurrence(gain, decay, 1.0, self._gain_num)
+            loss_num = _recurrence(loss, decay, 1.0, self._loss_num)
+            weight = _recurrence(np.ones(len(gain)), decay, 1.0, self._weight)
+            self._gain_num, self._loss_num, self._weight = float(gain_num[-1]), float(loss_num[-1]), float(weight[-1])
+            avg_gain = gain_num / weight
+            avg_loss = loss_num / weight
+            seen = self._count + np.arange(1, len(gain) + 1)
+            self._count += len(gain)
+            avg_gain[seen < self.window] = np.nan
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = avg_gain / avg_loss
+            rsi = 100 - (100 / (1 + rs))
+        return {self.column: rsi}
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            'prev_close': self._prev_close,
+            'gain_num': self._gain_num,
+            'loss_num': self._loss_num,
+            'weight': self._weight,
+            'count': self._count,
+            'gain_tail': self._gain_tail.values.copy(),
+            'loss_tail': self._loss_tail.values.copy()
+        }
+
+    def set_state(self, state: Dict[str, Any]):
+        self._prev_close = state['prev_close']
+        self._gain_num = state['gain_num']
+        self._loss_num = state['loss_num']
+        self._weight = state['weight']
+        self._count = state['count']
+        self._gain_tail.values = np.asarray(state['gain_tail'], dtype=np.float64).copy()
+        self._loss_tail.values = np.asarray(state['loss_tail'], dtype=np.float64).copy()
+
+
+class BollingerBands(IncrementalIndicator):
+    """Bandas de Bollinger: BB_SMA, BB_STD (ddof=1), BB_UPPER y BB_LOWER"""
+
+    def __init__(self, window: int = 20, num_std: float = 2.0, prefix: str = 'BB', source: str = 'close'):
+        self.window = window
+        self.num_std = num_std
+        self.prefix = prefix
+        self.sources = [source]
+        super().__init__(f'{prefix}_{window}', {'window': window, 'num_std': num_std, 'source': source})
+
+    @property
+    def outputs(self) -> List[str]:
+        return [f'{self.prefix}_SMA', f'{self.prefix}_STD', f'{self.prefix}_UPPER', f'{self.prefix}_LOWER']
+
+    def reset(self):
+        self._tail = _WindowTail(self.window)
+
+    def update(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        x = np.asarray(data[self.sources[0]], dtype=np.float64)
+        sma, std = _rolling(self._tail, x, _mean, _std)
+        return {
+            self.outputs[0]: sma,
+            self.outputs[1]: std,
+            self.outputs[2]: sma + std * self.num_std,
+            self.outputs[3]: sma - std * self.num_std
+        }
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'tail': self._tail.values.copy()}
+
+    def set_state(self, state: Dict[str, Any]):
+        self._tail.values = np.asarray(state['tail'], dtype=np.float64).copy()
+
+
+class MACD(IncrementalIndicator):
+    """MACD con sus EMAs rápida y lenta, línea de señal e histograma"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9,
+                 columns: Optional[Dict[str, str]] = None, source: str = 'close'):
+        names = {'fast': None, 'slow': None, 'macd': 'MACD', 'signal': 'MACD_SIGNAL', 'hist': 'MACD_HIST'}
+        names.update(columns or {})
+        self.names = names
+        self.sources = [source]
+        self._fast = EMA(fast, source=source)
+        self._slow = EMA(slow, source=source)
+        self._signal = EMA(signal, source=names['macd'])
+        super().__init__(names['macd'], {'fast': fast, 'slow': slow, 'signal': signal, 'source': source})
+
+    @property
+    def outputs(self) -> List[str]:
+        keys = ('fast', 'slow', 'macd', 'signal', 'hist')
+        return [self.names[k] for k in keys if self.names[k]]
+
+    def reset(self):
+        for ema in (self._fast, self._slow, self._signal):
+            ema.reset()
+
+    def update(self, data: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        x = data[self.sources[0]]
+        fast = self._fast.step(x)
+        slow = self._slow.step(x)
+        macd = fast - slow
+        signal = self._signal.step(macd)
+        values = {'fast': fast, 'slow': slow, 'macd': macd, 'signal': signal, 'hist': macd - signal}
+        return {self.names[k]: v for k, v in values.items() if self.names[k]}
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'fast': self._fast.get_state(), 'slow': self._slow.get_state(),
+                'signal': self._signal.get_state()}
+
+    def set_state(self, state: Dict[str, Any]):
+        self._fast.set_state(state['fast'])
+        self._slow.set_state(state['slow'])
+        self._signal.set_state(state['signal'])
+
+
+class IncrementalFeatureEngine:
+    """
+    Conjunto de indicadores incrementales que se actualizan juntos.
+
+    ``update(df)`` calcula las features de las velas nuevas (y sólo de ellas)
+    usando el estado acumulado; ``transform(df)`` recalcula desde cero.
+    """
+
+    def __init__(self, indicators: List[IncrementalIndicator]):
+        self.indicators = indicators
+        self.rows_seen = 0
+
+    @property
+    def outputs(self) -> List[str]:
+        return [col for ind in self.indicators for col in ind.outputs]
+
+    def reset(self):
+        for ind in self.indicators:
+            ind.reset()
+        self.rows_seen = 0
+
+    @staticmethod
+    def _inputs(df: pd.DataFrame, indicator: IncrementalIndicator) -> Dict[str, np.ndarray]:
+        return {src: pd.to_numeric(df[src], errors='coerce').to_numpy(dtype=np.float64)
+                for src in indicator.sources}
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula las features de las velas nuevas
+
+        Args:
+            df: Velas nuevas (posteriores a las ya procesadas)
+
+        Returns:
+            pd.DataFrame: Columnas de features con el mismo índice que ``df``
+        """
+        columns: Dict[str, np.ndarray] = {}
+        for ind in self.indicators:
+            columns.update(ind.update(self._inputs(df, ind)))
+        self.rows_seen += len(df)
+        return pd.DataFrame(columns, index=df.index)[self.outputs]
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Recalcula las features de ``df`` desde cero (mismo resultado que por chunks)"""
+        self.reset()
+        return self.update(df)
+
+    def add_features(self, df: pd.DataFrame, incremental: bool = False) -> pd.DataFrame:
+        """Añade las columnas de features a ``df`` (desde cero o continuando el estado)"""
+        features = self.update(df) if incremental else self.transform(df)
+        for col in features.columns:
+            df[col] = features[col]
+        return df
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'rows_seen': self.rows_seen,
+                'indicators': {ind.name: ind.get_state() for ind in self.indicators}}
+
+    def set_state(self, state: Dict[str, Any]):
+        self.rows_seen = state['rows_seen']
+        for ind in self.indicators:
+            ind.set_state(state['indicators'][ind.name])
+
+    def fingerprint(self) -> str:
+        return hashlib.sha1(''.join(ind.fingerprint() for ind in self.indicators).encode()).hexdigest()
+
+
+def advanced_feature_set() -> IncrementalFeatureEngine:
+    """Indicadores de AdvancedFeatureEngineer.add_technical_indicators"""
+    return IncrementalFeatureEngine([
+        SMA(10, 'SMA_10'),
+        SMA(30, 'SMA_30'),
+        RSI(14, 'RSI_14', method='wilder'),
+        MACD(12, 26, 9, columns={'fast': 'EMA_12', 'slow': 'EMA_26', 'macd': 'MACD',
+                                 'signal': 'MACD_Signal', 'hist': 'MACD_Hist'}),
+        BollingerBands(20, 2.0)
+    ])
+
+
+def processor_feature_set() -> IncrementalFeatureEngine:
+    """Indicadores de BinanceDataProcessor.process_data_chunk"""
+    return IncrementalFeatureEngine([
+        SMA(5), SMA(20), SMA(50),
+        EMA(12), EMA(26),
+        RSI(14, 'rsi', method='sma'),
+        BollingerBands(20, 2.0),
+        MACD(12, 26, 9)
+    ])
+
+
+def _hash_arrays(arrays: Iterable[np.ndarray]) -> str:
+    digest = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str(array.dtype).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _hash_state(state: Any) -> str:
+    return hashlib.sha1(pickle.dumps(state, protocol=4)).hexdigest()
+
+
+class FeatureChunkCache:
+    """
+    Caché en disco de features por chunk e indicador.
+
+    La clave de cada entrada combina la huella del indicador, el contenido de
+    sus columnas de entrada en el chunk y el estado con el que empieza el
+    chunk; la entrada guarda las columnas calculadas y el estado final.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, indicator: IncrementalIndicator, key: str) -> str:
+        return os.path.join(self.directory, indicator.name, f"{key}.pkl")
+
+    def compute(self, engine: IncrementalFeatureEngine, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula las features de un chunk continuando el estado de ``engine``,
+        reutilizando de disco los indicadores ya calculados
+
+        Returns:
+            pd.DataFrame: Columnas de features con el índice del chunk
+        """
+        columns: Dict[str, np.ndarray] = {}
+        for ind in engine.indicators:
+            inputs = engine._inputs(chunk, ind)
+            key = hashlib.sha1((ind.fingerprint() + _hash_arrays(inputs.values())
+                                + _hash_state(ind.get_state())).encode()).hexdigest()
+            path = self._path(ind, key)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    entry = pickle.load(f)
+                ind.set_state(entry['state'])
+                columns.update(entry['outputs'])
+                self.hits += 1
+                continue
+
+            outputs = ind.update(inputs)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'outputs': outputs, 'state': ind.get_state()}, f, protocol=4)
+            os.replace(tmp_path, path)
+            columns.update(outputs)
+            self.misses += 1
+
+        engine.rows_seen += len(chunk)
+        return pd.DataFrame(columns, index=chunk.index)[engine.outputs]
+
+
+def compute_features_chunked(chunks: Iterable[pd.DataFrame], engine: IncrementalFeatureEngine,
+                             cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Calcula las features de una secuencia de chunks consecutivos
+
+    Args:
+        chunks: Chunks de velas en orden cronológico
+        engine: Motor de features (se reinicia antes de empezar)
+        cache_dir: Directorio de la caché por chunk (None = sin caché)
+
+    Returns:
+        pd.DataFrame: Chunks originales con las columnas de features añadidas
+    """
+    engine.reset()
+    cache = FeatureChunkCache(cache_dir) if cache_dir else None
+    results = []
+    for chunk in chunks:
+        features = cache.compute(engine, chunk) if cache else engine.update(chunk)
+        results.append(pd.concat([chunk, features], axis=1))
+    if cache:
+        logger.info(f"Caché de features: {cache.hits} indicadores reutilizados, {cache.misses} calculados")
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results)
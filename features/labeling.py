@@ -0,0 +1,192 @@
+"""
+Etiquetado de datasets para ML: triple barrera (TP/SL/timeout) y horizonte fijo
+
+Implementación sólo con NumPy, sin numba. En lugar de recorrer cada vela y
+su ventana futura, se recorren los ``window`` desplazamientos y en cada uno se
+comparan todas las velas a la vez, con lo que el coste es O(N · window) en
+operaciones vectorizadas. Con el máximo/mínimo acumulado de high/low se
+obtiene en la misma pasada el primer toque de varios niveles de TP y SL, así
+que un grid completo de (TP, SL, ventana) cuesta prácticamente lo mismo que una
+sola combinación.
+
+Convenciones (las del cálculo original de process_historical_data.py):
+- Desde la vela i se mira de i+1 a i+window. TP se toca si
+  ``high >= close[i] * (1 + tp)``; SL si ``low <= close[i] * (1 - sl)``.
+- Si se tocan ambos, gana el que ocurre antes; en la misma vela gana el TP.
+- Las últimas ``window`` velas (sin ventana futura completa) valen 0.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+NO_TOUCH = np.iinfo(np.int32).max
+
+
+def _first_touches(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                   tp_levels: List[float], sl_levels: List[float],
+                   max_window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Desplazamiento (1..max_window) del primer toque de cada nivel de TP y SL
+
+    Returns:
+        Tuple: (tp_touch, sl_touch) con forma (niveles, N); NO_TOUCH si no se
+        toca dentro de ``max_window`` velas
+    """
+    n = len(close)
+    tp_prices = np.array([close * (1 + tp) for tp in tp_levels]).reshape(len(tp_levels), n)
+    sl_prices = np.array([close * (1 - sl) for sl in sl_levels]).reshape(len(sl_levels), n)
+    tp_touch = np.full((len(tp_levels), n), NO_TOUCH, dtype=np.int32)
+    sl_touch = np.full((len(sl_levels), n), NO_TOUCH, dtype=np.int32)
+
+    running_high = np.full(n, -np.inf)
+    running_low = np.full(n, np.inf)
+    for k in range(1, min(max_window, n - 1) + 1):
+        # Máximo/mínimo de las velas i+1..i+k para cada vela i con futuro suficiente
+        np.maximum(running_high[:n - k], high[k:], out=running_high[:n - k])
+        np.minimum(running_low[:n - k], low[k:], out=running_low[:n - k])
+        for touch, prices, hit in ((tp_touch, tp_prices, running_high[None, :] >= tp_prices),
+                                   (sl_touch, sl_prices, running_low[None, :] <= sl_prices)):
+            hit[:, n - k:] = False
+            new = hit & (touch == NO_TOUCH)
+            touch[new] = k
+    return tp_touch, sl_touch
+
+
+def _combine(tp_touch: np.ndarray, sl_touch: np.ndarray, window: int) -> np.ndarray:
+    """Etiqueta a partir de los primeros toques para una ventana dada"""
+    n = len(tp_touch)
+    tp_hit = tp_touch <= window
+    sl_hit = sl_touch <= window
+    labels = np.zeros(n, dtype=np.int8)
+    labels[tp_hit & (~sl_hit | (tp_touch <= sl_touch))] = 1
+    labels[sl_hit & (~tp_hit | (sl_touch < tp_touch))] = -1
+    labels[max(n - window, 0):] = 0
+    return labels
+
+
+def triple_barrier_labels(close, high, low, tp: float, sl: float, window: int,
+                          return_touch: bool = False):
+    """
+    Etiquetas de primer toque TP (1) / SL (-1) / timeout (0)
+
+    Args:
+        close: Precios de cierre
+        high: Máximos
+        low: Mínimos
+        tp: Take profit relativo (0.005 = 0.5%)
+        sl: Stop loss relativo (0.002 = 0.2%)
+        window: Velas hacia adelante
+        return_touch: Devolver también la vela del primer toque
+
+    Returns:
+        np.ndarray: Etiquetas int8; con ``return_touch`` una tupla (etiquetas,
+        desplazamiento del toque que decide la etiqueta, 0 si es timeout)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    tp_touch, sl_touch = _first_touches(close, high, low, [tp], [sl], window)
+    labels = _combine(tp_touch[0], sl_touch[0], window)
+    if not return_touch:
+        return labels
+    touch = np.where(labels == 1, tp_touch[0], np.where(labels == -1, sl_touch[0], 0)).astype(np.int32)
+    return labels, touch
+
+
+def triple_barrier_grid(close, high, low, tp_levels: Iterable[float], sl_levels: Iterable[float],
+                        windows: Iterable[int], column_format: str = 'target_tp{tp}_sl{sl}_w{window}'
+                        ) -> pd.DataFrame:
+    """
+    Etiquetas de triple barrera para todas las combinaciones de un grid en una pasada
+
+    Args:
+        close: Precios de cierre
+        high: Máximos
+        low: Mínimos
+        tp_levels: Niveles de take profit
+        sl_levels: Niveles de stop loss
+        windows: Ventanas (en velas)
+        column_format: Formato del nombre de cada columna
+
+    Returns:
+        pd.DataFrame: Una columna int8 por combinación (tp, sl, window)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    tp_levels, sl_levels, windows = list(tp_levels), list(sl_levels), list(windows)
+    tp_touch, sl_touch = _first_touches(close, high, low, tp_levels, sl_levels, max(windows))
+
+    columns = {}
+    for a, tp in enumerate(tp_levels):
+        for b, sl in enumerate(sl_levels):
+            for window in windows:
+                name = column_format.format(tp=tp, sl=sl, window=window)
+                columns[name] = _combine(tp_touch[a], sl_touch[b], window)
+    return pd.DataFrame(columns)
+
+
+def fixed_horizon_labels(close, horizon: int, up_threshold: float,
+                         down_threshold: Optional[float] = None) -> np.ndarray:
+    """
+    Etiqueta por retorno a horizonte fijo: 1 si sube más de ``up_threshold``,
+    -1 si baja más de ``down_threshold``, 0 en otro caso (y en las últimas
+    ``horizon`` velas, que no tienen futuro)
+    """
+    close = np.asarray(close, dtype=np.float64)
+    down_threshold = up_threshold if down_threshold is None else down_threshold
+    labels = np.zeros(len(close), dtype=np.int8)
+    if len(close) <= horizon:
+        return labels
+    future_return = (close[horizon:] - close[:-horizon]) / close[:-horizon]
+    labels[:-horizon][future_return > up_threshold] = 1
+    labels[:-horizon][future_return < -down_threshold] = -1
+    return labels
+
+
+def label_dataset_chunked(dataset, tp: float, sl: float, window: int,
+                          output=None, target_column: str = 'target') -> pd.DataFrame:
+    """
+    Etiqueta un dataset del almacén columnar partición a partición
+
+    Cada partición se etiqueta con las primeras ``window`` velas de la
+    siguiente como futuro, así que el resultado es idéntico a etiquetar el
+    histórico completo de una vez, sin tenerlo entero en memoria.
+
+    Args:
+        dataset: ColumnarDataset con columnas close/high/low
+        tp: Take profit relativo
+        sl: Stop loss relativo
+        window: Velas hacia adelante
+        output: ColumnarDataset donde escribir (tiempo + etiqueta), opcional
+        target_column: Nombre de la columna de etiqueta
+
+    Returns:
+        pd.DataFrame: Columna temporal y etiqueta
+    """
+    time_column = dataset.time_column
+    partitions = dataset.partitions()
+    results = []
+    for i, partition in enumerate(partitions):
+        current = dataset.read_arrays([time_column, 'close', 'high', 'low'], partitions=[partition])
+        rows = len(current['close'])
+        if i + 1 < len(partitions):
+            following = dataset.read_arrays(['close', 'high', 'low'], partitions=[partitions[i + 1]])
+            arrays = {col: np.concatenate([current[col], following[col][:window]])
+                      for col in ('close', 'high', 'low')}
+        else:
+            arrays = current
+        labels = triple_barrier_labels(arrays['close'], arrays['high'], arrays['low'], tp, sl, window)[:rows]
+        part = pd.DataFrame({time_column: np.asarray(current[time_column]), target_column: labels})
+        if output is not None:
+            output.write(part, time_column=time_column, mode='append')
+        results.append(part)
+        logger.info(f"Partición {partition} etiquetada: {rows} velas")
+    if not results:
+        return pd.DataFrame(columns=[time_column, target_column])
+    return pd.concat(results, ignore_index=True)
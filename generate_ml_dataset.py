@@ -6,6 +6,7 @@ La columna 'target' será:
 - 0 si se mantiene
 """
 import pandas as pd
+from features.labeling import fixed_horizon_labels
 
 # Cargar datos
 input_file = 'SOLUSDT_technical_analysis.csv'
@@ -17,15 +18,7 @@ df['change_pct'] = (df['future_close'] - df['close']) / df['close']
 
 # Definir target
 threshold = 0.001  # 0.1%
-def get_target(change):
-    if change > threshold:
-        return 1
-    elif change < -threshold:
-        return -1
-    else:
-        return 0
-
-df['target'] = df['change_pct'].apply(get_target)
+df['target'] = fixed_horizon_labels(df['close'].to_numpy(), 1, threshold)
 
 # Eliminar la última fila (sin futuro)
 df = df.iloc[:-1]
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from features.labeling import fixed_horizon_labels
 
 # Parámetros ajustables
 N = 5  # Número de velas hacia adelante
@@ -9,14 +10,8 @@ down_thresh = 0.002  # 0.2% para venta
 # Cargar el dataset original
 df = pd.read_csv('SOLUSDT_technical_analysis.csv')
 
-# Lógica lookahead
-future_return = (df['close'].shift(-N) - df['close']) / df['close']
-df['target'] = np.select(
-    [future_return > up_thresh,
-     future_return < -down_thresh],
-    [1, -1],
-    default=0
-)
+# Lógica lookahead (las últimas N velas, sin futuro, quedan en 0)
+df['target'] = fixed_horizon_labels(df['close'].to_numpy(), N, up_thresh, down_thresh)
 
 # Guardar el nuevo archivo
 df.to_csv('SOLUSDT_ml_dataset.csv', index=False)
@@ -0,0 +1,273 @@
+"""
+Indicadores técnicos sobre arrays NumPy (cálculo por lotes)
+
+Mismas fórmulas que ``TechnicalIndicators`` y que los objetos de
+``indicators.streaming``, pero sin crear Series ni objetos ``rolling`` de
+pandas:
+
+- Las ventanas móviles (suma, máximo, mínimo, desviación) se calculan por
+  bloques del tamaño de la ventana con prefijos y sufijos acumulados, en O(N)
+  y sin restar sumas acumuladas, así que no hay cancelación aunque la serie
+  sea muy larga.
+- Las medias exponenciales usan ``scipy.signal.lfilter`` con las mismas
+  operaciones que pandas; los pocos puntos donde pandas se salta la
+  actualización (valor igual a la media) se corrigen después. Sin scipy, o
+  con NaN intercalados, se usa el bucle de ``indicators.streaming``.
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+from indicators.streaming import EWM
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+# Correcciones de la media exponencial antes de pasar al bucle
+_MAX_EMA_FIXES = 32
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def shift(values, periods: int = 1) -> np.ndarray:
+    """Equivalente a ``Series.shift(periods)`` (positivo o negativo)"""
+    x = _as_array(values)
+    out = np.full(len(x), np.nan)
+    if periods == 0:
+        out[:] = x
+    elif 0 < periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    elif 0 < -periods < len(x):
+        out[:periods] = x[-periods:]
+    return out
+
+
+def _window_reduce(values, window: int, ufunc, fill: float) -> np.ndarray:
+    """
+    Reducción móvil por bloques (van Herk/Gil-Werman): cada ventana es el
+    sufijo acumulado de un bloque más el prefijo acumulado del siguiente.
+
+    Un NaN sólo llega a los acumulados que lo incluyen, así que el resultado es
+    NaN exactamente en las ventanas que contienen algún NaN.
+    """
+    if window < 1:
+        raise ValueError("La ventana debe ser >= 1")
+    x = _as_array(values)
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < window:
+        return out
+    blocks = -(-n // window)
+    if blocks * window == n:
+        padded = x.reshape(blocks, window)
+    else:
+        padded = np.full((blocks, window), fill)
+        padded.ravel()[:n] = x
+    prefix = ufunc.accumulate(padded, axis=1).ravel()[:n]
+    suffix = np.empty((blocks, window))
+    ufunc.accumulate(padded[:, ::-1], axis=1, out=suffix[:, ::-1])
+    suffix = suffix.ravel()[:n]
+    ufunc(suffix[:n - window + 1], prefix[window - 1:], out=out[window - 1:])
+    # Ventanas alineadas con un bloque: sólo el prefijo
+    out[window - 1::window] = prefix[window - 1::window]
+    return out
+
+
+def rolling_sum(values, window: int) -> np.ndarray:
+    """Suma móvil; NaN si la ventana no está completa o contiene NaN"""
+    return _window_reduce(values, window, np.add, 0.0)
+
+
+def rolling_mean(values, window: int) -> np.ndarray:
+    """Media móvil (``rolling(window).mean()``)"""
+    return rolling_sum(values, window) / window
+
+
+def rolling_max(values, window: int) -> np.ndarray:
+    """Máximo móvil (``rolling(window).max()``)"""
+    return _window_reduce(values, window, np.maximum, -np.inf)
+
+
+def rolling_min(values, window: int) -> np.ndarray:
+    """Mínimo móvil (``rolling(window).min()``)"""
+    return _window_reduce(values, window, np.minimum, np.inf)
+
+
+def _running_moments(columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Media y suma de cuadrados de desviaciones acumuladas (Welford) de cada
+    columna, recorriendo las filas: ``columns`` tiene forma (ventana, bloques)
+    """
+    mean = np.empty_like(columns)
+    m2 = np.empty_like(columns)
+    mean[0] = columns[0]
+    m2[0] = 0.0
+    for j in range(1, len(columns)):
+        delta = columns[j] - mean[j - 1]
+        mean[j] = mean[j - 1] + delta / (j + 1)
+        m2[j] = m2[j - 1] + delta * (columns[j] - mean[j])
+    return mean, m2
+
+
+def rolling_std(values, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    Desviación estándar móvil (``rolling(window).std()``)
+
+    Por bloques como ``_window_reduce``: media y suma de cuadrados de
+    desviaciones del sufijo y del prefijo con Welford, combinadas con la
+    fórmula de Chan. Una ventana constante da exactamente 0.
+    """
+    x = _as_array(values)
+    if window < 1:
+        raise ValueError("La ventana debe ser >= 1")
+    n = len(x)
+    out = np.full(n, np.nan)
+    if n < window or window <= ddof:
+        return out
+    blocks = -(-n // window)
+    padded = np.zeros(blocks * window)
+    padded[:n] = x
+    columns = np.ascontiguousarray(padded.reshape(blocks, window).T)
+    prefix_mean, prefix_m2 = (a.T.ravel()[:n] for a in _running_moments(columns))
+    suffix_mean, suffix_m2 = (a[::-1].T.ravel()[:n] for a in _running_moments(columns[::-1]))
+
+    # Ventana que empieza en i y termina en i + window - 1
+    windows = n - window + 1
+    suffix_count = window - np.arange(windows) % window
+    delta = suffix_mean[:windows] - prefix_mean[window - 1:]
+    m2 = suffix_m2[:windows] + prefix_m2[window - 1:]
+    m2 += delta * delta * (suffix_count * (window - suffix_count) / window)
+    # Ventanas alineadas con un bloque: sólo el prefijo
+    m2[::window] = prefix_m2[window - 1::window]
+    out[window - 1:] = np.sqrt(np.maximum(m2, 0.0) / (window - ddof))
+    return out
+
+
+def _ema_loop(x: np.ndarray, period: int) -> np.ndarray:
+    ewm = EWM(period)
+    return np.fromiter((ewm.update(value) for value in x.tolist()), dtype=np.float64, count=len(x))
+
+
+def ema(values, period: int = 20) -> np.ndarray:
+    """Media exponencial (``ewm(span=period, adjust=False).mean()``)"""
+    x = _as_array(values)
+    ewm = EWM(period)
+    alpha, decay = ewm.alpha, ewm.decay
+    valid = ~np.isnan(x)
+    if not valid.any():
+        return np.full(len(x), np.nan)
+    first = int(np.argmax(valid))
+    if lfilter is None or decay + alpha != 1.0 or not valid[first:].all():
+        return _ema_loop(x, period)
+
+    out = np.full(len(x), np.nan)
+    out[first] = x[first]
+    start = first + 1
+    fixes = 0
+    while start < len(x):
+        if fixes == _MAX_EMA_FIXES:
+            ewm.seed(out[start - 1])
+            out[start:] = [ewm.update(value) for value in x[start:].tolist()]
+            break
+        out[start:], _ = lfilter([alpha], [1.0, -decay], x[start:], zi=[decay * out[start - 1]])
+        # pandas no actualiza la media cuando el valor nuevo es igual a ella
+        skipped = np.flatnonzero((x[start:] == out[start - 1:-1]) & (out[start:] != out[start - 1:-1]))
+        if len(skipped) == 0:
+            break
+        fix = start + int(skipped[0])
+        out[fix] = out[fix - 1]
+        start = fix + 1
+        fixes += 1
+    return out
+
+
+def sma(values, period: int = 20) -> np.ndarray:
+    """Media móvil simple"""
+    return rolling_mean(values, period)
+
+
+def rsi(values, period: int = 14) -> np.ndarray:
+    """RSI con medias simples de ganancias y pérdidas"""
+    x = _as_array(values)
+    delta = x - shift(x, 1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = rolling_mean(gain, period) / rolling_mean(loss, period)
+        return 100 - (100 / (1 + rs))
+
+
+def macd(values, fast_period: int = 12, slow_period: int = 26,
+         signal_period: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD: (línea MACD, señal, histograma)"""
+    x = _as_array(values)
+    macd_line = ema(x, fast_period) - ema(x, slow_period)
+    signal_line = ema(macd_line, signal_period)
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def bollinger_bands(values, period: int = 20,
+                    num_std_dev: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bandas de Bollinger: (media, banda superior, banda inferior)"""
+    x = _as_array(values)
+    middle = rolling_mean(x, period)
+    std_dev = rolling_std(x, period)
+    return middle, middle + (std_dev * num_std_dev), middle - (std_dev * num_std_dev)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    """True Range (la primera vela es high - low)"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    prev_close = shift(close, 1)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """Average True Range"""
+    return rolling_mean(true_range(high, low, close), period)
+
+
+def adx(high, low, close, period: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ADX con medias exponenciales: (ADX, +DI, -DI)"""
+    high, low = _as_array(high), _as_array(low)
+    up_move = high - shift(high, 1)
+    down_move = shift(low, 1) - low
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+    smoothed_tr = ema(true_range(high, low, close), period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * ema(plus_dm, period) / smoothed_tr
+        minus_di = 100 * ema(minus_dm, period) / smoothed_tr
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return ema(dx, period), plus_di, minus_di
+
+
+def stochastic(high, low, close, k_period: int = 14,
+               d_period: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+    """Oscilador estocástico: (%K, %D)"""
+    lowest_low = rolling_min(low, k_period)
+    highest_high = rolling_max(high, k_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = 100 * ((_as_array(close) - lowest_low) / (highest_high - lowest_low))
+    return k, rolling_mean(k, d_period)
+
+
+def ichimoku(high, low, close, conversion_period: int = 9, base_period: int = 26,
+             lagging_span2_period: int = 52, displacement: int = 26) -> Dict[str, np.ndarray]:
+    """Componentes de Ichimoku (el Chikou Span mira ``displacement`` velas al futuro)"""
+    high, low = _as_array(high), _as_array(low)
+    tenkan_sen = (rolling_max(high, conversion_period) + rolling_min(low, conversion_period)) / 2
+    kijun_sen = (rolling_max(high, base_period) + rolling_min(low, base_period)) / 2
+    span_b = (rolling_max(high, lagging_span2_period) + rolling_min(low, lagging_span2_period)) / 2
+    return {
+        'tenkan_sen': tenkan_sen,
+        'kijun_sen': kijun_sen,
+        'senkou_span_a': shift((tenkan_sen + kijun_sen) / 2, displacement),
+        'senkou_span_b': shift(span_b, displacement),
+        'chikou_span': shift(close, -displacement)
+    }
@@ -0,0 +1,555 @@
+"""
+Patrones de velas, order flow y fractales sobre arrays NumPy
+
+Las mismas reglas que ``PatternRecognition`` aplica vela a vela, pero
+evaluadas como máscaras sobre todo el histórico en una sola pasada:
+
+- Cada detector devuelve ``{patrón: fuerza}`` con un array int8 por patrón
+  (0 = no hay patrón en esa vela; 1-4 = débil, moderado, fuerte, muy fuerte).
+- Dentro de los grupos de velas se respeta el orden de prioridad del
+  detector por filas: cada vela se queda con el primer patrón que cumple.
+- Los fractales (soportes y resistencias) salen de mínimos y máximos de
+  ventana centrada, con ``indicators.batch``.
+- ``pattern_events`` resume las máscaras en un array estructurado compacto
+  (posición, código, fuerza, dirección, precio) apto para estadísticas de
+  años de velas de 1m, y ``PatternEngine`` lo mantiene vela a vela.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from indicators.batch import rolling_max, rolling_min, shift
+
+WEAK, MODERATE, STRONG, VERY_STRONG = 1, 2, 3, 4
+BULLISH, NEUTRAL, BEARISH = 1, 0, -1
+
+# (nombre, grupo, dirección); dentro de cada grupo, en orden de prioridad
+PATTERNS: Tuple[Tuple[str, str, int], ...] = (
+    ('doji', 'single', NEUTRAL),
+    ('hammer', 'single', BULLISH),
+    ('inverted_hammer', 'single', BULLISH),
+    ('marubozu_bullish', 'single', BULLISH),
+    ('marubozu_bearish', 'single', BEARISH),
+    ('spinning_top', 'single', NEUTRAL),
+    ('hanging_man', 'single', BEARISH),
+    ('shooting_star', 'single', BEARISH),
+    ('engulfing_bullish', 'two', BULLISH),
+    ('engulfing_bearish', 'two', BEARISH),
+    ('harami_bullish', 'two', BULLISH),
+    ('harami_bearish', 'two', BEARISH),
+    ('tweezer_top', 'two', BEARISH),
+    ('tweezer_bottom', 'two', BULLISH),
+    ('piercing_line', 'two', BULLISH),
+    ('dark_cloud_cover', 'two', BEARISH),
+    ('morning_star', 'three', BULLISH),
+    ('evening_star', 'three', BEARISH),
+    ('three_white_soldiers', 'three', BULLISH),
+    ('three_black_crows', 'three', BEARISH),
+    ('strong_bid', 'order_flow', BULLISH),
+    ('strong_ask', 'order_flow', BEARISH),
+    ('absorption_buy', 'order_flow', BULLISH),
+    ('absorption_sell', 'order_flow', BEARISH),
+    ('stops_hunt_up', 'order_flow', BEARISH),
+    ('stops_hunt_down', 'order_flow', BULLISH),
+    ('delta_positive', 'order_flow', BULLISH),
+    ('delta_negative', 'order_flow', BEARISH),
+    ('fractal_support', 'fractal', BULLISH),
+    ('fractal_resistance', 'fractal', BEARISH),
+)
+
+PATTERN_CODES: Dict[str, int] = {name: code for code, (name, _, _) in enumerate(PATTERNS)}
+DIRECTION_NAMES: Dict[int, str] = {BULLISH: 'bullish', NEUTRAL: 'neutral', BEARISH: 'bearish'}
+
+EVENT_DTYPE = np.dtype([
+    ('position', np.int64),
+    ('code', np.int16),
+    ('strength', np.int8),
+    ('direction', np.int8),
+    ('price', np.float64),
+])
+
+# Velas previas que necesita cada vela nueva (media de volumen de 20 de la vela anterior)
+HISTORY_BARS = 21
+
+
+def _as_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+def _previous(values: np.ndarray, periods: int) -> np.ndarray:
+    return shift(values, periods)
+
+
+def _trailing_mean(values: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """
+    Media de ``values[i-start:i-stop]`` para cada i, como ``Series.mean()``:
+    suma secuencial desde 0 de los valores no NaN de la ventana, dividida por
+    cuántos hay (ventanas parciales al principio de la serie)
+    """
+    total = np.zeros(len(values))
+    count = np.zeros(len(values))
+    for lag in range(start, stop, -1):
+        lagged = _previous(values, lag)
+        valid = ~np.isnan(lagged)
+        total += np.where(valid, lagged, 0.0)
+        count += valid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return total / count
+
+
+def candle_anatomy(open_, high, low, close) -> Dict[str, np.ndarray]:
+    """
+    Cuerpo, sombras y sentido de cada vela
+
+    Returns:
+        Dict: body_size, is_bullish, upper_shadow, lower_shadow
+    """
+    open_, high, low, close = _as_array(open_), _as_array(high), _as_array(low), _as_array(close)
+    return {
+        'body_size': np.abs(close - open_),
+        'is_bullish': close > open_,
+        'upper_shadow': high - np.maximum(open_, close),
+        'lower_shadow': np.minimum(open_, close) - low,
+    }
+
+
+def _resolve(candidates: List[Tuple[str, np.ndarray, np.ndarray]], valid: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Aplica la prioridad del grupo: cada vela se queda con el primer patrón
+    que cumple. ``candidates`` es [(nombre, máscara, fuerza)] en orden.
+    """
+    taken = ~valid
+    result = {}
+    for name, mask, strength in candidates:
+        hit = mask & ~taken
+        result[name] = np.where(hit, strength, 0).astype(np.int8)
+        taken |= hit
+    return result
+
+
+def single_candle_patterns(open_, high, low, close, doji_threshold: float = 0.05) -> Dict[str, np.ndarray]:
+    """
+    Patrones de una vela (doji, martillos, marubozu, peonza...)
+
+    Args:
+        open_, high, low, close: Precios de las velas
+        doji_threshold: Cuerpo máximo del doji, en fracción del precio
+
+    Returns:
+        Dict: {patrón: fuerza por vela}
+    """
+    close = _as_array(close)
+    anatomy = candle_anatomy(open_, high, low, close)
+    body, bullish = anatomy['body_size'], anatomy['is_bullish']
+    upper, lower = anatomy['upper_shadow'], anatomy['lower_shadow']
+    n = len(close)
+
+    # Cuerpo medio de la vela y las 5 anteriores; cierre medio de las 3 anteriores
+    avg_body = _trailing_mean(body, 5, -1)
+    prior_close = _trailing_mean(close, 3, 0)
+    has_trend = np.arange(n) >= 3
+    downtrend = has_trend & (prior_close > close)
+    uptrend = has_trend & (prior_close < close)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        doji = body / (close * doji_threshold) < 1.0
+    hammer_shape = (lower > 2 * body) & (upper < 0.3 * body) & (body < avg_body)
+    inverted_shape = (upper > 2 * body) & (lower < 0.3 * body) & (body < avg_body)
+    marubozu = (body > 1.5 * avg_body) & (upper < 0.1 * body) & (lower < 0.1 * body)
+
+    return _resolve([
+        ('doji', doji, MODERATE),
+        ('hammer', hammer_shape, np.where(downtrend, VERY_STRONG, STRONG)),
+        ('inverted_hammer', inverted_shape, np.where(downtrend, STRONG, MODERATE)),
+        ('marubozu_bullish', bullish & marubozu, VERY_STRONG),
+        ('marubozu_bearish', ~bullish & marubozu, VERY_STRONG),
+        ('spinning_top', (body < 0.5 * avg_body) & (upper > body) & (lower > body), WEAK),
+        # Como en el detector por filas, el martillo y el martillo invertido
+        # tienen prioridad sobre estas dos formas
+        ('hanging_man', hammer_shape & uptrend, STRONG),
+        ('shooting_star', inverted_shape & uptrend, STRONG),
+    ], np.ones(n, dtype=bool))
+
+
+def two_candle_patterns(open_, high, low, close, engulfing_threshold: float = 1.05) -> Dict[str, np.ndarray]:
+    """
+    Patrones de dos velas (envolventes, harami, pinzas, línea penetrante...)
+
+    Args:
+        open_, high, low, close: Precios de las velas
+        engulfing_threshold: Factor de envolvente
+
+    Returns:
+        Dict: {patrón: fuerza por vela (la segunda del patrón)}
+    """
+    open_, high, low, close = _as_array(open_), _as_array(high), _as_array(low), _as_array(close)
+    anatomy = candle_anatomy(open_, high, low, close)
+    body, bullish = anatomy['body_size'], anatomy['is_bullish']
+    p_open, p_high, p_low, p_close = (_previous(x, 1) for x in (open_, high, low, close))
+    p_body = _previous(body, 1)
+    p_bullish = p_close > p_open
+    up_after_down = bullish & ~p_bullish
+    down_after_up = ~bullish & p_bullish
+    p_mid = (p_open + p_close) / 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tweezer_top = np.abs(high - p_high) / p_high < 0.003
+        tweezer_bottom = np.abs(low - p_low) / p_low < 0.003
+
+    valid = np.arange(len(close)) >= 1
+    return _resolve([
+        ('engulfing_bullish', up_after_down & (close > p_open * engulfing_threshold)
+         & (open_ < p_close * engulfing_threshold), STRONG),
+        ('engulfing_bearish', down_after_up & (open_ > p_close * engulfing_threshold)
+         & (close < p_open * engulfing_threshold), STRONG),
+        ('harami_bullish', up_after_down & (high < p_open) & (low > p_close) & (body < p_body * 0.6), MODERATE),
+        ('harami_bearish', down_after_up & (high < p_close) & (low > p_open) & (body < p_body * 0.6), MODERATE),
+        ('tweezer_top', down_after_up & tweezer_top, MODERATE),
+        ('tweezer_bottom', up_after_down & tweezer_bottom, MODERATE),
+        ('piercing_line', up_after_down & (open_ < p_close) & (close > p_mid), STRONG),
+        ('dark_cloud_cover', down_after_up & (open_ > p_close) & (close < p_mid), STRONG),
+    ], valid)
+
+
+def three_candle_patterns(open_, high, low, close) -> Dict[str, np.ndarray]:
+    """
+    Patrones de tres velas (estrellas, tres soldados, tres cuervos)
+
+    Returns:
+        Dict: {patrón: fuerza por vela (la tercera del patrón)}
+    """
+    open_, high, low, close = _as_array(open_), _as_array(high), _as_array(low), _as_array(close)
+    anatomy = candle_anatomy(open_, high, low, close)
+    body3, bullish3 = anatomy['body_size'], anatomy['is_bullish']
+    open1, close1, body1 = _previous(open_, 2), _previous(close, 2), _previous(body3, 2)
+    open2, close2, body2 = _previous(open_, 1), _previous(close, 1), _previous(body3, 1)
+    bullish1, bullish2 = close1 > open1, close2 > open2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        small_star = body2 / ((_previous(high, 1) + _previous(low, 1)) / 2) < 0.01
+    star = (body1 > body2 * 2) & (body3 > body2 * 2) & small_star
+    mid1 = (open1 + close1) / 2
+
+    valid = np.arange(len(close)) >= 2
+    return _resolve([
+        ('morning_star', ~bullish1 & bullish3 & star & (close > mid1), VERY_STRONG),
+        ('evening_star', bullish1 & ~bullish3 & star & (close < mid1), VERY_STRONG),
+        ('three_white_soldiers', bullish1 & bullish2 & bullish3 & (close2 > close1) & (close > close2)
+         & (open2 > open1) & (open_ > open2), VERY_STRONG),
+        ('three_black_crows', ~bullish1 & ~bullish2 & ~bullish3 & (close2 < close1) & (close < close2)
+         & (open2 < open1) & (open_ < open2), VERY_STRONG),
+    ], valid)
+
+
+def order_flow_patterns(open_, high, low, close, volume,
+                        volume_threshold: float = 1.5) -> Dict[str, np.ndarray]:
+    """
+    Señales aproximadas de order flow a partir de OHLCV
+
+    A diferencia de los patrones de velas, una vela puede tener varias.
+
+    Args:
+        open_, high, low, close, volume: Datos de las velas
+        volume_threshold: Múltiplo del volumen medio (20 velas) que se considera alto
+
+    Returns:
+        Dict: {señal: fuerza por vela}
+    """
+    open_, high, low, close = _as_array(open_), _as_array(high), _as_array(low), _as_array(close)
+    volume = _as_array(volume)
+    anatomy = candle_anatomy(open_, high, low, close)
+    body, bullish = anatomy['body_size'], anatomy['is_bullish']
+    p_close, p_bullish = _previous(close, 1), _previous(close, 1) > _previous(open_, 1)
+
+    # Misma media móvil de pandas que el detector por filas
+    avg_volume = pd.Series(volume).rolling(window=20).mean().to_numpy()
+    volume_delta = volume * np.where(close > open_, 1, -1)
+    high_volume = volume > avg_volume * volume_threshold
+    prev_high_volume = _previous(volume, 1) > _previous(avg_volume, 1) * volume_threshold
+    active_volume = volume > avg_volume * 1.2
+    last_5_high = _previous(rolling_max(high, 5), 1)
+    last_5_low = _previous(rolling_min(low, 5), 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        close_to_high = (high - close) / (high - low) < 0.2
+        close_to_low = (close - low) / (high - low) < 0.2
+
+    valid = np.arange(len(close)) >= 5
+    signals = {
+        'strong_bid': (high_volume & close_to_high & (volume_delta > 0), STRONG),
+        'strong_ask': (high_volume & close_to_low & (volume_delta < 0), STRONG),
+        'absorption_buy': (prev_high_volume & ~p_bullish & bullish & (close > p_close), VERY_STRONG),
+        'absorption_sell': (prev_high_volume & p_bullish & ~bullish & (close < p_close), VERY_STRONG),
+        'stops_hunt_up': ((high > last_5_high) & (close < last_5_high)
+                          & (anatomy['upper_shadow'] > 2 * body), STRONG),
+        'stops_hunt_down': ((low < last_5_low) & (close > last_5_low)
+                            & (anatomy['lower_shadow'] > 2 * body), STRONG),
+        'delta_positive': ((volume_delta > 0) & active_volume, MODERATE),
+        'delta_negative': ((volume_delta < 0) & active_volume, MODERATE),
+    }
+    return {name: np.where(mask & valid, strength, 0).astype(np.int8)
+            for name, (mask, strength) in signals.items()}
+
+
+def centered_extreme(values, window: int, mode: str = 'max') -> np.ndarray:
+    """
+    Máximo o mínimo de la ventana centrada en cada vela
+    (``rolling(window, center=True)``; NaN en los bordes)
+    """
+    reduce = rolling_max if mode == 'max' else rolling_min
+    return shift(reduce(values, window), -((window - 1) // 2))
+
+
+def local_extrema(values, window: int, mode: str = 'max') -> np.ndarray:
+    """
+    Posiciones de las velas que son el extremo de su ventana centrada
+
+    Args:
+        values: Serie de precios (máximos o mínimos)
+        window: Tamaño de la ventana
+        mode: 'max' o 'min'
+
+    Returns:
+        np.ndarray: Posiciones, en orden
+    """
+    values = _as_array(values)
+    return np.flatnonzero(values == centered_extreme(values, window, mode))
+
+
+def segment_extreme(values, positions: np.ndarray, mode: str = 'min') -> np.ndarray:
+    """
+    Extremo de ``values`` entre cada par de posiciones consecutivas, ambas
+    incluidas (``values[p[k]:p[k+1] + 1]``), ignorando NaN
+
+    Returns:
+        np.ndarray: Un valor por par (len(positions) - 1)
+    """
+    values = _as_array(values)
+    if len(positions) < 2:
+        return np.empty(0)
+    ufunc = np.fmin if mode == 'min' else np.fmax
+    return ufunc(ufunc.reduceat(values, positions)[:-1], values[positions[1:]])
+
+
+def fractals(high, low, period: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fractales: mínimos y máximos locales de ``period // 2`` velas a cada lado
+
+    Una vela es soporte si su mínimo es el menor de la ventana centrada
+    (empates incluidos), y resistencia si su máximo es el mayor. Las últimas
+    ``period // 2`` velas aún no están confirmadas y quedan en False.
+
+    Args:
+        high, low: Máximos y mínimos de las velas
+        period: Período del fractal
+
+    Returns:
+        Tuple: (máscara de soportes, máscara de resistencias)
+    """
+    high, low = _as_array(high), _as_array(low)
+    window = 2 * (period // 2) + 1
+    if len(low) < period:
+        return np.zeros(len(low), dtype=bool), np.zeros(len(high), dtype=bool)
+    return low == centered_extreme(low, window, 'min'), high == centered_extreme(high, window, 'max')
+
+
+def detect_all(open_, high, low, close, volume, config: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Todos los patrones de ``PATTERNS`` sobre el histórico completo
+
+    Args:
+        open_, high, low, close, volume: Datos de las velas
+        config: Umbrales de PatternRecognition (doji_threshold,
+                engulfing_threshold, volume_threshold, fractal_period,
+                enable_order_flow)
+
+    Returns:
+        Dict: {patrón: fuerza por vela}
+    """
+    config = config or {}
+    strengths = {}
+    strengths.update(single_candle_patterns(open_, high, low, close, config.get('doji_threshold', 0.05)))
+    strengths.update(two_candle_patterns(open_, high, low, close, config.get('engulfing_threshold', 1.05)))
+    strengths.update(three_candle_patterns(open_, high, low, close))
+    if config.get('enable_order_flow', True):
+        strengths.update(order_flow_patterns(open_, high, low, close, volume, config.get('volume_threshold', 1.5)))
+    supports, resistances = fractals(high, low, config.get('fractal_period', 5))
+    strengths['fractal_support'] = np.where(supports, MODERATE, 0).astype(np.int8)
+    strengths['fractal_resistance'] = np.where(resistances, MODERATE, 0).astype(np.int8)
+    return strengths
+
+
+def pattern_events(strengths: Dict[str, np.ndarray], close, low=None, high=None,
+                   offset: int = 0, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+    """
+    Convierte las máscaras de fuerza en un array estructurado de eventos
+
+    Args:
+        strengths: {patrón: fuerza por vela} (de detect_all o los detectores)
+        close: Cierres (precio de los patrones)
+        low, high: Mínimos y máximos (precio de los fractales)
+        offset: Se suma a las posiciones (velas anteriores al array)
+        start, stop: Rango de velas del que se extraen eventos
+
+    Returns:
+        np.ndarray: Eventos (EVENT_DTYPE) ordenados por posición y código
+    """
+    close = _as_array(close)
+    prices = {'fractal_support': low, 'fractal_resistance': high}
+    chunks = []
+    for name, strength in strengths.items():
+        code = PATTERN_CODES[name]
+        positions = np.flatnonzero(strength[start:stop]) + start
+        if len(positions) == 0:
+            continue
+        chunk = np.empty(len(positions), dtype=EVENT_DTYPE)
+        chunk['position'] = positions + offset
+        chunk['code'] = code
+        chunk['strength'] = strength[positions]
+        chunk['direction'] = PATTERNS[code][2]
+        source = prices.get(name)
+        chunk['price'] = (close if source is None else _as_array(source))[positions]
+        chunks.append(chunk)
+    if not chunks:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    events = np.concatenate(chunks)
+    return events[np.lexsort((events['code'], events['position']))]
+
+
+def event_names(events: np.ndarray) -> np.ndarray:
+    """Nombre del patrón de cada evento"""
+    names = np.array([name for name, _, _ in PATTERNS])
+    return names[events['code']]
+
+
+class PatternEngine:
+    """
+    Detector de patrones por lotes con modo incremental
+
+    ``scan`` evalúa un histórico completo; ``update`` recibe sólo las velas
+    nuevas y guarda las últimas velas necesarias para evaluarlas, así que su
+    coste no depende de la longitud del histórico. Los fractales se emiten
+    cuando se confirman (``period // 2`` velas después del pivote), con la
+    posición del pivote.
+    """
+
+    COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Args:
+            config: Umbrales de PatternRecognition (ver detect_all)
+        """
+        self.config = config if config is not None else {}
+        self.reset()
+
+    @property
+    def half_period(self) -> int:
+        return self.config.get('fractal_period', 5) // 2
+
+    @property
+    def history_bars(self) -> int:
+        return max(HISTORY_BARS, 2 * self.half_period)
+
+    def reset(self):
+        """Olvida las velas recibidas"""
+        self._tail = {col: np.empty(0) for col in self.COLUMNS}
+        self.count = 0
+
+    def _columns(self, data) -> Dict[str, np.ndarray]:
+        return {col: _as_array(data[col]) for col in self.COLUMNS}
+
+    def scan(self, data) -> np.ndarray:
+        """
+        Eventos de todo un histórico (no modifica el estado incremental)
+
+        Args:
+            data: DataFrame o dict de arrays con open, high, low, close y volume
+
+        Returns:
+            np.ndarray: Eventos (EVENT_DTYPE), posiciones desde 0
+        """
+        columns = self._columns(data)
+        strengths = detect_all(*(columns[col] for col in self.COLUMNS), self.config)
+        return pattern_events(strengths, columns['close'], columns['low'], columns['high'])
+
+    def update(self, data) -> np.ndarray:
+        """
+        Añade velas cerradas y devuelve los eventos que aparecen con ellas
+
+        Args:
+            data: DataFrame o dict de arrays con las velas nuevas
+
+        Returns:
+            np.ndarray: Eventos de las velas nuevas y fractales recién
+                        confirmados, con posiciones absolutas
+        """
+        new = self._columns(data)
+        added = len(new['close'])
+        if added == 0:
+            return np.empty(0, dtype=EVENT_DTYPE)
+        columns = {col: np.concatenate([self._tail[col], new[col]]) for col in self.COLUMNS}
+        kept = len(self._tail['close'])
+        offset = self.count - kept
+
+        strengths = detect_all(*(columns[col] for col in self.COLUMNS), self.config)
+        fractal_strengths = {name: strengths.pop(name) for name in ('fractal_support', 'fractal_resistance')}
+        events = pattern_events(strengths, columns['close'], offset=offset, start=kept)
+        # Pivotes que se confirman con las velas nuevas
+        confirmed = pattern_events(fractal_strengths, columns['close'], columns['low'], columns['high'],
+                                   offset=offset, start=max(kept - self.half_period, 0))
+
+        self._tail = {col: values[-self.history_bars:] for col, values in columns.items()}
+        self.count += added
+        events = np.concatenate([events, confirmed])
+        return events[np.lexsort((events['code'], events['position']))]
+
+
+def pattern_statistics(events: np.ndarray, close, horizon: int = 10) -> Dict[str, Dict[str, float]]:
+    """
+    Rendimiento de cada patrón a ``horizon`` velas vista
+
+    El retorno de un evento es el cambio del cierre desde la vela del patrón,
+    con el signo de su dirección (en los neutrales, el cambio tal cual). Los
+    eventos sin ``horizon`` velas posteriores se ignoran.
+
+    Args:
+        events: Eventos (EVENT_DTYPE) con posiciones sobre ``close``
+        close: Cierres del histórico
+        horizon: Velas hasta la salida
+
+    Returns:
+        Dict: {patrón: detected, win_rate, avg_return, avg_profit, avg_loss, profit_factor}
+    """
+    close = _as_array(close)
+    events = events[events['position'] + horizon < len(close)]
+    entry = close[events['position']]
+    change = close[events['position'] + horizon] / entry - 1
+    direction = events['direction'].astype(np.float64)
+    returns = np.where(direction == 0, change, change * direction)
+
+    codes = events['code'].astype(np.int64)
+    size = len(PATTERNS)
+    detected = np.bincount(codes, minlength=size)
+    wins = np.bincount(codes, weights=returns > 0, minlength=size)
+    total = np.bincount(codes, weights=returns, minlength=size)
+    profit = np.bincount(codes, weights=np.where(returns > 0, returns, 0.0), minlength=size)
+    loss = np.bincount(codes, weights=np.where(returns < 0, -returns, 0.0), minlength=size)
+
+    stats = {}
+    for code in np.flatnonzero(detected):
+        count = detected[code]
+        losses = count - wins[code]
+        avg_profit = profit[code] / wins[code] if wins[code] else 0.0
+        avg_loss = loss[code] / losses if losses else 0.0
+        stats[PATTERNS[code][0]] = {
+            'detected': int(count),
+            'win_rate': float(wins[code] / count),
+            'avg_return': float(total[code] / count),
+            'avg_profit': float(avg_profit),
+            'avg_loss': float(avg_loss),
+            'profit_factor': float(avg_profit / avg_loss) if avg_loss > 0 else float('inf'),
+        }
+    return stats
@@ -0,0 +1,593 @@
+"""
+Indicadores técnicos en streaming: O(1) por vela o por tick
+
+Cada indicador guarda el estado mínimo (sumas de la ventana, colas
+monótonas para máximos/mínimos, el último valor de las medias exponenciales)
+y lo actualiza con cada vela cerrada en tiempo constante:
+
+- ``update(...)`` añade una vela cerrada y devuelve el valor del indicador.
+- ``peek(...)`` devuelve el valor que tendría el indicador si la vela en curso
+  cerrase con esos precios, sin modificar el estado (para ticks).
+
+Las cuentas reproducen operación a operación las de pandas
+(``rolling().mean()`` con suma compensada, ``ewm(adjust=False).mean()``,
+``rolling().min()/max()``), así que los resultados coinciden bit a bit con
+los de ``TechnicalIndicators``. La desviación estándar usa el mismo Welford
+de ventana que pandas, pero se recalcula exacta cada ``resync_every`` velas
+para que el error no se acumule en un bot que lleva meses en marcha; difiere
+de pandas sólo en el redondeo.
+"""
+
+import math
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+NAN = float('nan')
+
+
+def _is_nan(value: float) -> bool:
+    return value != value
+
+
+def safe_div(a: float, b: float) -> float:
+    """División con la semántica de NumPy/pandas (x/0 = ±inf, 0/0 = NaN)"""
+    if b == 0:
+        if a == 0 or _is_nan(a):
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def nan_max(*values: float) -> float:
+    """Máximo ignorando NaN (como ``DataFrame.max(axis=1)``)"""
+    valid = [v for v in values if not _is_nan(v)]
+    return max(valid) if valid else NAN
+
+
+# ----------------------------------------------------------------------
+# Ventanas
+# ----------------------------------------------------------------------
+
+class RollingMean:
+    """
+    Media móvil de ventana fija con la suma compensada de pandas.
+
+    Estado: (nobs, suma, negativos, compensación al añadir, compensación al
+    quitar, repeticiones del último valor, último valor).
+    """
+
+    def __init__(self, window: int):
+        if window < 1:
+            raise ValueError("La ventana debe ser >= 1")
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self._values = deque()
+        self._state = (0, 0.0, 0, 0.0, 0.0, 0, NAN)
+
+    def _step(self, value: float) -> Tuple:
+        nobs, sum_x, neg_ct, comp_add, comp_remove, same, prev = self._state
+        if self.window == 1 or not self._values:
+            # pandas reinicia las sumas cuando la ventana no se solapa con la anterior
+            nobs, sum_x, neg_ct, comp_add, comp_remove, same, prev = 0, 0.0, 0, 0.0, 0.0, 0, value
+        elif len(self._values) == self.window:
+            old = self._values[0]
+            if not _is_nan(old):
+                nobs -= 1
+                y = -old - comp_remove
+                t = sum_x + y
+                comp_remove = t - sum_x - y
+                sum_x = t
+                if math.copysign(1.0, old) < 0:
+                    neg_ct -= 1
+        if not _is_nan(value):
+            nobs += 1
+            y = value - comp_add
+            t = sum_x + y
+            comp_add = t - sum_x - y
+            sum_x = t
+            if math.copysign(1.0, value) < 0:
+                neg_ct += 1
+            same = same + 1 if value == prev else 1
+            prev = value
+        return nobs, sum_x, neg_ct, comp_add, comp_remove, same, prev
+
+    @staticmethod
+    def _result(state: Tuple, window: int) -> float:
+        nobs, sum_x, neg_ct, _, _, same, prev = state
+        if nobs < window:
+            return NAN
+        result = sum_x / nobs
+        if same >= nobs:
+            return prev
+        if neg_ct == 0 and result < 0:
+            return 0.0
+        if neg_ct == nobs and result > 0:
+            return 0.0
+        return result
+
+    def update(self, value: float) -> float:
+        self._state = self._step(value)
+        self._values.append(value)
+        if len(self._values) > self.window:
+            self._values.popleft()
+        return self._result(self._state, self.window)
+
+    def peek(self, value: float) -> float:
+        return self._result(self._step(value), self.window)
+
+
+class RollingStd:
+    """
+    Desviación estándar móvil con el Welford de ventana de pandas.
+    """
+
+    def __init__(self, window: int, ddof: int = 1, resync_every: int = 1000):
+        """
+        Args:
+            window: Tamaño de la ventana
+            ddof: Grados de libertad descontados (1 = muestral, como pandas)
+            resync_every: Velas entre recálculos exactos del estado
+        """
+        if window < 1:
+            raise ValueError("La ventana debe ser >= 1")
+        self.window = window
+        self.ddof = ddof
+        self.resync_every = resync_every
+        self.reset()
+
+    def reset(self):
+        self._values = deque()
+        self._state = (0, 0.0, 0.0)
+        self._updates = 0
+
+    def _step(self, value: float) -> Tuple[int, float, float]:
+        nobs, mean_x, ssqdm_x = self._state
+        if self.window == 1 or not self._values:
+            nobs, mean_x, ssqdm_x = 0, 0.0, 0.0
+        elif len(self._values) == self.window:
+            old = self._values[0]
+            if not _is_nan(old):
+                nobs -= 1
+                if nobs:
+                    prev_mean = mean_x
+                    mean_x = mean_x - (old - mean_x) / nobs
+                    ssqdm_x = ssqdm_x - (old - prev_mean) * (old - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm_x = 0.0
+        if not _is_nan(value):
+            nobs += 1
+            prev_mean = mean_x
+            mean_x = mean_x + (value - mean_x) / nobs
+            ssqdm_x = ssqdm_x + (value - prev_mean) * (value - mean_x)
+        return nobs, mean_x, ssqdm_x
+
+    def _result(self, state: Tuple[int, float, float]) -> float:
+        nobs, _, ssqdm_x = state
+        if nobs < self.window or nobs <= self.ddof:
+            return NAN
+        if nobs == 1:
+            return 0.0
+        variance = ssqdm_x / (nobs - self.ddof)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def _exact_state(self) -> Tuple[int, float, float]:
+        valid = [v for v in self._values if not _is_nan(v)]
+        if not valid:
+            return 0, 0.0, 0.0
+        mean_x = math.fsum(valid) / len(valid)
+        return len(valid), mean_x, math.fsum((v - mean_x) ** 2 for v in valid)
+
+    def update(self, value: float) -> float:
+        self._state = self._step(value)
+        self._values.append(value)
+        if len(self._values) > self.window:
+            self._values.popleft()
+        result = self._result(self._state)
+        self._updates += 1
+        if self.resync_every and self._updates % self.resync_every == 0:
+            self._state = self._exact_state()
+        return result
+
+    def peek(self, value: float) -> float:
+        return self._result(self._step(value))
+
+
+class RollingExtremum:
+    """
+    Máximo o mínimo móvil con una cola monótona (O(1) amortizado).
+
+    Como ``rolling(window).max()``: si la ventana contiene algún NaN el
+    resultado es NaN.
+    """
+
+    def __init__(self, window: int, mode: str = 'max'):
+        if window < 1:
+            raise ValueError("La ventana debe ser >= 1")
+        if mode not in ('max', 'min'):
+            raise ValueError("mode debe ser 'max' o 'min'")
+        self.window = window
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        self._index = -1
+        self._queue = deque()
+        self._nan_positions = deque()
+        self._count = 0
+
+    def _better(self, a: float, b: float) -> bool:
+        return a >= b if self.mode == 'max' else a <= b
+
+    def update(self, value: float) -> float:
+        self._index += 1
+        self._count = min(self._count + 1, self.window)
+        expired = self._index - self.window
+        while self._queue and self._queue[0][0] <= expired:
+            self._queue.popleft()
+        while self._nan_positions and self._nan_positions[0] <= expired:
+            self._nan_positions.popleft()
+        if _is_nan(value):
+            self._nan_positions.append(self._index)
+        else:
+            while self._queue and self._better(value, self._queue[-1][1]):
+                self._queue.pop()
+            self._queue.append((self._index, value))
+        if self._count < self.window or self._nan_positions:
+            return NAN
+        return self._queue[0][1]
+
+    def peek(self, value: float) -> float:
+        if _is_nan(value) or min(self._count + 1, self.window) < self.window:
+            return NAN
+        expired = self._index + 1 - self.window
+        if self._nan_positions and self._nan_positions[-1] > expired:
+            return NAN
+        for index, candidate in self._queue:
+            if index > expired:
+                return candidate if self._better(candidate, value) else value
+        return value
+
+
+class EWM:
+    """
+    Media exponencial ``ewm(span=period, adjust=False).mean()`` de pandas,
+    incluido su tratamiento de NaN (``ignore_na=False``).
+    """
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("El período debe ser >= 1")
+        self.period = period
+        com = (period - 1) / 2
+        self.alpha = 1.0 / (1.0 + com)
+        self.decay = 1.0 - self.alpha
+        self.reset()
+
+    def reset(self):
+        self._state: Optional[Tuple[float, float, int]] = None
+
+    def seed(self, value: float):
+        """Continúa la media a partir de ``value`` (la última media calculada)"""
+        self._state = (value, 1.0, 1)
+
+    def _step(self, value: float) -> Tuple[float, float, int]:
+        is_observation = not _is_nan(value)
+        if self._state is None:
+            return value, 1.0, int(is_observation)
+        weighted, old_wt, nobs = self._state
+        nobs += is_observation
+        if not _is_nan(weighted):
+            old_wt *= self.decay
+            if is_observation:
+                if weighted != value:
+                    weighted = old_wt * weighted + self.alpha * value
+                    weighted /= (old_wt + self.alpha)
+                old_wt = 1.0
+        elif is_observation:
+            weighted = value
+        return weighted, old_wt, nobs
+
+    @staticmethod
+    def _result(state: Tuple[float, float, int]) -> float:
+        weighted, _, nobs = state
+        return weighted if nobs >= 1 else NAN
+
+    def update(self, value: float) -> float:
+        self._state = self._step(value)
+        return self._result(self._state)
+
+    def peek(self, value: float) -> float:
+        return self._result(self._step(value))
+
+
+class _Delay:
+    """Desplaza una serie ``periods`` velas hacia delante (``shift(periods)``)"""
+
+    def __init__(self, periods: int):
+        self.periods = periods
+        self.reset()
+
+    def reset(self):
+        self._values = deque()
+
+    def update(self, value: float) -> float:
+        self._values.append(value)
+        if len(self._values) > self.periods:
+            return self._values.popleft()
+        return NAN
+
+    def peek(self, value: float) -> float:
+        if self.periods == 0:
+            return value
+        return self._values[0] if len(self._values) == self.periods else NAN
+
+
+# ----------------------------------------------------------------------
+# Indicadores
+# ----------------------------------------------------------------------
+
+class StreamingIndicator:
+    """
+    Clase base: ``update`` para velas cerradas, ``peek`` para la vela en curso.
+    """
+
+    def __init__(self):
+        self.value: Any = None
+        self.count = 0
+        self.reset()
+
+    def reset(self):
+        raise NotImplementedError
+
+    def _compute(self, commit: bool, *args: float):
+        raise NotImplementedError
+
+    def update(self, *args: float):
+        """
+        Añade una vela cerrada
+
+        Returns:
+            Valor del indicador para esa vela
+        """
+        self.value = self._compute(True, *args)
+        self.count += 1
+        return self.value
+
+    def peek(self, *args: float):
+        """
+        Valor del indicador si la vela en curso cerrase con estos precios
+
+        Returns:
+            Valor provisional (el estado no cambia)
+        """
+        return self._compute(False, *args)
+
+    def warmup(self, *series) -> Any:
+        """
+        Alimenta el indicador con un histórico
+
+        Args:
+            *series: Una secuencia por entrada (p. ej. high, low, close)
+
+        Returns:
+            Valor del indicador tras la última vela
+        """
+        for row in zip(*series):
+            self.update(*(float(v) for v in row))
+        return self.value
+
+
+def _apply(component, commit: bool, value: float) -> float:
+    return component.update(value) if commit else component.peek(value)
+
+
+class SMA(StreamingIndicator):
+    """Media móvil simple"""
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        self._mean = RollingMean(self.period)
+
+    def _compute(self, commit: bool, close: float) -> float:
+        return _apply(self._mean, commit, close)
+
+
+class EMA(StreamingIndicator):
+    """Media móvil exponencial (``adjust=False``)"""
+
+    def __init__(self, period: int = 20):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        self._ewm = EWM(self.period)
+
+    def _compute(self, commit: bool, close: float) -> float:
+        return _apply(self._ewm, commit, close)
+
+
+class RSI(StreamingIndicator):
+    """RSI con medias simples de ganancias y pérdidas"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        self._gain = RollingMean(self.period)
+        self._loss = RollingMean(self.period)
+        self._prev_close = NAN
+
+    def _compute(self, commit: bool, close: float) -> float:
+        delta = close - self._prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain = _apply(self._gain, commit, gain)
+        avg_loss = _apply(self._loss, commit, loss)
+        if commit:
+            self._prev_close = close
+        rs = safe_div(avg_gain, avg_loss)
+        return 100 - safe_div(100, 1 + rs)
+
+
+class MACD(StreamingIndicator):
+    """MACD: (línea MACD, señal, histograma)"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        super().__init__()
+
+    def reset(self):
+        self._fast = EWM(self.fast_period)
+        self._slow = EWM(self.slow_period)
+        self._signal = EWM(self.signal_period)
+
+    def _compute(self, commit: bool, close: float) -> Tuple[float, float, float]:
+        macd_line = _apply(self._fast, commit, close) - _apply(self._slow, commit, close)
+        signal_line = _apply(self._signal, commit, macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+
+class BollingerBands(StreamingIndicator):
+    """Bandas de Bollinger: (media, banda superior, banda inferior)"""
+
+    def __init__(self, period: int = 20, num_std_dev: float = 2.0):
+        self.period = period
+        self.num_std_dev = num_std_dev
+        super().__init__()
+
+    def reset(self):
+        self._mean = RollingMean(self.period)
+        self._std = RollingStd(self.period)
+
+    def _compute(self, commit: bool, close: float) -> Tuple[float, float, float]:
+        middle = _apply(self._mean, commit, close)
+        std_dev = _apply(self._std, commit, close)
+        return middle, middle + (std_dev * self.num_std_dev), middle - (std_dev * self.num_std_dev)
+
+
+class _TrueRange:
+    """True Range de la vela respecto al cierre anterior"""
+
+    def __init__(self):
+        self.prev_close = NAN
+
+    def compute(self, commit: bool, high: float, low: float, close: float) -> float:
+        tr = nan_max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        if commit:
+            self.prev_close = close
+        return tr
+
+
+class ATR(StreamingIndicator):
+    """Average True Range (media simple del True Range)"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        self._tr = _TrueRange()
+        self._mean = RollingMean(self.period)
+
+    def _compute(self, commit: bool, high: float, low: float, close: float) -> float:
+        return _apply(self._mean, commit, self._tr.compute(commit, high, low, close))
+
+
+class ADX(StreamingIndicator):
+    """ADX con medias exponenciales: (ADX, +DI, -DI)"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        super().__init__()
+
+    def reset(self):
+        self._tr = _TrueRange()
+        self._prev_high = NAN
+        self._prev_low = NAN
+        self._plus = EWM(self.period)
+        self._minus = EWM(self.period)
+        self._range = EWM(self.period)
+        self._adx = EWM(self.period)
+
+    def _compute(self, commit: bool, high: float, low: float, close: float) -> Tuple[float, float, float]:
+        up_move = high - self._prev_high
+        down_move = self._prev_low - low
+        plus_dm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        minus_dm = down_move if (down_move > up_move and down_move > 0) else 0.0
+        tr = self._tr.compute(commit, high, low, close)
+        if commit:
+            self._prev_high = high
+            self._prev_low = low
+
+        smoothed_tr = _apply(self._range, commit, tr)
+        plus_di = safe_div(100 * _apply(self._plus, commit, plus_dm), smoothed_tr)
+        minus_di = safe_div(100 * _apply(self._minus, commit, minus_dm), smoothed_tr)
+        dx = safe_div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        return _apply(self._adx, commit, dx), plus_di, minus_di
+
+
+class Stochastic(StreamingIndicator):
+    """Oscilador estocástico: (%K, %D)"""
+
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.k_period = k_period
+        self.d_period = d_period
+        super().__init__()
+
+    def reset(self):
+        self._lowest = RollingExtremum(self.k_period, 'min')
+        self._highest = RollingExtremum(self.k_period, 'max')
+        self._d = RollingMean(self.d_period)
+
+    def _compute(self, commit: bool, high: float, low: float, close: float) -> Tuple[float, float]:
+        lowest_low = _apply(self._lowest, commit, low)
+        highest_high = _apply(self._highest, commit, high)
+        k = 100 * safe_div(close - lowest_low, highest_high - lowest_low)
+        return k, _apply(self._d, commit, k)
+
+
+class Ichimoku(StreamingIndicator):
+    """
+    Ichimoku: Tenkan, Kijun y Senkou A/B de la vela actual.
+
+    El Chikou Span de una vela es el cierre de ``displacement`` velas después,
+    así que no existe en streaming: el cierre de cada vela nueva es el Chikou
+    de la vela ``displacement`` posiciones atrás.
+    """
+
+    def __init__(self, conversion_period: int = 9, base_period: int = 26,
+                 lagging_span2_period: int = 52, displacement: int = 26):
+        self.conversion_period = conversion_period
+        self.base_period = base_period
+        self.lagging_span2_period = lagging_span2_period
+        self.displacement = displacement
+        super().__init__()
+
+    def reset(self):
+        self._windows = {
+            name: (RollingExtremum(period, 'max'), RollingExtremum(period, 'min'))
+            for name, period in (('tenkan', self.conversion_period), ('kijun', self.base_period),
+                                 ('span_b', self.lagging_span2_period))
+        }
+        self._span_a = _Delay(self.displacement)
+        self._span_b = _Delay(self.displacement)
+
+    def _compute(self, commit: bool, high: float, low: float, close: float) -> Dict[str, float]:
+        mid = {}
+        for name, (highest, lowest) in self._windows.items():
+            mid[name] = (_apply(highest, commit, high) + _apply(lowest, commit, low)) / 2
+        return {
+            'tenkan_sen': mid['tenkan'],
+            'kijun_sen': mid['kijun'],
+            'senkou_span_a': _apply(self._span_a, commit, (mid['tenkan'] + mid['kijun']) / 2),
+            'senkou_span_b': _apply(self._span_b, commit, mid['span_b'])
+        }
@@ -30,17 +30,28 @@ load_dotenv(dotenv_path=config_path)
 # Importar módulos del bot
 from api_client.modulocola import data_queue
 from api_client.modulo2 import OKXWebSocketClient
+from data_management.candle_buffer import CandleRingBuffer
+from data_management.columnar_store import ColumnarStore
+from features.incremental import RSI, SMA, IncrementalFeatureEngine
 
 # Flask app para monitoreo
 app = Flask(__name__)
 
 class PaperTradingEngine:
-    def __init__(self, initial_balance=10000):
+    def __init__(self, initial_balance=10000, history_capacity=5000, market_store='market_store'):
         self.balance = initial_balance
         self.initial_balance = initial_balance
         self.position = None
         self.trades = []
-        self.market_data = []
+        # Velas de 1m de SOL-USDT con SMA/RSI incrementales; las antiguas van al almacén columnar
+        spill_dataset = None
+        if market_store:
+            spill_dataset = ColumnarStore(market_store).dataset('SOL-USDT', '1m', kind='live_klines')
+        self.market_data = CandleRingBuffer(
+            capacity=history_capacity,
+            engine=IncrementalFeatureEngine([SMA(5, 'sma_5'), SMA(20, 'sma_20'), RSI(14, 'rsi', method='sma')]),
+            spill_dataset=spill_dataset
+        )
         self.learning_data = []
         self.status = "Iniciando..."
         
@@ -48,15 +59,11 @@ class PaperTradingEngine:
         if len(self.market_data) < 5:  # Reducido de 20 a 5 para acelerar el aprendizaje
             return None
             
-        df = pd.DataFrame(self.market_data)
-        df['sma_5'] = df['close'].rolling(5).mean()
-        df['sma_20'] = df['close'].rolling(20).mean()
-        df['rsi'] = self.calculate_rsi(df['close'])
-        
+        current = self.market_data.last()
         current_price = float(candle_data['close'])
-        sma_5 = df['sma_5'].iloc[-1]
-        sma_20 = df['sma_20'].iloc[-1]
-        rsi = df['rsi'].iloc[-1]
+        sma_5 = current['sma_5']
+        sma_20 = current['sma_20']
+        rsi = current['rsi']
         
         signal = None
         
@@ -274,19 +281,16 @@ class LearningTradingBot:
                             'volume': float(candle_data[5])
                         }
                         
-                        if processed_candle['timestamp'] != last_candle_time:
-                            self.engine.market_data.append(processed_candle)
-                            
-                            if len(self.engine.market_data) > 100:
-                                self.engine.market_data = self.engine.market_data[-100:]
-                            
+                        # El buffer descarta velas repetidas y actualiza los indicadores sólo con la nueva
+                        if (processed_candle['timestamp'] != last_candle_time and
+                                self.engine.market_data.append(processed_candle)):
                             analysis = self.engine.analyze_market(processed_candle)
                             if analysis and analysis['signal']:
                                 self.engine.execute_trade(analysis)
                             
                             last_candle_time = processed_candle['timestamp']
                             
-                            if len(self.engine.market_data) % 5 == 0:
+                            if self.engine.market_data.count % 5 == 0:
                                 price = processed_candle['close']
                                 data_count = len(self.engine.market_data)
                                 balance = self.engine.balance
@@ -27,6 +27,8 @@ from api_client.modulocola import data_queue
 from api_client.modulo2 import OKXWebSocketClient as BusinessOKXWebSocketClient
 # ---------------------------------------------------
 from data_management.historical_data_saver_async import HistoricalDataSaver
+from data_management.candle_buffer import CandleRingBuffer
+from features.incremental import processor_feature_set
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -58,7 +60,10 @@ class ScalpingBot:
         self.profitable_trades = 0
         self.mode = "paper"  # paper o real
         self.trades_history = []
-        self.price_history = []
+        # Velas cerradas con indicadores incrementales por (instrumento, intervalo).
+        # HistoricalDataSaver ya las persiste en SQLite, así que no se vuelcan al almacén
+        self.history_capacity = 5000
+        self.candles: Dict[tuple, CandleRingBuffer] = {}
         self.stop_event = threading.Event()
         self.status_thread = None
         self.trading_thread = None
@@ -74,8 +79,21 @@ class ScalpingBot:
     async def initialize(self):
         logger.info(f"Inicializando bot en modo {self.mode.upper()}...")
         await self.historical_data_saver.connect()
+        self.historical_data_saver.register_bar_closed_callback(self.on_bar_closed)
         logger.info("Bot inicializado.")
 
+    def on_bar_closed(self, bar: Dict[str, Any]):
+        """Recibe cada vela confirmada desde HistoricalDataSaver"""
+        key = (bar['instrument'], bar['interval'])
+        if key not in self.candles:
+            self.candles[key] = CandleRingBuffer(capacity=self.history_capacity, engine=processor_feature_set())
+        self.candles[key].append(bar)
+        logger.info(f"[ScalpingBot - Vela cerrada]: {bar['instrument']} ({bar['interval']}) @ {bar['timestamp']} - Cierre: {bar['close']}")
+
+    def get_candles(self, instrument: str, interval: str) -> Optional[CandleRingBuffer]:
+        """Buffer de velas cerradas (con RSI, medias, etc.) de un instrumento e intervalo"""
+        return self.candles.get((instrument, interval))
+
     def start(self):
         if not self.active:
             logger.info("Iniciando operaciones del bot...")
@@ -119,7 +137,7 @@ class ScalpingBot:
                 elif data.get('type') == 'books-l2-tbt':
                     logger.info(f"[ScalpingBot - OrderBook]: {data.get('instrument')} - Bid: {data.get('best_bid')}, Ask: {data.get('best_ask')}")
                     # NUEVO: Guardar datos de order book
-                    self.historical_data_saver.save_order_book_data(data) # <--- ¡Aquí está la adición!
+                    await self.historical_data_saver.save_order_book_data(data) # <--- ¡Aquí está la adición!
                 elif data.get('type') == 'trades':
                     logger.info(f"[ScalpingBot - Trade]: {data.get('instrument')} - Trades recibidos.")
                 elif data.get('type') == 'candle':
@@ -165,6 +183,9 @@ class ScalpingBot:
         print(f"Balance Actual: {self.balance:.2f} USDT")
         print(f"Posición Actual: {self.current_position if self.current_position else 'Ninguna'}")
         print(f"Total de Trades: {self.total_trades} | Rentables: {self.profitable_trades} ({self.profitable_trades/self.total_trades*100:.2f}% profitable)" if self.total_trades > 0 else "Total de Trades: 0")
+        db_metrics = self.historical_data_saver.get_metrics()
+        print(f"DB: {db_metrics['rows_flushed']} filas guardadas | Pendientes: {db_metrics['backlog']} | "
+              f"Volcado: {db_metrics['last_flush_latency_ms']:.1f} ms (media {db_metrics['avg_flush_latency_ms']:.1f} ms)")
         print("="*60 + "\n")
 
 async def main_cli_interface_async():
@@ -7,6 +7,7 @@ Módulo Intermediador para compatibilidad de datos entre fuentes Binance y el ba
 
 Entre quiénes trabaja:
 - Fuente: Archivos CSV históricos de Binance (binance_data/SOLUSDT_raw_historical_data_*.csv)
+  o su versión en el almacén columnar (data_management/columnar_store.py)
 - Destino: Módulo de backtesting clásico (backtesting.py)
 
 Uso típico:
@@ -16,6 +17,7 @@ Uso típico:
 """
 
 import pandas as pd
+from data_management.columnar_store import read_market_data
 
 def adaptar_binance_a_backtesting(file_path_or_df):
     """
@@ -26,7 +28,8 @@ def adaptar_binance_a_backtesting(file_path_or_df):
         DataFrame con columnas: timestamp, open, high, low, close, volume
     """
     if isinstance(file_path_or_df, str):
-        df = pd.read_csv(file_path_or_df)
+        # Sólo las columnas necesarias (del dataset columnar si existe, si no del CSV)
+        df = read_market_data(file_path_or_df, columns=['open_time', 'timestamp', 'open', 'high', 'low', 'close', 'volume'])
     else:
         df = file_path_or_df.copy()
     # Renombrar open_time a timestamp
@@ -13,10 +13,15 @@ import sys
 import json
 import logging
 import time
+import heapq
+import threading
+import warnings
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Any, Optional, Tuple, Union
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 # Configurar logging
@@ -26,6 +31,139 @@ logging.basicConfig(
 )
 logger = logging.getLogger('PairSelector')
 
+# Peticiones por segundo a los endpoints de velas, con margen respecto al
+# límite publicado (OKX: 40 cada 2 s por IP; Binance: 1200 de peso por minuto,
+# 2 por petición de klines)
+EXCHANGE_REQUESTS_PER_SECOND = {
+    'okx': 15.0,
+    'binance': 8.0
+}
+
+# OKX usa mayúsculas para horas, días y semanas
+OKX_BAR_MAP = {
+    "1h": "1H", "2h": "2H", "4h": "4H", "6h": "6H", "12h": "12H",
+    "1d": "1D", "1w": "1W"
+}
+
+# Tipos de estrategia con ranking propio (cualquier otro usa 'general')
+STRATEGY_TYPES = ('scalping', 'swing', 'general')
+
+# Activos que se analizan primero
+POPULAR_ASSETS = ["BTC", "ETH", "SOL", "BNB", "XRP", "ADA", "DOT", "DOGE", "AVAX", "MATIC"]
+
+
+class RateLimiter:
+    """
+    Limitador de peticiones por segundo compartido entre hilos.
+
+    Cubo de tokens que se rellena de forma continua; ``pause`` detiene todas
+    las peticiones hasta que vence el ``Retry-After`` de un 429.
+    """
+
+    def __init__(self, requests_per_second: float, burst: Optional[float] = None):
+        """
+        Args:
+            requests_per_second: Peticiones por segundo sostenidas
+            burst: Peticiones que pueden salir de golpe (por defecto, las de un segundo)
+        """
+        self.rate = float(requests_per_second)
+        self.capacity = float(burst if burst is not None else max(requests_per_second, 1.0))
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloquea hasta poder hacer una petición."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if self.tokens >= 1.0:
+                        self.tokens -= 1.0
+                        return
+                    delay = (1.0 - self.tokens) / self.rate
+                self.waits += 1
+                self.wait_seconds += delay
+            time.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Detiene todas las peticiones durante ``seconds``
+
+        Args:
+            seconds: Segundos de pausa
+        """
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+def compute_pair_metrics(close: np.ndarray, high: np.ndarray, low: np.ndarray,
+                         volume: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Métricas de volatilidad, rango y tendencia para muchos pares a la vez
+
+    Cada array es 2-D (pares x velas), alineado a la vela más reciente y
+    rellenado con NaN a la izquierda para los pares con menos historia. Los
+    resultados coinciden con el cálculo por par con pandas (std muestral).
+
+    Args:
+        close: Precios de cierre
+        high: Máximos
+        low: Mínimos
+        volume: Volúmenes
+
+    Returns:
+        Dict[str, np.ndarray]: Un array por métrica, con un valor por par
+    """
+    n_pairs = close.shape[0]
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        # Pares con una sola vela: std indefinida (NaN), igual que pandas
+        warnings.simplefilter('ignore', RuntimeWarning)
+        returns = close[:, 1:] / close[:, :-1] - 1.0
+        volatility = np.nanstd(returns, axis=1, ddof=1) * 100
+        avg_volume = np.nanmean(volume, axis=1)
+        volume_volatility = np.nanstd(volume, axis=1, ddof=1) / avg_volume
+        avg_range_pct = np.nanmean(high - low, axis=1) / np.nanmean(close, axis=1) * 100
+        first_close = close[np.arange(n_pairs), np.argmax(~np.isnan(close), axis=1)]
+        trend = (close[:, -1] / first_close - 1) * 100
+
+    return {
+        "volatility_daily": volatility,
+        "avg_volume": avg_volume,
+        "volume_volatility": volume_volatility,
+        "avg_range_pct": avg_range_pct,
+        "trend_30d": trend
+    }
+
+
+def _stack_ohlcv(frames: List[pd.DataFrame]) -> Dict[str, np.ndarray]:
+    """
+    Apila DataFrames OHLCV de distinta longitud en arrays 2-D alineados a la derecha
+
+    Args:
+        frames: DataFrames ordenados por tiempo
+
+    Returns:
+        Dict[str, np.ndarray]: Array (pares x velas) por columna
+    """
+    n_bars = max(len(df) for df in frames)
+    stacked = {}
+    for column in ("close", "high", "low", "volume"):
+        out = np.full((len(frames), n_bars), np.nan)
+        for row, df in enumerate(frames):
+            values = df[column].to_numpy(dtype=np.float64)
+            out[row, n_bars - len(values):] = values
+        stacked[column] = out
+    return stacked
+
+
 class PairSelector:
     """
     Sistema de selección y adaptación de pares de trading.
@@ -37,25 +175,45 @@ class PairSelector:
     def __init__(self, 
                exchange: str = 'okx',
                cache_file: str = 'data/trading_pairs_cache.json',
-               cache_duration_hours: int = 24):
+               cache_duration_hours: int = 24,
+               max_workers: int = 16,
+               requests_per_second: Optional[float] = None,
+               analysis_ttl_minutes: int = 60,
+               history_bars: int = 30):
         """
         Inicializa el selector de pares de trading.
-        
+
         Args:
             exchange: Exchange a utilizar ('okx', 'binance', etc.)
             cache_file: Archivo para cachear información de pares
             cache_duration_hours: Duración de la caché en horas
+            max_workers: Descargas de velas simultáneas al analizar pares
+            requests_per_second: Límite de peticiones compartido (por defecto, el del exchange)
+            analysis_ttl_minutes: Validez del análisis de cada par antes de repetirlo
+            history_bars: Velas diarias usadas en el análisis
         """
         self.exchange = exchange
         self.cache_file = cache_file
         self.cache_duration_hours = cache_duration_hours
-        
+        self.max_workers = max_workers
+        self.analysis_ttl_minutes = analysis_ttl_minutes
+        self.history_bars = history_bars
+
         # Estructura para almacenar pares de trading
         self.trading_pairs = {}
-        
+
         # Mapa de características por par
         self.pair_characteristics = {}
-        
+
+        # Puntuaciones por tipo de estrategia, actualizadas al llegar cada análisis
+        self._pair_scores = {strategy_type: {} for strategy_type in STRATEGY_TYPES}
+        self._analysis_lock = threading.Lock()
+
+        # Peticiones HTTP: límite compartido por todos los hilos y una sesión por hilo
+        self.rate_limiter = RateLimiter(
+            requests_per_second or EXCHANGE_REQUESTS_PER_SECOND.get(exchange.lower(), 5.0))
+        self._local = threading.local()
+
         # Cargar caché o datos iniciales
         self._ensure_cache_directory()
         self._load_or_update_pairs()
@@ -245,78 +403,158 @@ class PairSelector:
         # Se ejecuta en un hilo separado para no bloquear
         def analyze_worker():
             try:
-                # Seleccionar pares populares para análisis prioritario
-                popular_assets = ["BTC", "ETH", "SOL", "BNB", "XRP", "ADA", "DOT", "DOGE", "AVAX", "MATIC"]
-                usdt_pairs = {k: v for k, v in self.trading_pairs.items() if v.get("quote_asset") == "USDT"}
-                
-                # Priorizar pares populares
-                priority_pairs = {}
-                for asset in popular_assets:
-                    for symbol, data in usdt_pairs.items():
-                        if data.get("base_asset") == asset:
-                            priority_pairs[symbol] = data
-                
-                # Añadir el resto de pares USDT
-                other_pairs = {k: v for k, v in usdt_pairs.items() if k not in priority_pairs}
-                
-                # Analizar primero los prioritarios
-                self._analyze_pairs_batch(list(priority_pairs.keys()))
-                
-                # Luego el resto (limitando a 50 para no sobrecargar)
-                other_keys = list(other_pairs.keys())[:50]
-                self._analyze_pairs_batch(other_keys)
-                
-                logger.info(f"Análisis de características completado para {len(priority_pairs) + len(other_keys)} pares")
-                
+                self.scan_usdt_pairs()
             except Exception as e:
                 logger.error(f"Error en análisis de características: {e}")
-        
+
         # Iniciar en hilo separado
         executor = ThreadPoolExecutor(max_workers=1)
         executor.submit(analyze_worker)
-    
-    def _analyze_pairs_batch(self, symbols: List[str]):
+        executor.shutdown(wait=False)
+
+    def scan_usdt_pairs(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Analiza todos los pares USDT del exchange, primero los populares.
+
+        Los pares con un análisis más reciente que ``analysis_ttl_minutes`` no
+        se vuelven a descargar salvo con ``force``.
+
+        Args:
+            force: Repetir el análisis aunque esté vigente
+
+        Returns:
+            Dict[str, Any]: Pares considerados, analizados, en caché, fallidos y tiempo
+        """
+        usdt_pairs = [k for k, v in self.trading_pairs.items() if v.get("quote_asset") == "USDT"]
+        priority = {asset: i for i, asset in enumerate(POPULAR_ASSETS)}
+        usdt_pairs.sort(key=lambda s: priority.get(self.trading_pairs[s].get("base_asset"), len(priority)))
+
+        started = time.perf_counter()
+        stats = self._analyze_pairs_batch(usdt_pairs, force=force)
+        stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+        stats["pairs_per_s"] = round(stats["analyzed"] / stats["elapsed_s"], 1) if stats["elapsed_s"] else 0.0
+        logger.info(f"Análisis de características completado: {stats['analyzed']} pares analizados, "
+                    f"{stats['cached']} vigentes en caché, {stats['failed']} fallidos "
+                    f"en {stats['elapsed_s']}s")
+        return stats
+
+    def _needs_analysis(self, symbol: str) -> bool:
+        """
+        Indica si el análisis de un par falta o ha caducado.
+
+        Args:
+            symbol: Símbolo del par
+
+        Returns:
+            bool: True si hay que analizarlo
+        """
+        char = self.pair_characteristics.get(symbol)
+        if not char or "timestamp" not in char:
+            return True
+        age = datetime.now() - datetime.fromisoformat(char["timestamp"])
+        return age >= timedelta(minutes=self.analysis_ttl_minutes)
+
+    def _analyze_pairs_batch(self, symbols: List[str], force: bool = False,
+                             update_every: int = 50) -> Dict[str, int]:
         """
         Analiza un lote de pares para determinar sus características.
-        
+
+        Las velas se descargan en paralelo (``max_workers`` hilos con el límite
+        de peticiones compartido) y las métricas se calculan por bloques de
+        ``update_every`` pares a la vez, de modo que el ranking se actualiza
+        mientras avanza la descarga.
+
         Args:
             symbols: Lista de símbolos a analizar
+            force: Repetir el análisis aunque esté vigente
+            update_every: Pares descargados por cada actualización de métricas
+
+        Returns:
+            Dict[str, int]: Pares considerados, analizados, en caché y fallidos
         """
-        for symbol in symbols:
-            try:
-                # Obtener datos históricos
-                hist_data = self._fetch_historical_data(symbol, "1d", 30)
-                
-                if hist_data is not None and not hist_data.empty:
-                    # Calcular métricas básicas
-                    volatility = hist_data["close"].pct_change().std() * 100  # Volatilidad diaria en %
-                    avg_volume = hist_data["volume"].mean()
-                    volume_volatility = hist_data["volume"].std() / avg_volume
-                    
-                    # Calcular rangos de precio
-                    avg_range = (hist_data["high"] - hist_data["low"]).mean()
-                    avg_range_pct = avg_range / hist_data["close"].mean() * 100
-                    
-                    # Calcular tendencia
-                    start_price = hist_data["close"].iloc[0]
-                    end_price = hist_data["close"].iloc[-1]
-                    trend = (end_price / start_price - 1) * 100  # % de cambio
-                    
-                    # Guardar características
-                    self.pair_characteristics[symbol] = {
-                        "volatility_daily": volatility,
-                        "avg_volume": avg_volume,
-                        "volume_volatility": volume_volatility,
-                        "avg_range_pct": avg_range_pct,
-                        "trend_30d": trend,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    
-                    # Pequeña pausa para no sobrecargar API
-                    time.sleep(0.2)
-            
-            except Exception as e:
-                logger.error(f"Error al analizar par {symbol}: {e}")
+        pending = [s for s in dict.fromkeys(symbols) if force or self._needs_analysis(s)]
+        stats = {"symbols": len(set(symbols)), "analyzed": 0,
+                 "cached": len(set(symbols)) - len(pending), "failed": 0}
+        if not pending:
+            return stats
+
+        ready_symbols, ready_frames = [], []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pending)))) as executor:
+            futures = {executor.submit(self._fetch_historical_data, symbol, "1d", self.history_bars): symbol
+                       for symbol in pending}
+            for future in as_completed(futures):
+                symbol = futures[future]
+                hist_data = future.result()
+                if hist_data is None or len(hist_data) < 2:
+                    stats["failed"] += 1
+                    continue
+                ready_symbols.append(symbol)
+                ready_frames.append(hist_data)
+                if len(ready_symbols) >= update_every:
+                    stats["analyzed"] += self._update_characteristics(ready_symbols, ready_frames)
+                    ready_symbols, ready_frames = [], []
+
+        if ready_symbols:
+            stats["analyzed"] += self._update_characteristics(ready_symbols, ready_frames)
+        return stats
+
+    def _update_characteristics(self, symbols: List[str], frames: List[pd.DataFrame]) -> int:
+        """
+        Calcula las características de varios pares a la vez y actualiza el ranking.
+
+        Args:
+            symbols: Símbolos de los pares
+            frames: Velas de cada par, en el mismo orden
+
+        Returns:
+            int: Pares actualizados
+        """
+        stacked = _stack_ohlcv(frames)
+        metrics = compute_pair_metrics(stacked["close"], stacked["high"], stacked["low"], stacked["volume"])
+        timestamp = datetime.now().isoformat()
+
+        with self._analysis_lock:
+            for row, symbol in enumerate(symbols):
+                char = {name: float(values[row]) for name, values in metrics.items()}
+                char["timestamp"] = timestamp
+                self.pair_characteristics[symbol] = char
+                for strategy_type in STRATEGY_TYPES:
+                    entry = self._score_pair(strategy_type, symbol, char)
+                    if entry is None:
+                        self._pair_scores[strategy_type].pop(symbol, None)
+                    else:
+                        self._pair_scores[strategy_type][symbol] = entry
+        return len(symbols)
+
+    def _http_get(self, url: str, params: Dict[str, Any], max_retries: int = 3) -> Optional[requests.Response]:
+        """
+        GET con el límite de peticiones compartido y una sesión por hilo.
+
+        Un 429 detiene todas las peticiones durante el ``Retry-After``.
+
+        Args:
+            url: URL del endpoint
+            params: Parámetros de la consulta
+            max_retries: Reintentos tras un 429
+
+        Returns:
+            Optional[requests.Response]: Respuesta, o None si se agotan los reintentos
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=4))
+            self._local.session = session
+
+        for _ in range(max_retries + 1):
+            self.rate_limiter.acquire()
+            response = session.get(url, params=params, timeout=10)
+            if response.status_code not in (418, 429):
+                return response
+            retry_after = float(response.headers.get("Retry-After", 1))
+            logger.warning(f"Límite de peticiones alcanzado ({response.status_code}), pausa de {retry_after}s")
+            self.rate_limiter.pause(retry_after)
+        return None
     
     def _fetch_historical_data(self, symbol: str, timeframe: str, limit: int) -> Optional[pd.DataFrame]:
         """
@@ -338,13 +576,13 @@ class PairSelector:
                 
                 params = {
                     "instId": symbol,
-                    "bar": timeframe,
+                    "bar": OKX_BAR_MAP.get(timeframe, timeframe),
                     "limit": limit
                 }
                 
-                response = requests.get(url, params=params)
+                response = self._http_get(url, params)
                 
-                if response.status_code == 200:
+                if response is not None and response.status_code == 200:
                     data = response.json()
                     
                     if data.get("code") == "0" and "data" in data:
@@ -359,8 +597,8 @@ class PairSelector:
                         for col in ["open", "high", "low", "close", "volume"]:
                             df[col] = pd.to_numeric(df[col])
                         
-                        # Ordenar por timestamp
-                        df["timestamp"] = pd.to_datetime(df["timestamp"], unit='ms')
+                        # Ordenar por timestamp (OKX devuelve primero la más reciente)
+                        df["timestamp"] = pd.to_datetime(df["timestamp"].astype("int64"), unit='ms')
                         df.sort_values("timestamp", inplace=True)
                         
                         return df
@@ -382,9 +620,9 @@ class PairSelector:
                     "limit": limit
                 }
                 
-                response = requests.get(url, params=params)
+                response = self._http_get(url, params)
                 
-                if response.status_code == 200:
+                if response is not None and response.status_code == 200:
                     # Formato: [timestamp, open, high, low, close, volume, ...]
                     candles = response.json()
                     
@@ -689,105 +927,79 @@ class PairSelector:
             logger.error(f"Error al obtener datos de mercado para {symbol}: {e}")
             return {"error": f"Error: {e}"}
     
-    def get_recommended_pairs(self, strategy_type: str = 'scalping') -> List[Dict[str, Any]]:
+    def _score_pair(self, strategy_type: str, symbol: str, char: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
-        Obtiene pares recomendados para un tipo de estrategia.
-        
+        Puntúa un par para un tipo de estrategia.
+
         Args:
-            strategy_type: Tipo de estrategia ('scalping', 'swing', etc.)
-            
+            strategy_type: Tipo de estrategia ('scalping', 'swing' o 'general')
+            symbol: Símbolo del par
+            char: Características del par
+
         Returns:
-            List[Dict[str, Any]]: Lista de pares recomendados
+            Optional[Dict[str, Any]]: Recomendación con su score, o None si no cumple los criterios
         """
-        recommendations = []
-        
-        # Solo considerar pares con características analizadas
-        pairs_with_data = {k: v for k, v in self.pair_characteristics.items() if k in self.trading_pairs}
-        
-        if not pairs_with_data:
-            return []
-        
-        # Filtrar según el tipo de estrategia
+        pair_data = self.trading_pairs.get(symbol, {})
+
+        # Solo considerar pares con USDT
+        if pair_data.get("quote_asset") != "USDT":
+            return None
+
+        volatility = char.get("volatility_daily", 0)
+        volume = char.get("avg_volume", 0)
+        entry = {
+            "symbol": symbol,
+            "base_asset": pair_data.get("base_asset", ""),
+            "quote_asset": pair_data.get("quote_asset", "")
+        }
+
         if strategy_type == 'scalping':
             # Para scalping queremos volatilidad moderada-alta y alto volumen
-            for symbol, char in pairs_with_data.items():
-                pair_data = self.trading_pairs[symbol]
-                
-                # Solo considerar pares con USDT
-                if pair_data.get("quote_asset") != "USDT":
-                    continue
-                
-                volatility = char.get("volatility_daily", 0)
-                volume = char.get("avg_volume", 0)
-                
-                # Criterios para scalping
-                if 3.0 <= volatility <= 15.0 and volume > 1000000:
-                    score = (volatility * 0.6) + (volume / 1000000 * 0.4)
-                    
-                    recommendations.append({
-                        "symbol": symbol,
-                        "base_asset": pair_data.get("base_asset", ""),
-                        "quote_asset": pair_data.get("quote_asset", ""),
-                        "volatility": volatility,
-                        "volume": volume,
-                        "score": score
-                    })
-        
+            if 3.0 <= volatility <= 15.0 and volume > 1000000:
+                entry.update({"volatility": volatility, "volume": volume,
+                              "score": (volatility * 0.6) + (volume / 1000000 * 0.4)})
+                return entry
+
         elif strategy_type == 'swing':
             # Para swing trading buscamos tendencias claras
-            for symbol, char in pairs_with_data.items():
-                pair_data = self.trading_pairs[symbol]
-                
-                # Solo considerar pares con USDT
-                if pair_data.get("quote_asset") != "USDT":
-                    continue
-                
-                trend = abs(char.get("trend_30d", 0))
-                volume = char.get("avg_volume", 0)
-                
-                # Criterios para swing trading
-                if trend > 5.0 and volume > 500000:
-                    score = (trend * 0.7) + (volume / 1000000 * 0.3)
-                    
-                    recommendations.append({
-                        "symbol": symbol,
-                        "base_asset": pair_data.get("base_asset", ""),
-                        "quote_asset": pair_data.get("quote_asset", ""),
-                        "trend": char.get("trend_30d", 0),
-                        "volume": volume,
-                        "score": score
-                    })
-        
+            trend = abs(char.get("trend_30d", 0))
+            if trend > 5.0 and volume > 500000:
+                entry.update({"trend": char.get("trend_30d", 0), "volume": volume,
+                              "score": (trend * 0.7) + (volume / 1000000 * 0.3)})
+                return entry
+
         else:
             # Estrategia genérica, priorizar volumen y volatilidad moderada
-            for symbol, char in pairs_with_data.items():
-                pair_data = self.trading_pairs[symbol]
-                
-                # Solo considerar pares con USDT
-                if pair_data.get("quote_asset") != "USDT":
-                    continue
-                
-                volatility = char.get("volatility_daily", 0)
-                volume = char.get("avg_volume", 0)
-                
-                # Criterios generales
-                if volatility > 0 and volume > 100000:
-                    score = (min(volatility, 10) * 0.5) + (volume / 1000000 * 0.5)
-                    
-                    recommendations.append({
-                        "symbol": symbol,
-                        "base_asset": pair_data.get("base_asset", ""),
-                        "quote_asset": pair_data.get("quote_asset", ""),
-                        "volatility": volatility,
-                        "volume": volume,
-                        "score": score
-                    })
-        
-        # Ordenar por puntuación (score) descendente
-        recommendations.sort(key=lambda x: x.get("score", 0), reverse=True)
-        
-        # Limitar a los 10 mejores
-        return recommendations[:10]
+            if volatility > 0 and volume > 100000:
+                entry.update({"volatility": volatility, "volume": volume,
+                              "score": (min(volatility, 10) * 0.5) + (volume / 1000000 * 0.5)})
+                return entry
+
+        return None
+
+    def get_recommended_pairs(self, strategy_type: str = 'scalping') -> List[Dict[str, Any]]:
+        """
+        Obtiene pares recomendados para un tipo de estrategia.
+
+        Las puntuaciones se calculan al llegar el análisis de cada par, así que
+        el ranking refleja los pares analizados hasta el momento aunque el
+        escaneo siga en curso.
+
+        Args:
+            strategy_type: Tipo de estrategia ('scalping', 'swing', etc.)
+
+        Returns:
+            List[Dict[str, Any]]: Lista de pares recomendados
+        """
+        if strategy_type not in STRATEGY_TYPES:
+            strategy_type = 'general'
+
+        with self._analysis_lock:
+            candidates = [entry for symbol, entry in self._pair_scores[strategy_type].items()
+                          if symbol in self.trading_pairs]
+
+        # Los 10 mejores por puntuación (score) descendente
+        return heapq.nlargest(10, candidates, key=lambda x: x.get("score", 0))
     
     def adapt_strategy_to_pair(self, symbol: str, strategy_params: Dict[str, Any]) -> Dict[str, Any]:
         """
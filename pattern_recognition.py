@@ -6,6 +6,7 @@ Este módulo implementa:
 2. Análisis de niveles clave mediante fractales
 3. Análisis básico de order flow (imbalance y delta volumen)
 4. Sistema de puntuación para evaluación continua de precisión
+5. Escaneo vectorizado de históricos completos (indicators.patterns)
 """
 
 import numpy as np
@@ -17,6 +18,11 @@ from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime
 from enum import Enum
 
+from core.state_store import DEFAULT_SAVE_INTERVAL, JsonStateStore
+from indicators.patterns import (DIRECTION_NAMES, PATTERN_CODES, PATTERNS, PatternEngine, fractals,
+                                 order_flow_patterns, pattern_statistics, single_candle_patterns,
+                                 three_candle_patterns, two_candle_patterns)
+
 # Configuración de logging
 logger = logging.getLogger(__name__)
 
@@ -76,6 +82,9 @@ class MarketCondition(Enum):
 class PatternRecognition:
     """Sistema de reconocimiento de patrones de velas"""
     
+    # Velas recientes en las que detect_patterns busca patrones
+    RECENT_BARS = 10
+    
     def __init__(self, config: Dict[str, Any] = None, data_file: str = "pattern_data.json"):
         """
         Inicializa el sistema de reconocimiento de patrones
@@ -113,15 +122,26 @@ class PatternRecognition:
             'fractal_period': 5,
             
             # Archivo de datos
-            'data_file': data_file
+            'data_file': data_file,
+            
+            # Segundos mínimos entre escrituras del archivo de datos
+            'save_interval': DEFAULT_SAVE_INTERVAL
         }
         
         # Estadísticas de precisión por patrón
         self.pattern_stats = {}
         
+        # Escrituras agrupadas y atómicas del archivo de datos
+        self._store = JsonStateStore(self.config['data_file'], self._stats_dict,
+                                     min_interval=self.config.get('save_interval', DEFAULT_SAVE_INTERVAL),
+                                     indent=4, name='estadísticas de patrones')
+        
         # Cargar datos previos
         self._load_stats()
         
+        # Motor vectorizado para históricos completos y modo incremental
+        self.engine = PatternEngine(self.config)
+        
         logger.info("Sistema de reconocimiento de patrones inicializado")
     
     def _load_stats(self) -> None:
@@ -160,23 +180,21 @@ class PatternRecognition:
         
         logger.info("Estadísticas de patrones inicializadas")
     
+    def _stats_dict(self) -> Dict[str, Any]:
+        """Documento que se guarda en el archivo de datos"""
+        return {
+            'pattern_stats': self.pattern_stats,
+            'last_update': datetime.now().isoformat()
+        }
+    
     def _save_stats(self) -> None:
-        """Guarda estadísticas de precisión en archivo"""
-        try:
-            data = {
-                'pattern_stats': self.pattern_stats,
-                'last_update': datetime.now().isoformat()
-            }
-            
-            # Crear directorio si no existe
-            os.makedirs(os.path.dirname(self.config['data_file']) or '.', exist_ok=True)
-            
-            with open(self.config['data_file'], 'w') as f:
-                json.dump(data, f, indent=4)
-            
+        """Marca las estadísticas como modificadas (se escriben agrupadas y de forma atómica)"""
+        self._store.mark_dirty()
+    
+    def flush(self) -> None:
+        """Escribe ya las estadísticas de precisión pendientes"""
+        if self._store.flush():
             logger.debug(f"Estadísticas de patrones guardadas en {self.config['data_file']}")
-        except Exception as e:
-            logger.error(f"Error al guardar estadísticas de patrones: {e}")
     
     def update_pattern_performance(self, pattern: PatternType, success: bool, 
                                   profit: float, condition: MarketCondition) -> None:
@@ -302,8 +320,8 @@ class PatternRecognition:
         df['body_size'] = abs(df['close'] - df['open'])
         df['is_bullish'] = df['close'] > df['open']
         df['body_pct'] = df['body_size'] / ((df['high'] + df['low']) / 2)
-        df['upper_shadow'] = df.apply(lambda x: x['high'] - max(x['open'], x['close']), axis=1)
-        df['lower_shadow'] = df.apply(lambda x: min(x['open'], x['close']) - x['low'], axis=1)
+        df['upper_shadow'] = df['high'] - np.maximum(df['open'], df['close'])
+        df['lower_shadow'] = np.minimum(df['open'], df['close']) - df['low']
         df['shadow_ratio'] = (df['upper_shadow'] + df['lower_shadow']) / df['body_size'].replace(0, 0.001)
         df['avg_price'] = (df['high'] + df['low'] + df['open'] + df['close']) / 4
         
@@ -331,180 +349,39 @@ class PatternRecognition:
         
         return patterns
     
-    def _detect_single_candle_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _recent_events(self, df: pd.DataFrame, strengths: Dict[str, np.ndarray],
+                       first_position: int) -> List[Dict[str, Any]]:
         """
-        Detecta patrones de una sola vela
+        Convierte las máscaras de fuerza de las últimas velas en patrones
         
         Args:
             df: DataFrame con datos OHLCV
+            strengths: {patrón: fuerza por vela} de indicators.patterns
+            first_position: Primera vela en la que el patrón está definido
             
         Returns:
-            List[Dict]: Lista de patrones detectados
+            List[Dict]: Patrones detectados, de la vela más reciente a la más antigua
         """
         patterns = []
+        close = df['close'].to_numpy()
         
-        # Umbral para doji
-        doji_threshold = self.config['doji_threshold']
-        shadow_threshold = self.config['shadow_threshold']
-        
-        for i in range(len(df) - 1, max(0, len(df) - 10), -1):
-            row = df.iloc[i]
-            
-            # Calcular la media de los tamaños de cuerpo de las últimas velas
-            avg_body = df['body_size'].iloc[max(0, i-5):i+1].mean()
-            
-            # Precio promedio de la vela
-            price = row['close']
-            
-            # DOJI
-            # Cuerpo muy pequeño, sombras pueden variar
-            body_pct = row['body_size'] / (price * doji_threshold)
-            if body_pct < 1.0:
-                patterns.append({
-                    'type': PatternType.DOJI.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'neutral',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # MARTILLO (HAMMER)
-            # Cuerpo pequeño en la parte superior, sombra inferior larga
-            if (row['lower_shadow'] > 2 * row['body_size'] and
-                row['upper_shadow'] < 0.3 * row['body_size'] and
-                row['body_size'] < avg_body):
-                
-                strength = PatternStrength.STRONG.value
-                
-                # En una tendencia bajista es más significativo
-                if i >= 3 and df['close'].iloc[i-3:i].mean() > price:
-                    strength = PatternStrength.VERY_STRONG.value
-                
-                patterns.append({
-                    'type': PatternType.HAMMER.value,
-                    'position': i,
-                    'price': price,
-                    'strength': strength,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # MARTILLO INVERTIDO (INVERTED HAMMER)
-            # Cuerpo pequeño en la parte inferior, sombra superior larga
-            if (row['upper_shadow'] > 2 * row['body_size'] and
-                row['lower_shadow'] < 0.3 * row['body_size'] and
-                row['body_size'] < avg_body):
-                
-                strength = PatternStrength.MODERATE.value
-                
-                # En una tendencia bajista es más significativo
-                if i >= 3 and df['close'].iloc[i-3:i].mean() > price:
-                    strength = PatternStrength.STRONG.value
-                
-                patterns.append({
-                    'type': PatternType.INVERTED_HAMMER.value,
-                    'position': i,
-                    'price': price,
-                    'strength': strength,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # MARUBOZU ALCISTA
-            # Cuerpo grande alcista sin sombras (o muy pequeñas)
-            if (row['is_bullish'] and 
-                row['body_size'] > 1.5 * avg_body and
-                row['upper_shadow'] < 0.1 * row['body_size'] and
-                row['lower_shadow'] < 0.1 * row['body_size']):
-                
-                patterns.append({
-                    'type': PatternType.MARUBOZU_BULLISH.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # MARUBOZU BAJISTA
-            # Cuerpo grande bajista sin sombras (o muy pequeñas)
-            if (not row['is_bullish'] and 
-                row['body_size'] > 1.5 * avg_body and
-                row['upper_shadow'] < 0.1 * row['body_size'] and
-                row['lower_shadow'] < 0.1 * row['body_size']):
-                
-                patterns.append({
-                    'type': PatternType.MARUBOZU_BEARISH.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # SPINNING TOP (PEONZA)
-            # Cuerpo pequeño, sombras largas arriba y abajo
-            if (row['body_size'] < 0.5 * avg_body and
-                row['upper_shadow'] > row['body_size'] and
-                row['lower_shadow'] > row['body_size']):
-                
-                patterns.append({
-                    'type': PatternType.SPINNING_TOP.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.WEAK.value,
-                    'direction': 'neutral',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # HANGING MAN (HOMBRE COLGADO)
-            # Similar al martillo pero en tendencia alcista
-            if (row['lower_shadow'] > 2 * row['body_size'] and
-                row['upper_shadow'] < 0.3 * row['body_size'] and
-                row['body_size'] < avg_body):
-                
-                # Solo es hombre colgado en tendencia alcista
-                if i >= 3 and df['close'].iloc[i-3:i].mean() < price:
-                    patterns.append({
-                        'type': PatternType.HANGING_MAN.value,
-                        'position': i,
-                        'price': price,
-                        'strength': PatternStrength.STRONG.value,
-                        'direction': 'bearish',
-                        'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                    })
-                    continue
-            
-            # SHOOTING STAR (ESTRELLA FUGAZ)
-            # Similar al martillo invertido pero en tendencia alcista
-            if (row['upper_shadow'] > 2 * row['body_size'] and
-                row['lower_shadow'] < 0.3 * row['body_size'] and
-                row['body_size'] < avg_body):
-                
-                # Solo es estrella fugaz en tendencia alcista
-                if i >= 3 and df['close'].iloc[i-3:i].mean() < price:
+        for i in range(len(df) - 1, max(first_position - 1, len(df) - self.RECENT_BARS), -1):
+            for name, strength in strengths.items():
+                if strength[i]:
                     patterns.append({
-                        'type': PatternType.SHOOTING_STAR.value,
+                        'type': name,
                         'position': i,
-                        'price': price,
-                        'strength': PatternStrength.STRONG.value,
-                        'direction': 'bearish',
-                        'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
+                        'price': close[i],
+                        'strength': int(strength[i]),
+                        'direction': DIRECTION_NAMES[PATTERNS[PATTERN_CODES[name]][2]],
+                        'timestamp': df.index[i]
                     })
-                    continue
         
         return patterns
     
-    def _detect_two_candle_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _detect_single_candle_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
-        Detecta patrones de dos velas
+        Detecta patrones de una sola vela
         
         Args:
             df: DataFrame con datos OHLCV
@@ -512,155 +389,23 @@ class PatternRecognition:
         Returns:
             List[Dict]: Lista de patrones detectados
         """
-        patterns = []
-        
-        # Umbral para patrones de envolvente
-        engulfing_threshold = self.config['engulfing_threshold']
+        strengths = single_candle_patterns(df['open'], df['high'], df['low'], df['close'],
+                                           self.config['doji_threshold'])
+        return self._recent_events(df, strengths, 1)
+    
+    def _detect_two_candle_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        Detecta patrones de dos velas
         
-        for i in range(len(df) - 1, max(1, len(df) - 10), -1):
-            current = df.iloc[i]
-            previous = df.iloc[i-1]
-            
-            # Precio promedio de la última vela
-            price = current['close']
-            
-            # ENGULFING ALCISTA
-            # Vela actual alcista envuelve vela anterior bajista
-            if (current['is_bullish'] and
-                not previous['is_bullish'] and
-                current['close'] > previous['open'] * engulfing_threshold and
-                current['open'] < previous['close'] * engulfing_threshold):
-                
-                patterns.append({
-                    'type': PatternType.ENGULFING_BULLISH.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # ENGULFING BAJISTA
-            # Vela actual bajista envuelve vela anterior alcista
-            if (not current['is_bullish'] and
-                previous['is_bullish'] and
-                current['open'] > previous['close'] * engulfing_threshold and
-                current['close'] < previous['open'] * engulfing_threshold):
-                
-                patterns.append({
-                    'type': PatternType.ENGULFING_BEARISH.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # HARAMI ALCISTA
-            # Vela pequeña alcista dentro del rango de la anterior bajista
-            if (current['is_bullish'] and
-                not previous['is_bullish'] and
-                current['high'] < previous['open'] and
-                current['low'] > previous['close'] and
-                current['body_size'] < previous['body_size'] * 0.6):
-                
-                patterns.append({
-                    'type': PatternType.HARAMI_BULLISH.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # HARAMI BAJISTA
-            # Vela pequeña bajista dentro del rango de la anterior alcista
-            if (not current['is_bullish'] and
-                previous['is_bullish'] and
-                current['high'] < previous['close'] and
-                current['low'] > previous['open'] and
-                current['body_size'] < previous['body_size'] * 0.6):
-                
-                patterns.append({
-                    'type': PatternType.HARAMI_BEARISH.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # TWEEZER TOP (PINZAS SUPERIOR)
-            # Dos velas con máximos similares, primera alcista, segunda bajista
-            if (not current['is_bullish'] and
-                previous['is_bullish'] and
-                abs(current['high'] - previous['high']) / previous['high'] < 0.003):
-                
-                patterns.append({
-                    'type': PatternType.TWEEZER_TOP.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # TWEEZER BOTTOM (PINZAS INFERIOR)
-            # Dos velas con mínimos similares, primera bajista, segunda alcista
-            if (current['is_bullish'] and
-                not previous['is_bullish'] and
-                abs(current['low'] - previous['low']) / previous['low'] < 0.003):
-                
-                patterns.append({
-                    'type': PatternType.TWEEZER_BOTTOM.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # PIERCING LINE (LÍNEA PENETRANTE)
-            # Vela bajista seguida de vela alcista que cierra por encima del punto medio
-            if (current['is_bullish'] and
-                not previous['is_bullish'] and
-                current['open'] < previous['close'] and
-                current['close'] > (previous['open'] + previous['close']) / 2):
-                
-                patterns.append({
-                    'type': PatternType.PIERCING_LINE.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
+        Args:
+            df: DataFrame con datos OHLCV
             
-            # DARK CLOUD COVER (NUBE OSCURA)
-            # Vela alcista seguida de vela bajista que cierra por debajo del punto medio
-            if (not current['is_bullish'] and
-                previous['is_bullish'] and
-                current['open'] > previous['close'] and
-                current['close'] < (previous['open'] + previous['close']) / 2):
-                
-                patterns.append({
-                    'type': PatternType.DARK_CLOUD_COVER.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-        
-        return patterns
+        Returns:
+            List[Dict]: Lista de patrones detectados
+        """
+        strengths = two_candle_patterns(df['open'], df['high'], df['low'], df['close'],
+                                        self.config['engulfing_threshold'])
+        return self._recent_events(df, strengths, 2)
     
     def _detect_three_candle_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
@@ -672,95 +417,8 @@ class PatternRecognition:
         Returns:
             List[Dict]: Lista de patrones detectados
         """
-        patterns = []
-        
-        for i in range(len(df) - 1, max(2, len(df) - 10), -1):
-            c1 = df.iloc[i-2]  # Primera vela (más antigua)
-            c2 = df.iloc[i-1]  # Segunda vela
-            c3 = df.iloc[i]    # Tercera vela (más reciente)
-            
-            # Precio promedio de la última vela
-            price = c3['close']
-            
-            # MORNING STAR (ESTRELLA DE LA MAÑANA)
-            # Vela bajista, vela pequeña, vela alcista
-            if (not c1['is_bullish'] and
-                c1['body_size'] > c2['body_size'] * 2 and
-                c3['is_bullish'] and
-                c3['body_size'] > c2['body_size'] * 2 and
-                c2['body_size'] / ((c2['high'] + c2['low']) / 2) < 0.01 and
-                c3['close'] > (c1['open'] + c1['close']) / 2):
-                
-                patterns.append({
-                    'type': PatternType.MORNING_STAR.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # EVENING STAR (ESTRELLA DE LA TARDE)
-            # Vela alcista, vela pequeña, vela bajista
-            if (c1['is_bullish'] and
-                c1['body_size'] > c2['body_size'] * 2 and
-                not c3['is_bullish'] and
-                c3['body_size'] > c2['body_size'] * 2 and
-                c2['body_size'] / ((c2['high'] + c2['low']) / 2) < 0.01 and
-                c3['close'] < (c1['open'] + c1['close']) / 2):
-                
-                patterns.append({
-                    'type': PatternType.EVENING_STAR.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # THREE WHITE SOLDIERS (TRES SOLDADOS BLANCOS)
-            # Tres velas alcistas consecutivas, cada una cerrando más alta
-            if (c1['is_bullish'] and
-                c2['is_bullish'] and
-                c3['is_bullish'] and
-                c2['close'] > c1['close'] and
-                c3['close'] > c2['close'] and
-                c2['open'] > c1['open'] and
-                c3['open'] > c2['open']):
-                
-                patterns.append({
-                    'type': PatternType.THREE_WHITE_SOLDIERS.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-            
-            # THREE BLACK CROWS (TRES CUERVOS NEGROS)
-            # Tres velas bajistas consecutivas, cada una cerrando más baja
-            if (not c1['is_bullish'] and
-                not c2['is_bullish'] and
-                not c3['is_bullish'] and
-                c2['close'] < c1['close'] and
-                c3['close'] < c2['close'] and
-                c2['open'] < c1['open'] and
-                c3['open'] < c2['open']):
-                
-                patterns.append({
-                    'type': PatternType.THREE_BLACK_CROWS.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-                continue
-        
-        return patterns
+        strengths = three_candle_patterns(df['open'], df['high'], df['low'], df['close'])
+        return self._recent_events(df, strengths, 3)
     
     def _analyze_order_flow(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
@@ -772,160 +430,14 @@ class PatternRecognition:
         Returns:
             List[Dict]: Lista de señales de order flow
         """
-        signals = []
-        
         # Si no hay suficientes datos, retornar lista vacía
         if len(df) < 5:
-            return signals
-        
-        # Umbral para considerar volumen significativo
-        volume_threshold = self.config['volume_threshold']
-        
-        # Umbral para imbalances
-        imbalance_threshold = self.config['imbalance_threshold']
-        
-        # Calcular algunos valores útiles
-        df = df.copy()
-        
-        # Calcular delta de volumen (aproximado)
-        # En datos reales, usaríamos bid/ask real, aquí usamos apertura/cierre como proxy
-        df['volume_delta'] = df.apply(
-            lambda x: x['volume'] * (1 if x['close'] > x['open'] else -1), 
-            axis=1
-        )
-        
-        # Calcular volumen promedio
-        avg_volume = df['volume'].rolling(window=20).mean()
-        
-        for i in range(len(df) - 1, max(5, len(df) - 10), -1):
-            row = df.iloc[i]
-            prev_row = df.iloc[i-1]
-            
-            # Precio actual
-            price = row['close']
-            
-            # STRONG BID (FUERTE PRESIÓN COMPRADORA)
-            # Volumen alto + cierre cerca del máximo + delta positivo
-            close_to_high = (row['high'] - row['close']) / (row['high'] - row['low']) < 0.2
-            high_volume = row['volume'] > avg_volume.iloc[i] * volume_threshold
-            
-            if high_volume and close_to_high and row['volume_delta'] > 0:
-                signals.append({
-                    'type': OrderFlowSignal.STRONG_BID.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # STRONG ASK (FUERTE PRESIÓN VENDEDORA)
-            # Volumen alto + cierre cerca del mínimo + delta negativo
-            close_to_low = (row['close'] - row['low']) / (row['high'] - row['low']) < 0.2
-            
-            if high_volume and close_to_low and row['volume_delta'] < 0:
-                signals.append({
-                    'type': OrderFlowSignal.STRONG_ASK.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # ABSORPTION BUY (ABSORCIÓN DE VENTAS)
-            # Vela anterior bajista con volumen alto, vela actual alcista
-            prev_high_volume = prev_row['volume'] > avg_volume.iloc[i-1] * volume_threshold
-            
-            if (prev_high_volume and
-                not prev_row['is_bullish'] and
-                row['is_bullish'] and
-                row['close'] > prev_row['close']):
-                
-                signals.append({
-                    'type': OrderFlowSignal.ABSORPTION_BUY.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # ABSORPTION SELL (ABSORCIÓN DE COMPRAS)
-            # Vela anterior alcista con volumen alto, vela actual bajista
-            if (prev_high_volume and
-                prev_row['is_bullish'] and
-                not row['is_bullish'] and
-                row['close'] < prev_row['close']):
-                
-                signals.append({
-                    'type': OrderFlowSignal.ABSORPTION_SELL.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.VERY_STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # STOPS HUNT UP (CAZA DE STOPS HACIA ARRIBA)
-            # Vela con mecha superior larga que sube por encima de máximos recientes y luego baja
-            last_5_high = df['high'].iloc[i-5:i].max()
-            
-            if (row['high'] > last_5_high and
-                row['close'] < last_5_high and
-                row['upper_shadow'] > 2 * row['body_size']):
-                
-                signals.append({
-                    'type': OrderFlowSignal.STOPS_HUNT_UP.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # STOPS HUNT DOWN (CAZA DE STOPS HACIA ABAJO)
-            # Vela con mecha inferior larga que baja por debajo de mínimos recientes y luego sube
-            last_5_low = df['low'].iloc[i-5:i].min()
-            
-            if (row['low'] < last_5_low and
-                row['close'] > last_5_low and
-                row['lower_shadow'] > 2 * row['body_size']):
-                
-                signals.append({
-                    'type': OrderFlowSignal.STOPS_HUNT_DOWN.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.STRONG.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # DELTA POSITIVO SIGNIFICATIVO
-            # Acumulación sostenida (delta de volumen positivo)
-            if row['volume_delta'] > 0 and row['volume'] > avg_volume.iloc[i] * 1.2:
-                signals.append({
-                    'type': OrderFlowSignal.DELTA_POSITIVE.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'bullish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
-            
-            # DELTA NEGATIVO SIGNIFICATIVO
-            # Distribución sostenida (delta de volumen negativo)
-            if row['volume_delta'] < 0 and row['volume'] > avg_volume.iloc[i] * 1.2:
-                signals.append({
-                    'type': OrderFlowSignal.DELTA_NEGATIVE.value,
-                    'position': i,
-                    'price': price,
-                    'strength': PatternStrength.MODERATE.value,
-                    'direction': 'bearish',
-                    'timestamp': df.index[i] if hasattr(df.index, '__getitem__') else i
-                })
+            return []
         
-        return signals
+        # El delta de volumen usa apertura/cierre como aproximación de bid/ask
+        strengths = order_flow_patterns(df['open'], df['high'], df['low'], df['close'], df['volume'],
+                                        self.config['volume_threshold'])
+        return self._recent_events(df, strengths, 6)
     
     def _detect_fractals(self, df: pd.DataFrame) -> Dict[str, List[float]]:
         """
@@ -937,37 +449,10 @@ class PatternRecognition:
         Returns:
             Dict: Diccionario con niveles clave (soporte/resistencia)
         """
-        supports = []
-        resistances = []
-        
-        # Período para fractales
-        period = self.config['fractal_period']
-        half_period = period // 2
-        
-        if len(df) < period:
-            return {'supports': [], 'resistances': []}
-        
-        # Detectar fractales
-        for i in range(half_period, len(df) - half_period):
-            # Fractal alcista (mínimo local)
-            is_support = True
-            for j in range(1, half_period + 1):
-                if df['low'].iloc[i] > df['low'].iloc[i-j] or df['low'].iloc[i] > df['low'].iloc[i+j]:
-                    is_support = False
-                    break
-            
-            if is_support:
-                supports.append(df['low'].iloc[i])
-            
-            # Fractal bajista (máximo local)
-            is_resistance = True
-            for j in range(1, half_period + 1):
-                if df['high'].iloc[i] < df['high'].iloc[i-j] or df['high'].iloc[i] < df['high'].iloc[i+j]:
-                    is_resistance = False
-                    break
-            
-            if is_resistance:
-                resistances.append(df['high'].iloc[i])
+        # Mínimos y máximos locales de la ventana centrada del período
+        support_mask, resistance_mask = fractals(df['high'], df['low'], self.config['fractal_period'])
+        supports = df['low'].to_numpy()[support_mask].tolist()
+        resistances = df['high'].to_numpy()[resistance_mask].tolist()
         
         # Filtrar niveles cercanos (agrupar)
         supports = self._filter_nearby_levels(supports)
@@ -975,6 +460,52 @@ class PatternRecognition:
         
         return {'supports': supports, 'resistances': resistances}
     
+    def scan_history(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Detecta todos los patrones sobre el histórico completo
+        
+        A diferencia de detect_patterns (últimas velas, una lista de dicts),
+        devuelve un array estructurado compacto con un evento por patrón y
+        vela (ver indicators.patterns.EVENT_DTYPE), apto para años de velas.
+        
+        Args:
+            df: DataFrame con datos OHLCV
+            
+        Returns:
+            np.ndarray: Eventos ordenados por posición
+        """
+        return self.engine.scan(df)
+    
+    def update_history(self, new_bars: pd.DataFrame) -> np.ndarray:
+        """
+        Modo incremental: evalúa sólo las velas nuevas
+        
+        Args:
+            new_bars: Velas cerradas desde la llamada anterior
+            
+        Returns:
+            np.ndarray: Eventos de esas velas y fractales recién confirmados,
+                        con posiciones absolutas desde la primera vela recibida
+        """
+        return self.engine.update(new_bars)
+    
+    def backtest_patterns(self, df: pd.DataFrame, horizon: int = 10,
+                          events: Optional[np.ndarray] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Estadísticas de cada patrón sobre el histórico
+        
+        Args:
+            df: DataFrame con datos OHLCV
+            horizon: Velas hasta medir el resultado
+            events: Eventos ya calculados con scan_history (opcional)
+            
+        Returns:
+            Dict: {patrón: detected, win_rate, avg_return, avg_profit, avg_loss, profit_factor}
+        """
+        if events is None:
+            events = self.scan_history(df)
+        return pattern_statistics(events, df['close'], horizon)
+    
     def _filter_nearby_levels(self, levels: List[float]) -> List[float]:
         """
         Filtra niveles cercanos agrupándolos
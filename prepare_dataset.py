@@ -3,6 +3,7 @@ from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
 import logging
 import os
+from data_management.columnar_store import read_market_data, dataset_path_for_csv
 
 # Configuración del logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,12 +23,12 @@ def prepare_data_for_ml(filepath="SOLUSDT_processed_big_dataset.csv", validation
                Donde X son las características escaladas y y son las variables objetivo.
                scaler_X es el objeto scaler usado para transformar nuevos datos.
     """
-    if not os.path.exists(filepath):
+    if not os.path.exists(filepath) and not os.path.isdir(dataset_path_for_csv(filepath)):
         logging.error(f"Error: El archivo '{filepath}' no se encontró. Asegúrate de haber ejecutado process_historical_data.py.")
         return None, None, None, None, None, None, None
 
     logging.info(f"Cargando el dataset desde '{filepath}'...")
-    df = pd.read_csv(filepath)
+    df = read_market_data(filepath)
     logging.info(f"Dataset cargado. Filas totales: {len(df)}")
 
     # Asegúrate de que 'open_time' sea un datetime para una correcta división temporal
@@ -19,6 +19,8 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error
 
+from core.state_store import DEFAULT_SAVE_INTERVAL, JsonStateStore, atomic_write_json
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -47,7 +49,8 @@ class AdaptivePositionManager:
                 default_atr_multiplier: float = 1.5,
                 default_tp1_size: float = 0.25,
                 default_tp2_size: float = 0.5,
-                default_tp3_size: float = 0.25):
+                default_tp3_size: float = 0.25,
+                save_interval: float = DEFAULT_SAVE_INTERVAL):
         """
         Inicializa el gestor de posiciones.
         
@@ -63,6 +66,7 @@ class AdaptivePositionManager:
             default_tp1_size: Tamaño de la primera parte (25% por defecto)
             default_tp2_size: Tamaño de la segunda parte (50% por defecto) 
             default_tp3_size: Tamaño de la tercera parte (25% por defecto)
+            save_interval: Segundos mínimos entre escrituras del historial
         """
         self.symbol = symbol
         self.data_file = data_file
@@ -82,6 +86,9 @@ class AdaptivePositionManager:
         
         # Historial de posiciones
         self.position_history = []
+        self._store = JsonStateStore(data_file, lambda: self.position_history,
+                                     min_interval=save_interval, indent=4,
+                                     name='historial de posiciones')
         
         # Modelos de ML
         self.models = {
@@ -108,16 +115,13 @@ class AdaptivePositionManager:
             self.position_history = []
     
     def _save_data(self):
-        """Guarda datos históricos en archivo."""
-        try:
-            # Crear directorio si no existe
-            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-            
-            with open(self.data_file, 'w') as f:
-                json.dump(self.position_history, f, indent=4)
+        """Marca el historial como modificado (se escribe agrupado y de forma atómica)."""
+        self._store.mark_dirty()
+    
+    def flush(self):
+        """Escribe ya el historial de posiciones pendiente."""
+        if self._store.flush():
             logger.info(f"Guardados {len(self.position_history)} registros históricos de posiciones")
-        except Exception as e:
-            logger.error(f"Error al guardar datos históricos: {e}")
     
     def _load_or_train_models(self):
         """Carga modelos existentes o entrena nuevos si hay suficientes datos."""
@@ -219,11 +223,7 @@ class AdaptivePositionManager:
                 "optimal_params": self.params
             }
             
-            # Crear directorio si no existe
-            os.makedirs(os.path.dirname(self.model_file), exist_ok=True)
-            
-            with open(self.model_file, 'w') as f:
-                json.dump(model_data, f, indent=4)
+            atomic_write_json(self.model_file, model_data, indent=4)
             
             logger.info(f"Modelos entrenados y guardados: TP MSE={tp_mse:.4f}, SL MSE={sl_mse:.4f}, Size MSE={size_mse:.4f}")
         
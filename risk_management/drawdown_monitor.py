@@ -13,12 +13,17 @@ from typing import Dict, List, Any, Tuple, Optional, Callable
 from datetime import datetime, timedelta
 import threading
 
+from core.state_store import DEFAULT_SAVE_INTERVAL, AppendLog, JsonStateStore
+
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 class DrawdownMonitor:
     """Monitor de drawdown en tiempo real"""
     
+    # Muestras de equity que se conservan en memoria y en el registro .jsonl
+    MAX_LOG_ENTRIES = 1000
+    
     def __init__(self, config: Dict[str, Any] = None):
         """
         Inicializa el monitor de drawdown
@@ -31,14 +36,25 @@ class DrawdownMonitor:
             'critical_threshold': 0.15,  # 15% (detener trading)
             'sampling_interval': 60,     # segundos entre muestras
             'recovery_threshold': 0.05,  # 5% (recuperación para reanudar)
-            'log_file': 'drawdown_log.json'
+            'log_file': 'drawdown_log.json',
+            'save_interval': DEFAULT_SAVE_INTERVAL  # segundos mínimos entre escrituras
         }
         
         self.peak_equity = 0.0
         self.current_equity = 0.0
         self.current_drawdown = 0.0
         self.max_drawdown = 0.0
-        self.drawdown_log = []
+        
+        # Estado en JSON (escrituras agrupadas) y muestras en un registro .jsonl
+        log_file = self.config['log_file']
+        save_interval = self.config.get('save_interval', DEFAULT_SAVE_INTERVAL)
+        entries_file = self.config.get('entries_file', os.path.splitext(log_file)[0] + '.jsonl')
+        self._store = JsonStateStore(log_file, self._state_dict, min_interval=save_interval,
+                                     indent=4, name='estado de drawdown')
+        self._entries = AppendLog(entries_file, max_entries=self.MAX_LOG_ENTRIES,
+                                  min_interval=save_interval, name='registro de drawdown')
+        # Últimas muestras (se comparte con el registro, sin copias)
+        self.drawdown_log = self._entries.entries
         self.stop_trading_callbacks = []
         self.warning_callbacks = []
         self.monitoring_active = False
@@ -60,37 +76,38 @@ class DrawdownMonitor:
                 
                 self.peak_equity = data.get('peak_equity', 0.0)
                 self.max_drawdown = data.get('max_drawdown', 0.0)
-                self.drawdown_log = data.get('log', [])
+                
+                # Formato anterior: muestras dentro del JSON -> pasan al registro .jsonl
+                legacy_log = data.get('log', [])
+                if legacy_log:
+                    if not self.drawdown_log:
+                        self._entries.extend(legacy_log[-self.MAX_LOG_ENTRIES:])
+                        self._entries.flush()
+                    self._store.mark_dirty()
                 
                 logger.info(f"Registro histórico de drawdown cargado desde {log_file}")
             except Exception as e:
                 logger.error(f"Error al cargar registro de drawdown: {e}")
     
+    def _state_dict(self) -> Dict[str, Any]:
+        """Documento que se guarda en el archivo de estado"""
+        return {
+            'peak_equity': self.peak_equity,
+            'current_equity': self.current_equity,
+            'current_drawdown': self.current_drawdown,
+            'max_drawdown': self.max_drawdown,
+            'last_update': datetime.now().isoformat()
+        }
+    
     def _save_log(self) -> None:
-        """Guarda el registro de drawdown"""
-        try:
-            # Truncar log si es muy largo (mantener últimas 1000 entradas)
-            if len(self.drawdown_log) > 1000:
-                self.drawdown_log = self.drawdown_log[-1000:]
-            
-            data = {
-                'peak_equity': self.peak_equity,
-                'current_equity': self.current_equity,
-                'current_drawdown': self.current_drawdown,
-                'max_drawdown': self.max_drawdown,
-                'log': self.drawdown_log,
-                'last_update': datetime.now().isoformat()
-            }
-            
-            # Crear directorio si no existe
-            os.makedirs(os.path.dirname(self.config['log_file']) or '.', exist_ok=True)
-            
-            with open(self.config['log_file'], 'w') as f:
-                json.dump(data, f, indent=4)
-            
+        """Marca el estado de drawdown como modificado (se escribe agrupado y de forma atómica)"""
+        self._store.mark_dirty()
+    
+    def flush(self) -> None:
+        """Escribe ya el estado y las muestras pendientes"""
+        self._entries.flush()
+        if self._store.flush():
             logger.debug(f"Registro de drawdown guardado en {self.config['log_file']}")
-        except Exception as e:
-            logger.error(f"Error al guardar registro de drawdown: {e}")
     
     def update_equity(self, current_equity: float) -> float:
         """
@@ -123,7 +140,7 @@ class DrawdownMonitor:
             'equity': current_equity,
             'drawdown': self.current_drawdown
         }
-        self.drawdown_log.append(log_entry)
+        self._entries.append(log_entry)
         
         # Verificar umbrales
         self._check_thresholds()
@@ -227,6 +244,8 @@ class DrawdownMonitor:
         
         if self.monitor_thread:
             self.monitor_thread.join(timeout=5.0)
+        
+        self.flush()
     
     def get_stats(self) -> Dict[str, Any]:
         """
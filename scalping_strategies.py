@@ -17,6 +17,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any, Optional, Union
 import time
 
+from data_management.order_book import OrderBook, OrderBookView
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -80,13 +82,19 @@ class ScalpingStrategies:
         Analiza el libro de órdenes para identificar oportunidades y riesgos.
         
         Args:
-            orderbook: Datos del libro de órdenes (bids/asks)
+            orderbook: Datos del libro de órdenes (bids/asks), o un libro local
+                (OrderBook / OrderBookView) que se consulta sin copiar niveles
             current_price: Precio actual del activo
             depth_pct: Profundidad del libro a analizar (% desde precio actual)
             
         Returns:
             Dict[str, Any]: Análisis del libro de órdenes
         """
+        if isinstance(orderbook, (OrderBook, OrderBookView)):
+            analysis = orderbook.analyze(current_price, depth_pct=depth_pct)
+            analysis['timestamp'] = datetime.now().isoformat()
+            return analysis
+        
         # Validar datos de entrada
         if not orderbook or 'bids' not in orderbook or 'asks' not in orderbook:
             return {'error': 'Datos de orderbook inválidos'}
@@ -174,13 +182,17 @@ class ScalpingStrategies:
         Estima el slippage para una orden de mercado.
         
         Args:
-            orders: Lista de órdenes [[precio, cantidad], ...]
+            orders: Lista de órdenes [[precio, cantidad], ...] o un libro local
+                (OrderBook / OrderBookView), del que se usa el lado contrario a ``side``
             size: Tamaño de la orden
             side: Lado de la orden ('buy' o 'sell')
             
         Returns:
             float: Slippage estimado en porcentaje
         """
+        if isinstance(orders, (OrderBook, OrderBookView)):
+            return orders.estimate_slippage(side, size)
+        
         if not orders:
             return 0.0
             
@@ -24,6 +24,7 @@ from risk_management.drawdown_monitor import DrawdownMonitor, CircuitBreaker
 from risk_management.position_limits import PositionSizeManager
 from adaptive_weighting import AdaptiveWeightingSystem, MarketCondition, TimeInterval
 from pattern_recognition import PatternRecognition, PatternType
+from core.ledger import TradeLedger
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -99,6 +100,9 @@ class TradingSimulator:
         self.total_fees = 0.0
         self.total_slippage = 0.0
         
+        # Operaciones cerradas en columnas (ganancias/pérdidas acumuladas)
+        self.trade_ledger = TradeLedger(self.balance)
+        
         # Inicializar sistemas de soporte
         self.stats = TradeStats(stats_file="simulation_stats.json")
         self.drawdown_monitor = DrawdownMonitor()
@@ -149,6 +153,7 @@ class TradingSimulator:
         self.consecutive_losses = 0
         self.total_fees = 0.0
         self.total_slippage = 0.0
+        self.trade_ledger.reset(self.balance)
         self.paused = False
         
         logger.info("Simulador reiniciado con balance: ${:.2f}".format(self.balance))
@@ -442,6 +447,7 @@ class TradingSimulator:
         
         # Actualizar contadores
         self.trade_count += 1
+        self.trade_ledger.record(pnl, timestamp=position['exit_time'])
         
         if pnl > 0:
             self.win_count += 1
@@ -733,6 +739,94 @@ class TradingSimulator:
         # Calcular y retornar resultados
         return self.get_results()
     
+    def run_signal_simulation(self, df: pd.DataFrame, signals: pd.Series) -> Dict[str, Any]:
+        """
+        Simulación rápida a partir de una serie de señales precalculadas,
+        usando el núcleo vectorizado de backtesting.vectorized
+        
+        Es determinista: usa el fee configurado, el slippage mínimo y
+        'max_position_size' como fracción del balance por operación. No aplica
+        stop loss/take profit, latencia, fallos de orden ni circuit breakers;
+        para eso está run_simulation.
+        
+        Args:
+            df: DataFrame con datos OHLCV
+            signals: Serie de señales (1: long, -1: short, 0: sin señal)
+            
+        Returns:
+            Dict: Resultados de la simulación (mismo formato que run_simulation)
+        """
+        from backtesting.vectorized import simulate_signals
+        
+        self.reset()
+        
+        if len(df) < 10:
+            logger.error("Insuficientes datos para simulación (mínimo 10 velas)")
+            return {
+                'success': False,
+                'error': 'insufficient_data',
+                'message': 'Insuficientes datos para simulación'
+            }
+        
+        if 'close' not in df.columns:
+            logger.error("Columna requerida 'close' no encontrada en DataFrame")
+            return {
+                'success': False,
+                'error': 'missing_column',
+                'message': "Columna requerida 'close' no encontrada"
+            }
+        
+        close = df['close'].to_numpy(dtype=np.float64)
+        if isinstance(signals, pd.Series):
+            signal_values = signals.reindex(df.index).fillna(0).to_numpy()
+        else:
+            signal_values = np.asarray(signals)
+        
+        sim = simulate_signals(
+            close, signal_values,
+            initial_balance=self.config['initial_balance'],
+            commission=self.config['fees'],
+            slippage=self.config['min_slippage'],
+            accounting='units',
+            position_fraction=self.config['max_position_size'],
+            start=0
+        )
+        
+        entry_fees = sim['entry_price'] * sim['size'] * self.config['fees']
+        position_pnl = sim['net_pnl'] - entry_fees
+        
+        for k in range(len(sim['entry_idx'])):
+            self.closed_positions.append({
+                'id': k + 1,
+                'side': 'long' if sim['direction'][k] == 1 else 'short',
+                'entry_price': float(sim['entry_price'][k]),
+                'exit_price': float(sim['exit_price'][k]),
+                'size': float(sim['size'][k]),
+                'entry_time': str(df.index[sim['entry_idx'][k]]),
+                'exit_time': str(df.index[sim['exit_idx'][k]]),
+                'pnl': float(position_pnl[k]),
+                'close_reason': 'end_of_simulation' if sim['forced_exit'][k] else 'signal',
+                'status': 'closed'
+            })
+        
+        self.trade_ledger.record_many(position_pnl, timestamps=df.index[sim['exit_idx']])
+        self.trade_count = len(position_pnl)
+        self.win_count = int(np.count_nonzero(position_pnl > 0))
+        self.loss_count = self.trade_count - self.win_count
+        self.total_fees = float(entry_fees.sum() + sim['commission'].sum())
+        slippage = self.config['min_slippage']
+        self.total_slippage = float(((close[sim['entry_idx']] + close[sim['exit_idx']])
+                                     * slippage * sim['size']).sum())
+        
+        equity = sim['equity']
+        peaks = np.maximum.accumulate(equity)
+        self.max_drawdown = float(np.max((peaks - equity) / peaks)) if len(equity) else 0.0
+        self.peak_equity = float(peaks[-1])
+        self.balance = sim['final_balance']
+        self.equity = self.balance
+        
+        return self.get_results()
+    
     def get_results(self) -> Dict[str, Any]:
         """
         Obtiene resultados de la simulación
@@ -747,17 +841,9 @@ class TradingSimulator:
         total_pnl = self.balance - self.config['initial_balance']
         pnl_percentage = total_pnl / self.config['initial_balance'] * 100 if self.config['initial_balance'] > 0 else 0
         
-        # Calcular ganancia/pérdida promedio
-        avg_win = 0
-        avg_loss = 0
-        total_win = 0
-        total_loss = 0
-        
-        for pos in self.closed_positions:
-            if pos['pnl'] > 0:
-                total_win += pos['pnl']
-            else:
-                total_loss += abs(pos['pnl'])
+        # Calcular ganancia/pérdida promedio (acumuladas al cerrar cada posición)
+        total_win = self.trade_ledger.gross_profit
+        total_loss = self.trade_ledger.gross_loss
         
         avg_win = total_win / self.win_count if self.win_count > 0 else 0
         avg_loss = total_loss / self.loss_count if self.loss_count > 0 else 0
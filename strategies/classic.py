@@ -0,0 +1,131 @@
+"""
+Funciones de estrategias clásicas con la firma que usa el repositorio de
+estrategias (backtesting.advanced_optimizer.StrategyRepository)
+
+Cada función recibe un DataFrame OHLCV y parámetros con nombre, y devuelve una
+Serie de señales (>0 compra, <0 venta, 0 nada). Los cálculos son los de
+classic_strategies; aquí sólo se fijan los nombres de los parámetros que usan
+los grids de optimización (PARAM_GRIDS).
+"""
+
+from typing import Dict, List
+
+import pandas as pd
+
+from classic_strategies import ClassicStrategy, StatisticalStrategy
+
+# Grids de optimización por nombre de estrategia del repositorio
+PARAM_GRIDS: Dict[str, Dict[str, List]] = {
+    "SMA Crossover": {
+        "short_period": [5, 10, 15, 20],
+        "long_period": [30, 40, 50, 60]
+    },
+    "RSI Strategy": {
+        "period": [7, 14, 21],
+        "overbought": [65, 70, 75, 80],
+        "oversold": [20, 25, 30, 35]
+    },
+    "MACD Strategy": {
+        "fast_period": [8, 12, 16],
+        "slow_period": [21, 26, 30],
+        "signal_period": [7, 9, 12]
+    },
+    "Bollinger Bands": {
+        "period": [15, 20, 25],
+        "std_dev": [1.5, 2.0, 2.5]
+    },
+    "Mean Reversion": {
+        "lookback": [20, 30, 40],
+        "std_dev": [1.5, 2.0, 2.5, 3.0]
+    }
+}
+
+
+def sma_crossover_strategy(df: pd.DataFrame, short_period: int = 20, long_period: int = 50) -> pd.Series:
+    """
+    Cruce de medias simples
+
+    Args:
+        df: DataFrame con datos OHLCV
+        short_period: Período de la media rápida
+        long_period: Período de la media lenta
+
+    Returns:
+        pd.Series: Señales (cambios de posición)
+    """
+    return ClassicStrategy.moving_average_crossover(df, fast_period=short_period, slow_period=long_period)
+
+
+def rsi_strategy(df: pd.DataFrame, period: int = 14, overbought: int = 70, oversold: int = 30) -> pd.Series:
+    """
+    Sobrecompra/sobreventa por RSI
+
+    Args:
+        df: DataFrame con datos OHLCV
+        period: Período del RSI
+        overbought: Nivel de sobrecompra
+        oversold: Nivel de sobreventa
+
+    Returns:
+        pd.Series: Señales (cambios de posición)
+    """
+    return ClassicStrategy.rsi_strategy(df, period=period, overbought=overbought, oversold=oversold)
+
+
+def macd_strategy(df: pd.DataFrame, fast_period: int = 12, slow_period: int = 26,
+                  signal_period: int = 9) -> pd.Series:
+    """
+    Cruce de MACD con su línea de señal
+
+    Args:
+        df: DataFrame con datos OHLCV
+        fast_period: Período de la EMA rápida
+        slow_period: Período de la EMA lenta
+        signal_period: Período de la línea de señal
+
+    Returns:
+        pd.Series: Señales (cambios de posición)
+    """
+    return ClassicStrategy.macd_strategy(df, fast_period=fast_period, slow_period=slow_period,
+                                         signal_period=signal_period)
+
+
+def bollinger_bands_strategy(df: pd.DataFrame, period: int = 20, std_dev: float = 2.0) -> pd.Series:
+    """
+    Toques de las Bandas de Bollinger
+
+    Args:
+        df: DataFrame con datos OHLCV
+        period: Período de la media
+        std_dev: Número de desviaciones estándar
+
+    Returns:
+        pd.Series: Señales (cambios de posición)
+    """
+    return ClassicStrategy.bollinger_strategy(df, period=period, num_std_dev=std_dev)
+
+
+def mean_reversion_strategy(df: pd.DataFrame, lookback: int = 20, std_dev: float = 2.0) -> pd.Series:
+    """
+    Reversión a la media por Z-score
+
+    Args:
+        df: DataFrame con datos OHLCV
+        lookback: Ventana del Z-score
+        std_dev: Z-score de entrada
+
+    Returns:
+        pd.Series: Señales (cambios de posición)
+    """
+    # StatisticalStrategy añade columnas al DataFrame que recibe
+    return StatisticalStrategy.mean_reversion_strategy(df.copy(), window=lookback, z_entry=std_dev)
+
+
+# Estrategias base del repositorio, por nombre
+STRATEGIES = {
+    "SMA Crossover": sma_crossover_strategy,
+    "RSI Strategy": rsi_strategy,
+    "MACD Strategy": macd_strategy,
+    "Bollinger Bands": bollinger_bands_strategy,
+    "Mean Reversion": mean_reversion_strategy
+}
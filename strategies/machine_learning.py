@@ -5,11 +5,13 @@ Implementa modelos de ML para la toma de decisiones de trading
 
 import os
 import time
+import json
 import numpy as np
 import pandas as pd
 import logging
 import pickle
 import joblib
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any, Optional, Union
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
@@ -34,8 +36,25 @@ try:
 except ImportError:
     DEAP_AVAILABLE = False
 
+from core.market_data_hub import LatencyStats
+from indicators import streaming
+from indicators.streaming import NAN, nan_max, safe_div
+
 logger = logging.getLogger("ML_Strategies")
 
+# Columnas categóricas que no se escalan
+CATEGORICAL_FEATURES = ['hour', 'day_of_week', 'day_of_month', 'month', 'is_weekend',
+                        'doji', 'hammer', 'bullish', 'bearish', 'volume_increasing']
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime en ns, tamaño) de un archivo, o None si no existe"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
 class FeatureEngineering:
     """Clase para preparar y procesar características para modelos de ML"""
     
@@ -50,6 +69,12 @@ class FeatureEngineering:
         self.use_ta_lib = use_ta_lib
         self.feature_config = self._get_default_feature_config()
         self.scalers = {}
+        
+        # Archivo de scalers cargado (ruta, firma) y número de recargas
+        self._scalers_file = None
+        self.scaler_reloads = 0
+        # Vectores de escalado por orden de columnas (ver scale_rows)
+        self._scaling_cache = {}
     
     def _get_default_feature_config(self) -> Dict:
         """
@@ -218,16 +243,14 @@ class FeatureEngineering:
             # Volumen normalizado
             features['volume_norm'] = df['volume'] / df['volume'].rolling(20).mean()
             
-            # OBV (On Balance Volume)
-            obv = [0]
-            for i in range(1, len(df)):
-                if df['close'].iloc[i] > df['close'].iloc[i-1]:
-                    obv.append(obv[-1] + df['volume'].iloc[i])
-                elif df['close'].iloc[i] < df['close'].iloc[i-1]:
-                    obv.append(obv[-1] - df['volume'].iloc[i])
-                else:
-                    obv.append(obv[-1])
-            features['obv'] = obv
+            # OBV (On Balance Volume): suma acumulada del volumen con signo
+            close = df['close'].to_numpy()
+            volume = df['volume'].to_numpy()
+            step = np.zeros_like(volume)
+            if len(df) > 1:
+                step[1:] = np.where(close[1:] > close[:-1], volume[1:],
+                                    np.where(close[1:] < close[:-1], -volume[1:], 0))
+            features['obv'] = np.cumsum(step)
             
             # Volumen creciente/decreciente
             features['volume_increasing'] = (df['volume'] > df['volume'].shift(1)).astype(int)
@@ -339,10 +362,7 @@ class FeatureEngineering:
         scaled_features = features.copy()
         
         # Columnas a escalar (excluir características categóricas)
-        exclude_cols = ['hour', 'day_of_week', 'day_of_month', 'month', 'is_weekend',
-                        'doji', 'hammer', 'bullish', 'bearish', 'volume_increasing']
-        
-        cols_to_scale = [col for col in scaled_features.columns if col not in exclude_cols]
+        cols_to_scale = [col for col in scaled_features.columns if col not in CATEGORICAL_FEATURES]
         
         # Escalar cada característica
         for col in cols_to_scale:
@@ -368,17 +388,299 @@ class FeatureEngineering:
         os.makedirs(os.path.dirname(path), exist_ok=True)
         with open(path, 'wb') as f:
             pickle.dump(self.scalers, f)
+        # Lo que hay en disco es lo que ya está en memoria
+        self._scalers_file = (path, _file_signature(path))
     
-    def load_scalers(self, path: str = "models/scalers.pkl"):
+    def load_scalers(self, path: str = "models/scalers.pkl") -> bool:
         """
         Carga scalers previamente guardados
         
+        Sólo lee el archivo si cambió (fecha de modificación o tamaño) desde la
+        última carga o guardado, así que puede llamarse antes de cada predicción.
+        
         Args:
             path: Ruta de carga
+            
+        Returns:
+            bool: True si se leyeron los scalers del archivo
+        """
+        signature = _file_signature(path)
+        if signature is None or self._scalers_file == (path, signature):
+            return False
+        
+        with open(path, 'rb') as f:
+            self.scalers = pickle.load(f)
+        self._scalers_file = (path, signature)
+        self.scaler_reloads += 1
+        logger.info(f"Scalers cargados desde {path}")
+        return True
+    
+    def _scaling_vectors(self, columns: Tuple[str, ...]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Factores (scale_, min_) de los MinMaxScaler de cada columna, en orden
+        
+        Las columnas categóricas llevan factor 1 y desplazamiento 0. Devuelve
+        None si falta algún scaler o alguno recorta (clip), casos que se dejan
+        a scale_features.
+        """
+        scalers = [None if col in CATEGORICAL_FEATURES else self.scalers.get(col) for col in columns]
+        cached = self._scaling_cache.get(columns)
+        if cached is not None and all(a is b for a, b in zip(cached[0], scalers)):
+            return cached[1]
+        
+        scale = np.ones(len(columns))
+        offset = np.zeros(len(columns))
+        for i, (col, scaler) in enumerate(zip(columns, scalers)):
+            if col in CATEGORICAL_FEATURES:
+                continue
+            if scaler is None or getattr(scaler, 'clip', False):
+                return None
+            scale[i] = scaler.scale_[0]
+            offset[i] = scaler.min_[0]
+        self._scaling_cache[columns] = (scalers, (scale, offset))
+        return scale, offset
+    
+    def scale_rows(self, rows: np.ndarray, columns: List[str]) -> np.ndarray:
+        """
+        Escala filas de características con los scalers ya ajustados
+        
+        Equivale a scale_features(..., fit=False) pero con una sola operación
+        vectorial para todas las columnas y filas (mismas cuentas que
+        MinMaxScaler.transform: x * scale_ + min_).
+        
+        Args:
+            rows: Matriz (filas, columnas) de características sin escalar
+            columns: Nombres de las columnas, en el orden de la matriz
+            
+        Returns:
+            np.ndarray: Matriz escalada
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        vectors = self._scaling_vectors(tuple(columns))
+        if vectors is None:
+            frame = pd.DataFrame(rows, columns=list(columns))
+            return self.scale_features(frame, fit=False).to_numpy(dtype=np.float64)
+        scale, offset = vectors
+        return rows * scale + offset
+    
+    def last_feature_row(self, df: pd.DataFrame) -> Optional[pd.Series]:
+        """
+        Características de la última fila completa (sin NaN) de un DataFrame
+        
+        Args:
+            df: DataFrame con datos OHLCV
+            
+        Returns:
+            pd.Series: Características de esa fila, o None si no hay ninguna
+        """
+        features = self.create_features(df).dropna()
+        if len(features) == 0:
+            return None
+        return features.iloc[-1]
+    
+    def create_live_state(self) -> 'LiveFeatureState':
+        """
+        Crea un estado incremental con la configuración de características actual
+        
+        Returns:
+            LiveFeatureState: Estado a alimentar vela a vela
+        """
+        return LiveFeatureState(self.feature_config)
+    
+    def prepare_rows(self, items: Dict[Any, Any]) -> Tuple[List[Any], Optional[np.ndarray], Dict[Any, str]]:
+        """
+        Vector escalado de la vela más reciente de cada entrada
+        
+        Args:
+            items: {clave: DataFrame OHLCV | LiveFeatureState | dict de características}
+            
+        Returns:
+            Tuple: (claves válidas, matriz escalada con una fila por clave o None,
+                    {clave: error} de las entradas que no se pueden puntuar)
+        """
+        keys, rows, errors = [], [], {}
+        columns = None
+        for key, item in items.items():
+            if isinstance(item, LiveFeatureState):
+                features = item.features
+            elif isinstance(item, pd.DataFrame):
+                features = self.last_feature_row(item)
+            else:
+                features = item
+            
+            if features is None or len(features) == 0:
+                errors[key] = "No hay suficientes datos para predecir"
+                continue
+            names = tuple(features.keys())
+            values = np.fromiter((features[name] for name in names), dtype=np.float64, count=len(names))
+            if np.isnan(values).any():
+                errors[key] = "No hay suficientes datos para predecir"
+                continue
+            if columns is None:
+                columns = names
+            elif names != columns:
+                errors[key] = "Las características no coinciden con las del resto del lote"
+                continue
+            keys.append(key)
+            rows.append(values)
+        
+        if not rows:
+            return keys, None, errors
+        return keys, self.scale_rows(np.vstack(rows), list(columns)), errors
+
+class LiveFeatureState:
+    """
+    Estado incremental de las características de FeatureEngineering
+    
+    Cada vela cerrada actualiza los indicadores de indicators.streaming en
+    O(1) y deja en ``features`` el vector de la vela más reciente, con las
+    mismas columnas y en el mismo orden que create_features. Los valores
+    coinciden con los de create_features sobre todas las velas recibidas
+    (las desviaciones estándar, salvo redondeo; el OBV se acumula desde la
+    primera vela).
+    """
+    
+    def __init__(self, feature_config: Dict):
+        """
+        Args:
+            feature_config: Configuración de características de FeatureEngineering
         """
-        if os.path.exists(path):
-            with open(path, 'rb') as f:
-                self.scalers = pickle.load(f)
+        self.feature_config = feature_config
+        self.reset()
+    
+    def _enabled(self, name: str) -> bool:
+        return self.feature_config.get(name, {}).get("enabled", False)
+    
+    def reset(self):
+        """Vacía el estado"""
+        config = self.feature_config
+        self._rsi = [(p, streaming.RSI(p)) for p in config["rsi"]["periods"]] if self._enabled("rsi") else []
+        self._macd = streaming.MACD(config["macd"]["fast"], config["macd"]["slow"],
+                                    config["macd"]["signal"]) if self._enabled("macd") else None
+        self._bollinger = streaming.BollingerBands(config["bollinger"]["period"],
+                                                   config["bollinger"]["std_dev"]) if self._enabled("bollinger") else None
+        self._sma = [(p, streaming.SMA(p)) for p in config["sma"]["periods"]] if self._enabled("sma") else []
+        self._ema = [(p, streaming.EMA(p)) for p in config["ema"]["periods"]] if self._enabled("ema") else []
+        self._volume_mean = streaming.RollingMean(20)
+        self._obv = 0.0
+        self._atr = []
+        if self._enabled("volatility"):
+            self._atr = [(p, streaming.ATR(p), streaming.RollingStd(p)) for p in config["volatility"]["periods"]]
+        self._roc_periods = config["momentum"]["periods"] if self._enabled("momentum") else []
+        self._lags = config["lagged_features"]["lags"] if self._enabled("lagged_features") else []
+        
+        # Cierres y volúmenes anteriores para ROC, retardos y pct_change
+        history = max(list(self._roc_periods) + list(self._lags) + [1])
+        self._closes = deque([NAN] * history, maxlen=history)
+        self._volumes = deque([NAN] * history, maxlen=history)
+        
+        self.features: Dict[str, float] = {}
+        self.timestamp = None
+        self.count = 0
+    
+    def update(self, bar: Dict[str, float], timestamp=None) -> Dict[str, float]:
+        """
+        Añade una vela cerrada
+        
+        Args:
+            bar: Vela con 'open', 'high', 'low', 'close' y 'volume'
+            timestamp: Fecha de la vela (añade las características temporales)
+            
+        Returns:
+            Dict: Características de la vela, en el orden de create_features
+        """
+        open_, high, low = float(bar['open']), float(bar['high']), float(bar['low'])
+        close, volume = float(bar['close']), float(bar['volume'])
+        prev_close, prev_volume = self._closes[-1], self._volumes[-1]
+        features = {}
+        
+        for period, rsi in self._rsi:
+            features[f'rsi_{period}'] = rsi.update(close)
+        
+        if self._macd is not None:
+            features['macd'], features['macd_signal'], features['macd_hist'] = self._macd.update(close)
+        
+        if self._bollinger is not None:
+            middle, upper, lower = self._bollinger.update(close)
+            features['bb_upper'], features['bb_middle'], features['bb_lower'] = upper, middle, lower
+            features['bb_position'] = safe_div(close - lower, upper - lower)
+        
+        for period, sma in self._sma:
+            features[f'sma_{period}'] = value = sma.update(close)
+            features[f'sma_{period}_dist'] = safe_div(close - value, value)
+        
+        for period, ema in self._ema:
+            features[f'ema_{period}'] = value = ema.update(close)
+            features[f'ema_{period}_dist'] = safe_div(close - value, value)
+        
+        if self._enabled("candle_stats"):
+            body = safe_div(abs(close - open_), open_)
+            upper_wick = safe_div(high - nan_max(open_, close), open_)
+            lower_wick = safe_div(-nan_max(-open_, -close) - low, open_)
+            features['candle_body'], features['upper_wick'], features['lower_wick'] = body, upper_wick, lower_wick
+            
+            if self._enabled("candle_patterns"):
+                features['doji'] = int(body < 0.001)
+                features['hammer'] = int(lower_wick > 2 * body and upper_wick < 0.5 * body)
+                features['bullish'] = int(close > open_)
+                features['bearish'] = int(close < open_)
+        
+        if self._enabled("volume_indicators"):
+            features['volume_norm'] = safe_div(volume, self._volume_mean.update(volume))
+            if self.count > 0:
+                if close > prev_close:
+                    self._obv += volume
+                elif close < prev_close:
+                    self._obv -= volume
+            features['obv'] = self._obv
+            features['volume_increasing'] = int(volume > prev_volume)
+        
+        if self._atr:
+            change = safe_div(close, prev_close) - 1
+            for period, atr, volatility in self._atr:
+                features[f'atr_{period}'] = atr.update(high, low, close)
+                features[f'volatility_{period}'] = volatility.update(change)
+        
+        for period in self._roc_periods:
+            features[f'roc_{period}'] = (safe_div(close, self._closes[-period]) - 1) * 100
+        
+        if timestamp is not None and self._enabled("time_features"):
+            timestamp = pd.Timestamp(timestamp)
+            features['hour'] = timestamp.hour
+            features['day_of_week'] = timestamp.dayofweek
+            features['day_of_month'] = timestamp.day
+            features['month'] = timestamp.month
+            features['is_weekend'] = int(timestamp.dayofweek >= 5)
+        
+        for lag in self._lags:
+            lagged_close = self._closes[-lag]
+            features[f'close_lag_{lag}'] = lagged_close
+            features[f'close_return_lag_{lag}'] = safe_div(close, lagged_close) - 1
+            features[f'volume_lag_{lag}'] = self._volumes[-lag]
+        
+        self._closes.append(close)
+        self._volumes.append(volume)
+        self.features = features
+        self.timestamp = timestamp
+        self.count += 1
+        return features
+    
+    def warmup(self, df: pd.DataFrame) -> Dict[str, float]:
+        """
+        Alimenta el estado con un histórico de velas
+        
+        Args:
+            df: DataFrame OHLCV (con DatetimeIndex para las características temporales)
+            
+        Returns:
+            Dict: Características de la última vela
+        """
+        timestamps = df.index if isinstance(df.index, pd.DatetimeIndex) else [None] * len(df)
+        columns = [df[col].tolist() for col in ('open', 'high', 'low', 'close', 'volume')]
+        for timestamp, values in zip(timestamps, zip(*columns)):
+            self.update(dict(zip(('open', 'high', 'low', 'close', 'volume'), values)), timestamp)
+        return self.features
+
 
 class MLStrategy:
     """Clase base para estrategias basadas en ML"""
@@ -408,6 +710,15 @@ class MLStrategy:
         self.last_predictions = None
         self.model_performance = {}
         
+        # Archivo del modelo cargado/guardado, para recargarlo si cambia
+        self.model_path = None
+        self._model_signature = None
+        self.model_reloads = 0
+        
+        # Métricas de inferencia
+        self.latency = LatencyStats()
+        self.predictions_served = 0
+        
         # Inicializar modelo
         self._initialize_model()
     
@@ -652,59 +963,66 @@ class MLStrategy:
 
     # ...existing code...
     
-    def predict(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def predict(self, df: Union[pd.DataFrame, LiveFeatureState]) -> Dict[str, Any]:
         """
         Realiza predicciones con el modelo entrenado
         
         Args:
-            df: DataFrame con datos OHLCV recientes
+            df: DataFrame con datos OHLCV recientes, o LiveFeatureState con
+                las características de la última vela ya calculadas
             
         Returns:
             Dict: Predicción y confianza
         """
-        if not self.model_trained or self.model is None:
-            return {"signal": 0, "confidence": 0.0, "error": "Modelo no entrenado"}
-        
-        # Preparar características
-        features = self.feature_engineering.create_features(df)
+        return self.predict_batch({None: df})[None]
+    
+    def predict_batch(self, items: Dict[Any, Any]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Puntúa la vela más reciente de varios bots o símbolos a la vez
         
-        # Eliminar filas con NaN
-        features = features.dropna()
+        Todas las filas se pasan juntas al modelo en una sola llamada.
         
-        if len(features) == 0:
-            return {"signal": 0, "confidence": 0.0, "error": "No hay suficientes datos para predecir"}
+        Args:
+            items: {clave: DataFrame OHLCV | LiveFeatureState | dict de características}
+            
+        Returns:
+            Dict: {clave: predicción y confianza}
+        """
+        started = time.perf_counter()
+        self.reload_if_changed()
         
-        # Escalar características
-        self.feature_engineering.load_scalers()  # Cargar scalers guardados
-        scaled_features = self.feature_engineering.scale_features(features, fit=False)
+        if not self.model_trained or self.model is None:
+            self._record_latency(started, len(items))
+            return {key: {"signal": 0, "confidence": 0.0, "error": "Modelo no entrenado"} for key in items}
         
-        # Preparar datos según el tipo de modelo
         if self.model_type == "lstm" and KERAS_AVAILABLE:
-            # Preparar secuencia para LSTM
-            X = self._prepare_lstm_data(scaled_features)
-            
-            if len(X) == 0:
-                return {"signal": 0, "confidence": 0.0, "error": "Secuencia insuficiente para LSTM"}
-            
-            # Predecir
-            raw_prediction = self.model.predict(X)[-1][0]  # Última predicción
-            
-            if self.target_type == "classification":
-                # Convertir a señal (-1, 0, 1)
-                signal = 1 if raw_prediction > self.prediction_threshold else -1
-                confidence = abs(raw_prediction - 0.5) * 2  # Escalar a [0,1]
-            else:
-                signal = 1 if raw_prediction > 0 else -1 if raw_prediction < 0 else 0
-                confidence = min(abs(raw_prediction), 0.1) / 0.1  # Limitar a [0,1]
-        
+            results = {key: self._predict_lstm(item) for key, item in items.items()}
         else:
-            # Usar última fila para modelos scikit-learn
-            X = scaled_features.iloc[-1:].values
+            self.feature_engineering.load_scalers()  # Sólo relee si el archivo cambió
+            keys, X, errors = self.feature_engineering.prepare_rows(items)
+            predictions = self.predict_scaled(X) if X is not None else []
+            scored = dict(zip(keys, predictions))
+            results = {key: scored.get(key) or {"signal": 0, "confidence": 0.0, "error": errors[key]}
+                       for key in items}
+        
+        self._record_latency(started, len(items))
+        return results
+    
+    def predict_scaled(self, X: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Predicciones para filas de características ya escaladas
+        
+        Args:
+            X: Matriz (filas, características) escalada
             
-            if self.target_type == "classification":
-                # Para clasificadores, obtener probabilidades
-                if hasattr(self.model, "predict_proba"):
-                    proba = self.model.predict_proba(X)[0]
+        Returns:
+            List: Predicción y confianza de cada fila
+        """
+        results = []
+        if self.target_type == "classification":
+            # Para clasificadores, obtener probabilidades
+            if hasattr(self.model, "predict_proba"):
+                for proba in self.model.predict_proba(X):
                     # Si es clasificación binaria
                     if len(proba) == 2:
                         confidence = proba[1]
@@ -715,21 +1033,114 @@ class MLStrategy:
                         max_class_idx = np.argmax(proba)
                         signal = max_class_idx - 1  # Convertir a [-1, 0, 1]
                         confidence = proba[max_class_idx]
-                else:
-                    # Si no hay probabilidades, usar predicción directa
-                    signal = self.model.predict(X)[0]
-                    confidence = 0.6  # Confianza predeterminada
+                    results.append({"signal": signal, "confidence": float(confidence)})
             else:
-                # Para regresión, convertir el valor a señal
-                raw_prediction = self.model.predict(X)[0]
+                # Si no hay probabilidades, usar predicción directa
+                for signal in self.model.predict(X):
+                    results.append({"signal": signal, "confidence": 0.6})  # Confianza predeterminada
+        else:
+            # Para regresión, convertir el valor a señal
+            for raw_prediction in self.model.predict(X):
                 signal = 1 if raw_prediction > 0 else -1 if raw_prediction < 0 else 0
                 confidence = min(abs(raw_prediction), 0.1) / 0.1  # Limitar a [0,1]
+                results.append({"signal": signal, "confidence": float(confidence)})
+        
+        # Almacenar última predicción
+        if results:
+            self.last_predictions = results[-1]
+        return results
+    
+    def _predict_lstm(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Predicción LSTM sobre la secuencia de características de un DataFrame"""
+        if not isinstance(df, pd.DataFrame):
+            return {"signal": 0, "confidence": 0.0, "error": "LSTM necesita un DataFrame con el histórico"}
+        
+        # Preparar características
+        features = self.feature_engineering.create_features(df)
+        
+        # Eliminar filas con NaN
+        features = features.dropna()
+        
+        if len(features) == 0:
+            return {"signal": 0, "confidence": 0.0, "error": "No hay suficientes datos para predecir"}
+        
+        # Escalar características
+        self.feature_engineering.load_scalers()  # Cargar scalers guardados
+        scaled_features = self.feature_engineering.scale_features(features, fit=False)
+        
+        # Preparar secuencia para LSTM
+        X = self._prepare_lstm_data(scaled_features)
+        
+        if len(X) == 0:
+            return {"signal": 0, "confidence": 0.0, "error": "Secuencia insuficiente para LSTM"}
+        
+        # Predecir
+        raw_prediction = self.model.predict(X)[-1][0]  # Última predicción
+        
+        if self.target_type == "classification":
+            # Convertir a señal (-1, 0, 1)
+            signal = 1 if raw_prediction > self.prediction_threshold else -1
+            confidence = abs(raw_prediction - 0.5) * 2  # Escalar a [0,1]
+        else:
+            signal = 1 if raw_prediction > 0 else -1 if raw_prediction < 0 else 0
+            confidence = min(abs(raw_prediction), 0.1) / 0.1  # Limitar a [0,1]
         
         # Almacenar última predicción
         self.last_predictions = {"signal": signal, "confidence": float(confidence)}
         
         return self.last_predictions
     
+    def _record_latency(self, started: float, predictions: int):
+        """Registra la latencia de una llamada de predicción"""
+        self.latency.add((time.perf_counter() - started) * 1000)
+        self.predictions_served += predictions
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas de inferencia del modelo
+        
+        Returns:
+            Dict: Predicciones servidas, latencia por llamada (última, media y
+                  máxima), latencia media por predicción y recargas del modelo
+                  y de los scalers
+        """
+        metrics = {
+            "predictions": self.predictions_served,
+            "calls": self.latency.count,
+            **self.latency.as_dict("predict"),
+            "per_prediction_avg_ms": round(self.latency.total / self.predictions_served, 3)
+                                     if self.predictions_served else 0.0,
+            "model_reloads": self.model_reloads,
+            "scaler_reloads": self.feature_engineering.scaler_reloads
+        }
+        return metrics
+    
+    def _model_file(self, path: str) -> str:
+        """Archivo principal del modelo guardado en path"""
+        return path if self.model_type == "lstm" and KERAS_AVAILABLE else f"{path}.pkl"
+    
+    def _current_model_signature(self, path: str) -> Tuple:
+        return _file_signature(self._model_file(path)), _file_signature(f"{path}_metadata.json")
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Recarga el modelo si su archivo cambió desde la última carga o guardado
+        
+        Returns:
+            bool: True si se recargó el modelo
+        """
+        if self.model_path is None:
+            return False
+        signature = self._current_model_signature(self.model_path)
+        if signature == self._model_signature or signature[0] is None:
+            return False
+        
+        logger.info(f"El modelo {self.model_path} cambió en disco, recargando")
+        if self.load_model(self.model_path):
+            self.model_reloads += 1
+            return True
+        return False
+    
     def save_model(self, path: str = None):
         """
         Guarda el modelo entrenado
@@ -765,22 +1176,35 @@ class MLStrategy:
             with open(f"{path}_metadata.json", 'w') as f:
                 json.dump(metadata, f, indent=2)
             
+            # El archivo recién escrito no debe provocar una recarga
+            self.model_path = path
+            self._model_signature = self._current_model_signature(path)
+            
             logger.info(f"Modelo guardado en {path}")
         
         except Exception as e:
             logger.error(f"Error al guardar modelo: {e}")
     
-    def load_model(self, path: str = None):
+    def load_model(self, path: str = None) -> bool:
         """
         Carga un modelo guardado
         
+        Después, predict lo recarga automáticamente si el archivo cambia.
+        
         Args:
             path: Ruta de carga (predeterminada basada en tipo de modelo)
+            
+        Returns:
+            bool: True si se cargó sin errores
         """
         if path is None:
             path = f"models/{self.model_type}_model"
         
         try:
+            # Firma tomada antes de leer: si el archivo cambia durante la
+            # lectura, la siguiente predicción lo vuelve a cargar
+            signature = self._current_model_signature(path)
+            
             # Cargar metadatos
             if os.path.exists(f"{path}_metadata.json"):
                 with open(f"{path}_metadata.json", 'r') as f:
@@ -809,10 +1233,14 @@ class MLStrategy:
             # Cargar scalers
             self.feature_engineering.load_scalers()
             
+            self.model_path = path
+            self._model_signature = signature
             logger.info(f"Modelo cargado desde {path}")
+            return True
         
         except Exception as e:
             logger.error(f"Error al cargar modelo: {e}")
+            return False
     
     def optimize_hyperparameters(self, df: pd.DataFrame, lookahead: int = 1, threshold: float = 0.0):
         """
@@ -957,6 +1385,8 @@ class MLEnsembleStrategy:
             model_configs: Lista de configuraciones de modelos
         """
         self.models = []
+        # Características y scalers compartidos: un solo vector por vela para todos los modelos
+        self.feature_engineering = FeatureEngineering()
         
         # Crear modelos según configuraciones
         if model_configs:
@@ -970,20 +1400,28 @@ class MLEnsembleStrategy:
                     model_type=model_type,
                     model_params=model_params,
                     target_type=target_type,
-                    prediction_threshold=prediction_threshold
+                    prediction_threshold=prediction_threshold,
+                    feature_engineering=self.feature_engineering
                 )
                 
                 self.models.append(model)
         else:
             # Crear conjunto predeterminado
             self.models = [
-                MLStrategy(model_type="random_forest", target_type="classification"),
-                MLStrategy(model_type="gradient_boosting", target_type="classification"),
-                MLStrategy(model_type="mlp", target_type="classification")
+                MLStrategy(model_type="random_forest", target_type="classification",
+                           feature_engineering=self.feature_engineering),
+                MLStrategy(model_type="gradient_boosting", target_type="classification",
+                           feature_engineering=self.feature_engineering),
+                MLStrategy(model_type="mlp", target_type="classification",
+                           feature_engineering=self.feature_engineering)
             ]
         
         self.weights = [1.0] * len(self.models)  # Pesos iguales inicialmente
         self.performance_history = []
+        
+        # Métricas de inferencia del conjunto
+        self.latency = LatencyStats()
+        self.predictions_served = 0
     
     def train_all(self, df: pd.DataFrame, lookahead: int = 1, threshold: float = 0.0):
         """
@@ -1009,25 +1447,78 @@ class MLEnsembleStrategy:
         
         return {"models": len(self.models), "results": results, "weights": self.weights}
     
-    def predict(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def predict(self, df: Union[pd.DataFrame, LiveFeatureState]) -> Dict[str, Any]:
         """
         Realiza predicción ponderada con todos los modelos
         
         Args:
-            df: DataFrame con datos OHLCV
+            df: DataFrame con datos OHLCV, o LiveFeatureState de la serie
             
         Returns:
             Dict: Predicción y confianza
         """
+        return self.predict_batch({None: df})[None]
+    
+    def predict_batch(self, items: Dict[Any, Any]) -> Dict[Any, Dict[str, Any]]:
+        """
+        Predicción ponderada de la vela más reciente de varios bots o símbolos
+        
+        Las características se calculan y escalan una sola vez por entrada y
+        FeatureEngineering; cada modelo puntúa todas las filas en una llamada.
+        
+        Args:
+            items: {clave: DataFrame OHLCV | LiveFeatureState | dict de características}
+            
+        Returns:
+            Dict: {clave: predicción y confianza}
+        """
+        started = time.perf_counter()
+        member_results = []
+        prepared = {}
+        
+        for model in self.models:
+            model.reload_if_changed()
+            if model.model_type == "lstm" or not model.model_trained or model.model is None:
+                member_results.append(model.predict_batch(items))
+                continue
+            
+            feature_engineering = model.feature_engineering
+            if id(feature_engineering) not in prepared:
+                feature_engineering.load_scalers()
+                prepared[id(feature_engineering)] = feature_engineering.prepare_rows(items)
+            keys, X, errors = prepared[id(feature_engineering)]
+            
+            member_started = time.perf_counter()
+            predictions = model.predict_scaled(X) if X is not None else []
+            model._record_latency(member_started, len(keys))
+            scored = dict(zip(keys, predictions))
+            member_results.append({key: scored.get(key) or {"signal": 0, "confidence": 0.0, "error": errors[key]}
+                                   for key in items})
+        
+        results = {key: self._combine([member[key] for member in member_results]) for key in items}
+        self.latency.add((time.perf_counter() - started) * 1000)
+        self.predictions_served += len(items)
+        return results
+    
+    def _combine(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Combina las predicciones de los modelos del conjunto
+        
+        Args:
+            results: Predicción de cada modelo, en el orden de self.models
+            
+        Returns:
+            Dict: Predicción y confianza del conjunto
+        """
         predictions = []
         confidences = []
+        weights = []
         
-        for i, model in enumerate(self.models):
-            result = model.predict(df)
-            
+        for i, result in enumerate(results):
             if "error" not in result:
                 predictions.append(result["signal"])
                 confidences.append(result["confidence"])
+                weights.append(self.weights[i])
             else:
                 logger.warning(f"Error en predicción del modelo {i}: {result['error']}")
         
@@ -1039,7 +1530,7 @@ class MLEnsembleStrategy:
         total_weight = 0
         
         for i, pred in enumerate(predictions):
-            weight = self.weights[i] * confidences[i]
+            weight = weights[i] * confidences[i]
             weighted_sum += pred * weight
             total_weight += weight
         
@@ -1061,6 +1552,22 @@ class MLEnsembleStrategy:
         
         return {"signal": signal, "confidence": float(ensemble_confidence)}
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Métricas de inferencia del conjunto y de cada modelo
+        
+        Returns:
+            Dict: Predicciones servidas, latencia por llamada y métricas por modelo
+        """
+        return {
+            "predictions": self.predictions_served,
+            "calls": self.latency.count,
+            **self.latency.as_dict("predict"),
+            "per_prediction_avg_ms": round(self.latency.total / self.predictions_served, 3)
+                                     if self.predictions_served else 0.0,
+            "models": [model.get_metrics() for model in self.models]
+        }
+    
     def _update_weights(self):
         """Actualiza los pesos de los modelos según su rendimiento"""
         performances = []
@@ -1152,7 +1659,8 @@ class MLEnsembleStrategy:
                     model_type=model_metadata.get("model_type", "random_forest"),
                     model_params=model_metadata.get("model_params", None),
                     target_type=model_metadata.get("target_type", "classification"),
-                    prediction_threshold=model_metadata.get("prediction_threshold", 0.5)
+                    prediction_threshold=model_metadata.get("prediction_threshold", 0.5),
+                    feature_engineering=self.feature_engineering
                 )
                 
                 model.load_model(model_path)
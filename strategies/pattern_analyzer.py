@@ -18,6 +18,9 @@ from datetime import datetime, timedelta
 from enum import Enum
 from scipy import stats
 
+from indicators.batch import rolling_max, rolling_min
+from indicators.patterns import local_extrema, segment_extreme
+
 logger = logging.getLogger("PatternAnalyzer")
 
 class PatternType(Enum):
@@ -271,134 +274,119 @@ class PatternAnalyzer:
         """Detecta patrón de Doble Techo"""
         # Implementación simplificada
         window = min(20, len(df) // 3)
+        high = df['high'].to_numpy(dtype=float)
         
-        # Encontrar máximos locales
-        df['rolling_max'] = df['high'].rolling(window=window, center=True).max()
-        is_max = (df['high'] == df['rolling_max'])
-        
-        max_indices = is_max[is_max].index.tolist()
-        
-        # Buscar dos máximos similares con un valle entre ellos
-        if len(max_indices) >= 2:
-            for i in range(len(max_indices) - 1):
-                idx1 = max_indices[i]
-                idx2 = max_indices[i + 1]
-                
-                # Verificar que los máximos están separados por un mínimo
-                if idx2 - idx1 > window // 2:
-                    price1 = df.loc[idx1, 'high']
-                    price2 = df.loc[idx2, 'high']
-                    
-                    # Verificar que los precios son similares (dentro del 1%)
-                    if abs(price1 - price2) / price1 < 0.01:
-                        # Encontrar el mínimo entre los dos máximos
-                        between_min = df.loc[idx1:idx2, 'low'].min()
-                        
-                        # Verificar que hay un mínimo significativo entre ellos
-                        if (price1 - between_min) / price1 > 0.01:
-                            patterns.append({
-                                'type': 'double_top',
-                                'pattern_type': PatternType.REVERSAL_TOP,
-                                'start_idx': idx1,
-                                'end_idx': idx2,
-                                'first_price': price1,
-                                'second_price': price2,
-                                'strength': SignalStrength.MODERATE,
-                                'target': between_min,  # Objetivo es el mínimo previo
-                                'entry': df.loc[idx2, 'close'],  # Entrada en el cierre del segundo pico
-                                'stop_loss': max(price1, price2) * 1.01  # Stop loss por encima del máximo
-                            })
+        # Encontrar máximos locales y el mínimo entre cada par consecutivo
+        max_pos = local_extrema(high, window, 'max')
+        if len(max_pos) < 2:
+            return
+        first, second = max_pos[:-1], max_pos[1:]
+        price1, price2 = high[first], high[second]
+        between_min = segment_extreme(df['low'], max_pos, 'min')
+        
+        # Máximos separados, con precios similares (1%) y un mínimo significativo entre ellos
+        found = ((second - first > window // 2) &
+                 (np.abs(price1 - price2) / price1 < 0.01) &
+                 ((price1 - between_min) / price1 > 0.01))
+        
+        close = df['close'].to_numpy()
+        for k in np.flatnonzero(found):
+            patterns.append({
+                'type': 'double_top',
+                'pattern_type': PatternType.REVERSAL_TOP,
+                'start_idx': df.index[first[k]],
+                'end_idx': df.index[second[k]],
+                'first_price': price1[k],
+                'second_price': price2[k],
+                'strength': SignalStrength.MODERATE,
+                'target': between_min[k],  # Objetivo es el mínimo previo
+                'entry': close[second[k]],  # Entrada en el cierre del segundo pico
+                'stop_loss': max(price1[k], price2[k]) * 1.01  # Stop loss por encima del máximo
+            })
     
     def _detect_double_bottom(self, df: pd.DataFrame, patterns: List[Dict[str, Any]]):
         """Detecta patrón de Doble Suelo"""
         # Implementación simplificada
         window = min(20, len(df) // 3)
+        low = df['low'].to_numpy(dtype=float)
         
-        # Encontrar mínimos locales
-        df['rolling_min'] = df['low'].rolling(window=window, center=True).min()
-        is_min = (df['low'] == df['rolling_min'])
-        
-        min_indices = is_min[is_min].index.tolist()
-        
-        # Buscar dos mínimos similares con un máximo entre ellos
-        if len(min_indices) >= 2:
-            for i in range(len(min_indices) - 1):
-                idx1 = min_indices[i]
-                idx2 = min_indices[i + 1]
-                
-                # Verificar que los mínimos están separados por un máximo
-                if idx2 - idx1 > window // 2:
-                    price1 = df.loc[idx1, 'low']
-                    price2 = df.loc[idx2, 'low']
-                    
-                    # Verificar que los precios son similares (dentro del 1%)
-                    if abs(price1 - price2) / price1 < 0.01:
-                        # Encontrar el máximo entre los dos mínimos
-                        between_max = df.loc[idx1:idx2, 'high'].max()
-                        
-                        # Verificar que hay un máximo significativo entre ellos
-                        if (between_max - price1) / price1 > 0.01:
-                            patterns.append({
-                                'type': 'double_bottom',
-                                'pattern_type': PatternType.REVERSAL_BOTTOM,
-                                'start_idx': idx1,
-                                'end_idx': idx2,
-                                'first_price': price1,
-                                'second_price': price2,
-                                'strength': SignalStrength.MODERATE,
-                                'target': between_max,  # Objetivo es el máximo previo
-                                'entry': df.loc[idx2, 'close'],  # Entrada en el cierre del segundo suelo
-                                'stop_loss': min(price1, price2) * 0.99  # Stop loss por debajo del mínimo
-                            })
+        # Encontrar mínimos locales y el máximo entre cada par consecutivo
+        min_pos = local_extrema(low, window, 'min')
+        if len(min_pos) < 2:
+            return
+        first, second = min_pos[:-1], min_pos[1:]
+        price1, price2 = low[first], low[second]
+        between_max = segment_extreme(df['high'], min_pos, 'max')
+        
+        # Mínimos separados, con precios similares (1%) y un máximo significativo entre ellos
+        found = ((second - first > window // 2) &
+                 (np.abs(price1 - price2) / price1 < 0.01) &
+                 ((between_max - price1) / price1 > 0.01))
+        
+        close = df['close'].to_numpy()
+        for k in np.flatnonzero(found):
+            patterns.append({
+                'type': 'double_bottom',
+                'pattern_type': PatternType.REVERSAL_BOTTOM,
+                'start_idx': df.index[first[k]],
+                'end_idx': df.index[second[k]],
+                'first_price': price1[k],
+                'second_price': price2[k],
+                'strength': SignalStrength.MODERATE,
+                'target': between_max[k],  # Objetivo es el máximo previo
+                'entry': close[second[k]],  # Entrada en el cierre del segundo suelo
+                'stop_loss': min(price1[k], price2[k]) * 0.99  # Stop loss por debajo del mínimo
+            })
     
     def _detect_head_and_shoulders(self, df: pd.DataFrame, patterns: List[Dict[str, Any]]):
         """Detecta patrón de Hombro-Cabeza-Hombro"""
         # Implementación simplificada - esta es una aproximación básica
         window = min(10, len(df) // 5)
+        high = df['high'].to_numpy(dtype=float)
         
-        # Encontrar máximos locales
-        df['rolling_max'] = df['high'].rolling(window=window, center=True).max()
-        is_max = (df['high'] == df['rolling_max'])
-        
-        max_indices = is_max[is_max].index.tolist()
-        
-        # Se necesitan 3 máximos para este patrón
-        if len(max_indices) >= 3:
-            for i in range(len(max_indices) - 2):
-                left_idx = max_indices[i]
-                head_idx = max_indices[i + 1]
-                right_idx = max_indices[i + 2]
-                
-                # Verificar espaciado apropiado
-                if head_idx - left_idx > window and right_idx - head_idx > window:
-                    left_price = df.loc[left_idx, 'high']
-                    head_price = df.loc[head_idx, 'high']
-                    right_price = df.loc[right_idx, 'high']
-                    
-                    # El máximo central debe ser mayor que los laterales
-                    if head_price > left_price and head_price > right_price:
-                        # Los hombros deben tener precios similares
-                        if abs(left_price - right_price) / left_price < 0.05:
-                            # Encontrar la "línea de cuello" (neckline)
-                            min1 = df.loc[left_idx:head_idx, 'low'].min()
-                            min2 = df.loc[head_idx:right_idx, 'low'].min()
-                            neckline = (min1 + min2) / 2
-                            
-                            patterns.append({
-                                'type': 'head_and_shoulders',
-                                'pattern_type': PatternType.REVERSAL_TOP,
-                                'left_idx': left_idx,
-                                'head_idx': head_idx,
-                                'right_idx': right_idx,
-                                'left_price': left_price,
-                                'head_price': head_price,
-                                'right_price': right_price,
-                                'neckline': neckline,
-                                'strength': SignalStrength.STRONG,
-                                'target': neckline - (head_price - neckline),  # Objetivo es la distancia de cabeza a cuello
-                                'entry': df.loc[right_idx, 'close'],  # Entrada tras el hombro derecho
-                                'stop_loss': head_price * 1.01  # Stop loss por encima de la cabeza
-                            })
+        # Se necesitan 3 máximos locales consecutivos para este patrón
+        max_pos = local_extrema(high, window, 'max')
+        if len(max_pos) < 3:
+            return
+        left, head, right = max_pos[:-2], max_pos[1:-1], max_pos[2:]
+        left_price, head_price, right_price = high[left], high[head], high[right]
+        
+        # Mínimos entre hombro y cabeza, y entre cabeza y hombro: la "línea de cuello"
+        between_min = segment_extreme(df['low'], max_pos, 'min')
+        neckline = (between_min[:-1] + between_min[1:]) / 2
+        
+        # Espaciado apropiado, cabeza por encima y hombros similares (5%)
+        found = ((head - left > window) & (right - head > window) &
+                 (head_price > left_price) & (head_price > right_price) &
+                 (np.abs(left_price - right_price) / left_price < 0.05))
+        
+        close = df['close'].to_numpy()
+        for k in np.flatnonzero(found):
+            patterns.append({
+                'type': 'head_and_shoulders',
+                'pattern_type': PatternType.REVERSAL_TOP,
+                'left_idx': df.index[left[k]],
+                'head_idx': df.index[head[k]],
+                'right_idx': df.index[right[k]],
+                'left_price': left_price[k],
+                'head_price': head_price[k],
+                'right_price': right_price[k],
+                'neckline': neckline[k],
+                'strength': SignalStrength.STRONG,
+                'target': neckline[k] - (head_price[k] - neckline[k]),  # Objetivo es la distancia de cabeza a cuello
+                'entry': close[right[k]],  # Entrada tras el hombro derecho
+                'stop_loss': head_price[k] * 1.01  # Stop loss por encima de la cabeza
+            })
+    
+    @staticmethod
+    def _window_extremes(values: np.ndarray, window: int, mode: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Extremo de las ``window`` velas anteriores y de las ``window`` velas
+        desde la actual, para cada vela i en [window, len - window)
+        """
+        rolling = rolling_max(values, window) if mode == 'max' else rolling_min(values, window)
+        positions = np.arange(window, len(values) - window)
+        return rolling[positions - 1], rolling[positions + window - 1]
     
     def _detect_ascending_triangle(self, df: pd.DataFrame, patterns: List[Dict[str, Any]]):
         """Detecta patrón de Triángulo Ascendente"""
@@ -410,48 +398,41 @@ class PatternAnalyzer:
         if len(df) < window * 2:
             return
         
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        candidates = np.arange(window, len(df) - window)
+        
         # Buscar una resistencia horizontal (máximos similares)
-        max_points = []
-        for i in range(window, len(df) - window):
-            current_high = df.iloc[i]['high']
-            prev_high = df.iloc[i - window:i]['high'].max()
-            next_high = df.iloc[i:i + window]['high'].max()
-            
-            if abs(current_high - prev_high) / prev_high < 0.01 and current_high >= next_high * 0.99:
-                max_points.append((df.index[i], current_high))
+        prev_high, next_high = self._window_extremes(high, window, 'max')
+        current_high = high[candidates]
+        max_points = candidates[(np.abs(current_high - prev_high) / prev_high < 0.01) &
+                                (current_high >= next_high * 0.99)]
         
         # Buscar mínimos ascendentes
-        min_points = []
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            prev_low = df.iloc[i - window:i]['low'].min()
-            next_low = df.iloc[i:i + window]['low'].min()
-            
-            if current_low > prev_low * 1.01 and current_low <= next_low * 1.01:
-                min_points.append((df.index[i], current_low))
+        prev_low, next_low = self._window_extremes(low, window, 'min')
+        current_low = low[candidates]
+        min_points_list = candidates[(current_low > prev_low * 1.01) & (current_low <= next_low * 1.01)]
         
-        if len(max_points) >= min_points and len(min_points) >= min_points:
+        if len(max_points) >= min_points and len(min_points_list) >= min_points:
             # Verificar que hay un patrón de triángulo (resistencia horizontal, soporte ascendente)
-            resistance_level = np.median([p[1] for p in max_points])
+            resistance_level = np.median(high[max_points])
             
             # Calcular línea de tendencia de soporte (simplificado)
-            if len(min_points) >= 2:
-                first_min = min_points[0]
-                last_min = min_points[-1]
-                
-                # Verificar que los mínimos son ascendentes
-                if last_min[1] > first_min[1]:
-                    patterns.append({
-                        'type': 'ascending_triangle',
-                        'pattern_type': PatternType.CONTINUATION,
-                        'start_idx': first_min[0],
-                        'end_idx': last_min[0],
-                        'resistance': resistance_level,
-                        'strength': SignalStrength.MODERATE,
-                        'target': resistance_level * 1.02,  # Objetivo por encima de la resistencia
-                        'entry': resistance_level * 1.01,  # Entrada en ruptura confirmada
-                        'stop_loss': last_min[1] * 0.99  # Stop loss debajo del último mínimo
-                    })
+            first_min, last_min = min_points_list[0], min_points_list[-1]
+            
+            # Verificar que los mínimos son ascendentes
+            if low[last_min] > low[first_min]:
+                patterns.append({
+                    'type': 'ascending_triangle',
+                    'pattern_type': PatternType.CONTINUATION,
+                    'start_idx': df.index[first_min],
+                    'end_idx': df.index[last_min],
+                    'resistance': resistance_level,
+                    'strength': SignalStrength.MODERATE,
+                    'target': resistance_level * 1.02,  # Objetivo por encima de la resistencia
+                    'entry': resistance_level * 1.01,  # Entrada en ruptura confirmada
+                    'stop_loss': low[last_min] * 0.99  # Stop loss debajo del último mínimo
+                })
     
     def _detect_descending_triangle(self, df: pd.DataFrame, patterns: List[Dict[str, Any]]):
         """Detecta patrón de Triángulo Descendente"""
@@ -463,98 +444,86 @@ class PatternAnalyzer:
         if len(df) < window * 2:
             return
         
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        candidates = np.arange(window, len(df) - window)
+        
         # Buscar un soporte horizontal (mínimos similares)
-        min_points_list = []
-        for i in range(window, len(df) - window):
-            current_low = df.iloc[i]['low']
-            prev_low = df.iloc[i - window:i]['low'].min()
-            next_low = df.iloc[i:i + window]['low'].min()
-            
-            if abs(current_low - prev_low) / prev_low < 0.01 and current_low <= next_low * 1.01:
-                min_points_list.append((df.index[i], current_low))
+        prev_low, next_low = self._window_extremes(low, window, 'min')
+        current_low = low[candidates]
+        min_points_list = candidates[(np.abs(current_low - prev_low) / prev_low < 0.01) &
+                                     (current_low <= next_low * 1.01)]
         
         # Buscar máximos descendentes
-        max_points = []
-        for i in range(window, len(df) - window):
-            current_high = df.iloc[i]['high']
-            prev_high = df.iloc[i - window:i]['high'].max()
-            next_high = df.iloc[i:i + window]['high'].max()
-            
-            if current_high < prev_high * 0.99 and current_high >= next_high * 0.99:
-                max_points.append((df.index[i], current_high))
+        prev_high, next_high = self._window_extremes(high, window, 'max')
+        current_high = high[candidates]
+        max_points = candidates[(current_high < prev_high * 0.99) & (current_high >= next_high * 0.99)]
         
         if len(min_points_list) >= min_points and len(max_points) >= min_points:
             # Verificar que hay un patrón de triángulo (soporte horizontal, resistencia descendente)
-            support_level = np.median([p[1] for p in min_points_list])
+            support_level = np.median(low[min_points_list])
             
             # Calcular línea de tendencia de resistencia (simplificado)
-            if len(max_points) >= 2:
-                first_max = max_points[0]
-                last_max = max_points[-1]
-                
-                # Verificar que los máximos son descendentes
-                if last_max[1] < first_max[1]:
-                    patterns.append({
-                        'type': 'descending_triangle',
-                        'pattern_type': PatternType.CONTINUATION,
-                        'start_idx': first_max[0],
-                        'end_idx': last_max[0],
-                        'support': support_level,
-                        'strength': SignalStrength.MODERATE,
-                        'target': support_level * 0.98,  # Objetivo por debajo del soporte
-                        'entry': support_level * 0.99,  # Entrada en ruptura confirmada
-                        'stop_loss': last_max[1] * 1.01  # Stop loss arriba del último máximo
-                    })
+            first_max, last_max = max_points[0], max_points[-1]
+            
+            # Verificar que los máximos son descendentes
+            if high[last_max] < high[first_max]:
+                patterns.append({
+                    'type': 'descending_triangle',
+                    'pattern_type': PatternType.CONTINUATION,
+                    'start_idx': df.index[first_max],
+                    'end_idx': df.index[last_max],
+                    'support': support_level,
+                    'strength': SignalStrength.MODERATE,
+                    'target': support_level * 0.98,  # Objetivo por debajo del soporte
+                    'entry': support_level * 0.99,  # Entrada en ruptura confirmada
+                    'stop_loss': high[last_max] * 1.01  # Stop loss arriba del último máximo
+                })
     
     def _detect_flag_pattern(self, df: pd.DataFrame, patterns: List[Dict[str, Any]]):
         """Detecta patrón de Bandera"""
         # Implementación simplificada
         # Una bandera es un patrón de consolidación tras un movimiento fuerte
         window = min(15, len(df) // 5)
+        if len(df) <= window * 3:
+            return
         
-        # Primero, detectar un movimiento fuerte (tendencia)
-        for i in range(window * 2, len(df) - window):
-            # Calcular retorno en la ventana previa
-            start_price = df.iloc[i - window * 2]['close']
-            pre_end_price = df.iloc[i - window]['close']
-            
-            price_change = (pre_end_price - start_price) / start_price
-            
-            # Considerar un movimiento fuerte si el cambio es > 3%
-            is_strong_move = abs(price_change) > 0.03
+        high = df['high'].to_numpy(dtype=float)
+        low = df['low'].to_numpy(dtype=float)
+        close = df['close'].to_numpy(dtype=float)
+        candidates = np.arange(window * 2, len(df) - window)
+        
+        # Primero, detectar un movimiento fuerte (> 3%) en la ventana previa
+        start_price = close[candidates - window * 2]
+        pre_end_price = close[candidates - window]
+        price_change = (pre_end_price - start_price) / start_price
+        
+        # Rango de la ventana anterior y de la posterior (consolidación)
+        pre_high, post_high = self._window_extremes(high, window, 'max')
+        pre_low, post_low = self._window_extremes(low, window, 'min')
+        pre_range = pre_high[window:] - pre_low[window:]
+        post_range = post_high[window:] - post_low[window:]
+        
+        # Una bandera tiene un rango más estrecho que el movimiento anterior
+        found = (np.abs(price_change) > 0.03) & (post_range < pre_range * 0.7)
+        
+        for k in np.flatnonzero(found):
+            i = candidates[k]
+            flag_direction = "bullish" if price_change[k] > 0 else "bearish"
             
-            if is_strong_move:
-                # Verificar si hay una consolidación (rango más estrecho) después
-                highs = df.iloc[i - window:i]['high']
-                lows = df.iloc[i - window:i]['low']
-                
-                pre_range = highs.max() - lows.min()
-                
-                # Verificar el rango en el período posterior
-                post_highs = df.iloc[i:i + window]['high']
-                post_lows = df.iloc[i:i + window]['low']
-                
-                post_range = post_highs.max() - post_lows.min()
-                
-                # Una bandera tiene un rango más estrecho que el movimiento anterior
-                is_flag = post_range < pre_range * 0.7
-                
-                if is_flag:
-                    flag_direction = "bullish" if price_change > 0 else "bearish"
-                    
-                    patterns.append({
-                        'type': 'flag',
-                        'pattern_type': PatternType.CONTINUATION,
-                        'direction': flag_direction,
-                        'start_idx': df.index[i - window * 2],
-                        'pole_end_idx': df.index[i - window],
-                        'flag_end_idx': df.index[i + window],
-                        'strength': SignalStrength.MODERATE,
-                        'target': pre_end_price + (pre_end_price - start_price) if flag_direction == "bullish" else
-                                 pre_end_price - (start_price - pre_end_price),
-                        'entry': df.iloc[i + window]['close'],  # Entrada al final del período de consolidación
-                        'stop_loss': post_lows.min() * 0.99 if flag_direction == "bullish" else post_highs.max() * 1.01
-                    })
+            patterns.append({
+                'type': 'flag',
+                'pattern_type': PatternType.CONTINUATION,
+                'direction': flag_direction,
+                'start_idx': df.index[i - window * 2],
+                'pole_end_idx': df.index[i - window],
+                'flag_end_idx': df.index[i + window],
+                'strength': SignalStrength.MODERATE,
+                'target': pre_end_price[k] + (pre_end_price[k] - start_price[k]) if flag_direction == "bullish" else
+                         pre_end_price[k] - (start_price[k] - pre_end_price[k]),
+                'entry': close[i + window],  # Entrada al final del período de consolidación
+                'stop_loss': post_low[window + k] * 0.99 if flag_direction == "bullish" else post_high[window + k] * 1.01
+            })
     
     def analyze_recent_price_behavior(self, df: pd.DataFrame, lookback_bars: int = 100) -> Dict[str, Any]:
         """
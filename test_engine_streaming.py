@@ -0,0 +1,79 @@
+"""
+Pruebas de paridad del modo streaming de BacktestEngine (backtesting/engine.py)
+
+Comparan run_backtest(streaming=True) con el bucle original, que copia el
+prefijo de datos en cada vela: mismas operaciones y misma curva de equity
+con una función de estrategia clásica (sin copia, el valor por defecto, y
+con copia), con una estrategia que modifica el DataFrame recibido y con la
+misma estrategia como serie de señales.
+
+Ejecutar con: python -m pytest test_engine_streaming.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting.engine import BacktestEngine
+from backtesting.streaming import SignalSeriesStrategy
+
+
+def make_data(n: int = 300, seed: int = 9) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2024-01-01', periods=n, freq='15min')
+    return pd.DataFrame({'open': close, 'high': close * 1.002, 'low': close * 0.998,
+                         'close': close, 'volume': rng.uniform(1, 10, n)}, index=index)
+
+
+def sma_signals(df: pd.DataFrame, fast: int = 5, slow: int = 20) -> pd.Series:
+    """1 con la media rápida por encima, -1 por debajo y 0 (cierre) en el cruce exacto o sin datos"""
+    diff = df['close'].rolling(fast).mean() - df['close'].rolling(slow).mean()
+    return np.sign(diff).fillna(0)
+
+
+def sma_cross(df: pd.DataFrame, fast: int = 5, slow: int = 20):
+    """Función de estrategia clásica: decide con la última vela del prefijo"""
+    signal = int(sma_signals(df, fast, slow).iloc[-1])
+    return signal, f"sma {fast}/{slow}: {signal}"
+
+
+def sma_cross_mutating(df: pd.DataFrame, fast: int = 5, slow: int = 20):
+    """Igual que sma_cross, pero después escribe en el DataFrame recibido (en el sitio)"""
+    df['signal'] = sma_signals(df, fast, slow)
+    signal = int(df['signal'].iloc[-1])
+    df.loc[df.index[0], 'close'] = -1.0
+    df.iloc[-1, df.columns.get_loc('close')] *= 2
+    return signal, f"sma {fast}/{slow}: {signal}"
+
+
+def run(engine: BacktestEngine, strategy, **kwargs):
+    results = engine.run_backtest(strategy, {'fast': 5, 'slow': 20}, **kwargs)
+    trades = [(t['type'], t['timestamp'], t['exit_timestamp'], t['entry_price'], t['exit_price'], t['pnl'])
+              for t in engine.simulator.trades]
+    equity = np.array(engine.simulator.equity_ledger.equity, dtype=float)
+    return results, trades, equity
+
+
+@pytest.mark.parametrize('strategy, options', [
+    (sma_cross, {}),
+    (sma_cross, {'copy_history': True}),
+    (sma_cross_mutating, {}),
+    (SignalSeriesStrategy(sma_signals, {'fast': 5, 'slow': 20}), {}),
+])
+def test_streaming_matches_legacy_loop(strategy, options):
+    data = make_data()
+    engine = BacktestEngine(symbol='SOL-USDT', timeframe='15m')
+    engine.data = data
+    engine.start_date, engine.end_date = data.index.min(), data.index.max()
+
+    legacy_results, legacy_trades, legacy_equity = run(engine, sma_cross)
+    results, trades, equity = run(engine, strategy, streaming=True, **options)
+
+    assert len(legacy_trades) > 5
+    assert {t[0] for t in legacy_trades} == {'long', 'short'}
+    assert [t[:3] for t in trades] == [t[:3] for t in legacy_trades]
+    np.testing.assert_allclose([t[3:] for t in trades], [t[3:] for t in legacy_trades], rtol=1e-12)
+    np.testing.assert_allclose(equity, legacy_equity, rtol=1e-12)
+    assert results['net_profit'] == pytest.approx(legacy_results['net_profit'], rel=1e-12)
+    pd.testing.assert_frame_equal(engine.data, make_data())
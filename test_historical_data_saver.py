@@ -0,0 +1,67 @@
+"""
+Pruebas del volcado por lotes de HistoricalDataSaver
+(data_management/historical_data_saver_async.py)
+
+Comprueban, sobre una base de datos SQLite temporal, que las filas
+envenenadas (restricción NOT NULL, tipo no soportado o número de columnas
+incorrecto) se apartan sin impedir que el resto del lote ni los volcados
+siguientes se guarden.
+
+Ejecutar con: python -m pytest test_historical_data_saver.py
+"""
+
+import asyncio
+import sqlite3
+
+from data_management.historical_data_saver_async import HistoricalDataSaver
+
+
+def ticker_message(ts: int, price: float) -> dict:
+    return {'data': [{'ts': str(ts), 'instId': 'SOL-USDT', 'last': str(price), 'askPx': str(price + 0.01),
+                      'bidPx': str(price - 0.01), 'high24h': '200', 'low24h': '100',
+                      'volCcy24h': '1000', 'vol24h': '10'}]}
+
+
+def count_rows(db_path, table: str) -> int:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_poisoned_row_does_not_block_flushes(tmp_path):
+    db_path = str(tmp_path / 'market.db')
+
+    async def scenario():
+        saver = HistoricalDataSaver(db_path, flush_interval=60)
+        await saver.connect()
+        try:
+            for i in range(3):
+                await saver.save_ticker_data(ticker_message(1_700_000_000_000 + i, 150.0 + i))
+            await saver._enqueue('tickers', (1_700_000_000_005, 'SOL-USDT', {'last': 1.0}, 1.0, 1.0,
+                                             1.0, 1.0, 1.0, 1.0))
+            await saver._enqueue('order_book', (1_700_000_000_000, 'SOL-USDT'))
+            await saver._enqueue('order_book', (1_700_000_000_000, 'SOL-USDT', 149.9, 2.0, 150.1, 3.0, '42'))
+            await saver._enqueue('candlesticks', (1_700_000_000_000, 'SOL-USDT', '1m', 150.0, 151.0, 149.0,
+                                                  150.5, 10.0, 1500.0, None))
+            await saver._enqueue('candlesticks', (1_700_000_000_000, 'SOL-USDT', '5m', 150.0, 151.0, 149.0,
+                                                  150.5, 10.0, 1500.0, 1_700_000_000_100))
+            first = await saver.flush()
+
+            await saver.save_ticker_data(ticker_message(1_700_000_000_010, 160.0))
+            second = await saver.flush()
+            return first, second, saver.get_metrics(), list(saver.rejected_rows)
+        finally:
+            await saver.disconnect()
+
+    first, second, metrics, rejected = asyncio.run(scenario())
+
+    assert first == 5
+    assert second == 1
+    assert metrics['rows_rejected'] == 3
+    assert metrics['flush_errors'] == 1
+    assert metrics['rows_flushed'] == 6
+    assert metrics['backlog'] == 0
+    assert metrics['rows_dropped'] == 0
+    assert sorted(table for table, _, _ in rejected) == ['candlesticks', 'order_book', 'tickers']
+    assert count_rows(db_path, 'tickers') == 4
+    assert count_rows(db_path, 'order_book') == 1
+    assert count_rows(db_path, 'candlesticks') == 1
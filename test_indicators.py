@@ -0,0 +1,210 @@
+"""
+Pruebas de paridad de la librería de indicadores (indicators/)
+
+Comparan, vela a vela, las fórmulas de pandas de TechnicalIndicators con:
+- los objetos de indicators.streaming (update/peek, O(1) por vela), que deben
+  dar exactamente los mismos números (la desviación estándar, salvo redondeo);
+- las funciones de indicators.batch (NumPy), iguales salvo redondeo.
+
+Ejecutar con: python -m pytest test_indicators.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from classic_strategies import TechnicalIndicators
+from indicators import batch, streaming
+
+# Tolerancia del cálculo por lotes (sumas por bloques frente a sumas acumuladas)
+RTOL = 1e-9
+ATOL = 1e-9
+# Con una ventana constante la varianza acumulada de pandas deja un residuo de
+# orden ε·precio² y su raíz llega a ~1e-6; el cálculo por bloques da 0 exacto
+STD_ATOL = 1e-5
+
+
+def make_ohlc(n: int = 1500, seed: int = 7, flat: bool = True) -> pd.DataFrame:
+    """Paseo aleatorio con un tramo plano (ventanas constantes y divisiones 0/0)"""
+    rng = np.random.default_rng(seed)
+    close = 150.0 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    high = close * (1 + np.abs(rng.normal(0, 0.001, n)))
+    low = close * (1 - np.abs(rng.normal(0, 0.001, n)))
+    if flat:
+        rows = slice(n // 3, n // 3 + 40)
+        close[rows] = high[rows] = low[rows] = close[n // 3]
+    index = pd.date_range('2024-01-01', periods=n, freq='min')
+    return pd.DataFrame({'high': high, 'low': low, 'close': close}, index=index)
+
+
+def pandas_reference(method, *args, **kwargs):
+    """Resultado de TechnicalIndicators con las fórmulas de pandas"""
+    backend = TechnicalIndicators.backend
+    TechnicalIndicators.backend = 'pandas'
+    try:
+        return method(*args, **kwargs)
+    finally:
+        TechnicalIndicators.backend = backend
+
+
+def as_columns(result):
+    """Series, tupla o diccionario de Series -> lista de arrays"""
+    if isinstance(result, dict):
+        return [np.asarray(result[key], dtype=float) for key in sorted(result)]
+    if isinstance(result, tuple):
+        return [np.asarray(r, dtype=float) for r in result]
+    return [np.asarray(result, dtype=float)]
+
+
+def stream(indicator, *columns):
+    """Alimenta un indicador vela a vela, comprobando que peek coincide con update"""
+    rows = []
+    for values in zip(*(c.tolist() for c in columns)):
+        preview = indicator.peek(*values)
+        value = indicator.update(*values)
+        assert _bits(preview) == _bits(value)
+        rows.append(value)
+    if isinstance(rows[0], dict):
+        return [np.array([row[key] for row in rows]) for key in sorted(rows[0])]
+    if isinstance(rows[0], tuple):
+        return [np.array(column) for column in zip(*rows)]
+    return [np.array(rows)]
+
+
+def _bits(value):
+    if isinstance(value, dict):
+        value = [value[key] for key in sorted(value)]
+    return np.asarray(value, dtype=float).tobytes()
+
+
+def assert_identical(expected, actual):
+    for exp, act in zip(expected, actual):
+        np.testing.assert_array_equal(np.isnan(exp), np.isnan(act))
+        np.testing.assert_array_equal(exp, act)
+
+
+def assert_close(expected, actual, atol: float = ATOL):
+    assert len(expected) == len(actual)
+    for exp, act in zip(expected, actual):
+        np.testing.assert_array_equal(np.isnan(exp), np.isnan(act))
+        np.testing.assert_allclose(act, exp, rtol=RTOL, atol=atol)
+
+
+CASES = [
+    # (método de TechnicalIndicators, indicador streaming, función batch, entradas, parámetros)
+    ('sma', streaming.SMA, batch.sma, ('close',), {'period': 20}),
+    ('sma', streaming.SMA, batch.sma, ('close',), {'period': 1}),
+    ('ema', streaming.EMA, batch.ema, ('close',), {'period': 12}),
+    ('rsi', streaming.RSI, batch.rsi, ('close',), {'period': 14}),
+    ('macd', streaming.MACD, batch.macd, ('close',), {}),
+    ('bollinger_bands', streaming.BollingerBands, batch.bollinger_bands, ('close',),
+     {'period': 20, 'num_std_dev': 2.0}),
+    ('atr', streaming.ATR, batch.atr, ('high', 'low', 'close'), {'period': 14}),
+    ('adx', streaming.ADX, batch.adx, ('high', 'low', 'close'), {'period': 14}),
+    ('stochastic', streaming.Stochastic, batch.stochastic, ('high', 'low', 'close'), {}),
+]
+
+# Salidas derivadas de la desviación estándar (ver STD_ATOL)
+USES_STD = {'bollinger_bands'}
+
+
+def test_streaming_matches_pandas():
+    df = make_ohlc()
+    for name, indicator, _, inputs, params in CASES:
+        series = [df[col] for col in inputs]
+        expected = as_columns(pandas_reference(getattr(TechnicalIndicators, name), *series, **params))
+        actual = stream(indicator(**params), *(df[col].to_numpy() for col in inputs))
+        if name in USES_STD:
+            assert_close(expected, actual, atol=STD_ATOL)
+        else:
+            assert_identical(expected, actual)
+
+
+def test_streaming_std_does_not_drift():
+    close = make_ohlc(20000, flat=False)['close'].to_numpy()
+    std = streaming.RollingStd(20)
+    actual = np.array([std.update(value) for value in close.tolist()])
+    assert_close([batch.rolling_std(close, 20)], [actual])
+
+
+def test_batch_matches_pandas():
+    df = make_ohlc()
+    for name, _, function, inputs, params in CASES:
+        series = [df[col] for col in inputs]
+        expected = as_columns(pandas_reference(getattr(TechnicalIndicators, name), *series, **params))
+        actual = as_columns(function(*(df[col].to_numpy() for col in inputs), **params))
+        assert_close(expected, actual, atol=STD_ATOL if name in USES_STD else ATOL)
+
+
+def test_ichimoku():
+    df = make_ohlc()
+    expected = pandas_reference(TechnicalIndicators.ichimoku, df['high'], df['low'], df['close'])
+    components = batch.ichimoku(df['high'], df['low'], df['close'])
+    assert_close(as_columns(expected), as_columns(components))
+
+    # En streaming no hay Chikou Span (mira al futuro): se comparan el resto
+    del expected['chikou_span']
+    actual = stream(streaming.Ichimoku(), df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy())
+    assert_identical(as_columns(expected), actual)
+
+
+def test_technical_indicators_numpy_backend():
+    df = make_ohlc()
+    checks = [
+        ('sma', (df['close'], 20)), ('ema', (df['close'], 20)), ('rsi', (df['close'],)),
+        ('macd', (df['close'],)), ('bollinger_bands', (df['close'],)),
+        ('atr', (df['high'], df['low'], df['close'])), ('adx', (df['high'], df['low'], df['close'])),
+        ('stochastic', (df['high'], df['low'], df['close'])),
+        ('ichimoku', (df['high'], df['low'], df['close'])),
+    ]
+    assert TechnicalIndicators.backend == 'numpy'
+    for name, args in checks:
+        method = getattr(TechnicalIndicators, name)
+        expected, actual = pandas_reference(method, *args), method(*args)
+        if isinstance(expected, pd.Series):
+            expected, actual = (expected,), (actual,)
+        elif isinstance(expected, dict):
+            expected, actual = [expected[k] for k in sorted(expected)], [actual[k] for k in sorted(actual)]
+        for exp, act in zip(expected, actual):
+            pd.testing.assert_series_equal(act, exp, check_exact=False, rtol=RTOL,
+                                           atol=STD_ATOL if name in USES_STD else ATOL)
+
+
+def test_nan_and_short_inputs():
+    close = make_ohlc(200)['close'].to_numpy().copy()
+    close[50] = np.nan
+    for period in (5, 20):
+        expected = pd.Series(close).rolling(period)
+        assert_close([expected.mean().to_numpy()], [batch.sma(close, period)])
+        assert_close([expected.std().to_numpy()], [batch.rolling_std(close, period)], atol=STD_ATOL)
+        assert_close([expected.max().to_numpy()], [batch.rolling_max(close, period)])
+        assert_identical([expected.mean().to_numpy()], stream(streaming.SMA(period), close))
+    assert_identical([pd.Series(close).ewm(span=10, adjust=False).mean().to_numpy()],
+                     [batch.ema(close, 10)])
+    assert_identical([pd.Series(close).ewm(span=10, adjust=False).mean().to_numpy()],
+                     stream(streaming.EMA(10), close))
+
+    short = close[:10]
+    assert np.isnan(batch.sma(short, 20)).all()
+    assert np.isnan(batch.rolling_std(short, 20)).all()
+    assert len(batch.ema(np.array([]), 10)) == 0
+
+
+def test_peek_does_not_change_state():
+    df = make_ohlc(300)
+    adx = streaming.ADX()
+    adx.warmup(df['high'][:-1], df['low'][:-1], df['close'][:-1])
+    last = (df['high'].iloc[-1], df['low'].iloc[-1], df['close'].iloc[-1])
+    # Varios ticks de la vela en curso y después su cierre
+    for factor in (0.99, 1.01, 1.0):
+        adx.peek(last[0] * factor, last[1] * factor, last[2] * factor)
+    final = adx.update(*last)
+    expected = pandas_reference(TechnicalIndicators.adx, df['high'], df['low'], df['close'])
+    assert _bits(final) == _bits(tuple(series.iloc[-1] for series in expected))
+
+
+if __name__ == "__main__":
+    for test in (test_streaming_matches_pandas, test_streaming_std_does_not_drift, test_batch_matches_pandas, test_ichimoku,
+                 test_technical_indicators_numpy_backend, test_nan_and_short_inputs,
+                 test_peek_does_not_change_state):
+        test()
+        print(f"OK {test.__name__}")
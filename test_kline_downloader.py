@@ -0,0 +1,183 @@
+"""
+Pruebas del descargador de velas (data_management/kline_downloader.py)
+
+Levantan un servidor aiohttp local que imita /api/v3/klines de Binance y
+comprueban, sobre un almacén columnar temporal:
+- la pausa de Retry-After ante un 429 y el reintento de la petición;
+- la reanudación de una descarga interrumpida a partir de la última vela;
+- el relleno de huecos intermedios pidiendo sólo lo que falta;
+- que no se guardan velas duplicadas aunque el exchange las repita;
+- que los huecos del propio exchange se informan en ``missing_after``.
+
+Ejecutar con: python -m pytest test_kline_downloader.py
+"""
+
+import asyncio
+import time
+
+import numpy as np
+from aiohttp import web
+
+from data_management.columnar_store import ColumnarStore
+from data_management.kline_downloader import INTERVAL_MS, KLINES_PATH, KlineDownloader, to_ms
+
+SYMBOL = 'SOLUSDT'
+INTERVAL = '1m'
+IV = INTERVAL_MS[INTERVAL]
+START = to_ms('2024-01-01')
+
+
+def at(i: int) -> int:
+    """Tiempo de apertura de la vela ``i`` desde START"""
+    return START + i * IV
+
+
+class KlineStub:
+    """Servidor de velas sintéticas con límites de peso, rechazos y huecos configurables"""
+
+    def __init__(self, holes=(), rate_limited: int = 0, retry_after: str = '1',
+                 reject_from=None, repeat_last: bool = False):
+        self.holes = set(holes)
+        self.rate_limited = rate_limited
+        self.retry_after = retry_after
+        self.reject_from = reject_from
+        self.repeat_last = repeat_last
+        self.log = []  # (instante, status, startTime, endTime)
+
+    @staticmethod
+    def kline(t: int) -> list:
+        price = 100.0 + (t - START) / IV * 0.01
+        return [t, f"{price:.2f}", f"{price + 1:.2f}", f"{price - 1:.2f}", f"{price + 0.5:.2f}",
+                "10.0", t + IV - 1, "1000.0", 5, "5.0", "500.0", "0"]
+
+    async def handle(self, request: web.Request) -> web.Response:
+        start = int(request.query['startTime'])
+        end = int(request.query['endTime'])
+        limit = int(request.query['limit'])
+        now = time.monotonic()
+        if self.rate_limited:
+            self.rate_limited -= 1
+            self.log.append((now, 429, start, end))
+            return web.json_response({'code': -1003, 'msg': 'Too many requests'}, status=429,
+                                     headers={'Retry-After': self.retry_after})
+        if self.reject_from is not None and start >= self.reject_from:
+            self.log.append((now, 400, start, end))
+            return web.json_response({'code': -1121, 'msg': 'Invalid symbol'}, status=400)
+        self.log.append((now, 200, start, end))
+        first = -(-start // IV) * IV
+        rows = [self.kline(t) for t in range(first, end + 1, IV) if t not in self.holes][:limit]
+        if self.repeat_last and rows:
+            rows.append(rows[-1])
+        return web.json_response(rows, headers={'X-MBX-USED-WEIGHT-1M': '10'})
+
+    def served(self, status: int = 200) -> list:
+        return [(start, end) for _, code, start, end in self.log if code == status]
+
+
+def download(stub: KlineStub, root, start=None, end=None, fill_gaps: bool = True, **options):
+    """Descarga SYMBOL contra el servidor local; devuelve (estadísticas, descargador)"""
+    async def scenario():
+        app = web.Application()
+        app.router.add_get(KLINES_PATH, stub.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            downloader = KlineDownloader(str(root), base_url=f"http://127.0.0.1:{port}", **options)
+            async with downloader:
+                return await downloader.download(SYMBOL, INTERVAL, start, end, fill_gaps), downloader
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(scenario())
+
+
+def stored_open_times(root) -> np.ndarray:
+    values = ColumnarStore(str(root)).dataset(SYMBOL, INTERVAL).read_arrays(['open_time'])['open_time']
+    return np.asarray(values).astype('datetime64[ms]').astype(np.int64)
+
+
+def assert_stored(root, expected):
+    times = stored_open_times(root)
+    assert len(np.unique(times)) == len(times), "velas duplicadas en el almacén"
+    assert np.sort(times).tolist() == sorted(expected)
+
+
+def test_retry_after_pauses_and_retries(tmp_path):
+    stub = KlineStub(rate_limited=1, retry_after='1')
+    stats, downloader = download(stub, tmp_path, at(0), at(2500), limit=1000, max_concurrency=1)
+
+    assert stats['candles'] == 2500
+    assert stats['missing_after'] == 0
+    assert downloader.retries == 1
+    limited_at, _, start, _ = next(entry for entry in stub.log if entry[1] == 429)
+    retried_at = next(t for t, code, s, _ in stub.log if code == 200 and s == start)
+    assert retried_at - limited_at >= 0.9
+    assert_stored(tmp_path, [at(i) for i in range(2500)])
+
+
+def test_resumes_interrupted_download(tmp_path):
+    stub = KlineStub(reject_from=at(1500))
+    first, _ = download(stub, tmp_path, at(0), at(3000), limit=500)
+    assert first['candles'] == 1500
+    assert first['missing_after'] == 1500
+
+    stub.reject_from = None
+    stub.log.clear()
+    second, _ = download(stub, tmp_path, None, at(3000), fill_gaps=False, limit=500)
+
+    assert min(start for start, _ in stub.served()) == at(1500)
+    assert second['candles'] == 1500
+    assert second['missing_after'] == 0
+    assert_stored(tmp_path, [at(i) for i in range(3000)])
+
+
+def test_fills_gaps_without_duplicates(tmp_path):
+    hole = set(at(i) for i in range(400, 650))
+    stub = KlineStub(holes=hole)
+    first, _ = download(stub, tmp_path, at(0), at(2000), limit=1000)
+    assert first['missing_after'] == len(hole)
+
+    stub.holes.clear()
+    stub.log.clear()
+    second, _ = download(stub, tmp_path, at(0), at(2000), limit=1000)
+
+    assert stub.served() == [(at(400), at(650) - 1)]
+    assert second['gaps'] == 1
+    assert second['candles'] == len(hole)
+    assert second['missing_after'] == 0
+    assert_stored(tmp_path, [at(i) for i in range(2000)])
+
+    stub.log.clear()
+    third, _ = download(stub, tmp_path, at(0), at(2000), limit=1000)
+    assert stub.log == []
+    assert third['candles'] == 0
+    assert_stored(tmp_path, [at(i) for i in range(2000)])
+
+
+def test_drops_duplicates_sent_by_exchange(tmp_path):
+    stub = KlineStub(repeat_last=True)
+    stats, _ = download(stub, tmp_path, at(0), at(1200), limit=300)
+
+    assert stats['requests'] == 4
+    assert stats['duplicates_received'] == 4
+    assert stats['candles'] == 1200
+    assert_stored(tmp_path, [at(i) for i in range(1200)])
+
+
+def test_reports_exchange_holes_in_missing_after(tmp_path):
+    holes = {at(i) for i in (5, 6, 7, 333, 999)} | {at(i) for i in range(1500, 1560)}
+    stub = KlineStub(holes=holes)
+    first, _ = download(stub, tmp_path, at(0), at(2000), limit=1000)
+
+    assert first['candles'] == 2000 - len(holes)
+    assert first['missing_after'] == len(holes)
+
+    # Al repetir, sólo se vuelven a pedir los huecos y siguen sin datos
+    second, _ = download(stub, tmp_path, at(0), at(2000), limit=1000)
+    assert second['missing_before'] == len(holes)
+    assert second['candles'] == 0
+    assert second['missing_after'] == len(holes)
+    assert_stored(tmp_path, sorted(set(at(i) for i in range(2000)) - holes))
@@ -0,0 +1,83 @@
+"""
+Pruebas de ParallelGridRunner (backtesting/parallel.py)
+
+Comprueban que un grid da los mismos resultados en serie (n_jobs=1) y en
+paralelo (n_jobs=2): los procesos reciben los datos con los mismos dtypes
+(enteros, booleanos, fechas, texto) y la misma vista de solo lectura que el
+camino en serie.
+
+Ejecutar con: python -m pytest test_parallel.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting.parallel import ParallelGridRunner, SharedOHLCV, generate_param_combinations
+
+
+def make_data(n: int = 500, tz: str = None) -> pd.DataFrame:
+    rng = np.random.default_rng(4)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2024-01-01', periods=n, freq='min', tz=tz, name='timestamp')
+    return pd.DataFrame({
+        'open': close,
+        'close': close,
+        'trades': rng.integers(0, 50, n),
+        'confirmed': rng.random(n) > 0.1,
+        'close_time': index.tz_localize(None) + pd.Timedelta(seconds=59) if tz else index + pd.Timedelta(seconds=59),
+        'symbol': 'SOL-USDT',
+        'volume': rng.uniform(1, 10, n).astype(np.float32)
+    }, index=index)
+
+
+def evaluate(data: pd.DataFrame, params, context):
+    """Métricas que dependen de los dtypes, del índice y de poder escribir en los datos"""
+    window = params['window']
+    signal = data['close'].rolling(window).mean()
+    try:
+        data.iloc[0, 0] = -1.0
+        writable = True
+    except ValueError:
+        writable = False
+    return {
+        'dtypes': [str(dtype) for dtype in data.dtypes],
+        'columns': list(data.columns),
+        'index': str(data.index.dtype),
+        'first_index': str(data.index[0]),
+        'signal_last': float(signal.iloc[-1]),
+        'trades_sum': int(data['trades'][data['confirmed']].sum()),
+        'trades_type': type(data['trades'].iloc[0]).__name__,
+        'symbol': data['symbol'].iloc[-1],
+        'last_close_time': str(data['close_time'].iloc[-1]),
+        'volume_sum': float(data['volume'].sum()),
+        'writable': writable
+    }
+
+
+@pytest.mark.parametrize('tz', [None, 'Europe/Madrid'])
+def test_serial_and_parallel_results_match(tz):
+    data = make_data(tz=tz)
+    combinations = generate_param_combinations({'window': [5, 20, 50]})
+
+    serial = ParallelGridRunner(evaluate, data, n_jobs=1).run(combinations)
+    parallel = ParallelGridRunner(evaluate, data, n_jobs=2).run(combinations)
+
+    assert serial == parallel
+    result = serial[0][1]
+    assert result['dtypes'] == [str(dtype) for dtype in data.dtypes]
+    assert result['columns'] == list(data.columns)
+    assert result['index'] == str(data.index.dtype)
+    assert result['writable'] is False
+    assert data.iloc[0, 0] != -1.0
+
+
+def test_local_view_is_read_only_copy_with_same_dtypes():
+    data = make_data()
+    view = SharedOHLCV.local_view(data)
+
+    pd.testing.assert_frame_equal(view, data)
+    with pytest.raises(ValueError):
+        view.loc[view.index[0], 'close'] = 0.0
+    view['extra'] = 1.0
+    assert 'extra' not in data.columns
@@ -0,0 +1,88 @@
+"""
+Pruebas de paridad de la simulación de cortos (core/short_trading.py)
+
+Comparan ShortTradingSimulator.run_vectorized_simulation (núcleo por arrays
+simulate_short_positions) con el bucle por vela de run_simulation, con
+señales aleatorias en futuros, margen y spot, con y sin SL/TP, con y sin
+apalancamiento y con posiciones del 100% del balance: mismas operaciones,
+mismo registro, misma curva de equity y mismas estadísticas.
+
+Ejecutar con: python -m pytest test_short_trading.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.short_trading import ShortTradingSimulator
+
+INITIAL_BALANCE = 10000.0
+
+
+def make_data(n: int = 400, seed: int = 11) -> pd.DataFrame:
+    """Paseo aleatorio horario con volatilidad suficiente para tocar SL/TP y liquidaciones"""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    index = pd.date_range('2024-01-01', periods=n, freq='h')
+    return pd.DataFrame({'open': close, 'high': close * 1.001, 'low': close * 0.999,
+                         'close': close, 'volume': 1.0}, index=index)
+
+
+def random_strategy(seed: int):
+    def strategy(data: pd.DataFrame) -> pd.Series:
+        rng = np.random.default_rng(seed)
+        return pd.Series(rng.choice([-1, 0, 0, 0, 1], len(data)), index=data.index)
+    return strategy
+
+
+def assert_same_simulation(loop, vectorized):
+    assert vectorized['total_trades'] == loop['total_trades']
+    assert [(t['type'], t['time'], t.get('close_reason')) for t in vectorized['trades_log']] == \
+        [(t['type'], t['time'], t.get('close_reason')) for t in loop['trades_log']]
+    loop_pnl = [t['pnl_info']['net_pnl'] for t in loop['trades_log'] if 'pnl_info' in t]
+    vec_pnl = [t['pnl_info']['net_pnl'] for t in vectorized['trades_log'] if 'pnl_info' in t]
+    np.testing.assert_allclose(vec_pnl, loop_pnl, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(vectorized['equity_curve'], loop['equity_curve'], rtol=1e-9)
+    for key in ('final_balance', 'total_return_pct', 'max_drawdown_pct', 'sharpe_ratio',
+                'win_rate', 'total_fees', 'fee_impact_pct'):
+        assert vectorized[key] == pytest.approx(loop[key], rel=1e-9, abs=1e-9, nan_ok=True), key
+
+
+@pytest.mark.parametrize('position_size_pct', [25.0, 100.0])
+@pytest.mark.parametrize('leverage', [1.0, 5.0, 20.0])
+@pytest.mark.parametrize('sl_tp', [(None, None), (3.0, 6.0)])
+@pytest.mark.parametrize('trade_type', ['futures', 'margin', 'spot'])
+def test_vectorized_simulation_matches_loop(trade_type, sl_tp, leverage, position_size_pct):
+    data = make_data()
+    strategy = random_strategy(seed=5)
+    stop_loss_pct, take_profit_pct = sl_tp
+    params = dict(initial_balance=INITIAL_BALANCE, leverage=leverage, position_size_pct=position_size_pct,
+                  stop_loss_pct=stop_loss_pct, take_profit_pct=take_profit_pct)
+
+    loop = ShortTradingSimulator('SOL-USDT', trade_type=trade_type).run_simulation(data, strategy, **params)
+    vectorized = ShortTradingSimulator('SOL-USDT', trade_type=trade_type).run_vectorized_simulation(
+        data, strategy, **params)
+
+    assert loop['total_trades'] > 0
+    assert_same_simulation(loop, vectorized)
+
+
+def test_rejected_entry_does_not_stop_simulation():
+    """Con el 100% del balance, el redondeo puede rechazar una entrada y aceptar la siguiente"""
+    rejected_price = next(p for p in np.arange(1.01, 100.0, 0.01)
+                          if INITIAL_BALANCE / p * p > INITIAL_BALANCE)
+    close = np.full(12, 100.0)
+    close[2] = rejected_price
+    index = pd.date_range('2024-01-01', periods=len(close), freq='h')
+    data = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 1.0},
+                        index=index)
+    signals = pd.Series([0, 0, -1, 0, 0, -1, 0, 0, 1, 0, 0, 0], index=index)
+    params = dict(initial_balance=INITIAL_BALANCE, position_size_pct=100.0,
+                  stop_loss_pct=None, take_profit_pct=None)
+
+    loop = ShortTradingSimulator('SOL-USDT').run_simulation(data, lambda df: signals, **params)
+    vectorized = ShortTradingSimulator('SOL-USDT').run_vectorized_simulation(data, lambda df: signals, **params)
+
+    assert loop['total_trades'] == 1
+    assert vectorized['trades_log'][0]['time'] == index[5].isoformat()
+    assert_same_simulation(loop, vectorized)
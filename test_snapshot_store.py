@@ -0,0 +1,89 @@
+"""
+Pruebas del almacén de snapshots (adaptive_system/snapshot_store.py) y de la
+rotación de respaldos programados (adaptive_system/brain_transfer.py)
+
+Comprueban que un bloque truncado en disco se vuelve a escribir en vez de
+reutilizarse, que gc espera a que termine un create en curso y que
+scheduled_backup sólo rota sus propios snapshots.
+
+Ejecutar con: python -m pytest test_snapshot_store.py
+"""
+
+import datetime
+import os
+import threading
+
+from adaptive_system import brain_transfer
+from adaptive_system.brain_transfer import BrainTransfer, scheduled_backup
+from adaptive_system.snapshot_store import SnapshotStore
+
+
+def write_file(path, size: int, seed: int = 0) -> str:
+    path.write_bytes(bytes((i * 31 + seed) % 251 for i in range(size)))
+    return str(path)
+
+
+def test_truncated_chunk_is_rewritten(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'store'), chunk_size=4096)
+    source = write_file(tmp_path / 'model.bin', 10000)
+    manifest = store.create([('model.bin', source)], snapshot_id='first')
+
+    digest = manifest['files']['model.bin']['chunks'][0]
+    chunk_path = store._chunk_path(digest)
+    with open(chunk_path, 'rb') as f:
+        payload = f.read()
+    with open(chunk_path, 'wb') as f:
+        f.write(payload[:len(payload) // 2])
+
+    (tmp_path / 'model.bin').touch()
+    second = store.create([('model.bin', source)], snapshot_id='second')
+
+    assert second['stats']['new_chunks'] == 1
+    with open(chunk_path, 'rb') as f:
+        assert f.read() == payload
+    store.restore('second', str(tmp_path / 'restored'))
+    assert (tmp_path / 'restored' / 'model.bin').read_bytes() == (tmp_path / 'model.bin').read_bytes()
+
+
+def test_gc_waits_for_create_in_progress(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'store'), chunk_size=4096)
+    source = write_file(tmp_path / 'model.bin', 10000)
+    result = {}
+
+    with store._lock(exclusive=False):
+        # Bloque escrito por un create que aún no ha guardado su manifiesto
+        digest, _ = store._put_chunk(b'chunk in progress')
+        gc_thread = threading.Thread(target=lambda: result.update(store.gc()))
+        gc_thread.start()
+        gc_thread.join(timeout=0.3)
+        assert gc_thread.is_alive()
+        assert os.path.exists(store._chunk_path(digest))
+        store.create([('model.bin', source)], snapshot_id='concurrent')
+    gc_thread.join(timeout=5)
+
+    assert not gc_thread.is_alive()
+    assert result['removed_chunks'] == 1
+    assert not os.path.exists(store._chunk_path(digest))
+    store.restore('concurrent', str(tmp_path / 'restored'))
+    assert (tmp_path / 'restored' / 'model.bin').read_bytes() == (tmp_path / 'model.bin').read_bytes()
+
+
+def test_scheduled_backup_keeps_manual_snapshots(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'indicator_performance.json').write_text('{}')
+    BrainTransfer().create_snapshot('manual_before_upgrade')
+
+    start = datetime.datetime(2026, 1, 1)
+    ticks = iter(range(100))
+
+    class SteppingDatetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return start + datetime.timedelta(seconds=next(ticks))
+
+    monkeypatch.setattr(brain_transfer.datetime, 'datetime', SteppingDatetime)
+    created = [scheduled_backup(keep=2) for _ in range(4)]
+
+    ids = {s['id'] for s in SnapshotStore(str(tmp_path / 'brain_exports' / 'snapshots')).list_snapshots()}
+    assert ids == {'manual_before_upgrade', created[2], created[3]}
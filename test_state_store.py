@@ -0,0 +1,48 @@
+"""
+Pruebas de JsonStateStore (core/state_store.py)
+
+Comprueban que la escritura aplazada guarda el documento tal como estaba en
+el último mark_dirty y que el temporizador nunca llama a ``snapshot`` ni
+recorre el estado vivo del propietario desde su hilo.
+
+Ejecutar con: python -m pytest test_state_store.py
+"""
+
+import json
+import threading
+import time
+
+from core.state_store import JsonStateStore
+
+
+def test_timer_writes_copy_taken_on_owner_thread(tmp_path):
+    path = tmp_path / 'state.json'
+    state = {'weights': {'rsi': 1.0}, 'history': [1]}
+    snapshot_threads = []
+
+    def snapshot():
+        snapshot_threads.append(threading.get_ident())
+        return {'weights': state['weights'], 'history': state['history']}
+
+    store = JsonStateStore(str(path), snapshot, min_interval=0.2)
+    try:
+        store.mark_dirty()
+        assert json.loads(path.read_text()) == {'weights': {'rsi': 1.0}, 'history': [1]}
+
+        state['weights']['rsi'] = 2.0
+        state['history'].append(2)
+        store.mark_dirty()
+        # Cambios sin mark_dirty: no deben colarse en la escritura aplazada
+        state['weights']['macd'] = 3.0
+        state['history'].append(3)
+
+        deadline = time.monotonic() + 5
+        while store.writes < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert store.writes == 2
+        assert not store.dirty
+        assert json.loads(path.read_text()) == {'weights': {'rsi': 2.0}, 'history': [1, 2]}
+        assert set(snapshot_threads) == {threading.get_ident()}
+    finally:
+        store.close()
@@ -0,0 +1,97 @@
+"""
+Pruebas de paridad del núcleo vectorizado (backtesting/vectorized.py)
+
+Comparan simulate_signals/signal_transitions con los bucles por vela que
+sustituyen, incluidas las señales NaN del calentamiento de los indicadores:
+- BacktestResult(vectorized=True) frente al bucle de BacktestResult;
+- signal_transitions frente a las reglas del bucle aplicadas vela a vela.
+
+Ejecutar con: python -m pytest test_vectorized.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtesting.advanced_optimizer import BacktestResult
+from backtesting.vectorized import signal_transitions
+
+
+def make_data(n: int = 600, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range('2024-01-01', periods=n, freq='h')
+    return pd.DataFrame({'open': close, 'high': close * 1.001, 'low': close * 0.999,
+                         'close': close, 'volume': 1.0}, index=index)
+
+
+def make_signals(index: pd.Index, seed: int, nan_blocks: bool = True) -> pd.Series:
+    """Señales aleatorias con tramos NaN (al inicio y en medio de los datos)"""
+    rng = np.random.default_rng(seed)
+    signals = pd.Series(rng.choice([-1.0, 0.0, 0.0, 1.0], len(index)), index=index)
+    if nan_blocks:
+        signals.iloc[:25] = np.nan
+        signals.iloc[200:230] = np.nan
+        signals.iloc[rng.choice(len(index), 20, replace=False)] = np.nan
+    return signals
+
+
+def reference_transitions(signals: np.ndarray, nan_policy: str):
+    """Reglas del bucle de BacktestResult, vela a vela"""
+    entries, exits, directions = [], [], []
+    position = 0
+    for i in range(1, len(signals)):
+        signal = signals[i]
+        if np.isnan(signal) and nan_policy == 'zero':
+            signal = 0.0
+        if position == 0 and signal != 0:
+            position = 1 if signal > 0 else -1
+            entries.append(i)
+            directions.append(position)
+        elif position != 0 and ((position == 1 and signal < 0) or (position == -1 and signal > 0)):
+            exits.append(i)
+            position = 0
+    if len(exits) < len(entries):
+        exits.append(-1)
+    return entries, exits, directions
+
+
+@pytest.mark.parametrize('nan_policy', ['zero', 'short'])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_signal_transitions_match_loop(seed, nan_policy):
+    signals = make_signals(make_data().index, seed).to_numpy()
+    entries, exits, directions = signal_transitions(signals, nan_policy=nan_policy)
+    ref_entries, ref_exits, ref_directions = reference_transitions(signals, nan_policy)
+    assert entries.tolist() == ref_entries
+    assert exits.tolist() == ref_exits
+    assert directions.tolist() == ref_directions
+
+
+def test_nan_policy_zero_ignores_nan():
+    signals = np.array([np.nan, np.nan, np.nan, 1, np.nan, -1, np.nan])
+    entries, exits, directions = signal_transitions(signals)
+    assert entries.tolist() == [3]
+    assert exits.tolist() == [5]
+    assert directions.tolist() == [1]
+
+
+@pytest.mark.parametrize('nan_blocks', [False, True])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_backtest_result_vectorized_matches_loop(seed, nan_blocks):
+    data = make_data()
+    signals = make_signals(data.index, seed, nan_blocks)
+
+    loop = BacktestResult('test', {}, data, signals)
+    vectorized = BacktestResult('test', {}, data, signals, vectorized=True)
+
+    loop_exits = [t for t in loop.trades if t['type'] == 'exit']
+    vec_exits = [t for t in vectorized.trades if t['type'] == 'exit']
+    assert [(t['time'], t['position']) for t in vec_exits] == \
+        [(t['time'], t['position']) for t in loop_exits]
+    np.testing.assert_allclose([t['pnl'] for t in vec_exits],
+                               [t['pnl'] for t in loop_exits], rtol=1e-9)
+    np.testing.assert_allclose(vectorized.equity_curve.to_numpy(),
+                               loop.equity_curve.to_numpy(), rtol=1e-9)
+    assert vectorized.final_balance == pytest.approx(loop.final_balance, rel=1e-9)
+    for key, value in loop.metrics.items():
+        assert vectorized.metrics[key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
@@ -17,6 +17,10 @@ from dotenv import load_dotenv
 from typing import Dict, List, Optional
 from websockets import connect
 
+from data_management.candle_buffer import CandleRingBuffer
+from data_management.columnar_store import ColumnarStore
+from features.incremental import MACD, RSI, SMA, IncrementalFeatureEngine
+
 # Configurar encoding para Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -118,13 +122,13 @@ class BinanceWebSocketClient:
 class PaperTradingEngine:
     """Motor de paper trading con aprendizaje"""
     
-    def __init__(self, symbol="SOLUSDT", initial_balance=10000):
+    def __init__(self, symbol="SOLUSDT", initial_balance=10000, history_capacity=5000,
+                 market_store: Optional[str] = 'market_store', interval='1m'):
         self.symbol = symbol
         self.balance = initial_balance
         self.initial_balance = initial_balance
         self.position = None
         self.trades = []
-        self.market_data = []
         self.learning_data = []
         
         # Configuración de riesgo
@@ -157,6 +161,15 @@ class PaperTradingEngine:
             }
         }
         
+        # Velas cerradas con indicadores incrementales; las que salen del buffer
+        # se vuelcan al almacén columnar (None = se descartan)
+        spill_dataset = None
+        if market_store:
+            spill_dataset = ColumnarStore(market_store).dataset(symbol, interval, kind='live_klines')
+        self.market_data = CandleRingBuffer(capacity=history_capacity,
+                                            engine=self.build_feature_engine(),
+                                            spill_dataset=spill_dataset)
+        
         logger.info(f"Bot inicializado - Symbol: {self.symbol} - Balance inicial: ${self.initial_balance:.2f}")
 
     def analyze_market(self, candle_data):
@@ -164,11 +177,8 @@ class PaperTradingEngine:
         if len(self.market_data) < 26:  # Necesitamos al menos 26 velas para MACD
             return None
             
-        df = pd.DataFrame(self.market_data)
-        df = self.calculate_technical_indicators(df)
-        
         current_price = float(candle_data['close'])
-        current_data = df.iloc[-1]
+        current_data = self.market_data.last()
         
         # Señales técnicas usando la configuración actual
         signals = {
@@ -202,26 +212,20 @@ class PaperTradingEngine:
             'signal': 1 if weighted_signal > 0.5 else -1 if weighted_signal < -0.5 else 0
         }
 
+    def build_feature_engine(self) -> IncrementalFeatureEngine:
+        """Motor de indicadores incrementales según indicator_config"""
+        rsi, macd, sma = (self.indicator_config[k] for k in ('rsi', 'macd', 'sma'))
+        return IncrementalFeatureEngine([
+            RSI(rsi['period'], 'rsi', method='sma'),
+            MACD(macd['fast'], macd['slow'], macd['signal'],
+                 columns={'macd': 'macd', 'signal': 'macd_signal', 'hist': None}),
+            SMA(sma['fast'], 'sma_fast'),
+            SMA(sma['slow'], 'sma_slow')
+        ])
+
     def calculate_technical_indicators(self, df):
-        """Calcula indicadores técnicos en el DataFrame"""
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=self.indicator_config['rsi']['period']).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=self.indicator_config['rsi']['period']).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-        
-        # MACD
-        exp1 = df['close'].ewm(span=self.indicator_config['macd']['fast']).mean()
-        exp2 = df['close'].ewm(span=self.indicator_config['macd']['slow']).mean()
-        df['macd'] = exp1 - exp2
-        df['macd_signal'] = df['macd'].ewm(span=self.indicator_config['macd']['signal']).mean()
-        
-        # SMAs
-        df['sma_fast'] = df['close'].rolling(window=self.indicator_config['sma']['fast']).mean()
-        df['sma_slow'] = df['close'].rolling(window=self.indicator_config['sma']['slow']).mean()
-        
-        return df
+        """Calcula indicadores técnicos en el DataFrame (pasada completa con un motor nuevo)"""
+        return self.build_feature_engine().add_features(df)
 
     def execute_trade(self, analysis):
         """Ejecuta operaciones basadas en el análisis"""
@@ -361,14 +365,10 @@ class LearningTradingBot:
                     if data['type'] == 'kline':
                         candle_data = data['data'][0]
                         
-                        # Evitar procesar la misma vela múltiples veces
-                        if candle_data['timestamp'] != last_candle_time:
-                            self.engine.market_data.append(candle_data)
-                            
-                            # Mantener solo las últimas 100 velas
-                            if len(self.engine.market_data) > 100:
-                                self.engine.market_data = self.engine.market_data[-100:]
-                            
+                        # Evitar procesar la misma vela múltiples veces; el buffer
+                        # actualiza los indicadores sólo con la vela nueva
+                        if (candle_data['timestamp'] != last_candle_time and
+                                self.engine.market_data.append(candle_data)):
                             # Analizar mercado y ejecutar operaciones
                             analysis = self.engine.analyze_market(candle_data)
                             if analysis and analysis['signal']:
@@ -377,7 +377,7 @@ class LearningTradingBot:
                             last_candle_time = candle_data['timestamp']
                             
                             # Log de actividad cada 5 velas
-                            if len(self.engine.market_data) % 5 == 0:
+                            if self.engine.market_data.count % 5 == 0:
                                 logger.info(f"[PRECIO] {self.engine.symbol}: ${candle_data['close']:.4f} | "
                                           f"Datos: {len(self.engine.market_data)} velas | "
                                           f"Balance: ${self.engine.balance:.2f}")
@@ -396,6 +396,7 @@ class LearningTradingBot:
         self.running = False
         if self.ws_client and self.ws_client.ws:
             await self.ws_client.ws.close()
+        self.engine.market_data.flush()
         self.engine.analyze_performance()
 
 async def main():
@@ -10,6 +10,8 @@ from sklearn.preprocessing import MinMaxScaler
 
 # Importamos la clase BinanceDataProcessor
 from binance_data_processor import BinanceDataProcessor 
+from data_management.columnar_store import iter_market_data, count_rows, dataset_path_for_csv
+from features.incremental import compute_features_chunked, processor_feature_set
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -21,112 +23,66 @@ def prepare_data_for_ml_chunked(
     final_processed_csv_filename: str = "SOLUSDT_full_processed_for_ml.csv"
 ):
     """
-    Prepara los datos para el Machine Learning leyendo el dataset grande por chunks,
-    procesando cada chunk y guardándolo en Google Drive para persistencia.
-    Luego, carga y concatena los chunks procesados para el entrenamiento.
+    Prepara los datos para el Machine Learning leyendo el dataset grande por chunks.
+    Los indicadores se calculan con el motor incremental, que arrastra su estado
+    entre chunks (overlap_candles ya no es necesario y se ignora), y cada
+    indicador por chunk se guarda en una caché con huella de contenido y
+    parámetros dentro de processed_chunks_base_dir.
     """
-    # Si filepath es una lista de archivos, los concatenamos antes de procesar por chunks
+    # Si filepath es una lista de archivos, se leen por chunks uno tras otro
+    # (sin concatenarlos en un CSV temporal que habría que volver a parsear)
+    sources = filepath if isinstance(filepath, list) else [filepath]
     if isinstance(filepath, list):
-        logging.info(f"Concatenando {len(filepath)} archivos de datos brutos SOLUSDT...")
-        df_list = [pd.read_csv(f) for f in filepath]
-        full_df = pd.concat(df_list, ignore_index=True)
-        # Guardar temporalmente el archivo concatenado para procesamiento por chunks
-        temp_concat_path = os.path.join(processed_chunks_base_dir, "SOLUSDT_full_concat.csv")
-        full_df.to_csv(temp_concat_path, index=False)
-        filepath = temp_concat_path
-    if not os.path.exists(filepath):
-        logging.error(f"Archivo de dataset no encontrado: {filepath}")
-        return None, None, None, None, None, None, None
+        logging.info(f"Leyendo {len(sources)} archivos de datos brutos SOLUSDT...")
+    for source in sources:
+        # Vale el CSV o su dataset columnar convertido ('<fichero>.cstore')
+        if not os.path.exists(source) and not os.path.isdir(dataset_path_for_csv(source)):
+            logging.error(f"Archivo de dataset no encontrado: {source}")
+            return None, None, None, None, None, None, None
 
     processor = BinanceDataProcessor()
     estimated_bytes_per_row = 160
     chunksize_rows = int((chunk_size_mb * 1024 * 1024) / estimated_bytes_per_row)
-    if chunksize_rows < overlap_candles * 2:
-        chunksize_rows = overlap_candles * 2 + 100
-        logging.warning(f"Chunk size de {chunk_size_mb} MB es muy pequeño. Ajustado a {chunksize_rows} filas para asegurar el procesamiento de indicadores.")
     logging.info(f"Estimando {chunksize_rows} filas por chunk para {chunk_size_mb} MB.")
 
     os.makedirs(processed_chunks_base_dir, exist_ok=True)
     logging.info(f"Directorio de chunks procesados creado/verificado: {processed_chunks_base_dir}")
 
-    header = pd.read_csv(filepath, nrows=0).columns.tolist()
-    total_rows = sum(1 for line in open(filepath)) - 1
+    total_rows = sum(count_rows(source) for source in sources)
     logging.info(f"Total de filas en el dataset original: {total_rows}")
 
-    current_start_row = 1
-    chunk_idx = 0
-    overlap_buffer = pd.DataFrame()
-    csv_iterator = pd.read_csv(filepath, chunksize=chunksize_rows, iterator=True, nrows=50000)
-    processed_chunk_files = []
+    numeric_cols = ['open', 'high', 'low', 'close', 'volume', 'quote_asset_volume',
+                    'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume']
+    # Sólo se leen las columnas de velas que usa el pipeline (la columna 'ignore'
+    # de Binance no se carga); con dataset columnar no se parsea el CSV
+    kline_cols = ['open_time', 'close_time'] + numeric_cols
 
-    while True:
-        chunk_filename = os.path.join(processed_chunks_base_dir, f"chunk_{chunk_idx:05d}.csv")
-        if os.path.exists(chunk_filename):
-            logging.info(f"Chunk {chunk_idx + 1} ya procesado y guardado: {chunk_filename}. Cargando para concatenar.")
-            processed_chunk_files.append(chunk_filename)
-            try:
-                # Avanza el iterador para que no vuelva a procesar el mismo chunk
-                # Esto es una corrección para asegurar que el iterador de CSV avance adecuadamente si el archivo ya existe.
-                for _ in range(int(chunksize_rows / chunksize_rows)):
-                     _ = next(csv_iterator)
-            except StopIteration:
-                break
-            current_start_row += chunksize_rows
-            chunk_idx += 1
-            continue
-        logging.info(f"Procesando y guardando chunk {chunk_idx + 1}...")
-        try:
-            df_chunk = next(csv_iterator)
-        except StopIteration:
-            break
-        df_chunk['open_time'] = pd.to_datetime(df_chunk['open_time'])
-        df_chunk['close_time'] = pd.to_datetime(df_chunk['close_time'])
-        combined_df = pd.concat([overlap_buffer, df_chunk]).reset_index(drop=True)
-        logging.info(f"Tamaño combinado (buffer + chunk): {len(combined_df)} filas.")
-        
-        # Aquí el procesador de datos ahora también calculará el nuevo 'target'
-        processed_combined_df = processor.process_data_chunk(combined_df) 
-        
-        # Ajustamos el criterio de primera fila válida:
-        # Ahora el target (ej. 'future_return') es clave, además de los indicadores.
-        # Asumiendo que el nuevo target tendrá NaNs al final si se usa .shift(-N)
-        first_valid_row_idx = processed_combined_df.dropna(
-            subset=['rsi', 'sma_20', 'ema_26', 'MACD', 'MACD_SIGNAL', 'MACD_HIST', 'target'] # Indicadores y target en mayúsculas
-        ).index.min()
-        
-        if first_valid_row_idx is None:
-            logging.warning(f"Chunk {chunk_idx + 1}: No se encontraron filas válidas después del cálculo de indicadores y target. Saltando este chunk.")
-            overlap_buffer = df_chunk.tail(overlap_candles).copy()
-            current_start_row += len(df_chunk)
-            chunk_idx += 1
-            continue
-        start_index_for_current_data = len(overlap_buffer)
-        effective_start_idx = max(first_valid_row_idx, start_index_for_current_data)
-        processed_chunk_data = processed_combined_df.iloc[effective_start_idx:]
-        logging.info(f"Chunk {chunk_idx + 1} procesado. Filas útiles añadidas: {len(processed_chunk_data)}. Columnas: {processed_chunk_data.columns.tolist()}")
-        processed_chunk_data.to_csv(chunk_filename, index=False)
-        processed_chunk_files.append(chunk_filename)
-        logging.info(f"Chunk {chunk_idx + 1} guardado en: {chunk_filename}")
-        overlap_buffer = df_chunk.tail(overlap_candles).copy()
-        chunk_idx += 1
-        current_start_row += len(df_chunk)
+    def _clean_chunks():
+        chunks = iter_market_data(sources, columns=kline_cols, chunksize=chunksize_rows, nrows=50000)
+        for chunk_idx, df_chunk in enumerate(chunks):
+            logging.info(f"Procesando chunk {chunk_idx + 1}...")
+            for col in numeric_cols:
+                if col in df_chunk.columns:
+                    df_chunk[col] = pd.to_numeric(df_chunk[col], errors='coerce')
+            df_chunk = df_chunk.dropna(subset=[col for col in numeric_cols if col in df_chunk.columns])
+            df_chunk['open_time'] = pd.to_datetime(df_chunk['open_time'])
+            df_chunk['close_time'] = pd.to_datetime(df_chunk['close_time'])
+            yield processor.calculate_time_features(df_chunk)
 
-    logging.info(f"Fase de procesamiento de chunks completada. Total de chunks guardados: {len(processed_chunk_files)}")
-    logging.info("Cargando y concatenando todos los chunks procesados desde Google Drive...")
-    existing_processed_files = sorted(glob.glob(os.path.join(processed_chunks_base_dir, "chunk_*.csv")))
-    if not existing_processed_files:
-        logging.error("No se encontraron chunks procesados para cargar. Algo salió mal en la fase de procesamiento.")
-        return None, None, None, None, None, None, None
-    full_processed_df_list = []
-    for f in existing_processed_files:
-        try:
-            full_processed_df_list.append(pd.read_csv(f))
-        except Exception as e:
-            logging.error(f"Error al cargar el chunk procesado {f}: {e}")
-    if not full_processed_df_list:
-        logging.error("No se pudieron cargar chunks válidos para la concatenación final.")
+    # Los indicadores continúan su estado de un chunk al siguiente (sin solapamiento de velas)
+    # y cada indicador/chunk ya calculado se reutiliza de la caché si no cambió ni el dato ni el parámetro
+    feature_cache_dir = os.path.join(processed_chunks_base_dir, "feature_cache")
+    full_processed_df = compute_features_chunked(_clean_chunks(), processor_feature_set(), feature_cache_dir)
+    if full_processed_df.empty:
+        logging.error("No se encontraron datos para procesar en el dataset.")
         return None, None, None, None, None, None, None
-    full_processed_df = pd.concat(full_processed_df_list, ignore_index=True)
+    full_processed_df = full_processed_df.reset_index(drop=True)
+
+    # El target mira velas futuras, así que se calcula sobre el histórico completo
+    full_processed_df = processor.calculate_future_profitability_target(full_processed_df,
+                                                                        price_change_percent_threshold=0.0,
+                                                                        horizon_candles=5)
+    full_processed_df = processor.detect_trading_signals(full_processed_df)
     logging.info(f"Todos los chunks concatenados. Dimensiones del DataFrame final: {full_processed_df.shape}")
     final_csv_path = os.path.join(processed_chunks_base_dir, final_processed_csv_filename)
     try:
@@ -55,6 +55,9 @@ class OKXWebSocketClient:
         self.on_position_callback = None
         self.on_order_callback = None
         
+        # Listeners que reciben el mensaje público completo (con 'arg')
+        self.message_listeners: List[Callable[[Dict], None]] = []
+        
         # Control flags
         self.keep_running = False
         self.connected_public = False
@@ -127,6 +130,12 @@ class OKXWebSocketClient:
             if 'data' in data:
                 channel = data.get('arg', {}).get('channel')
                 
+                for listener in self.message_listeners:
+                    try:
+                        listener(data)
+                    except Exception as e:
+                        logger.error(f"Error in message listener: {e}")
+                
                 if channel == 'tickers':
                     if self.on_ticker_callback:
                         self.on_ticker_callback(data['data'])
@@ -451,6 +460,24 @@ class OKXWebSocketClient:
         self.public_ws.send(json.dumps(sub_msg))
         logger.info(f"Subscribed to orderbooks for {symbols} with depth {depth}")
     
+    def resubscribe(self, channel: str, symbol: str):
+        """
+        Cancela y repite la suscripción a un canal (p. ej. para recibir un
+        snapshot nuevo del libro tras un checksum incorrecto)
+        
+        Args:
+            channel: Canal de OKX (ej. "books")
+            symbol: Par (ej. "BTC-USDT")
+        """
+        if not self.connected_public:
+            logger.warning(f"Public WebSocket not connected, can't resubscribe to {channel}")
+            return
+        
+        args = [{"channel": channel, "instId": symbol}]
+        self.public_ws.send(json.dumps({"op": "unsubscribe", "args": args}))
+        self.public_ws.send(json.dumps({"op": "subscribe", "args": args}))
+        logger.info(f"Resubscribed to {channel} for {symbol}")
+    
     def subscribe_trades(self, symbols: List[str]):
         """Suscribe a trades en tiempo real"""
         if not self.connected_public:
@@ -552,6 +579,13 @@ class OKXWebSocketClient:
         self.private_ws.send(json.dumps(sub_msg))
         logger.info("Subscribed to order updates")
     
+    def add_message_listener(self, listener: Callable[[Dict], None]):
+        """
+        Añade un listener que recibe cada mensaje público de datos completo
+        (incluido 'arg' con canal e instId), p. ej. MarketDataHub.on_okx_message
+        """
+        self.message_listeners.append(listener)
+    
     def register_ticker_callback(self, callback: Callable[[List[Dict]], None]):
         """Registra callback para tickers"""
         self.on_ticker_callback = callback